@@ -0,0 +1,144 @@
+"""create core tables
+
+Revision ID: 0b1e7f3c9a42
+Revises:
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b1e7f3c9a42'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Раньше основные таблицы создавал API при старте (create_all).
+    # В такой БД они уже есть - миграция их не трогает
+    if 'users' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('telegram_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('registration_date', sa.DateTime(), nullable=False),
+    sa.Column('referral_code', sa.String(), nullable=False),
+    sa.Column('referred_by', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('referral_code')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True)
+
+    op.create_table('subscription_tiers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tier_name', sa.String(), nullable=False),
+    sa.Column('display_name', sa.String(), nullable=False),
+    sa.Column('model_name', sa.String(), nullable=False),
+    sa.Column('price_rubles', sa.Integer(), nullable=False),
+    sa.Column('daily_messages', sa.Integer(), nullable=False),
+    sa.Column('video_hours_limit', sa.Integer(), nullable=False),
+    sa.Column('files_limit', sa.Integer(), nullable=False),
+    sa.Column('photos_limit', sa.Integer(), nullable=False),
+    sa.Column('texts_limit', sa.Integer(), nullable=False),
+    sa.Column('daily_video_hours', sa.Integer(), nullable=False),
+    sa.Column('daily_files', sa.Integer(), nullable=False),
+    sa.Column('daily_photos', sa.Integer(), nullable=False),
+    sa.Column('daily_texts', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('display_name'),
+    sa.UniqueConstraint('tier_name')
+    )
+    op.create_index(op.f('ix_subscription_tiers_id'), 'subscription_tiers', ['id'], unique=False)
+
+    op.create_table('user_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('upload_date', sa.DateTime(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('file_type', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('extracted_text', sa.Text(), nullable=True),
+    sa.Column('file_url', sa.String(), nullable=True),
+    sa.Column('duration_hours', sa.Float(), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_documents_id'), 'user_documents', ['id'], unique=False)
+
+    op.create_table('user_actions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=True),
+    sa.Column('action_date', sa.DateTime(), nullable=False),
+    sa.Column('action_type', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['user_documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_actions_id'), 'user_actions', ['id'], unique=False)
+    op.create_index(op.f('ix_user_actions_user_id'), 'user_actions', ['user_id'], unique=False)
+
+    op.create_table('transactions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payment_provider_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tier_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('payment_method', sa.String(), nullable=False),
+    sa.Column('payment_provider', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tier_id'], ['subscription_tiers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('payment_provider_id')
+    )
+    op.create_index(op.f('ix_transactions_id'), 'transactions', ['id'], unique=False)
+
+    op.create_table('user_subscriptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tier_id', sa.Integer(), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=True),
+    sa.Column('source', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date_plan', sa.DateTime(), nullable=True),
+    sa.Column('end_date_fact', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tier_id'], ['subscription_tiers.id'], ),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_subscriptions_id'), 'user_subscriptions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_subscriptions_id'), table_name='user_subscriptions')
+    op.drop_table('user_subscriptions')
+    op.drop_index(op.f('ix_transactions_id'), table_name='transactions')
+    op.drop_table('transactions')
+    op.drop_index(op.f('ix_user_actions_user_id'), table_name='user_actions')
+    op.drop_index(op.f('ix_user_actions_id'), table_name='user_actions')
+    op.drop_table('user_actions')
+    op.drop_index(op.f('ix_user_documents_id'), table_name='user_documents')
+    op.drop_table('user_documents')
+    op.drop_index(op.f('ix_subscription_tiers_id'), table_name='subscription_tiers')
+    op.drop_table('subscription_tiers')
+    op.drop_index(op.f('ix_users_telegram_id'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
@@ -1,7 +1,7 @@
 """add support tables
 
 Revision ID: 5c617080f948
-Revises: 
+Revises: 0b1e7f3c9a42
 Create Date: 2026-01-03 12:06:04.525412
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '5c617080f948'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '0b1e7f3c9a42'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
@@ -0,0 +1,73 @@
+"""add user_documents limit indexes
+
+Revision ID: a3f1c2d4e5b6
+Revises: 5c617080f948
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c2d4e5b6'
+down_revision: Union[str, Sequence[str], None] = '5c617080f948'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции,
+    # зато таблица не блокируется на запись во время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_documents_user_type_date',
+            'user_documents',
+            ['user_id', 'file_type', 'upload_date'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_user_documents_active_user_type_date',
+            'user_documents',
+            ['user_id', 'file_type', 'upload_date'],
+            unique=False,
+            postgresql_where=sa.text('is_deleted = false'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_user_actions_user_type_date',
+            'user_actions',
+            ['user_id', 'action_type', 'action_date'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_actions_user_type_date',
+            table_name='user_actions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.drop_index(
+            'ix_user_documents_active_user_type_date',
+            table_name='user_documents',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.drop_index(
+            'ix_user_documents_user_type_date',
+            table_name='user_documents',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -0,0 +1,81 @@
+"""add user_usage
+
+Revision ID: b7e2d9c1f0a3
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d9c1f0a3'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c2d4e5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_usage',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('texts_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('photos_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('files_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('video_hours', sa.Float(), server_default='0', nullable=False),
+    sa.Column('usage_day', sa.Date(), nullable=True),
+    sa.Column('daily_texts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('daily_photos', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('daily_files', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('daily_video_hours', sa.Float(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Начальное заполнение по user_documents (те же правила, что и в UsageService).
+    # Расхождения из-за часового пояса сервера БД исправит ночная сверка.
+    op.execute("""
+        INSERT INTO user_usage (
+            user_id, texts_count, photos_count, files_count, video_hours,
+            usage_day, daily_texts, daily_photos, daily_files, daily_video_hours, updated_at
+        )
+        SELECT
+            u.id,
+            count(d.id) FILTER (WHERE d.file_type = 'text' AND d.is_deleted = false),
+            count(d.id) FILTER (WHERE d.file_type = 'photo' AND d.is_deleted = false AND d.status = 'completed'),
+            count(d.id) FILTER (WHERE d.file_type = 'file' AND d.is_deleted = false AND d.status = 'completed'),
+            coalesce(sum(d.duration_hours) FILTER (
+                WHERE d.file_type = 'video' AND d.is_deleted = false AND d.status = 'completed'
+            ), 0),
+            CURRENT_DATE,
+            count(d.id) FILTER (
+                WHERE d.file_type = 'text' AND d.is_deleted = false
+                AND d.upload_date >= CURRENT_DATE AND d.upload_date < CURRENT_DATE + 1
+            ),
+            count(d.id) FILTER (
+                WHERE d.file_type = 'photo'
+                AND d.upload_date >= CURRENT_DATE AND d.upload_date < CURRENT_DATE + 1
+            ),
+            count(d.id) FILTER (
+                WHERE d.file_type = 'file'
+                AND d.upload_date >= CURRENT_DATE AND d.upload_date < CURRENT_DATE + 1
+            ),
+            coalesce(sum(d.duration_hours) FILTER (
+                WHERE d.file_type = 'video'
+                AND d.upload_date >= CURRENT_DATE AND d.upload_date < CURRENT_DATE + 1
+            ), 0),
+            now()
+        FROM users u
+        LEFT JOIN user_documents d ON d.user_id = u.id
+        GROUP BY u.id
+        ON CONFLICT (user_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_usage')
@@ -0,0 +1,74 @@
+"""add user_documents preview
+
+Revision ID: c4d8e1f2a7b9
+Revises: b7e2d9c1f0a3
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e1f2a7b9'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d9c1f0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Длина превью (DocumentService.PREVIEW_LENGTH)
+PREVIEW_LENGTH = 200
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_documents', sa.Column('preview', sa.String(), nullable=True))
+
+    # Превью существующих документов
+    op.execute(f"""
+        UPDATE user_documents
+        SET preview = left(extracted_text, {PREVIEW_LENGTH})
+        WHERE extracted_text IS NOT NULL AND extracted_text <> ''
+    """)
+
+    # Списки документов сортируются по (upload_date, id) - id добавляется
+    # в индекс, чтобы страница читалась из индекса без сортировки
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_documents_active_user_type_date',
+            table_name='user_documents',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.create_index(
+            'ix_user_documents_active_user_type_date',
+            'user_documents',
+            ['user_id', 'file_type', 'upload_date', 'id'],
+            unique=False,
+            postgresql_where=sa.text('is_deleted = false'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_documents_active_user_type_date',
+            table_name='user_documents',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.create_index(
+            'ix_user_documents_active_user_type_date',
+            'user_documents',
+            ['user_id', 'file_type', 'upload_date'],
+            unique=False,
+            postgresql_where=sa.text('is_deleted = false'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+    op.drop_column('user_documents', 'preview')
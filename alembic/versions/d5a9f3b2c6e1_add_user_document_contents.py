@@ -0,0 +1,70 @@
+"""add user_document_contents
+
+Revision ID: d5a9f3b2c6e1
+Revises: c4d8e1f2a7b9
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a9f3b2c6e1'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e1f2a7b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Документов за один шаг переноса текстов (каждый шаг - отдельная транзакция)
+BACKFILL_BATCH_SIZE = 1000
+
+# Перенос текстов документов с id в (:start_id, :end_id].
+# Повторный запуск не трогает уже перенесённые тексты
+BACKFILL_SQL = """
+    INSERT INTO user_document_contents (document_id, text, char_count, size_bytes)
+    SELECT id, extracted_text, char_length(extracted_text), octet_length(extracted_text)
+    FROM user_documents
+    WHERE id > :start_id AND id <= :end_id AND extracted_text IS NOT NULL
+    ON CONFLICT (document_id) DO NOTHING
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_document_contents',
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=True),
+    sa.Column('char_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('size_bytes', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['user_documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('document_id')
+    )
+
+    # Перенос текстов короткими транзакциями по диапазонам id: таблица
+    # user_documents не блокируется, API и worker продолжают работать.
+    # Колонка user_documents.extracted_text остаётся до отдельной миграции:
+    # тексты, записанные старыми экземплярами во время выкладки, переносит
+    # повторный запуск utils/backfill_document_contents.py
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM user_documents")).scalar()
+
+        for start_id in range(0, max_id, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text(BACKFILL_SQL),
+                {"start_id": start_id, "end_id": start_id + BACKFILL_BATCH_SIZE}
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Тексты, записанные после переноса, возвращаются в user_documents
+    op.execute("""
+        UPDATE user_documents d
+        SET extracted_text = c.text
+        FROM user_document_contents c
+        WHERE c.document_id = d.id
+    """)
+    op.drop_table('user_document_contents')
@@ -0,0 +1,56 @@
+"""add user_document_contents storage
+
+Revision ID: e8c1a4d7b3f5
+Revises: d5a9f3b2c6e1
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c1a4d7b3f5'
+down_revision: Union[str, Sequence[str], None] = 'd5a9f3b2c6e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Строк за одну транзакцию при заполнении stored_bytes
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Колонки с постоянным значением по умолчанию - без перезаписи таблицы
+    op.add_column('user_document_contents', sa.Column('storage', sa.String(), server_default='inline', nullable=False))
+    op.add_column('user_document_contents', sa.Column('data', sa.LargeBinary(), nullable=True))
+    op.add_column('user_document_contents', sa.Column('s3_key', sa.String(), nullable=True))
+    op.add_column('user_document_contents', sa.Column('stored_bytes', sa.Integer(), server_default='0', nullable=False))
+
+    # Существующие тексты хранятся как есть: stored_bytes = size_bytes.
+    # Сжатие - utils/recompress_document_contents.py
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT coalesce(max(document_id), 0) FROM user_document_contents")).scalar()
+
+        for start_id in range(0, max_id, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text("""
+                    UPDATE user_document_contents
+                    SET stored_bytes = size_bytes
+                    WHERE document_id > :start_id AND document_id <= :end_id AND storage = 'inline'
+                """),
+                {"start_id": start_id, "end_id": start_id + BACKFILL_BATCH_SIZE}
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Сжатые тексты нужно предварительно распаковать
+    # (utils/recompress_document_contents.py --decompress)
+    op.drop_column('user_document_contents', 'stored_bytes')
+    op.drop_column('user_document_contents', 's3_key')
+    op.drop_column('user_document_contents', 'data')
+    op.drop_column('user_document_contents', 'storage')
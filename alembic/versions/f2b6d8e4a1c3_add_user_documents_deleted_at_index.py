@@ -0,0 +1,44 @@
+"""add user_documents deleted_at index
+
+Revision ID: f2b6d8e4a1c3
+Revises: e8c1a4d7b3f5
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8e4a1c3'
+down_revision: Union[str, Sequence[str], None] = 'e8c1a4d7b3f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Поиск документов для окончательного удаления (purge_deleted_documents)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_documents_deleted_at',
+            'user_documents',
+            ['deleted_at'],
+            unique=False,
+            postgresql_where=sa.text('is_deleted = true'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_documents_deleted_at',
+            table_name='user_documents',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -1,17 +1,22 @@
 # Обработка асинхронных запросов на перевод видео в текст и обновление токена
-# celery -A backend.celery_app worker --beat --loglevel=info --pool=solo
+# PROCESS_ROLE=worker celery -A backend.celery_app worker --beat --loglevel=info --pool=solo
 
 # Для работы Celery локально, нужно не забывать запускать redis-server.exe
 
+import logging
 from celery import Celery
 from celery.schedules import crontab
-from shared.config import settings
+from celery.signals import worker_init, setup_logging
+from shared.config import settings, configure_logging
 
 # Инициализация Celery
+# Модули задач импортирует только worker при старте: API ставит задачи
+# через заглушки backend/task_signatures.py и не загружает реализации
 celery_app = Celery(
     'cogito_bot',
     broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL
+    backend=settings.REDIS_URL,
+    include=['backend.s3_storage', 'backend.maintenance_tasks']
 )
 
 # Конфигурация Celery
@@ -41,8 +46,33 @@ celery_app.conf.beat_schedule = {
         'task': 'backend.s3_storage.refresh_vision_iam_token',
         'schedule': crontab(minute=0, hour='*/11'),
     },
+    # Сверка счётчиков user_usage с user_documents раз в сутки
+    'reconcile-user-usage-daily': {
+        'task': 'backend.maintenance_tasks.reconcile_user_usage',
+        'schedule': crontab(minute=30, hour=3),
+    },
+    # Удаление незавершённых сессий прямой загрузки в S3
+    'expire-upload-sessions-every-15-minutes': {
+        'task': 'backend.maintenance_tasks.expire_upload_sessions',
+        'schedule': crontab(minute='*/15'),
+    },
+    # Окончательное удаление старых удалённых документов раз в сутки
+    'purge-deleted-documents-daily': {
+        'task': 'backend.maintenance_tasks.purge_deleted_documents',
+        'schedule': crontab(minute=0, hour=4),
+    },
 }
 
-# Импорт задач в конце, чтобы избежать циклической зависимости
-if __name__ != '__main__':
-    from backend import s3_storage
\ No newline at end of file
+@setup_logging.connect
+def configure_worker_logging(**kwargs):
+    # Логирование worker настраивается один раз, вместо логгера Celery
+    configure_logging('worker.log')
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    # HTTP-сервер метрик Prometheus для worker (пул соединений с БД и др.)
+    if settings.WORKER_METRICS_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(settings.WORKER_METRICS_PORT)
+        logging.getLogger(__name__).info(f"Метрики worker доступны на порту {settings.WORKER_METRICS_PORT}")
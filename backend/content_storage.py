@@ -0,0 +1,199 @@
+"""
+Хранение извлечённого текста документов (user_document_contents).
+
+Расшифровки многочасовых видео и OCR весят мегабайты, а хранились как
+несжатый Text. Политика хранения (shared.config.ContentStorage):
+- до settings.CONTENT_INLINE_MAX_BYTES - текст как есть (колонка text);
+- больше - сжатый zstd (колонка data, bytea);
+- сжатый от settings.CONTENT_S3_MIN_BYTES - объект в S3 (колонка s3_key).
+  В S3 текст выносит worker после распознавания (offload_to_s3) и
+  utils/recompress_document_contents.py для старых документов.
+
+Чтение прозрачное для текстов в БД (UserDocument.extracted_text) и
+потоковое: фрагмент текста (read_text_range) распаковывается только до
+нужного места. Текст из S3 читается только явно (read_text, open_text_stream) -
+это блокирующий сетевой вызов, из API вызывать через run_blocking.
+
+Без пакета zstandard новые тексты хранятся как есть.
+"""
+
+import codecs
+import io
+import logging
+from typing import BinaryIO, Dict, Optional
+
+from backend.metrics import CONTENT_ORIGINAL_BYTES, CONTENT_STORED_BYTES
+from shared.config import settings, ContentStorage
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Префикс объектов S3 с текстами документов
+S3_PREFIX = "contents"
+
+# Размер блока при потоковой распаковке
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def content_s3_key(document_id: int) -> str:
+    """Ключ объекта S3 с текстом документа."""
+    return f"{S3_PREFIX}/document_{document_id}.txt.zst"
+
+
+def encode_text(value: Optional[str]) -> Dict:
+    """
+    Значения колонок user_document_contents для текста.
+
+    Args:
+        value: Извлечённый текст
+
+    Returns:
+        Словарь text, data, s3_key, storage, char_count, size_bytes, stored_bytes
+    """
+    raw = value.encode("utf-8") if value else b""
+    columns = {
+        "text": value,
+        "data": None,
+        "s3_key": None,
+        "storage": ContentStorage.INLINE,
+        "char_count": len(value) if value else 0,
+        "size_bytes": len(raw),
+        "stored_bytes": len(raw),
+    }
+
+    if len(raw) > settings.CONTENT_INLINE_MAX_BYTES and zstandard is not None:
+        data = zstandard.ZstdCompressor(level=settings.CONTENT_ZSTD_LEVEL).compress(raw)
+        columns.update(text=None, data=data, storage=ContentStorage.ZSTD, stored_bytes=len(data))
+
+    CONTENT_ORIGINAL_BYTES.labels(columns["storage"]).inc(columns["size_bytes"])
+    CONTENT_STORED_BYTES.labels(columns["storage"]).inc(columns["stored_bytes"])
+
+    return columns
+
+
+def offload_to_s3(content, document_id: int) -> bool:
+    """
+    Вынести сжатый текст в S3, если он не меньше settings.CONTENT_S3_MIN_BYTES.
+
+    Блокирующий вызов. При ошибке S3 текст остаётся в БД.
+
+    Args:
+        content: UserDocumentContent (изменяется на месте, коммит - за вызывающим)
+        document_id: ID документа
+
+    Returns:
+        True если текст вынесен в S3
+    """
+    if content.storage != ContentStorage.ZSTD or content.stored_bytes < settings.CONTENT_S3_MIN_BYTES:
+        return False
+
+    from backend.object_storage import get_s3_client, BUCKET_NAME
+
+    s3_key = content_s3_key(document_id)
+    try:
+        get_s3_client().put_object(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Body=content.data,
+            ContentType='application/zstd'
+        )
+    except Exception as e:
+        logger.error(f"Не удалось вынести текст документа {document_id} в S3: {e}")
+        return False
+
+    content.data = None
+    content.s3_key = s3_key
+    content.storage = ContentStorage.S3
+
+    logger.info(f"Текст документа {document_id} вынесен в S3: {s3_key} ({content.stored_bytes} байт)")
+
+    return True
+
+
+def open_text_stream(content) -> BinaryIO:
+    """
+    Поток распакованного текста в UTF-8.
+
+    Args:
+        content: UserDocumentContent или строка с колонками storage, text, data, s3_key
+
+    Returns:
+        Файлоподобный объект (закрывается вызывающим)
+    """
+    storage = content.storage or ContentStorage.INLINE
+
+    if storage == ContentStorage.INLINE:
+        return io.BytesIO((content.text or "").encode("utf-8"))
+
+    if zstandard is None:
+        raise RuntimeError("Для чтения сжатых текстов нужен пакет zstandard")
+
+    if storage == ContentStorage.ZSTD:
+        source = io.BytesIO(content.data)
+    else:
+        from backend.object_storage import get_s3_client, BUCKET_NAME
+
+        source = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=content.s3_key)['Body']
+
+    return zstandard.ZstdDecompressor().stream_reader(source, closefd=True)
+
+
+def read_text(content) -> Optional[str]:
+    """
+    Прочитать текст целиком.
+
+    Args:
+        content: UserDocumentContent (или None)
+
+    Returns:
+        Текст или None
+    """
+    if content is None:
+        return None
+
+    if (content.storage or ContentStorage.INLINE) == ContentStorage.INLINE:
+        return content.text
+
+    with open_text_stream(content) as stream:
+        return stream.read().decode("utf-8")
+
+
+def read_text_range(content, offset: int, length: int) -> str:
+    """
+    Прочитать фрагмент текста, распаковывая поток только до его конца.
+
+    Args:
+        content: UserDocumentContent или строка с колонками storage, text, data, s3_key
+        offset: Смещение в символах
+        length: Длина фрагмента в символах
+
+    Returns:
+        Фрагмент текста
+    """
+    if (content.storage or ContentStorage.INLINE) == ContentStorage.INLINE:
+        return (content.text or "")[offset:offset + length]
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    end = offset + length
+    read = 0
+    parts = []
+
+    with open_text_stream(content) as stream:
+        while read < end:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+
+            # Часть блока, попадающая во фрагмент
+            start = max(offset - read, 0)
+            if start < len(text):
+                parts.append(text[start:end - read])
+            read += len(text)
+
+            if not chunk:
+                break
+
+    return "".join(parts)
@@ -2,22 +2,22 @@
 
 import os
 import logging
+from uuid import uuid4
 from pathlib import Path
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from urllib.parse import quote_plus
 
+from shared.config import settings, get_db_pool_config
+from backend.metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, register_pool_metrics, instrument_engine
+
 # Загружаем .env из secret/
 env_path = Path(__file__).parent.parent / 'secret' / '.env'
 load_dotenv(dotenv_path=env_path)
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # Проверяем что переменные загрузились
@@ -33,20 +33,117 @@ if not all([db_user, db_password, db_host, db_port, db_name]):
 
 # URL подключения к PostgreSQL
 DATABASE_URL = f"postgresql://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
+# URL для асинхронного драйвера (asyncpg) - используется API
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
 
 logger.info(f"Подключение к БД: postgresql://{db_user}@{db_host}:{db_port}/{db_name}")
 
+# Настройки пула для роли текущего процесса (api, worker, bot)
+pool_config = get_db_pool_config()
+statement_timeout_ms = pool_config["statement_timeout_ms"]
+
+logger.info(
+    f"Пул БД [{settings.PROCESS_ROLE}]: size={pool_config['pool_size']}, "
+    f"overflow={pool_config['max_overflow']}, recycle={pool_config['pool_recycle']}s, "
+    f"statement_timeout={statement_timeout_ms}ms, pgbouncer={pool_config['pgbouncer']}"
+)
+
+pool_kwargs = {
+    "pool_size": pool_config["pool_size"],
+    "max_overflow": pool_config["max_overflow"],
+    "pool_timeout": pool_config["pool_timeout"],
+    "pool_recycle": pool_config["pool_recycle"],
+    "pool_pre_ping": pool_config["pool_pre_ping"],
+}
+
+if pool_config["pgbouncer"]:
+    # PgBouncer (transaction pooling) не пропускает параметр options
+    # и не сохраняет серверные prepared statements между транзакциями.
+    # statement_timeout выставляется через SET LOCAL в начале транзакции.
+    sync_connect_args = {"application_name": pool_config["application_name"]}
+    async_connect_args = {
+        "server_settings": {"application_name": pool_config["application_name"]},
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+else:
+    sync_connect_args = {
+        "application_name": pool_config["application_name"],
+        "options": f"-c statement_timeout={statement_timeout_ms}",
+    }
+    async_connect_args = {
+        "server_settings": {
+            "application_name": pool_config["application_name"],
+            "statement_timeout": str(statement_timeout_ms),
+        },
+    }
+
+
+def set_local_statement_timeout(conn):
+    # Таймаут действует до конца текущей транзакции (режим PgBouncer)
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+
+
 # Создаём движок БД
 try:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        connect_args=sync_connect_args,
+        **pool_kwargs
+    )
     logger.info("Движок БД успешно создан")
 except Exception as e:
     logger.error(f"Ошибка создания движка БД: {e}")
     raise
 
+# Создаём асинхронный движок БД для API
+try:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=InstrumentedAsyncQueuePool,
+        connect_args=async_connect_args,
+        **pool_kwargs
+    )
+    logger.info("Асинхронный движок БД успешно создан")
+except Exception as e:
+    logger.error(f"Ошибка создания асинхронного движка БД: {e}")
+    raise
+
+if pool_config["pgbouncer"]:
+    event.listen(engine, "begin", set_local_statement_timeout)
+    event.listen(async_engine.sync_engine, "begin", set_local_statement_timeout)
+
+# Метрики заполненности пулов
+register_pool_metrics("sync", engine.pool, pool_config["pool_size"], pool_config["max_overflow"])
+register_pool_metrics("async", async_engine.pool, pool_config["pool_size"], pool_config["max_overflow"])
+
+# Время SQL запросов (в том числе за запрос API)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# Профилировщик SQL (N+1, медленные запросы) - только по явному включению
+if settings.SQL_PROFILER_ENABLED:
+    from backend.sql_profiler import install_sql_profiler, profile_celery_tasks
+
+    install_sql_profiler(engine)
+    install_sql_profiler(async_engine.sync_engine)
+    profile_celery_tasks()
+
 # Создаём фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Фабрика асинхронных сессий
+# expire_on_commit=False: после commit объекты остаются доступными без
+# повторного запроса (ленивая подгрузка в async режиме невозможна)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -64,4 +161,16 @@ def get_db():
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Функция для получения асинхронной сессии БД
+async def get_async_db():
+    # Генератор асинхронной сессии БД для использования в FastAPI Depends
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Ошибка при работе с БД: {e}")
+            await db.rollback()
+            raise
@@ -9,32 +9,38 @@ FastAPI приложение - основной API сервер бота.
 """
 
 import os
-from fastapi import FastAPI, HTTPException, Depends, Request
+import json
+import asyncio
+import functools
+import contextvars
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager, suppress
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import uvicorn
 import logging
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from typing import Optional, List
 
-from backend.database import get_db, engine
-from backend import models, schemas
+from backend.database import get_db, get_async_db, AsyncSessionLocal
+from backend import schemas
 from backend.celery_app import celery_app
 from celery.result import AsyncResult
-from backend.s3_storage import (
-    process_video,
+from backend.object_storage import (
     upload_photo_to_s3,
-    process_photo_ocr,
     upload_file_to_s3,
-    process_file,
     delete_from_s3,
-    get_photo_presigned_url
+    get_photo_presigned_url,
+    create_presigned_upload,
+    head_s3_object
 )
+from backend.task_signatures import process_video, process_photo_ocr, process_file, delete_s3_objects
 from dotenv import load_dotenv
 from pathlib import Path
-from shared.config import S3_BASE_URL
+from shared.config import S3_BASE_URL, settings, Limits, DocumentStatus, ContentStorage, CONTENT_CONFIG, configure_logging
 
 # Импорт сервисов
 from backend.services import (
@@ -43,40 +49,87 @@ from backend.services import (
     DocumentService,
     LimitsService
 )
-
-# Настройка логирования
-BASE_DIR = Path(__file__).parent.parent
-LOGS_DIR = BASE_DIR / 'logs'
-LOGS_DIR.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGS_DIR / 'api.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from backend.services.upload_context import UploadContext
+from backend.services.tier_catalogue import tier_catalogue, listen_for_tiers_invalidation
+from backend.services.stats_cache import stats_cache
+from backend.services.rate_limit import create_limiter, rate_limit_key, resolve_rate_limit_identity, tier_limit
+from backend.services.progress_events import progress_events, TERMINAL_STATUSES
+from backend.streaming_upload import stream_files_to_s3, UploadTooLarge
+from backend.task_dispatch import dispatch_group, get_group_status, get_tasks_status
+from backend.serialization import FastJSONResponse, rows_to_dicts, schema_fields
+from backend.content_storage import encode_text, read_text, read_text_range
+from backend.metrics import RequestMetricsMiddleware, instrument_celery_publish
+from backend.sql_profiler import SqlProfilerMiddleware
+
+# Настройка логирования (один раз для процесса API)
+configure_logging('api.log')
 logger = logging.getLogger(__name__)
 
 env_path = Path(__file__).parent.parent / 'secret' / '.env'
 load_dotenv(dotenv_path=env_path)
 
-# Инициализируем таблицы в БД
-models.Base.metadata.create_all(bind=engine)
-logger.info("Инициализированы таблицы в БД")
+# Схема БД управляется только миграциями Alembic (alembic upgrade head)
+
+# Ограниченный пул потоков для блокирующих вызовов (S3, брокер Celery).
+# Event loop не блокируется, а число одновременных обращений к S3 и Redis
+# не превышает API_IO_WORKERS независимо от количества запросов.
+# Создаётся при старте приложения (lifespan).
+io_executor: Optional[ThreadPoolExecutor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Жизненный цикл приложения: создание и освобождение ресурсов."""
+    global io_executor
+
+    io_executor = ThreadPoolExecutor(
+        max_workers=settings.API_IO_WORKERS,
+        thread_name_prefix="api-io"
+    )
+
+    # Каталог тарифов: загрузка при старте и подписка на инвалидацию.
+    # Если БД недоступна, каталог загрузится при первом обращении.
+    try:
+        async with AsyncSessionLocal() as db:
+            await tier_catalogue.load(db)
+    except Exception as e:
+        logger.warning(f"Каталог тарифов не загружен при старте: {e}")
+
+    tiers_listener = asyncio.create_task(listen_for_tiers_invalidation())
+
+    yield
+
+    tiers_listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await tiers_listener
+
+    logger.info("Закрытие пула потоков для блокирующих вызовов...")
+    io_executor.shutdown(wait=True)
+
 
 # Инициализация FastAPI
 app = FastAPI(
     title="Cogito AI Bot API",
     version="2.0.0",
-    description="API для управления базой знаний и подписками"
+    description="API для управления базой знаний и подписками",
+    lifespan=lifespan
 )
 
-# Rate Limiting (защита от DoS)
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Rate Limiting (защита от DoS): счётчики в Redis, общие для всех
+# воркеров и реплик API; ключ - пользователь, лимит зависит от тарифа
+limiter = create_limiter()
+
+# Метрики запросов (/metrics): время по маршрутам, SQL, S3 и брокер за запрос
+app.add_middleware(RequestMetricsMiddleware)
+# Профиль SQL по запросам (settings.SQL_PROFILER_ENABLED, сводка по заголовку X-SQL-Profile)
+app.add_middleware(SqlProfilerMiddleware)
+instrument_celery_publish()
+
+
+# Поля документов в ответах списков (строки ORM сериализуются без валидации);
+# текст документа читается отдельно - распаковка и S3 в пуле потоков
+DOCUMENT_FIELDS = [name for name in schema_fields(schemas.DocumentResponse) if name != "extracted_text"]
+DOCUMENT_LIST_ITEM_FIELDS = schema_fields(schemas.DocumentListItem)
 
 
 # ============================================================================
@@ -103,13 +156,211 @@ def get_priority(tier: str) -> int:
     return priorities.get(tier, 4)
 
 
+async def run_blocking(func, *args, **kwargs):
+    """
+    Выполнить блокирующую функцию в ограниченном пуле потоков.
+
+    Используется для вызовов boto3 и публикации задач Celery,
+    у которых нет асинхронного API. Выполняется в контексте текущего
+    запроса (время вызова учитывается в его метриках).
+
+    Args:
+        func: Блокирующая функция
+        *args: Позиционные аргументы
+        **kwargs: Именованные аргументы
+
+    Returns:
+        Результат функции
+    """
+    loop = asyncio.get_running_loop()
+    # Контекст запроса нужен в потоке для метрик S3 и брокера
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(io_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def run_blocking_batch(calls, limit: Optional[int] = None) -> list:
+    """
+    Выполнить несколько блокирующих вызовов параллельно.
+
+    Args:
+        calls: Список пар (функция, кортеж аргументов)
+        limit: Максимум одновременных вызовов (по умолчанию settings.S3_UPLOAD_CONCURRENCY)
+
+    Returns:
+        Результаты или исключения в порядке calls
+    """
+    semaphore = asyncio.Semaphore(limit or settings.S3_UPLOAD_CONCURRENCY)
+
+    async def run(func, args):
+        async with semaphore:
+            return await run_blocking(func, *args)
+
+    return await asyncio.gather(*(run(func, args) for func, args in calls), return_exceptions=True)
+
+
+def rate_limited(base_limit: str) -> list:
+    """
+    Зависимости маршрута с rate limit.
+
+    Ключ (telegram_id и тариф) определяет resolve_rate_limit_identity,
+    счётчик увеличивается в пуле потоков - хранилище limits синхронное
+    (Lua скрипт в Redis).
+
+    Args:
+        base_limit: Лимит бесплатного тарифа ("10/minute")
+
+    Returns:
+        Список для параметра dependencies маршрута
+    """
+    limit_for_tier = tier_limit(base_limit)
+
+    async def enforce_rate_limit(request: Request, _: None = Depends(resolve_rate_limit_identity)) -> None:
+        key, tier_name = rate_limit_key(request)
+        item = limit_for_tier(tier_name)
+        route = request.scope["route"]
+
+        if not await run_blocking(limiter.hit, item, f"{request.method}:{route.path}", key):
+            raise HTTPException(status_code=429, detail=f"Rate limit exceeded: {item}")
+
+    return [Depends(enforce_rate_limit)]
+
+
+async def get_upload_context(db: AsyncSession, telegram_id: int) -> UploadContext:
+    """
+    Загрузить контекст загрузки (пользователь, подписка, тариф, использование).
+
+    Args:
+        db: Асинхронная сессия БД
+        telegram_id: ID пользователя в Telegram
+
+    Returns:
+        Контекст загрузки
+
+    Raises:
+        HTTPException: 404 если пользователь не найден, 400 если нет активной подписки
+    """
+    context = await UploadContext.load(db, telegram_id)
+
+    if not context:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if not context.tier:
+        raise HTTPException(status_code=400, detail="No active subscription")
+
+    return context
+
+
+async def receive_streamed_files(request: Request, field_name: str, make_key, content_type: Optional[str] = None):
+    """
+    Принять файлы из multipart запроса потоком в S3.
+
+    Args:
+        request: Запрос
+        field_name: Имя поля формы с файлами
+        make_key: Функция ключа S3 по имени файла
+        content_type: MIME тип объектов в S3 (по умолчанию - из запроса)
+
+    Returns:
+        Список StreamedFile
+
+    Raises:
+        HTTPException: 413 при превышении размера, 400 при некорректном запросе или без файлов
+    """
+    try:
+        files = await stream_files_to_s3(
+            request,
+            field_name,
+            make_key=make_key,
+            run_blocking=run_blocking,
+            max_file_size=Limits.MAX_FILE_SIZE_MB * 1024 * 1024,
+            max_files=Limits.BUFFER_MAX_ITEMS,
+            content_type=content_type
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    return files
+
+
+async def store_batch_uploads(
+    db: AsyncSession,
+    document_service: DocumentService,
+    user_id: int,
+    document_ids: List[int],
+    results: list
+) -> List[str]:
+    """
+    Записать ссылки на загруженные файлы и зафиксировать пакет документов.
+
+    Если хотя бы одна загрузка не удалась, транзакция откатывается
+    (документы и счётчики не сохраняются), а загруженные объекты удаляются.
+
+    Args:
+        db: Асинхронная сессия БД
+        document_service: Сервис документов
+        user_id: ID пользователя
+        document_ids: ID документов, добавленных через add_documents
+        results: Результаты run_blocking_batch (S3 ключи или исключения)
+
+    Returns:
+        S3 ключи в порядке document_ids
+
+    Raises:
+        HTTPException: 400 при некорректных данных файла, 500 при ошибке S3
+    """
+    errors = [result for result in results if isinstance(result, Exception)]
+
+    if errors:
+        await db.rollback()
+        await run_blocking_batch([(delete_from_s3, (key,)) for key in results if isinstance(key, str)])
+
+        logger.error(f"Ошибка пакетной загрузки в S3 ({len(errors)} из {len(results)}): {errors[0]}")
+
+        if any(isinstance(error, ValueError) for error in errors):
+            raise HTTPException(status_code=400, detail=str(errors[0]))
+        raise HTTPException(status_code=500, detail="Upload failed")
+
+    await document_service.set_file_urls({
+        document_id: f"{S3_BASE_URL}/{s3_key}"
+        for document_id, s3_key in zip(document_ids, results)
+    })
+    await document_service.commit_documents(user_id, document_ids)
+
+    return results
+
+
+def ensure_document_owner(doc, telegram_id: int, document_id: int, not_found: str = "Document not found"):
+    """
+    Проверить, что документ существует и принадлежит пользователю.
+
+    Args:
+        doc: Строка документа с колонкой owner_telegram_id (или None)
+        telegram_id: ID пользователя в Telegram
+        document_id: ID документа
+        not_found: Текст ошибки 404
+
+    Raises:
+        HTTPException: 404 если документа нет, 403 если он чужой
+    """
+    if doc is None:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    if doc.owner_telegram_id != telegram_id:
+        logger.warning(f"Попытка доступа к чужому документу: telegram_id={telegram_id}, document_id={document_id}")
+        raise HTTPException(status_code=403, detail="Access denied")
+
+
 # ============================================================================
 # ЭНДПОИНТЫ ПОЛЬЗОВАТЕЛЕЙ
 # ============================================================================
 
-@app.post("/users/register", response_model=schemas.UserResponse)
-@limiter.limit("10/minute")
-def register_user(request: Request, user: schemas.UserCreate, db: Session = Depends(get_db)):
+@app.post("/users/register", response_model=schemas.UserResponse, dependencies=rate_limited("10/minute"))
+async def register_user(request: Request, user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Регистрация нового пользователя или авторизация существующего.
 
@@ -119,7 +370,7 @@ def register_user(request: Request, user: schemas.UserCreate, db: Session = Depe
 
     user_service = UserService(db)
 
-    registered_user = user_service.register_or_get_user(
+    registered_user = await user_service.register_or_get_user(
         telegram_id=user.telegram_id,
         username=user.username,
         referred_by=user.referred_by
@@ -128,33 +379,55 @@ def register_user(request: Request, user: schemas.UserCreate, db: Session = Depe
     return registered_user
 
 
-@app.get("/users/{telegram_id}/stats", response_model=schemas.UserStats)
-@limiter.limit("30/minute")
-def get_user_stats(request: Request, telegram_id: int, db: Session = Depends(get_db)):
+@app.get("/users/{telegram_id}/stats", response_model=schemas.UserStats, dependencies=rate_limited("30/minute"))
+async def get_user_stats(request: Request, telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Получить статистику пользователя для главного меню.
 
     Включает информацию о подписке, лимитах и использовании базы знаний.
+    Результат кешируется в Redis до изменения данных пользователя.
     """
     logger.debug(f"Запрос статистики: telegram_id={telegram_id}")
 
     user_service = UserService(db)
 
     try:
-        stats = user_service.get_user_stats(telegram_id)
+        stats = await stats_cache.get_or_compute(
+            telegram_id,
+            lambda: user_service.get_user_stats(telegram_id)
+        )
         return stats
     except ValueError as e:
         logger.warning(f"Ошибка получения статистики: {e}")
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.post("/users/{telegram_id}/ai-queries", response_model=schemas.AiQueryLogResponse, dependencies=rate_limited("60/minute"))
+async def log_ai_query(
+    request: Request,
+    telegram_id: int,
+    data: schemas.AiQueryLogRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Записать запрос пользователя к ИИ (дневной лимит сообщений).
+    """
+    user_service = UserService(db)
+
+    try:
+        action_id = await user_service.log_ai_query(telegram_id, data.document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"success": True, "action_id": action_id}
+
+
 # ============================================================================
 # ЭНДПОИНТЫ ПОДПИСОК
 # ============================================================================
 
-@app.get("/subscriptions/tiers", response_model=list[schemas.SubscriptionTierResponse])
-@limiter.limit("20/minute")
-def get_subscription_tiers(request: Request, db: Session = Depends(get_db)):
+@app.get("/subscriptions/tiers", response_model=list[schemas.SubscriptionTierResponse], dependencies=rate_limited("20/minute"))
+async def get_subscription_tiers(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Получить список доступных для покупки тарифных планов.
 
@@ -163,7 +436,7 @@ def get_subscription_tiers(request: Request, db: Session = Depends(get_db)):
     logger.debug("Запрос списка тарифных планов")
 
     subscription_service = SubscriptionService(db)
-    tiers = subscription_service.get_all_tiers(exclude_internal=True)
+    tiers = await subscription_service.get_all_tiers(exclude_internal=True)
 
     logger.debug(f"Возвращено {len(tiers)} тарифных планов")
     return tiers
@@ -173,9 +446,8 @@ def get_subscription_tiers(request: Request, db: Session = Depends(get_db)):
 # ЭНДПОИНТЫ БАЗЫ ЗНАНИЙ
 # ============================================================================
 
-@app.post("/kb/upload/text", response_model=schemas.TextUploadResponse)
-@limiter.limit("20/minute")
-def upload_text_to_kb(request: Request, data: schemas.TextUploadRequest, db: Session = Depends(get_db)):
+@app.post("/kb/upload/text", response_model=schemas.TextUploadResponse, dependencies=rate_limited("20/minute"))
+async def upload_text_to_kb(request: Request, data: schemas.TextUploadRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Загрузить текст в базу знаний.
 
@@ -183,31 +455,21 @@ def upload_text_to_kb(request: Request, data: schemas.TextUploadRequest, db: Ses
     """
     logger.info(f"Загрузка текста: telegram_id={data.telegram_id}")
 
-    user_service = UserService(db)
-    subscription_service = SubscriptionService(db)
     limits_service = LimitsService(db)
     document_service = DocumentService(db)
 
-    # Получаем пользователя
-    user = user_service.get_user_by_telegram_id(data.telegram_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Получаем активную подписку
-    subscription_info = subscription_service.get_active_subscription(user.id)
-    if not subscription_info:
-        raise HTTPException(status_code=400, detail="No active subscription")
-
-    _, tier = subscription_info
+    # Пользователь, подписка, тариф и использование - одним запросом
+    context = await get_upload_context(db, data.telegram_id)
+    user, tier = context.user, context.tier
 
     # Проверяем лимиты
-    can_upload, error = limits_service.check_text_limits(user.id, tier)
+    can_upload, error = await limits_service.check_text_limits(user.id, tier, context.usage)
     if not can_upload:
         logger.warning(f"Превышен лимит: user={data.telegram_id}, error={error}")
         raise HTTPException(status_code=400, detail=error)
 
     # Создаём документ
-    new_doc = document_service.create_document(
+    new_doc = await document_service.create_document(
         user_id=user.id,
         filename=f"text_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
         file_type="text",
@@ -220,9 +482,8 @@ def upload_text_to_kb(request: Request, data: schemas.TextUploadRequest, db: Ses
     return {"success": True, "document_id": new_doc.id}
 
 
-@app.get("/kb/documents/{telegram_id}", response_model=schemas.DocumentsListResponse)
-@limiter.limit("30/minute")
-def get_user_documents(request: Request, telegram_id: int, db: Session = Depends(get_db)):
+@app.get("/kb/documents/{telegram_id}", response_model=schemas.DocumentsListResponse, dependencies=rate_limited("30/minute"))
+async def get_user_documents(request: Request, telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Получить список всех документов пользователя в базе знаний.
 
@@ -233,53 +494,107 @@ def get_user_documents(request: Request, telegram_id: int, db: Session = Depends
     user_service = UserService(db)
     document_service = DocumentService(db)
 
-    user = user_service.get_user_by_telegram_id(telegram_id)
+    user = await user_service.get_user_by_telegram_id(telegram_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    documents = document_service.get_user_documents(user.id)
+    documents = await document_service.get_user_documents(user.id, with_content=True)
+
+    # Тексты читаются параллельно в пуле потоков: сжатые распаковываются,
+    # вынесенные в S3 скачиваются
+    texts = await run_blocking_batch([(read_text, (doc.content,)) for doc in documents])
+    for text in texts:
+        if isinstance(text, Exception):
+            raise text
+
+    # Ответ с полными текстами большой - без валидации строк ORM
+    items = rows_to_dicts(documents, DOCUMENT_FIELDS)
+    for item, text in zip(items, texts):
+        item["extracted_text"] = text
 
     logger.debug(f"Возвращено {len(documents)} документов")
 
-    return {
-        "documents": documents,
+    return FastJSONResponse({
+        "documents": items,
         "total_count": len(documents)
-    }
+    })
 
 
-@app.post("/kb/upload/video", response_model=schemas.VideoUploadResponse)
-@limiter.limit("10/minute")
-def upload_videos_to_kb(request: Request, data: schemas.VideoUploadRequest, db: Session = Depends(get_db)):
+@app.get("/kb/documents/{telegram_id}/page", response_model=schemas.DocumentsPageResponse, dependencies=rate_limited("60/minute"))
+async def get_user_documents_page(
+    request: Request,
+    telegram_id: int,
+    file_type: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Загрузить видео в базу знаний для обработки.
+    Получить страницу документов пользователя (новые первыми).
 
-    Создаёт Celery задачи для транскрибации видео.
+    Документы возвращаются без полного текста - только с превью.
+    Для следующей страницы передаётся next_cursor из ответа;
+    total_count считается только для первой страницы.
     """
-    logger.info(f"Загрузка {len(data.videos)} видео: telegram_id={data.telegram_id}")
+    logger.debug(f"Запрос страницы документов: telegram_id={telegram_id}, type={file_type}, cursor={cursor}")
 
     user_service = UserService(db)
-    subscription_service = SubscriptionService(db)
     document_service = DocumentService(db)
 
-    user = user_service.get_user_by_telegram_id(data.telegram_id)
+    user = await user_service.get_user_by_telegram_id(telegram_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Получаем тариф для определения приоритета
-    subscription_info = subscription_service.get_active_subscription(user.id)
-    if not subscription_info:
-        raise HTTPException(status_code=400, detail="No active subscription")
+    try:
+        documents, next_cursor = await document_service.get_documents_page(
+            user.id,
+            file_type=file_type,
+            status=status,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    total_count = None
+    if cursor is None:
+        # Первая страница без продолжения - это весь список
+        if next_cursor is None:
+            total_count = len(documents)
+        else:
+            total_count = await document_service.count_user_documents(user.id, file_type=file_type, status=status)
 
-    _, tier = subscription_info
+    return FastJSONResponse({
+        "documents": rows_to_dicts(documents, DOCUMENT_LIST_ITEM_FIELDS),
+        "next_cursor": next_cursor,
+        "total_count": total_count
+    })
+
+
+@app.post("/kb/upload/video", response_model=schemas.VideoUploadResponse, dependencies=rate_limited("10/minute"))
+async def upload_videos_to_kb(request: Request, data: schemas.VideoUploadRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Загрузить видео в базу знаний для обработки.
+
+    Создаёт Celery задачи для транскрибации видео.
+    """
+    logger.info(f"Загрузка {len(data.videos)} видео: telegram_id={data.telegram_id}")
+
+    document_service = DocumentService(db)
+
+    # Тариф нужен для определения приоритета
+    context = await get_upload_context(db, data.telegram_id)
+    user, tier = context.user, context.tier
     priority = get_priority(tier.tier_name)
 
     logger.info(f"Приоритет обработки: {priority} (tier={tier.tier_name})")
 
-    # Создаём документы и задачи
-    task_ids = []
+    # Создаём документы
+    document_ids = []
 
     for video in data.videos:
-        new_doc = document_service.create_document(
+        new_doc = await document_service.create_document(
             user_id=user.id,
             filename=video['title'],
             file_type="video",
@@ -287,44 +602,109 @@ def upload_videos_to_kb(request: Request, data: schemas.VideoUploadRequest, db:
             file_url=video['url'],
             duration_hours=video['duration']
         )
+        document_ids.append(new_doc.id)
+
+    # Задачи транскрибации - одной группой
+    dispatched = await run_blocking(
+        dispatch_group,
+        process_video,
+        [
+            [video['url'], document_id, user.telegram_id, video['title']]
+            for video, document_id in zip(data.videos, document_ids)
+        ],
+        priority
+    )
 
-        # Запускаем Celery задачу
-        task = process_video.apply_async(
-            args=[video['url'], new_doc.id],
-            priority=priority
-        )
-        task_ids.append(task.id)
-
-        logger.info(f"Создана задача: task_id={task.id}, document_id={new_doc.id}")
+    logger.info(f"Создана группа задач: group_id={dispatched.group_id}, document_ids={document_ids}")
 
     return {
         "success": True,
-        "task_id": ",".join(task_ids),
-        "message": f"Добавлено {len(data.videos)} видео в обработку"
+        "task_id": ",".join(dispatched.task_ids),
+        "message": f"Добавлено {len(data.videos)} видео в обработку",
+        "group_id": dispatched.group_id,
+        "task_ids": dispatched.task_ids
     }
 
 
-@app.get("/kb/video/status/{task_id}", response_model=schemas.VideoStatusResponse)
-@limiter.limit("60/minute")
-def get_video_status(request: Request, task_id: str):
+@app.get("/kb/video/status/{task_id}", response_model=schemas.VideoStatusResponse, dependencies=rate_limited("60/minute"))
+async def get_video_status(request: Request, task_id: str, telegram_id: int):
     """
     Проверить статус обработки видео по ID задачи.
+
+    telegram_id обязателен: по нему считается rate limit пользователя.
     """
-    logger.debug(f"Проверка статуса: task_id={task_id}")
+    logger.debug(f"Проверка статуса: task_id={task_id}, telegram_id={telegram_id}")
+
+    def read_task_status():
+        # Чтение из result backend (Redis) - блокирующий вызов
+        task = AsyncResult(task_id, app=celery_app)
+        state, info = task.state, task.info
+
+        return {
+            "task_id": task_id,
+            "status": state.lower(),
+            "progress": info.get('progress') if isinstance(info, dict) else None,
+            "error": str(info) if state == 'FAILURE' else None
+        }
+
+    return await run_blocking(read_task_status)
+
+
+@app.get("/kb/tasks/group/{group_id}", response_model=schemas.TaskGroupStatusResponse, dependencies=rate_limited("60/minute"))
+async def get_task_group_status(request: Request, group_id: str, telegram_id: int):
+    """
+    Проверить статус группы задач пакетной загрузки.
+
+    Возвращает статус каждой задачи и общий статус пакета.
+    telegram_id обязателен: по нему считается rate limit пользователя.
+    """
+    logger.debug(f"Проверка статуса группы: group_id={group_id}, telegram_id={telegram_id}")
+
+    status = await run_blocking(get_group_status, group_id)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task group not found")
+
+    return status
+
+
+@app.post("/kb/status:batch", response_model=schemas.BatchStatusResponse, dependencies=rate_limited("60/minute"))
+async def get_batch_status(request: Request, data: schemas.BatchStatusRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Статусы нескольких документов и задач одним запросом.
+
+    Документы читаются одним запросом к БД (только документы пользователя),
+    задачи - одним MGET к result backend.
+    """
+    if len(data.document_ids) + len(data.task_ids) > Limits.STATUS_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {Limits.STATUS_BATCH_MAX_IDS})")
+
+    logger.debug(f"Статусы: документов={len(data.document_ids)}, задач={len(data.task_ids)}")
+
+    document_service = DocumentService(db)
+
+    document_ids = list(dict.fromkeys(data.document_ids))
+    rows = await document_service.get_documents_status(document_ids, telegram_id=data.telegram_id)
+
+    # Соединение с БД не удерживается на время запроса к result backend
+    await db.commit()
+
+    tasks = await run_blocking(get_tasks_status, list(dict.fromkeys(data.task_ids)))
 
-    task = AsyncResult(task_id, app=celery_app)
+    found = {row.id: row for row in rows}
 
     return {
-        "task_id": task_id,
-        "status": task.state.lower(),
-        "progress": task.info.get('progress') if isinstance(task.info, dict) else None,
-        "error": str(task.info) if task.state == 'FAILURE' else None
+        "documents": [
+            {"document_id": row.id, "filename": row.filename, "file_type": row.file_type, "status": row.status}
+            for row in (found[document_id] for document_id in document_ids if document_id in found)
+        ],
+        "tasks": tasks,
+        "missing_document_ids": [document_id for document_id in document_ids if document_id not in found]
     }
 
 
-@app.put("/kb/documents/{document_id}/status")
-@limiter.limit("100/minute")
-def update_document_status(request: Request, document_id: int, data: dict, db: Session = Depends(get_db)):
+@app.put("/kb/documents/{document_id}/status", dependencies=rate_limited("100/minute"))
+async def update_document_status(request: Request, document_id: int, data: dict, db: AsyncSession = Depends(get_async_db)):
     """
     Обновить статус обработки документа.
 
@@ -334,11 +714,16 @@ def update_document_status(request: Request, document_id: int, data: dict, db: S
 
     document_service = DocumentService(db)
 
-    success = document_service.update_document_status(
+    # Сжатие распознанного текста (zstd) - в пуле потоков
+    transcription = data.get('transcription')
+    content = await run_blocking(encode_text, transcription) if transcription else None
+
+    success = await document_service.update_document_status(
         document_id=document_id,
         status=data.get('status'),
         error=data.get('error'),
-        transcription=data.get('transcription')
+        transcription=transcription,
+        content=content
     )
 
     if not success:
@@ -347,9 +732,8 @@ def update_document_status(request: Request, document_id: int, data: dict, db: S
     return {"success": True}
 
 
-@app.get("/kb/documents/{document_id}/info")
-@limiter.limit("60/minute")
-def get_document_info(request: Request, document_id: int, db: Session = Depends(get_db)):
+@app.get("/kb/documents/{document_id}/info", dependencies=rate_limited("60/minute"))
+async def get_document_info(request: Request, document_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Получить информацию о документе.
 
@@ -360,123 +744,308 @@ def get_document_info(request: Request, document_id: int, db: Session = Depends(
     user_service = UserService(db)
     document_service = DocumentService(db)
 
-    doc = document_service.get_document_by_id(document_id)
+    doc = await document_service.get_document_by_id(document_id, with_content=True)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    user = user_service.get_user_by_id(doc.user_id)
+    user = await user_service.get_user_by_id(doc.user_id)
 
     return {
         "telegram_id": user.telegram_id,
         "filename": doc.filename,
-        "extracted_text": doc.extracted_text,
+        "extracted_text": await run_blocking(read_text, doc.content),
         "file_url": doc.file_url,
         "status": doc.status
     }
 
 
-@app.post("/kb/upload/photos", response_model=schemas.PhotoUploadResponse)
-@limiter.limit("10/minute")
-def upload_photos_to_kb(request: Request, data: schemas.PhotoUploadRequest, db: Session = Depends(get_db)):
+async def progress_stream(request: Request, document_id: int, snapshot: dict):
+    """
+    SSE поток событий прогресса документа.
+
+    Args:
+        request: Запрос (для проверки отключения клиента)
+        document_id: ID документа
+        snapshot: Текущий статус, отправляемый первым событием
+
+    Yields:
+        События в формате text/event-stream
+    """
+    yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+
+    if snapshot["status"] in TERMINAL_STATUSES:
+        return
+
+    idle = 0
+    events = progress_events.listen(document_id, Limits.PROGRESS_STREAM_TIMEOUT_SEC, since=snapshot["timestamp"] or 0.0)
+
+    async with aclosing(events):
+        async for event in events:
+            if await request.is_disconnected():
+                break
+
+            if event is None:
+                # Комментарий SSE не даёт прокси закрыть простаивающее соединение
+                idle += 1
+                if idle >= Limits.PROGRESS_HEARTBEAT_SEC:
+                    idle = 0
+                    yield ": keep-alive\n\n"
+                continue
+
+            idle = 0
+            yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+
+
+@app.get("/kb/documents/{document_id}/progress", response_model=schemas.DocumentProgressResponse, dependencies=rate_limited("60/minute"))
+async def get_document_progress(
+    request: Request,
+    document_id: int,
+    telegram_id: int,
+    wait: int = Query(0, ge=0, le=Limits.PROGRESS_LONG_POLL_MAX_SEC),
+    since: float = 0.0,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Прогресс обработки документа (long-poll или SSE).
+
+    С заголовком Accept: text/event-stream события передаются потоком
+    до итогового статуса. Иначе возвращается текущий статус, а при
+    wait > 0 и since (время последнего полученного события) ответ
+    ждёт следующего события до wait секунд.
+
+    Текущий этап берётся из последнего события в Redis, итоговый
+    статус и статус без событий - из БД.
+    """
+    document_service = DocumentService(db)
+
+    doc = await document_service.get_owned_document(document_id)
+    ensure_document_owner(doc, telegram_id, document_id)
+
+    # Соединение с БД не удерживается на время ожидания событий
+    await db.commit()
+
+    snapshot = {"document_id": document_id, "status": doc.status, "stage": None, "error": None, "timestamp": None}
+    if doc.status not in TERMINAL_STATUSES:
+        snapshot = await progress_events.last_event(document_id) or snapshot
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            progress_stream(request, document_id, snapshot),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    is_new = not since or (snapshot["timestamp"] or 0.0) > since
+    if wait == 0 or is_new or snapshot["status"] in TERMINAL_STATUSES:
+        return snapshot
+
+    async with aclosing(progress_events.listen(document_id, wait, since=since)) as events:
+        async for event in events:
+            if event is not None:
+                return event
+
+    return snapshot
+
+
+@app.get("/kb/documents/{telegram_id}/{document_id}", response_model=schemas.DocumentDetailResponse, dependencies=rate_limited("60/minute"))
+async def get_user_document(request: Request, telegram_id: int, document_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Получить документ пользователя без полного текста.
+
+    Текст читается фрагментами через /kb/documents/{telegram_id}/{document_id}/text.
+    """
+    logger.debug(f"Запрос документа: telegram_id={telegram_id}, document_id={document_id}")
+
+    document_service = DocumentService(db)
+
+    doc = await document_service.get_owned_document(document_id)
+    ensure_document_owner(doc, telegram_id, document_id)
+
+    return doc
+
+
+@app.get("/kb/documents/{telegram_id}/{document_id}/text", response_model=schemas.DocumentTextResponse, dependencies=rate_limited("120/minute"))
+async def get_user_document_text(
+    request: Request,
+    telegram_id: int,
+    document_id: int,
+    offset: int = Query(0, ge=0),
+    length: int = Query(Limits.MESSAGE_MAX_LENGTH, ge=1, le=Limits.DOCUMENT_TEXT_MAX_WINDOW),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить фрагмент извлечённого текста документа.
+
+    Смещение и длина - в символах. next_offset равен None на последнем фрагменте.
+    """
+    logger.debug(f"Запрос текста: document_id={document_id}, offset={offset}, length={length}")
+
+    document_service = DocumentService(db)
+
+    doc = await document_service.get_document_text(document_id, offset=offset, length=length)
+    ensure_document_owner(doc, telegram_id, document_id)
+
+    # Сжатый текст распаковывается (или читается из S3) только до конца фрагмента
+    text = doc.text
+    if doc.storage not in (None, ContentStorage.INLINE):
+        text = await run_blocking(read_text_range, doc, offset, length)
+
+    next_offset = offset + len(text)
+
+    return {
+        "document_id": document_id,
+        "file_type": doc.file_type,
+        "offset": offset,
+        "text": text,
+        "total_length": doc.text_length,
+        "next_offset": next_offset if next_offset < doc.text_length else None
+    }
+
+
+@app.post("/kb/upload/photos", response_model=schemas.PhotoUploadResponse, dependencies=rate_limited("10/minute"))
+async def upload_photos_to_kb(request: Request, data: schemas.PhotoUploadRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Загрузить фото в базу знаний для OCR.
     """
     logger.info(f"Загрузка {len(data.photos)} фото: telegram_id={data.telegram_id}")
 
-    user_service = UserService(db)
-    subscription_service = SubscriptionService(db)
     limits_service = LimitsService(db)
     document_service = DocumentService(db)
 
-    user = user_service.get_user_by_telegram_id(data.telegram_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    context = await get_upload_context(db, data.telegram_id)
+    user, tier = context.user, context.tier
 
-    # Получаем тариф
-    subscription_info = subscription_service.get_active_subscription(user.id)
-    if not subscription_info:
-        raise HTTPException(status_code=400, detail="No active subscription")
+    # Проверяем лимиты на весь пакет
+    can_upload, error = await limits_service.check_photo_limits(user.id, tier, context.usage, len(data.photos))
+    if not can_upload:
+        raise HTTPException(status_code=400, detail=error)
+
+    priority = get_priority(tier.tier_name)
+
+    # Все документы - одним INSERT, коммит после загрузки в S3
+    document_ids = await document_service.add_documents(
+        user.id,
+        "photo",
+        [photo['filename'] for photo in data.photos]
+    )
+
+    # Загружаем в S3 параллельно
+    results = await run_blocking_batch([
+        (upload_photo_to_s3, (photo['base64'], user.id, document_id))
+        for photo, document_id in zip(data.photos, document_ids)
+    ])
+    s3_keys = await store_batch_uploads(db, document_service, user.id, document_ids, results)
+
+    # Запускаем OCR - одной группой задач
+    dispatched = await run_blocking(
+        dispatch_group,
+        process_photo_ocr,
+        [[document_id, s3_key, user.telegram_id] for document_id, s3_key in zip(document_ids, s3_keys)],
+        priority
+    )
 
-    _, tier = subscription_info
+    logger.info(f"OCR задачи созданы: group_id={dispatched.group_id}, document_ids={document_ids}")
+
+    return {
+        "success": True,
+        "uploaded_count": len(data.photos),
+        "task_ids": dispatched.task_ids,
+        "group_id": dispatched.group_id
+    }
+
+
+@app.post("/kb/upload/photos/multipart", response_model=schemas.PhotoUploadResponse, dependencies=rate_limited("10/minute"))
+async def upload_photos_multipart(request: Request, telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Загрузить фото в базу знаний (multipart/form-data, поле photos).
+
+    Фото передаются в S3 потоком, без base64 и без буферизации всего запроса.
+    """
+    logger.info(f"Потоковая загрузка фото: telegram_id={telegram_id}")
+
+    limits_service = LimitsService(db)
+    document_service = DocumentService(db)
+
+    context = await get_upload_context(db, telegram_id)
+    user, tier = context.user, context.tier
 
     # Проверяем лимиты
-    can_upload, error = limits_service.check_photo_limits(user.id, tier)
+    can_upload, error = await limits_service.check_photo_limits(user.id, tier, context.usage)
     if not can_upload:
         raise HTTPException(status_code=400, detail=error)
 
-    priority = get_priority(tier.tier_name)
-    task_ids = []
+    # Соединение с БД не удерживается на время приёма файлов
+    await db.commit()
 
-    for photo in data.photos:
-        # Создаём документ
-        new_doc = document_service.create_document(
-            user_id=user.id,
-            filename=photo['filename'],
-            file_type="photo",
-            status="pending"
-        )
+    photos = await receive_streamed_files(
+        request,
+        "photos",
+        make_key=lambda filename: f"photos/user_{user.id}/photo_{uuid4().hex}.jpg",
+        content_type="image/jpeg"
+    )
 
-        # Загружаем в S3
-        s3_key = upload_photo_to_s3(photo['base64'], user.id, new_doc.id)
-        s3_url = f"{S3_BASE_URL}/{s3_key}"
+    # Количество фото известно только после приёма - проверяем лимиты на весь пакет
+    can_upload, error = await limits_service.check_photo_limits(user.id, tier, count=len(photos))
+    if not can_upload:
+        await run_blocking_batch([(delete_from_s3, (photo.s3_key,)) for photo in photos])
+        raise HTTPException(status_code=400, detail=error)
 
-        # Обновляем URL
-        doc = document_service.get_document_by_id(new_doc.id)
-        doc.file_url = s3_url
-        db.commit()
+    priority = get_priority(tier.tier_name)
 
-        # Запускаем OCR
-        task = process_photo_ocr.apply_async(
-            args=[new_doc.id, s3_key],
-            priority=priority
-        )
-        task_ids.append(task.id)
+    # Объекты уже в S3 - документы создаются одним INSERT
+    document_ids = await document_service.add_documents(
+        user.id,
+        "photo",
+        [photo.filename for photo in photos],
+        file_urls=[f"{S3_BASE_URL}/{photo.s3_key}" for photo in photos]
+    )
+    await document_service.commit_documents(user.id, document_ids)
+
+    # Запускаем OCR - одной группой задач
+    dispatched = await run_blocking(
+        dispatch_group,
+        process_photo_ocr,
+        [[document_id, photo.s3_key, user.telegram_id] for document_id, photo in zip(document_ids, photos)],
+        priority
+    )
 
-        logger.info(f"OCR задача создана: task_id={task.id}, document_id={new_doc.id}")
+    logger.info(f"OCR задачи созданы: group_id={dispatched.group_id}, document_ids={document_ids}")
 
     return {
         "success": True,
-        "uploaded_count": len(data.photos),
-        "task_ids": task_ids
+        "uploaded_count": len(photos),
+        "task_ids": dispatched.task_ids,
+        "group_id": dispatched.group_id
     }
 
 
-@app.get("/kb/photo/{document_id}/presigned")
-@limiter.limit("60/minute")
-def get_photo_presigned_url_endpoint(
+@app.get("/kb/photo/{document_id}/presigned", dependencies=rate_limited("60/minute"))
+async def get_photo_presigned_url_endpoint(
     request: Request,
     document_id: int,
     telegram_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить presigned URL для просмотра оригинального фото.
     """
     logger.debug(f"Запрос presigned URL: document_id={document_id}, telegram_id={telegram_id}")
 
-    user_service = UserService(db)
     document_service = DocumentService(db)
 
-    # Проверяем пользователя
-    user = user_service.get_user_by_telegram_id(telegram_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Получаем документ
-    doc = document_service.get_document_by_id(document_id)
-    if not doc or doc.file_type != "photo":
-        raise HTTPException(status_code=404, detail="Photo not found")
+    # Документ и его владелец - одним запросом
+    doc = await document_service.get_owned_document(document_id)
+    if doc is not None and doc.file_type != "photo":
+        doc = None
 
     # ПРОВЕРКА ПРАВ ДОСТУПА
-    if doc.user_id != user.id:
-        logger.warning(f"Попытка доступа к чужому фото: user={user.id}, doc.user_id={doc.user_id}")
-        raise HTTPException(status_code=403, detail="Access denied")
+    ensure_document_owner(doc, telegram_id, document_id, not_found="Photo not found")
 
     # Извлекаем S3 ключ
     s3_key = doc.file_url.replace(f"{S3_BASE_URL}/", "")
 
-    # Генерируем URL
-    presigned_url = get_photo_presigned_url(s3_key, expiration=3600)
+    # Подпись считается локально, но первый вызов создаёт клиент boto3
+    presigned_url = await run_blocking(get_photo_presigned_url, s3_key, expiration=3600)
 
     return {
         "presigned_url": presigned_url,
@@ -484,104 +1053,385 @@ def get_photo_presigned_url_endpoint(
     }
 
 
-@app.post("/kb/upload/files", response_model=schemas.FileUploadResponse)
-@limiter.limit("10/minute")
-def upload_files_to_kb(request: Request, data: schemas.FileUploadRequest, db: Session = Depends(get_db)):
+@app.post("/kb/upload/files", response_model=schemas.FileUploadResponse, dependencies=rate_limited("10/minute"))
+async def upload_files_to_kb(request: Request, data: schemas.FileUploadRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Загрузить файлы (TXT, PDF, DOCX) в базу знаний.
     """
     logger.info(f"Загрузка {len(data.files)} файлов: telegram_id={data.telegram_id}")
 
-    user_service = UserService(db)
-    subscription_service = SubscriptionService(db)
     limits_service = LimitsService(db)
     document_service = DocumentService(db)
 
-    user = user_service.get_user_by_telegram_id(data.telegram_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    context = await get_upload_context(db, data.telegram_id)
+    user, tier = context.user, context.tier
 
-    subscription_info = subscription_service.get_active_subscription(user.id)
-    if not subscription_info:
-        raise HTTPException(status_code=400, detail="No active subscription")
+    # Проверяем лимиты на весь пакет
+    can_upload, error = await limits_service.check_file_limits(user.id, tier, context.usage, len(data.files))
+    if not can_upload:
+        raise HTTPException(status_code=400, detail=error)
+
+    priority = get_priority(tier.tier_name)
+
+    # Все документы - одним INSERT, коммит после загрузки в S3
+    document_ids = await document_service.add_documents(
+        user.id,
+        "file",
+        [file_data['filename'] for file_data in data.files]
+    )
+
+    # Загружаем в S3 параллельно
+    results = await run_blocking_batch([
+        (
+            upload_file_to_s3,
+            (file_data['file_bytes'], user.id, document_id, file_data['filename'].split('.')[-1].lower())
+        )
+        for file_data, document_id in zip(data.files, document_ids)
+    ])
+    s3_keys = await store_batch_uploads(db, document_service, user.id, document_ids, results)
+
+    # Запускаем обработку - одной группой задач
+    dispatched = await run_blocking(
+        dispatch_group,
+        process_file,
+        [
+            [document_id, s3_key, file_data['mime_type'], user.telegram_id, file_data['filename']]
+            for file_data, document_id, s3_key in zip(data.files, document_ids, s3_keys)
+        ],
+        priority
+    )
+
+    logger.info(f"Файлы в обработке: group_id={dispatched.group_id}, document_ids={document_ids}")
+
+    return {
+        "success": True,
+        "uploaded_count": len(data.files),
+        "task_ids": dispatched.task_ids,
+        "group_id": dispatched.group_id
+    }
+
+
+@app.post("/kb/upload/files/multipart", response_model=schemas.FileUploadResponse, dependencies=rate_limited("10/minute"))
+async def upload_files_multipart(request: Request, telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Загрузить файлы (TXT, PDF, DOCX) в базу знаний (multipart/form-data, поле files).
 
-    _, tier = subscription_info
+    Файлы передаются в S3 потоком, без base64 и без буферизации всего запроса.
+    """
+    logger.info(f"Потоковая загрузка файлов: telegram_id={telegram_id}")
+
+    limits_service = LimitsService(db)
+    document_service = DocumentService(db)
+
+    context = await get_upload_context(db, telegram_id)
+    user, tier = context.user, context.tier
 
     # Проверяем лимиты
-    can_upload, error = limits_service.check_file_limits(user.id, tier)
+    can_upload, error = await limits_service.check_file_limits(user.id, tier, context.usage)
     if not can_upload:
         raise HTTPException(status_code=400, detail=error)
 
+    # Соединение с БД не удерживается на время приёма файлов
+    await db.commit()
+
+    files = await receive_streamed_files(
+        request,
+        "files",
+        make_key=lambda filename: f"files/user_{user.id}/document_{uuid4().hex}.{filename.split('.')[-1].lower()}"
+    )
+
+    # Количество файлов известно только после приёма - проверяем лимиты на весь пакет
+    can_upload, error = await limits_service.check_file_limits(user.id, tier, count=len(files))
+    if not can_upload:
+        await run_blocking_batch([(delete_from_s3, (file.s3_key,)) for file in files])
+        raise HTTPException(status_code=400, detail=error)
+
     priority = get_priority(tier.tier_name)
-    task_ids = []
 
-    for file_data in data.files:
-        extension = file_data['filename'].split('.')[-1].lower()
+    # Объекты уже в S3 - документы создаются одним INSERT
+    document_ids = await document_service.add_documents(
+        user.id,
+        "file",
+        [file.filename for file in files],
+        file_urls=[f"{S3_BASE_URL}/{file.s3_key}" for file in files]
+    )
+    await document_service.commit_documents(user.id, document_ids)
+
+    # Запускаем обработку - одной группой задач
+    dispatched = await run_blocking(
+        dispatch_group,
+        process_file,
+        [
+            [document_id, file.s3_key, file.content_type, user.telegram_id, file.filename]
+            for document_id, file in zip(document_ids, files)
+        ],
+        priority
+    )
 
-        # Создаём документ
-        new_doc = document_service.create_document(
-            user_id=user.id,
-            filename=file_data['filename'],
-            file_type="file",
-            status="pending"
-        )
+    logger.info(f"Файлы в обработке: group_id={dispatched.group_id}, document_ids={document_ids}")
+
+    return {
+        "success": True,
+        "uploaded_count": len(files),
+        "task_ids": dispatched.task_ids,
+        "group_id": dispatched.group_id
+    }
+
+
+@app.post("/kb/upload/session", response_model=schemas.UploadSessionResponse, dependencies=rate_limited("10/minute"))
+async def create_upload_session(request: Request, data: schemas.UploadSessionRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Создать сессию прямой загрузки фото или файлов в S3.
+
+    Для каждого файла создаётся документ и presigned POST: данные
+    загружаются в S3 напрямую, минуя API, затем вызывается
+    /kb/upload/session/finalize. Незавершённые сессии удаляет
+    maintenance_tasks.expire_upload_sessions (дневной лимит возвращается).
+    """
+    logger.info(f"Сессия загрузки {len(data.files)} ({data.file_type}): telegram_id={data.telegram_id}")
 
-        # Загружаем в S3
-        s3_key = upload_file_to_s3(file_data['file_bytes'], user.id, new_doc.id, extension)
-        s3_url = f"{S3_BASE_URL}/{s3_key}"
+    if data.file_type not in ("photo", "file"):
+        raise HTTPException(status_code=400, detail="Unsupported file type")
 
-        # Обновляем URL
-        doc = document_service.get_document_by_id(new_doc.id)
-        doc.file_url = s3_url
-        db.commit()
+    if not data.files or len(data.files) > Limits.BUFFER_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Expected 1-{Limits.BUFFER_MAX_ITEMS} files")
 
-        # Запускаем обработку
-        task = process_file.apply_async(
-            args=[new_doc.id, s3_key, file_data['mime_type']],
-            priority=priority
+    max_size = Limits.MAX_FILE_SIZE_MB * 1024 * 1024
+    for file in data.files:
+        if file.size > max_size:
+            raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
+
+    limits_service = LimitsService(db)
+    document_service = DocumentService(db)
+
+    context = await get_upload_context(db, data.telegram_id)
+    user, tier = context.user, context.tier
+
+    # Проверяем лимиты на весь пакет
+    if data.file_type == "photo":
+        can_upload, error = await limits_service.check_photo_limits(user.id, tier, context.usage, len(data.files))
+    else:
+        can_upload, error = await limits_service.check_file_limits(user.id, tier, context.usage, len(data.files))
+    if not can_upload:
+        raise HTTPException(status_code=400, detail=error)
+
+    # Документы ожидают загрузки в статусе uploading
+    document_ids = await document_service.add_documents(
+        user.id,
+        data.file_type,
+        [file.filename for file in data.files],
+        status=DocumentStatus.UPLOADING
+    )
+
+    if data.file_type == "photo":
+        s3_keys = [f"photos/user_{user.id}/photo_{document_id}.jpg" for document_id in document_ids]
+        content_types = ["image/jpeg"] * len(data.files)
+    else:
+        s3_keys = [
+            f"files/user_{user.id}/document_{document_id}.{file.filename.split('.')[-1].lower()}"
+            for file, document_id in zip(data.files, document_ids)
+        ]
+        content_types = [file.mime_type or "application/octet-stream" for file in data.files]
+
+    await document_service.set_file_urls({
+        document_id: f"{S3_BASE_URL}/{s3_key}"
+        for document_id, s3_key in zip(document_ids, s3_keys)
+    })
+    await document_service.commit_documents(user.id, document_ids)
+
+    # Подпись считается локально, без запросов к S3, но первый вызов создаёт клиент boto3
+    uploads = []
+    for document_id, s3_key, content_type in zip(document_ids, s3_keys, content_types):
+        presigned = await run_blocking(
+            create_presigned_upload,
+            s3_key,
+            content_type,
+            max_size,
+            expiration=Limits.UPLOAD_URL_EXPIRATION_SEC
         )
-        task_ids.append(task.id)
+        uploads.append({"document_id": document_id, **presigned})
+
+    return {
+        "uploads": uploads,
+        "expires_in": Limits.UPLOAD_URL_EXPIRATION_SEC
+    }
+
+
+@app.post("/kb/upload/session/finalize", response_model=schemas.UploadFinalizeResponse, dependencies=rate_limited("10/minute"))
+async def finalize_upload_session(request: Request, data: schemas.UploadFinalizeRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Завершить прямую загрузку в S3 и запустить обработку.
+
+    Наличие, размер и ETag объектов проверяются через head_object.
+    Документы, не прошедшие проверку, удаляются, дневной лимит за них
+    возвращается.
+    """
+    logger.info(f"Завершение загрузки {len(data.uploads)} документов: telegram_id={data.telegram_id}")
+
+    document_service = DocumentService(db)
+
+    context = await get_upload_context(db, data.telegram_id)
+    user, tier = context.user, context.tier
+
+    uploads = {item.document_id: item for item in data.uploads}
+
+    # Повторное завершение тех же документов их уже не захватит
+    documents = await document_service.claim_pending_uploads(user.id, data.file_type, list(uploads))
+    if not documents:
+        raise HTTPException(status_code=404, detail="No pending uploads found")
+
+    s3_keys = [doc.file_url.replace(f"{S3_BASE_URL}/", "") for doc in documents]
+    heads = await run_blocking_batch([(head_s3_object, (s3_key,)) for s3_key in s3_keys])
+
+    max_size = Limits.MAX_FILE_SIZE_MB * 1024 * 1024
+    claimed_ids = {doc.id for doc in documents}
+    failed_ids = [document_id for document_id in uploads if document_id not in claimed_ids]
+    rejected_ids = []
+    verified = []
 
-        logger.info(f"Файл обработка: task_id={task.id}, document_id={new_doc.id}")
+    for doc, s3_key, head in zip(documents, s3_keys, heads):
+        item = uploads[doc.id]
+
+        if isinstance(head, Exception) or head is None:
+            reason = "object not found"
+        elif head["size"] > max_size or (item.size is not None and head["size"] != item.size):
+            reason = f"size mismatch ({head['size']})"
+        elif item.etag and head["etag"] != item.etag.strip('"'):
+            reason = "ETag mismatch"
+        else:
+            verified.append((doc, s3_key, head))
+            continue
+
+        logger.warning(f"Загрузка документа {doc.id} не подтверждена: {reason}")
+        rejected_ids.append(doc.id)
+
+        if isinstance(head, dict):
+            await run_blocking(delete_from_s3, s3_key)
+
+    await document_service.discard_uploads(user.id, rejected_ids)
+    failed_ids.extend(rejected_ids)
+
+    if not verified:
+        raise HTTPException(status_code=400, detail="Uploaded objects not found in storage")
+
+    # Запускаем OCR или обработку файлов - одной группой задач
+    if data.file_type == "photo":
+        task, args_list = process_photo_ocr, [[doc.id, s3_key, user.telegram_id] for doc, s3_key, _ in verified]
+    else:
+        task, args_list = process_file, [
+            [doc.id, s3_key, head["content_type"] or "application/octet-stream", user.telegram_id, doc.filename]
+            for doc, s3_key, head in verified
+        ]
+
+    dispatched = await run_blocking(dispatch_group, task, args_list, get_priority(tier.tier_name))
+
+    logger.info(f"Прямая загрузка завершена: group_id={dispatched.group_id}, документов={len(verified)}")
 
     return {
         "success": True,
-        "uploaded_count": len(data.files),
-        "task_ids": task_ids
+        "uploaded_count": len(verified),
+        "failed_document_ids": failed_ids,
+        "task_ids": dispatched.task_ids,
+        "group_id": dispatched.group_id
     }
 
 
-@app.delete("/kb/documents/{document_id}")
-@limiter.limit("30/minute")
-def delete_document(request: Request, document_id: int, db: Session = Depends(get_db)):
+@app.post("/kb/documents:bulk-delete", response_model=schemas.BulkDeleteResponse, dependencies=rate_limited("10/minute"))
+async def bulk_delete_documents(request: Request, data: schemas.BulkDeleteRequest, db: AsyncSession = Depends(get_async_db)):
     """
-    Удалить документ из базы знаний (мягкое удаление).
+    Удалить несколько документов пользователя (мягкое удаление).
 
-    Для фото и файлов также удаляется объект из S3.
+    Документы выбираются по ID, по типу или все сразу и удаляются одним
+    UPDATE. Объекты S3 удаляются в фоне задачей delete_s3_objects.
     """
-    logger.info(f"Запрос на удаление: document_id={document_id}")
+    selectors = [bool(data.document_ids), data.file_type is not None, data.all]
+    if sum(selectors) != 1:
+        raise HTTPException(status_code=400, detail="Specify exactly one of document_ids, file_type or all")
 
+    if len(data.document_ids) > Limits.BULK_DELETE_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {Limits.BULK_DELETE_MAX_IDS})")
+
+    if data.file_type is not None and data.file_type not in CONTENT_CONFIG:
+        raise HTTPException(status_code=400, detail="Unknown file_type")
+
+    logger.info(
+        f"Массовое удаление: telegram_id={data.telegram_id}, ids={len(data.document_ids)}, "
+        f"file_type={data.file_type}, all={data.all}"
+    )
+
+    user_service = UserService(db)
     document_service = DocumentService(db)
 
-    document = document_service.get_document_by_id(document_id)
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    user = await user_service.get_user_by_telegram_id(data.telegram_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    # Удаляем из S3 если это фото или файл
-    if document.file_type in ["photo", "file"] and document.file_url:
+    rows, content_keys = await document_service.soft_delete_documents(
+        user.id,
+        document_ids=list(dict.fromkeys(data.document_ids)) or None,
+        file_type=data.file_type
+    )
+
+    # Файлы фото и документов и вынесенные в S3 тексты
+    s3_keys = [
+        row.file_url.replace(f"{S3_BASE_URL}/", "")
+        for row in rows
+        if row.file_type in ["photo", "file"] and row.file_url
+    ] + content_keys
+
+    cleanup_task_id = None
+    if s3_keys:
         try:
-            s3_key = document.file_url.replace(f"{S3_BASE_URL}/", "")
-            delete_from_s3(s3_key)
-            logger.info(f"Удалён из S3: {s3_key}")
+            task = await run_blocking(delete_s3_objects.apply_async, args=[s3_keys])
+            cleanup_task_id = task.id
         except Exception as e:
-            logger.error(f"Ошибка удаления из S3: {e}")
+            # Документы уже удалены; объекты удалит purge_deleted_documents
+            logger.error(f"Не удалось поставить удаление {len(s3_keys)} объектов S3: {e}")
 
-    # Мягкое удаление
-    document_service.soft_delete_document(document_id)
+    logger.info(f"Удалено документов: {len(rows)}, объектов S3 в очереди: {len(s3_keys)}")
+
+    return {
+        "success": True,
+        "deleted_count": len(rows),
+        "deleted_ids": [row.id for row in rows],
+        "cleanup_task_id": cleanup_task_id
+    }
+
+
+@app.delete("/kb/documents/{document_id}", dependencies=rate_limited("30/minute"))
+async def delete_document(
+    request: Request,
+    document_id: int,
+    telegram_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Удалить документ пользователя из базы знаний (мягкое удаление).
+
+    Для фото и файлов также удаляется объект из S3.
+    """
+    logger.info(f"Запрос на удаление: document_id={document_id}, telegram_id={telegram_id}")
+
+    document_service = DocumentService(db)
+
+    document = await document_service.get_owned_document(document_id)
+    ensure_document_owner(document, telegram_id, document_id)
+
+    # Мягкое удаление; владелец уже известен - документ повторно не читается
+    content_keys = await document_service.soft_delete_document(document_id, user_id=document.user_id)
+
+    # Файл фото или документа и вынесенный в S3 текст
+    s3_keys = list(content_keys or [])
+    if document.file_type in ["photo", "file"] and document.file_url:
+        s3_keys.append(document.file_url.replace(f"{S3_BASE_URL}/", ""))
+
+    if s3_keys:
+        await run_blocking_batch([(delete_from_s3, (key,)) for key in s3_keys])
+        logger.info(f"Удалено из S3 объектов: {len(s3_keys)}")
 
     logger.info(f"Документ {document_id} удалён")
 
-    return {"success": True, "message": "Document deleted"}
+    return {"success": True, "message": "Document deleted", "file_type": document.file_type}
 
 
 # === SUPPORT TICKET ENDPOINTS ===
@@ -713,11 +1563,23 @@ def close_ticket(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# ============================================================================
+# МЕТРИКИ
+# ============================================================================
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики Prometheus (запросы API, SQL, S3, брокер Celery, пул соединений с БД)."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 # ============================================================================
 # ЗАПУСК СЕРВЕРА
 # ============================================================================
 
 if __name__ == "__main__":
+    import uvicorn
+
     logger.info(f"Запуск API на {os.getenv('API_HOST')}:{os.getenv('API_PORT')}")
 
     uvicorn.run(
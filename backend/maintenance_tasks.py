@@ -0,0 +1,216 @@
+# Периодические задачи обслуживания БД (запускаются Celery beat)
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, select, update
+
+from backend.celery_app import celery_app
+from backend.content_storage import content_s3_key
+from backend.database import SessionLocal
+from backend.models import User, UserDocument, UserDocumentContent, UserDailyAction
+from backend.object_storage import delete_objects_from_s3
+from backend.services.date_utils import get_today_range
+from backend.services.document_service import build_discard_uploads
+from backend.services.stats_cache import stats_cache
+from backend.services.usage_service import build_usage_delta, discarded_upload_refunds, reconcile_usage_sync
+from shared.config import settings, ContentStorage, DocumentStatus, Limits, S3_BASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Количество пользователей, пересчитываемых в одной транзакции
+USAGE_RECONCILE_BATCH_SIZE = 500
+
+# Количество документов, удаляемых в одной транзакции
+DOCUMENT_PURGE_BATCH_SIZE = 500
+
+# Количество незавершённых загрузок, удаляемых в одной транзакции
+UPLOAD_SESSION_EXPIRE_BATCH_SIZE = 500
+
+# Типы документов, которые обрабатывает worker (текст мог быть вынесен в S3)
+WORKER_FILE_TYPES = ("video", "photo", "file")
+
+
+@celery_app.task(name='backend.maintenance_tasks.reconcile_user_usage')
+def reconcile_user_usage(batch_size: int = USAGE_RECONCILE_BATCH_SIZE):
+    # Пересчёт счётчиков user_usage по user_documents пачками пользователей
+    db = SessionLocal()
+    total = 0
+    last_user_id = 0
+
+    try:
+        while True:
+            user_ids = db.scalars(
+                select(User.id)
+                .where(User.id > last_user_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all()
+
+            if not user_ids:
+                break
+
+            total += reconcile_usage_sync(db, list(user_ids))
+            db.commit()
+
+            last_user_id = user_ids[-1]
+
+        logger.info(f"Счётчики использования пересчитаны: {total} пользователей")
+        return {"users": total}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка пересчёта счётчиков использования: {e}")
+        raise
+
+    finally:
+        db.close()
+
+
+def _purge_batch(db, cutoff: datetime, batch_size: int) -> dict:
+    # Удаление одной пачки документов; возвращает удалённое и ключи S3
+    documents = db.execute(
+        select(UserDocument.id, UserDocument.file_type, UserDocument.file_url)
+        .where(UserDocument.is_deleted == True, UserDocument.deleted_at < cutoff)
+        .order_by(UserDocument.id)
+        .limit(batch_size)
+        # Документы, которые сейчас меняет другая транзакция, - в следующий запуск
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    if not documents:
+        return {"documents": 0}
+
+    document_ids = [doc.id for doc in documents]
+    contents = db.execute(
+        select(UserDocumentContent.storage, UserDocumentContent.stored_bytes)
+        .where(UserDocumentContent.document_id.in_(document_ids))
+    ).all()
+
+    # Файлы фото и документов, а также тексты, вынесенные в S3
+    # (после мягкого удаления ссылка на текст в БД уже очищена)
+    s3_keys = []
+    for doc in documents:
+        if doc.file_type in ("photo", "file") and doc.file_url and doc.file_url.startswith(f"{S3_BASE_URL}/"):
+            s3_keys.append(doc.file_url.replace(f"{S3_BASE_URL}/", ""))
+        if doc.file_type in WORKER_FILE_TYPES:
+            s3_keys.append(content_s3_key(doc.id))
+
+    # Действия пользователя остаются (дневные лимиты сообщений), без ссылки на документ
+    actions = db.execute(
+        update(UserDailyAction)
+        .where(UserDailyAction.document_id.in_(document_ids))
+        .values(document_id=None)
+    ).rowcount
+    db.execute(delete(UserDocumentContent).where(UserDocumentContent.document_id.in_(document_ids)))
+    db.execute(delete(UserDocument).where(UserDocument.id.in_(document_ids)))
+
+    return {
+        "documents": len(document_ids),
+        "actions": actions,
+        "db_bytes": sum(c.stored_bytes for c in contents if c.storage != ContentStorage.S3),
+        "s3_keys": s3_keys,
+    }
+
+
+@celery_app.task(name='backend.maintenance_tasks.purge_deleted_documents')
+def purge_deleted_documents(retention_days: Optional[int] = None, batch_size: int = DOCUMENT_PURGE_BATCH_SIZE):
+    # Окончательное удаление документов, мягко удалённых больше retention_days дней назад.
+    # Счётчики user_usage не меняются: удалённые документы в хранилище не считаются,
+    # а дневные лимиты касаются только сегодняшних загрузок
+    retention_days = retention_days if retention_days is not None else settings.DOCUMENT_PURGE_AFTER_DAYS
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    report = {"documents": 0, "actions": 0, "db_bytes": 0, "s3_objects": 0, "s3_failed": 0}
+
+    while True:
+        db = SessionLocal()
+
+        try:
+            batch = _purge_batch(db, cutoff, batch_size)
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ошибка удаления документов: {e}")
+            raise
+
+        finally:
+            db.close()
+
+        if not batch["documents"]:
+            break
+
+        # Объекты S3 удаляются после коммита - только для удалённых строк
+        failed = delete_objects_from_s3(batch["s3_keys"])
+
+        report["documents"] += batch["documents"]
+        report["actions"] += batch["actions"]
+        report["db_bytes"] += batch["db_bytes"]
+        report["s3_objects"] += len(batch["s3_keys"]) - len(failed)
+        report["s3_failed"] += len(failed)
+
+    logger.info(
+        f"Удалено документов: {report['documents']}, освобождено в БД: {report['db_bytes']} байт текста, "
+        f"объектов S3: {report['s3_objects']} (ошибок: {report['s3_failed']})"
+    )
+    return report
+
+
+@celery_app.task(name='backend.maintenance_tasks.expire_upload_sessions')
+def expire_upload_sessions(batch_size: int = UPLOAD_SESSION_EXPIRE_BATCH_SIZE):
+    # Удаление документов прямой загрузки, не завершённых до истечения presigned POST.
+    # Дневной лимит за сегодняшние загрузки возвращается, загруженные без finalize
+    # объекты удаляются из S3
+    cutoff = datetime.now() - timedelta(seconds=Limits.UPLOAD_URL_EXPIRATION_SEC + Limits.UPLOAD_SESSION_GRACE_SEC)
+    report = {"documents": 0, "s3_failed": 0}
+
+    while True:
+        db = SessionLocal()
+
+        try:
+            # Документы, которые сейчас захватывает finalize, - в следующий запуск
+            document_ids = db.scalars(
+                select(UserDocument.id)
+                .where(UserDocument.status == DocumentStatus.UPLOADING, UserDocument.upload_date < cutoff)
+                .order_by(UserDocument.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+
+            if not document_ids:
+                break
+
+            rows = db.execute(build_discard_uploads(
+                UserDocument.id.in_(document_ids),
+                UserDocument.status == DocumentStatus.UPLOADING
+            )).all()
+
+            today_start, tomorrow_start = get_today_range()
+            for (user_id, file_type), count in discarded_upload_refunds(rows, today_start, tomorrow_start).items():
+                db.execute(build_usage_delta(user_id, file_type, daily=-count))
+
+            telegram_ids = db.scalars(
+                select(User.telegram_id).where(User.id.in_({row.user_id for row in rows}))
+            ).all()
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ошибка удаления незавершённых загрузок: {e}")
+            raise
+
+        finally:
+            db.close()
+
+        for telegram_id in telegram_ids:
+            stats_cache.invalidate_sync(telegram_id)
+
+        s3_keys = [
+            row.file_url.replace(f"{S3_BASE_URL}/", "")
+            for row in rows if row.file_url and row.file_url.startswith(f"{S3_BASE_URL}/")
+        ]
+        report["documents"] += len(rows)
+        report["s3_failed"] += len(delete_objects_from_s3(s3_keys))
+
+    logger.info(f"Удалено незавершённых загрузок: {report['documents']} (ошибок S3: {report['s3_failed']})")
+    return report
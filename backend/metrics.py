@@ -0,0 +1,368 @@
+# Метрики Prometheus для API и Celery worker
+
+import time
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# ПУЛ СОЕДИНЕНИЙ С БД
+# ============================================================================
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время ожидания соединения из пула",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Количество таймаутов ожидания соединения из пула",
+    ["engine"]
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Количество выданных соединений",
+    ["engine"]
+)
+
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "Максимальное количество соединений (pool_size + max_overflow)",
+    ["engine"]
+)
+
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation",
+    "Доля занятых соединений пула (0..1)",
+    ["engine"]
+)
+
+
+class _CheckoutTimingMixin:
+    """Замеряет время получения соединения из пула."""
+
+    # Метка движка в метриках, задаётся в подклассах
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool с метриками для синхронного движка."""
+
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool с метриками для асинхронного движка."""
+
+    metrics_label = "async"
+
+
+def register_pool_metrics(label: str, pool, pool_size: int, max_overflow: int):
+    """
+    Зарегистрировать gauge-метрики заполненности пула.
+
+    Значения считываются из пула в момент сбора метрик.
+
+    Args:
+        label: Метка движка (sync, async)
+        pool: Пул соединений SQLAlchemy
+        pool_size: Размер пула
+        max_overflow: Максимальное превышение размера пула
+    """
+    capacity = pool_size + max_overflow
+
+    DB_POOL_CAPACITY.labels(label).set(capacity)
+    DB_POOL_CHECKED_OUT.labels(label).set_function(pool.checkedout)
+    DB_POOL_SATURATION.labels(label).set_function(
+        lambda: pool.checkedout() / capacity if capacity else 0.0
+    )
+
+
+# ============================================================================
+# КЕШ СТАТИСТИКИ
+# ============================================================================
+
+STATS_CACHE_REQUESTS = Counter(
+    "stats_cache_requests_total",
+    "Обращения к кешу статистики пользователя (hit, miss, error, bypass)",
+    ["result"]
+)
+
+
+# ============================================================================
+# ХРАНЕНИЕ ТЕКСТОВ ДОКУМЕНТОВ
+# ============================================================================
+
+# Сэкономлено байт: content_original_bytes_total - content_stored_bytes_total
+CONTENT_ORIGINAL_BYTES = Counter(
+    "content_original_bytes_total",
+    "Размер записанных текстов документов до сжатия",
+    ["storage"]
+)
+
+CONTENT_STORED_BYTES = Counter(
+    "content_stored_bytes_total",
+    "Размер записанных текстов документов после сжатия",
+    ["storage"]
+)
+
+
+# ============================================================================
+# ЗАПРОСЫ API
+# ============================================================================
+
+HTTP_REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Время обработки запроса API",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "api_requests_in_flight",
+    "Запросы API в обработке",
+    ["method", "route"]
+)
+
+HTTP_RESPONSE_SIZE = Histogram(
+    "api_response_size_bytes",
+    "Размер тела ответа API",
+    ["method", "route"],
+    buckets=(100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+)
+
+# Время запроса по зависимостям: Postgres, S3, брокер Celery
+REQUEST_DEPENDENCY_SECONDS = Histogram(
+    "api_request_dependency_seconds",
+    "Суммарное время обращений к зависимости за один запрос API",
+    ["route", "dependency"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+REQUEST_DB_QUERIES = Histogram(
+    "api_request_db_queries",
+    "Количество SQL запросов за один запрос API",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+
+# Метка запросов, не попавших ни в один маршрут (без роста числа серий)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    """Обращения к зависимостям в рамках одного запроса API."""
+
+    DEPENDENCIES = ("db", "s3", "broker")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.seconds = dict.fromkeys(self.DEPENDENCIES, 0.0)
+        # Вызовы S3 и брокера идут параллельно из пула потоков
+        self._lock = threading.Lock()
+
+    def add(self, dependency: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[dependency] += seconds
+            if dependency == "db":
+                self.db_queries += 1
+
+
+# Статистика текущего запроса (копируется в потоки пула вместе с контекстом)
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_dependency(dependency: str, seconds: float) -> None:
+    """Учесть обращение к зависимости в статистике текущего запроса."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(dependency, seconds)
+
+
+def _route_template(app, scope) -> str:
+    # Шаблон пути (/kb/documents/{telegram_id}) вместо фактического пути
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware метрик запросов API.
+
+    Записывает время, число запросов в обработке и размер ответа по
+    маршрутам, а также время Postgres, S3 и брокера за запрос.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope["app"], scope)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+            in_flight.dec()
+            _request_stats.reset(token)
+
+            REQUEST_DB_QUERIES.labels(route).observe(stats.db_queries)
+            for dependency, seconds in stats.seconds.items():
+                REQUEST_DEPENDENCY_SECONDS.labels(route, dependency).observe(seconds)
+
+
+# ============================================================================
+# SQL ЗАПРОСЫ
+# ============================================================================
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Время выполнения SQL запроса",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+
+def instrument_engine(engine, label: str) -> None:
+    """
+    Замерять SQL запросы движка (event hooks SQLAlchemy).
+
+    Args:
+        engine: Синхронный движок (для асинхронного - async_engine.sync_engine)
+        label: Метка движка (sync, async)
+    """
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_DURATION.labels(label).observe(elapsed)
+        record_dependency("db", elapsed)
+
+    def handle_error(exception_context):
+        started = exception_context.connection and exception_context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+# ============================================================================
+# S3 И БРОКЕР CELERY
+# ============================================================================
+
+S3_REQUEST_DURATION = Histogram(
+    "s3_request_duration_seconds",
+    "Время запроса к S3",
+    ["operation", "result"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+CELERY_PUBLISH_DURATION = Histogram(
+    "celery_publish_duration_seconds",
+    "Время публикации задачи в брокер",
+    ["task"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+def instrument_s3_client(client) -> None:
+    """
+    Замерять запросы клиента boto3 (события botocore).
+
+    Начало отсчёта - before-parameter-build: обработчики before-call
+    могут вернуть ответ и остановить остальные (Stubber в тестах).
+
+    Args:
+        client: Клиент boto3
+    """
+    def before_parameter_build(context, **kwargs):
+        context["metrics_started"] = time.perf_counter()
+
+    def after_call(context, model, **kwargs):
+        started = context.pop("metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        result = "error" if kwargs.get("exception") else "ok"
+        S3_REQUEST_DURATION.labels(model.name, result).observe(elapsed)
+        record_dependency("s3", elapsed)
+
+    client.meta.events.register("before-parameter-build.s3", before_parameter_build)
+    client.meta.events.register("after-call.s3", after_call)
+    client.meta.events.register("after-call-error.s3", after_call)
+
+
+# Начало публикации задач по ID (before_task_publish -> after_task_publish)
+_publish_started: Dict[str, float] = {}
+
+
+def _before_task_publish(headers=None, **kwargs):
+    if headers and "id" in headers:
+        _publish_started[headers["id"]] = time.perf_counter()
+
+
+def _after_task_publish(sender=None, headers=None, **kwargs):
+    started = _publish_started.pop(headers.get("id"), None) if headers else None
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    CELERY_PUBLISH_DURATION.labels(sender or "unknown").observe(elapsed)
+    record_dependency("broker", elapsed)
+
+
+def instrument_celery_publish() -> None:
+    """Замерять публикацию задач Celery (сигналы before/after_task_publish)."""
+    from celery.signals import after_task_publish, before_task_publish
+
+    before_task_publish.connect(_before_task_publish, weak=False)
+    after_task_publish.connect(_after_task_publish, weak=False)
@@ -1,9 +1,11 @@
 # Инструкция по инициализации таблиц и полей в базе данных PostgreSQL
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, Text, Boolean, ForeignKey, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from backend.database import Base
+from backend.content_storage import encode_text, read_text
+from shared.config import ContentStorage
 
 
 # users - общая информация о пользователях
@@ -30,6 +32,7 @@ class User(Base):
     subscriptions = relationship("UserSubscription", back_populates="user")
     transactions = relationship("Transaction", back_populates="user")
     support_tickets = relationship("SupportTicket", back_populates="user", cascade="all, delete-orphan")
+    usage = relationship("UserUsage", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
 
 # user_actions - лог действий пользователей
@@ -51,6 +54,11 @@ class UserDailyAction(Base):
     user = relationship("User", back_populates="actions")
     document = relationship("UserDocument", back_populates="actions")
 
+    __table_args__ = (
+        # Подсчёт действий пользователя за день (сообщения ИИ)
+        Index("ix_user_actions_user_type_date", "user_id", "action_type", "action_date"),
+    )
+
 
 # user_documents - файлы пользователей в базе знаний
 class UserDocument(Base):
@@ -69,8 +77,8 @@ class UserDocument(Base):
     file_type = Column(String, nullable=False)
     # Статус обработки
     status = Column(String, default="processing", nullable=False)
-    # Извлеченный текст
-    extracted_text = Column(Text)
+    # Начало извлеченного текста для списков документов
+    preview = Column(String)
     # Ссылка на файл в S3
     file_url = Column(String)
     # Длина видео
@@ -83,6 +91,115 @@ class UserDocument(Base):
     # Relationships
     user = relationship("User", back_populates="documents")
     actions = relationship("UserDailyAction", back_populates="document")
+    # Извлеченный текст - в отдельной таблице, загружается только по запросу
+    content = relationship(
+        "UserDocumentContent",
+        back_populates="document",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    @property
+    def extracted_text(self):
+        # Извлеченный текст (None, если текста нет); сжатый распаковывается.
+        # Вынесенный в S3 не скачивается: это сетевой вызов, из API - read_text в пуле потоков
+        if self.content is not None and self.content.storage == ContentStorage.S3:
+            raise RuntimeError(f"Текст документа {self.id} хранится в S3 - читать через read_text")
+        return read_text(self.content)
+
+    @extracted_text.setter
+    def extracted_text(self, value):
+        # Размер и количество символов вычисляются при записи
+        if self.content is None:
+            if value is None:
+                return
+            self.content = UserDocumentContent()
+        self.content.set_text(value)
+
+    __table_args__ = (
+        # Дневные лимиты (учитывают и удалённые документы)
+        Index("ix_user_documents_user_type_date", "user_id", "file_type", "upload_date"),
+        # Хранилище и списки документов - только неудалённые
+        # (id - для постраничной выдачи по (upload_date, id))
+        Index(
+            "ix_user_documents_active_user_type_date",
+            "user_id", "file_type", "upload_date", "id",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+        # Окончательное удаление старых удалённых документов
+        Index(
+            "ix_user_documents_deleted_at",
+            "deleted_at",
+            postgresql_where=text("is_deleted = true"),
+            sqlite_where=text("is_deleted = 1")
+        ),
+    )
+
+
+# user_document_contents - извлеченный текст документов (1:1 с user_documents)
+# Вынесен из user_documents: списки, лимиты и статистика не читают тексты
+class UserDocumentContent(Base):
+    __tablename__ = "user_document_contents"
+
+    # id документа
+    document_id = Column(Integer, ForeignKey("user_documents.id", ondelete="CASCADE"), primary_key=True)
+    # Способ хранения текста (ContentStorage)
+    storage = Column(String, default=ContentStorage.INLINE, server_default=ContentStorage.INLINE, nullable=False)
+    # Извлеченный текст (storage = inline)
+    text = Column(Text)
+    # Сжатый zstd текст (storage = zstd)
+    data = Column(LargeBinary)
+    # Ключ объекта S3 со сжатым текстом (storage = s3)
+    s3_key = Column(String)
+    # Количество символов текста
+    char_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Размер текста в байтах (UTF-8)
+    size_bytes = Column(Integer, default=0, server_default="0", nullable=False)
+    # Размер хранимых данных в байтах (после сжатия)
+    stored_bytes = Column(Integer, default=0, server_default="0", nullable=False)
+
+    # Relationships
+    document = relationship("UserDocument", back_populates="content")
+
+    def set_text(self, value):
+        # Текст вместе с размерами; большие тексты сжимаются (backend/content_storage.py)
+        self.set_columns(encode_text(value))
+
+    def set_columns(self, columns):
+        # Колонки, заранее вычисленные encode_text (сжатие в API - в пуле потоков)
+        for name, column_value in columns.items():
+            setattr(self, name, column_value)
+
+
+# user_usage - счётчики использования базы знаний (одна строка на пользователя)
+# Обновляются в той же транзакции, что и документы; эталон - user_documents
+class UserUsage(Base):
+    __tablename__ = "user_usage"
+
+    # id пользователя
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # Хранилище: неудалённые документы (фото, файлы и видео - только обработанные)
+    texts_count = Column(Integer, default=0, server_default="0", nullable=False)
+    photos_count = Column(Integer, default=0, server_default="0", nullable=False)
+    files_count = Column(Integer, default=0, server_default="0", nullable=False)
+    video_hours = Column(Float, default=0, server_default="0", nullable=False)
+
+    # День, к которому относятся дневные счётчики
+    usage_day = Column(Date)
+    # Дневные счётчики: загрузки за usage_day (тексты - только неудалённые)
+    daily_texts = Column(Integer, default=0, server_default="0", nullable=False)
+    daily_photos = Column(Integer, default=0, server_default="0", nullable=False)
+    daily_files = Column(Integer, default=0, server_default="0", nullable=False)
+    daily_video_hours = Column(Float, default=0, server_default="0", nullable=False)
+
+    # Дата последнего обновления
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relationships
+    user = relationship("User", back_populates="usage")
 
 
 # subscription_tiers - тарифные планы
@@ -0,0 +1,321 @@
+# Работа с объектным хранилищем S3
+#
+# Лёгкий модуль для API: клиент S3 и операции с объектами без
+# зависимостей обработки (yt_dlp, ffmpeg, pdf2image, docx).
+# Celery задачи обработки - в backend/s3_storage.py.
+
+import base64
+import logging
+import threading
+from typing import List, Optional
+
+from shared.config import settings
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# НАСТРОЙКА S3 CLIENT
+# ============================================================================
+
+# Клиент для работы с Yandex Object Storage.
+# boto3 импортируется и клиент создаётся при первом обращении, а не
+# при импорте API (ускоряет старт и перезапуск по --reload).
+s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Клиент S3 (создаётся при первом обращении)."""
+    global s3_client
+
+    if s3_client is not None:
+        return s3_client
+
+    # Первые запросы приходят из пула потоков одновременно
+    with _s3_client_lock:
+        if s3_client is None:
+            import boto3
+            from backend.metrics import instrument_s3_client
+
+            client = boto3.client(
+                's3',
+                endpoint_url='https://storage.yandexcloud.net',
+                aws_access_key_id=settings.YANDEX_ACCESS_KEY,
+                aws_secret_access_key=settings.YANDEX_SECRET_KEY,
+                config=boto3.session.Config(
+                    proxies={}  # Отключение проксирования
+                )
+            )
+            instrument_s3_client(client)
+            s3_client = client
+
+    return s3_client
+
+
+BUCKET_NAME = settings.YC_BUCKET_NAME
+
+
+# ============================================================================
+# РАБОТА С S3
+# ============================================================================
+
+# Загрузка фото в S3
+def upload_photo_to_s3(photo_base64: str, user_id: int, document_id: int) -> str:
+    try:
+        # Декодируем base64
+        try:
+            photo_bytes = base64.b64decode(photo_base64)
+        except Exception as e:
+            logger.error(f"Ошибка декодирования base64 для фото document_id={document_id}: {e}")
+            raise ValueError(f"Invalid base64 data: {e}")
+
+        # Формируем путь в S3
+        s3_key = f"photos/user_{user_id}/photo_{document_id}.jpg"
+
+        # Загружаем в S3
+        get_s3_client().put_object(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Body=photo_bytes,
+            ContentType='image/jpeg'
+        )
+
+        logger.info(f"Загружено фото в S3: {s3_key}")
+        return s3_key
+
+    except ValueError:
+        # Пробрасываем ValueError дальше (это ошибка валидации base64)
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка загрузки фото в S3: {e}")
+        raise
+
+
+# Получение presigned URL для скачивания фото
+def get_photo_presigned_url(s3_key: str, expiration: int = 3600) -> str:
+    try:
+        presigned_url = get_s3_client().generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': BUCKET_NAME,
+                'Key': s3_key
+            },
+            ExpiresIn=expiration
+        )
+
+        logger.info(f"Сгенерирован presigned URL для {s3_key}")
+        return presigned_url
+
+    except Exception as e:
+        logger.error(f"Ошибка генерации presigned URL: {e}")
+        raise
+
+
+# Presigned POST для загрузки объекта напрямую в S3 (минуя API)
+def create_presigned_upload(s3_key: str, content_type: str, max_size: int, expiration: int = 900) -> dict:
+    try:
+        # Тип и размер объекта закреплены в политике - S3 отклонит другие
+        presigned = get_s3_client().generate_presigned_post(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size]
+            ],
+            ExpiresIn=expiration
+        )
+
+        logger.debug(f"Сгенерирован presigned POST для {s3_key}")
+        return presigned
+
+    except Exception as e:
+        logger.error(f"Ошибка генерации presigned POST: {e}")
+        raise
+
+
+# Метаданные объекта в S3 (None если объекта нет)
+def head_s3_object(s3_key: str) -> Optional[dict]:
+    from botocore.exceptions import ClientError
+
+    try:
+        response = get_s3_client().head_object(Bucket=BUCKET_NAME, Key=s3_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        logger.error(f"Ошибка чтения метаданных {s3_key}: {e}")
+        raise
+
+    return {
+        'size': response['ContentLength'],
+        'etag': response['ETag'].strip('"'),
+        'content_type': response.get('ContentType')
+    }
+
+
+# Загрузка файла в S3
+def upload_file_to_s3(file_base64: str, user_id: int, document_id: int, extension: str) -> str:
+    try:
+        # Декодируем base64
+        try:
+            file_bytes = base64.b64decode(file_base64)
+        except Exception as e:
+            logger.error(f"Ошибка декодирования base64 для файла document_id={document_id}: {e}")
+            raise ValueError(f"Invalid base64 data: {e}")
+
+        # Формируем путь в S3
+        s3_key = f"files/user_{user_id}/document_{document_id}.{extension}"
+
+        # Загружаем в S3
+        get_s3_client().put_object(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Body=file_bytes
+        )
+
+        logger.info(f"Загружен файл в S3: {s3_key}")
+        return s3_key
+
+    except ValueError:
+        # Пробрасываем ValueError дальше
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка загрузки файла в S3: {e}")
+        raise
+
+
+class S3StreamUpload:
+    """
+    Потоковая загрузка объекта в S3 частями.
+
+    Данные накапливаются до размера части и отправляются через
+    multipart upload, поэтому в памяти держится не больше одной части.
+    Объект меньше одной части загружается одним put_object.
+    Методы с сетевыми вызовами блокирующие - в API вызывать через пул потоков.
+    """
+
+    def __init__(self, s3_key: str, content_type: Optional[str] = None, part_size: Optional[int] = None):
+        """
+        Args:
+            s3_key: Ключ объекта
+            content_type: MIME тип объекта
+            part_size: Размер части в байтах (по умолчанию settings.S3_MULTIPART_PART_SIZE_MB)
+        """
+        self.s3_key = s3_key
+        self.content_type = content_type
+        self.part_size = part_size or settings.S3_MULTIPART_PART_SIZE_MB * 1024 * 1024
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Добавить данные в буфер (без сетевых вызовов).
+
+        Returns:
+            True если накоплена часть и нужно вызвать upload_part()
+        """
+        self._buffer.extend(data)
+        self.size += len(data)
+        return len(self._buffer) >= self.part_size
+
+    def upload_part(self) -> None:
+        """Отправить накопленную часть."""
+        if self._upload_id is None:
+            extra = {"ContentType": self.content_type} if self.content_type else {}
+            response = get_s3_client().create_multipart_upload(Bucket=BUCKET_NAME, Key=self.s3_key, **extra)
+            self._upload_id = response['UploadId']
+
+        part_number = len(self._parts) + 1
+        response = get_s3_client().upload_part(
+            Bucket=BUCKET_NAME,
+            Key=self.s3_key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer)
+        )
+        self._parts.append({"ETag": response['ETag'], "PartNumber": part_number})
+        self._buffer.clear()
+
+    def complete(self) -> str:
+        """
+        Завершить загрузку.
+
+        Returns:
+            Ключ объекта в S3
+        """
+        if self._upload_id is None:
+            # Объект меньше одной части - один запрос
+            extra = {"ContentType": self.content_type} if self.content_type else {}
+            get_s3_client().put_object(Bucket=BUCKET_NAME, Key=self.s3_key, Body=bytes(self._buffer), **extra)
+        else:
+            if self._buffer:
+                self.upload_part()
+            get_s3_client().complete_multipart_upload(
+                Bucket=BUCKET_NAME,
+                Key=self.s3_key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+
+        self._buffer.clear()
+        logger.info(f"Загружен объект в S3: {self.s3_key} ({self.size} байт)")
+        return self.s3_key
+
+    def abort(self) -> None:
+        """Отменить загрузку и освободить загруженные части."""
+        self._buffer.clear()
+
+        if self._upload_id is None:
+            return
+
+        try:
+            get_s3_client().abort_multipart_upload(Bucket=BUCKET_NAME, Key=self.s3_key, UploadId=self._upload_id)
+        except Exception as e:
+            logger.error(f"Ошибка отмены multipart загрузки ({self.s3_key}): {e}")
+
+
+# Удаление объекта из S3 (универсальная функция)
+def delete_from_s3(s3_key: str) -> bool:
+    try:
+        get_s3_client().delete_object(Bucket=BUCKET_NAME, Key=s3_key)
+        logger.info(f"Удалён объект из S3: {s3_key}")
+        return True
+    except Exception as e:
+        logger.error(f"Ошибка удаления объекта из S3 ({s3_key}): {e}")
+        return False
+
+
+# Максимум ключей в одном запросе DeleteObjects
+S3_DELETE_BATCH_SIZE = 1000
+
+
+# Удаление нескольких объектов из S3 (DeleteObjects пачками по 1000 ключей)
+def delete_objects_from_s3(s3_keys: List[str]) -> List[str]:
+    failed = []
+
+    for start in range(0, len(s3_keys), S3_DELETE_BATCH_SIZE):
+        chunk = s3_keys[start:start + S3_DELETE_BATCH_SIZE]
+
+        try:
+            response = get_s3_client().delete_objects(
+                Bucket=BUCKET_NAME,
+                Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+            )
+        except Exception as e:
+            logger.error(f"Ошибка удаления {len(chunk)} объектов из S3: {e}")
+            failed.extend(chunk)
+            continue
+
+        # В режиме Quiet ответ содержит только ошибки
+        errors = response.get('Errors', [])
+        for error in errors:
+            logger.error(f"Ошибка удаления объекта из S3 ({error.get('Key')}): {error.get('Message')}")
+        failed.extend(error['Key'] for error in errors)
+
+    logger.info(f"Удалено объектов из S3: {len(s3_keys) - len(failed)} из {len(s3_keys)}")
+
+    return failed
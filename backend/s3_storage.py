@@ -1,7 +1,11 @@
-# Работа с объектным хранилищем S3 и Celery задачи
+# Celery задачи обработки документов (загружается только worker)
+#
+# API ставит задачи через лёгкие заглушки из backend/task_signatures.py,
+# а операции с объектами S3 берёт из backend/object_storage.py.
+# Имена задач заданы явно и должны совпадать с заглушками.
 
 from backend.celery_app import celery_app
-import boto3
+from backend.object_storage import get_s3_client, BUCKET_NAME, delete_objects_from_s3
 import yt_dlp
 import ffmpeg
 import tempfile
@@ -9,7 +13,6 @@ import os
 import requests
 import time
 import shutil
-import httpx
 import asyncio
 from utils.iam_manager import get_new_iam_token, get_new_vision_iam_token
 import io
@@ -20,6 +23,8 @@ from typing import Optional, Tuple
 import logging
 import base64
 from shared.notifications import NotificationService
+from backend.services.document_status_repository import document_status_repository
+from backend.services.progress_events import progress_events, ProgressStage
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -30,64 +35,64 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 
 # Обновление токена SpeechKit каждые 11 часов
-@celery_app.task
+@celery_app.task(name='backend.s3_storage.refresh_iam_token')
 def refresh_iam_token():
     get_new_iam_token()
 
 
 # Обновление токена Vision API каждые 11 часов
-@celery_app.task
+@celery_app.task(name='backend.s3_storage.refresh_vision_iam_token')
 def refresh_vision_iam_token():
     get_new_vision_iam_token()
 
 
-# ============================================================================
-# НАСТРОЙКА S3 CLIENT
-# ============================================================================
-
-# Клиент для работы с Yandex Object Storage
-s3_client = boto3.client(
-    's3',
-    endpoint_url='https://storage.yandexcloud.net',
-    aws_access_key_id=settings.YANDEX_ACCESS_KEY,
-    aws_secret_access_key=settings.YANDEX_SECRET_KEY,
-    config=boto3.session.Config(
-        proxies={}  # Отключение проксирования
-    )
-)
-
-BUCKET_NAME = settings.YC_BUCKET_NAME
-
-
 # ============================================================================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ============================================================================
 
-# Обновление статуса документа через API
+# Обновление статуса документа (запись напрямую в БД)
 def update_document_status(
         document_id: int,
         status: str,
         error: Optional[str] = None,
-        transcription: Optional[str] = None
+        transcription: Optional[str] = None,
+        telegram_id: Optional[int] = None
 ) -> None:
-    api_url = settings.API_URL
+    document_status_repository.set_status(
+        document_id,
+        status,
+        error=error,
+        transcription=transcription,
+        telegram_id=telegram_id
+    )
 
-    payload = {
-        "status": status,
-        "error": error,
-        "transcription": transcription
-    }
+    # Подписчики прогресса получают новый статус сразу
+    progress_events.publish(
+        document_id,
+        status=DocumentStatus.FAILED if error else status,
+        error=error
+    )
 
-    try:
-        response = httpx.put(
-            f"{api_url}/kb/documents/{document_id}/status",
-            json=payload,
-            timeout=30.0
-        )
-        if response.status_code != 200:
-            logger.warning(f"Ошибка обновления статуса документа {document_id}: {response.text}")
-    except Exception as e:
-        logger.error(f"Не удалось обновить статус документа {document_id}: {e}")
+
+# Этап обработки: событие для подписчиков и прогресс задачи в result backend
+def report_progress(task, document_id: int, stage: str) -> None:
+    progress_events.publish(document_id, stage=stage)
+
+    if task.request.id:
+        task.update_state(state='PROGRESS', meta={'progress': stage, 'document_id': document_id})
+
+
+# Владелец и имя файла для задач, поставленных без них в аргументах
+def resolve_document_owner(
+        document_id: int,
+        telegram_id: Optional[int],
+        filename: Optional[str] = None
+) -> Tuple[Optional[int], Optional[str]]:
+    if telegram_id is not None:
+        return telegram_id, filename
+
+    owner = document_status_repository.get_owner(document_id)
+    return owner if owner else (None, filename)
 
 
 async def notify_user_success(
@@ -100,104 +105,6 @@ async def notify_user_success(
     await NotificationService.send_success(telegram_id, content_type, **kwargs)
 
 
-# ============================================================================
-# РАБОТА С S3
-# ============================================================================
-
-# Загрузка фото в S3
-def upload_photo_to_s3(photo_base64: str, user_id: int, document_id: int) -> str:
-    try:
-        # Декодируем base64
-        try:
-            photo_bytes = base64.b64decode(photo_base64)
-        except Exception as e:
-            logger.error(f"Ошибка декодирования base64 для фото document_id={document_id}: {e}")
-            raise ValueError(f"Invalid base64 data: {e}")
-
-        # Формируем путь в S3
-        s3_key = f"photos/user_{user_id}/photo_{document_id}.jpg"
-
-        # Загружаем в S3
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=s3_key,
-            Body=photo_bytes,
-            ContentType='image/jpeg'
-        )
-
-        logger.info(f"Загружено фото в S3: {s3_key}")
-        return s3_key
-
-    except ValueError:
-        # Пробрасываем ValueError дальше (это ошибка валидации base64)
-        raise
-    except Exception as e:
-        logger.error(f"Ошибка загрузки фото в S3: {e}")
-        raise
-
-
-# Получение presigned URL для скачивания фото
-def get_photo_presigned_url(s3_key: str, expiration: int = 3600) -> str:
-    try:
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': BUCKET_NAME,
-                'Key': s3_key
-            },
-            ExpiresIn=expiration
-        )
-
-        logger.info(f"Сгенерирован presigned URL для {s3_key}")
-        return presigned_url
-
-    except Exception as e:
-        logger.error(f"Ошибка генерации presigned URL: {e}")
-        raise
-
-
-# Загрузка файла в S3
-def upload_file_to_s3(file_base64: str, user_id: int, document_id: int, extension: str) -> str:
-    try:
-        # Декодируем base64
-        try:
-            file_bytes = base64.b64decode(file_base64)
-        except Exception as e:
-            logger.error(f"Ошибка декодирования base64 для файла document_id={document_id}: {e}")
-            raise ValueError(f"Invalid base64 data: {e}")
-
-        # Формируем путь в S3
-        s3_key = f"files/user_{user_id}/document_{document_id}.{extension}"
-
-        # Загружаем в S3
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=s3_key,
-            Body=file_bytes
-        )
-
-        logger.info(f"Загружен файл в S3: {s3_key}")
-        return s3_key
-
-    except ValueError:
-        # Пробрасываем ValueError дальше
-        raise
-    except Exception as e:
-        logger.error(f"Ошибка загрузки файла в S3: {e}")
-        raise
-
-
-# Удаление объекта из S3 (универсальная функция)
-def delete_from_s3(s3_key: str) -> bool:
-    try:
-        s3_client.delete_object(Bucket=BUCKET_NAME, Key=s3_key)
-        logger.info(f"Удалён объект из S3: {s3_key}")
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка удаления объекта из S3 ({s3_key}): {e}")
-        return False
-
-
 # ============================================================================
 # OCR И ОБРАБОТКА ИЗОБРАЖЕНИЙ
 # ============================================================================
@@ -412,18 +319,25 @@ def extract_text_from_pdf_ocr(pdf_bytes: bytes) -> str:
 # ============================================================================
 
 # Обработка видео (скачивание, транскрибация)
-@celery_app.task(bind=True, max_retries=3)
-def process_video(self, video_url: str, document_id: int):
+@celery_app.task(bind=True, max_retries=3, name='backend.s3_storage.process_video')
+def process_video(
+        self,
+        video_url: str,
+        document_id: int,
+        telegram_id: Optional[int] = None,
+        filename: Optional[str] = None
+):
     temp_dir = None
 
     try:
-        update_document_status(document_id, DocumentStatus.PROCESSING)
+        update_document_status(document_id, DocumentStatus.PROCESSING, telegram_id=telegram_id)
 
         temp_dir = tempfile.mkdtemp()
         video_path = os.path.join(temp_dir, f"video_{document_id}.mp4")
         audio_path = os.path.join(temp_dir, f"audio_{document_id}.mp3")
 
         # Скачиваем видео
+        report_progress(self, document_id, ProgressStage.DOWNLOADING)
         logger.info(f"Скачивание видео {document_id}...")
         ydl_opts = {
             'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
@@ -435,6 +349,7 @@ def process_video(self, video_url: str, document_id: int):
             ydl.download([video_url])
 
         # Извлекаем аудио
+        report_progress(self, document_id, ProgressStage.TRANSCODING)
         logger.info(f"Извлечение аудио из видео {document_id}...")
         ffmpeg.input(video_path).output(
             audio_path,
@@ -446,12 +361,13 @@ def process_video(self, video_url: str, document_id: int):
 
         # Загружаем аудио в S3
         audio_filename = f"audio_{document_id}.mp3"
-        s3_client.upload_file(audio_path, BUCKET_NAME, audio_filename)
+        get_s3_client().upload_file(audio_path, BUCKET_NAME, audio_filename)
         audio_url = f"https://storage.yandexcloud.net/{BUCKET_NAME}/{audio_filename}"
 
         logger.info(f"Аудио загружено в S3: {audio_filename}")
 
         # Отправляем в Yandex SpeechKit
+        report_progress(self, document_id, ProgressStage.RECOGNIZING)
         folder_id = settings.YANDEX_FOLDER_ID
         iam_token = settings.YANDEX_IAM_TOKEN
 
@@ -504,18 +420,17 @@ def process_video(self, video_url: str, document_id: int):
                 transcription = ' '.join([chunk['alternatives'][0]['text'] for chunk in chunks])
 
                 # Сохраняем в БД
-                update_document_status(document_id, DocumentStatus.COMPLETED, transcription=transcription)
-
-                # Получаем данные для уведомления
-                api_url = settings.API_URL
-                doc_response = httpx.get(f"{api_url}/kb/documents/{document_id}/info")
-
-                if doc_response.status_code == 200:
-                    user_data = doc_response.json()
-                    telegram_id = user_data['telegram_id']
-                    filename = user_data['filename']
-
-                    # Отправляем уведомление
+                report_progress(self, document_id, ProgressStage.SAVING)
+                update_document_status(
+                    document_id,
+                    DocumentStatus.COMPLETED,
+                    transcription=transcription,
+                    telegram_id=telegram_id
+                )
+
+                # Отправляем уведомление
+                telegram_id, filename = resolve_document_owner(document_id, telegram_id, filename)
+                if telegram_id is not None:
                     asyncio.run(notify_user_success(
                         telegram_id,
                         "video",
@@ -536,7 +451,7 @@ def process_video(self, video_url: str, document_id: int):
 
     except Exception as e:
         logger.error(f"Ошибка обработки видео {document_id}: {e}")
-        update_document_status(document_id, DocumentStatus.FAILED, str(e))
+        update_document_status(document_id, DocumentStatus.FAILED, str(e), telegram_id=telegram_id)
 
         if temp_dir and os.path.exists(temp_dir):
             shutil.rmtree(temp_dir)
@@ -545,13 +460,14 @@ def process_video(self, video_url: str, document_id: int):
 
 
 # Обработка фото через OCR
-@celery_app.task(bind=True, max_retries=3)
-def process_photo_ocr(self, document_id: int, s3_key: str):
+@celery_app.task(bind=True, max_retries=3, name='backend.s3_storage.process_photo_ocr')
+def process_photo_ocr(self, document_id: int, s3_key: str, telegram_id: Optional[int] = None):
     try:
-        update_document_status(document_id, DocumentStatus.PROCESSING)
+        update_document_status(document_id, DocumentStatus.PROCESSING, telegram_id=telegram_id)
 
         # Скачиваем фото из S3
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+        report_progress(self, document_id, ProgressStage.DOWNLOADING)
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=s3_key)
         photo_bytes = response['Body'].read()
 
         logger.info(f"Начало OCR для фото {document_id}")
@@ -560,6 +476,7 @@ def process_photo_ocr(self, document_id: int, s3_key: str):
         photo_base64 = base64.b64encode(photo_bytes).decode('utf-8')
 
         # Отправляем в Yandex Vision API
+        report_progress(self, document_id, ProgressStage.RECOGNIZING)
         vision_iam_token = settings.YANDEX_VISION_IAM_TOKEN
         folder_id = settings.YANDEX_FOLDER_ID
 
@@ -618,17 +535,17 @@ def process_photo_ocr(self, document_id: int, s3_key: str):
             extracted_text = "[Текст не распознан]"
 
         # Сохраняем результат
-        update_document_status(document_id, DocumentStatus.COMPLETED, transcription=extracted_text.strip())
-
-        # Получаем данные для уведомления
-        api_url = settings.API_URL
-        doc_response = httpx.get(f"{api_url}/kb/documents/{document_id}/info")
-
-        if doc_response.status_code == 200:
-            user_data = doc_response.json()
-            telegram_id = user_data['telegram_id']
+        report_progress(self, document_id, ProgressStage.SAVING)
+        update_document_status(
+            document_id,
+            DocumentStatus.COMPLETED,
+            transcription=extracted_text.strip(),
+            telegram_id=telegram_id
+        )
 
-            # Отправляем уведомление с фото
+        # Отправляем уведомление с фото
+        telegram_id, _ = resolve_document_owner(document_id, telegram_id)
+        if telegram_id is not None:
             asyncio.run(notify_user_success(
                 telegram_id,
                 "photo",
@@ -641,21 +558,30 @@ def process_photo_ocr(self, document_id: int, s3_key: str):
 
     except Exception as e:
         logger.error(f"Ошибка обработки фото {document_id}: {e}")
-        update_document_status(document_id, DocumentStatus.FAILED, str(e))
+        update_document_status(document_id, DocumentStatus.FAILED, str(e), telegram_id=telegram_id)
         raise
 
 
 # Обработка файлов (TXT, PDF, DOCX)
-@celery_app.task(bind=True, max_retries=3)
-def process_file(self, document_id: int, s3_key: str, mime_type: str):
+@celery_app.task(bind=True, max_retries=3, name='backend.s3_storage.process_file')
+def process_file(
+        self,
+        document_id: int,
+        s3_key: str,
+        mime_type: str,
+        telegram_id: Optional[int] = None,
+        filename: Optional[str] = None
+):
     try:
-        update_document_status(document_id, DocumentStatus.PROCESSING)
+        update_document_status(document_id, DocumentStatus.PROCESSING, telegram_id=telegram_id)
 
         # Скачиваем файл из S3
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
+        report_progress(self, document_id, ProgressStage.DOWNLOADING)
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=s3_key)
         file_bytes = response['Body'].read()
 
         # Обрабатываем в зависимости от типа
+        report_progress(self, document_id, ProgressStage.RECOGNIZING)
         if mime_type == "text/plain":
             logger.info(f"Обработка TXT файла {document_id}...")
             extracted_text = extract_text_from_txt(file_bytes)
@@ -672,18 +598,17 @@ def process_file(self, document_id: int, s3_key: str, mime_type: str):
             raise Exception(f"Неподдерживаемый тип файла: {mime_type}")
 
         # Сохраняем результат
-        update_document_status(document_id, DocumentStatus.COMPLETED, transcription=extracted_text)
-
-        # Получаем данные для уведомления
-        api_url = settings.API_URL
-        doc_response = httpx.get(f"{api_url}/kb/documents/{document_id}/info")
-
-        if doc_response.status_code == 200:
-            user_data = doc_response.json()
-            telegram_id = user_data['telegram_id']
-            filename = user_data['filename']
+        report_progress(self, document_id, ProgressStage.SAVING)
+        update_document_status(
+            document_id,
+            DocumentStatus.COMPLETED,
+            transcription=extracted_text,
+            telegram_id=telegram_id
+        )
 
-            # Отправляем уведомление
+        # Отправляем уведомление
+        telegram_id, filename = resolve_document_owner(document_id, telegram_id, filename)
+        if telegram_id is not None:
             asyncio.run(notify_user_success(
                 telegram_id,
                 "file",
@@ -696,5 +621,26 @@ def process_file(self, document_id: int, s3_key: str, mime_type: str):
 
     except Exception as e:
         logger.error(f"Ошибка обработки файла {document_id}: {e}")
-        update_document_status(document_id, DocumentStatus.FAILED, str(e))
-        raise
\ No newline at end of file
+        update_document_status(document_id, DocumentStatus.FAILED, str(e), telegram_id=telegram_id)
+        raise
+
+
+# ============================================================================
+# УДАЛЕНИЕ ОБЪЕКТОВ S3
+# ============================================================================
+
+# Пауза перед повтором удаления (удваивается с каждой попыткой)
+DELETE_RETRY_BASE_SEC = 30
+
+
+@celery_app.task(bind=True, max_retries=5, name='backend.s3_storage.delete_s3_objects')
+def delete_s3_objects(self, s3_keys):
+    # Удаление объектов пачками DeleteObjects; повторяются только неудалённые ключи.
+    # Оставшиеся после всех попыток объекты удалит purge_deleted_documents
+    failed = delete_objects_from_s3(s3_keys)
+
+    if failed:
+        logger.warning(f"Не удалено объектов S3: {len(failed)}, попытка {self.request.retries + 1}")
+        raise self.retry(args=[failed], countdown=DELETE_RETRY_BASE_SEC * 2 ** self.request.retries)
+
+    return {"deleted": len(s3_keys)}
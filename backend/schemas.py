@@ -34,6 +34,15 @@ class UserStats(BaseModel):
     kb_storage: dict
     kb_daily: dict
 
+# Запись запроса к ИИ
+class AiQueryLogRequest(BaseModel):
+    document_id: Optional[int] = None
+
+# Ответ после записи запроса к ИИ
+class AiQueryLogResponse(BaseModel):
+    success: bool
+    action_id: int
+
 
 # СХЕМЫ ДЛЯ ЭНДПОИНТОВ ПОДПИСОК
 
@@ -88,6 +97,39 @@ class DocumentsListResponse(BaseModel):
     documents: list[DocumentResponse]
     total_count: int
 
+# Документ в постраничном списке (без полного текста)
+class DocumentListItem(BaseModel):
+    id: int
+    filename: str
+    file_type: str
+    upload_date: datetime
+    file_url: Optional[str] = None
+    duration_hours: Optional[float] = None
+    status: Optional[str] = None
+    preview: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# Документ пользователя (без полного текста)
+class DocumentDetailResponse(DocumentListItem):
+    text_length: int = 0
+
+# Фрагмент извлечённого текста документа
+class DocumentTextResponse(BaseModel):
+    document_id: int
+    file_type: str
+    offset: int
+    text: str
+    total_length: int
+    next_offset: Optional[int] = None
+
+# Страница списка файлов пользователя
+class DocumentsPageResponse(BaseModel):
+    documents: list[DocumentListItem]
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None  # Только для первой страницы
+
 # Запрос на обработку видео
 class VideoUploadRequest(BaseModel):
     telegram_id: int
@@ -96,8 +138,10 @@ class VideoUploadRequest(BaseModel):
 # Ответ от обработчика видео с ID задачи
 class VideoUploadResponse(BaseModel):
     success: bool
-    task_id: str
+    task_id: str  # ID задач через запятую
     message: str
+    group_id: Optional[str] = None
+    task_ids: list[str] = []
 
 # Статус обработки видео
 class VideoStatusResponse(BaseModel):
@@ -106,6 +150,64 @@ class VideoStatusResponse(BaseModel):
     progress: Optional[str] = None
     error: Optional[str] = None
 
+# Прогресс обработки документа
+class DocumentProgressResponse(BaseModel):
+    document_id: int
+    status: str
+    stage: Optional[str] = None  # downloading, transcoding, recognizing, saving
+    error: Optional[str] = None
+    timestamp: Optional[float] = None  # время события (None - статус из БД)
+
+# Статус задачи в группе
+class TaskStatusItem(BaseModel):
+    task_id: str
+    status: str
+    progress: Optional[str] = None
+    error: Optional[str] = None
+
+# Статус группы задач пакетной загрузки
+class TaskGroupStatusResponse(BaseModel):
+    group_id: str
+    status: str  # pending, processing, completed, failed, partial
+    total: int
+    completed: int
+    failed: int
+    pending: int
+    tasks: list[TaskStatusItem]
+
+# Запрос статусов нескольких документов и задач
+class BatchStatusRequest(BaseModel):
+    document_ids: list[int] = []
+    task_ids: list[str] = []
+    telegram_id: int  # только документы пользователя; ключ rate limit
+
+# Статус документа
+class DocumentStatusItem(BaseModel):
+    document_id: int
+    filename: str
+    file_type: str
+    status: str
+
+# Статусы документов и задач
+class BatchStatusResponse(BaseModel):
+    documents: list[DocumentStatusItem]
+    tasks: list[TaskStatusItem]
+    missing_document_ids: list[int]
+
+# Массовое удаление документов: по ID, по типу или все (ровно один способ)
+class BulkDeleteRequest(BaseModel):
+    telegram_id: int
+    document_ids: list[int] = []
+    file_type: Optional[str] = None
+    all: bool = False
+
+# Результат массового удаления
+class BulkDeleteResponse(BaseModel):
+    success: bool
+    deleted_count: int
+    deleted_ids: list[int]
+    cleanup_task_id: Optional[str] = None  # фоновое удаление объектов из S3
+
 # Запрос на загрузку фото
 class PhotoUploadRequest(BaseModel):
     telegram_id: int
@@ -116,6 +218,7 @@ class PhotoUploadResponse(BaseModel):
     success: bool
     uploaded_count: int
     task_ids: list[str]
+    group_id: Optional[str] = None
 
 # Запрос на загрузку файлов
 class FileUploadRequest(BaseModel):
@@ -127,6 +230,50 @@ class FileUploadResponse(BaseModel):
     success: bool
     uploaded_count: int
     task_ids: list[str]
+    group_id: Optional[str] = None
+
+# Файл сессии прямой загрузки в S3
+class UploadSessionFile(BaseModel):
+    filename: str
+    mime_type: Optional[str] = None
+    size: int
+
+# Запрос сессии прямой загрузки в S3
+class UploadSessionRequest(BaseModel):
+    telegram_id: int
+    file_type: str  # photo, file
+    files: list[UploadSessionFile]
+
+# Presigned POST для загрузки одного документа
+class PresignedUpload(BaseModel):
+    document_id: int
+    url: str
+    fields: dict[str, str]
+
+# Ответ с presigned POST для каждого документа
+class UploadSessionResponse(BaseModel):
+    uploads: list[PresignedUpload]
+    expires_in: int
+
+# Загруженный в S3 документ
+class UploadFinalizeItem(BaseModel):
+    document_id: int
+    size: Optional[int] = None
+    etag: Optional[str] = None
+
+# Запрос завершения прямой загрузки
+class UploadFinalizeRequest(BaseModel):
+    telegram_id: int
+    file_type: str  # photo, file
+    uploads: list[UploadFinalizeItem]
+
+# Ответ после завершения прямой загрузки
+class UploadFinalizeResponse(BaseModel):
+    success: bool
+    uploaded_count: int
+    failed_document_ids: list[int]
+    task_ids: list[str]
+    group_id: Optional[str] = None
 
 
 # СХЕМЫ САППОРТА
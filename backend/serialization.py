@@ -0,0 +1,82 @@
+"""
+Быстрая сериализация JSON для больших ответов API.
+
+Списки документов с extracted_text весят мегабайты. По умолчанию FastAPI
+валидирует каждую строку ORM через response_model (from_attributes) и
+только потом кодирует JSON. Для доверенных данных из БД это лишняя работа:
+на горячих эндпоинтах ответ собирается из атрибутов строк напрямую и
+кодируется orjson (FastJSONResponse). response_model у таких эндпоинтов
+остаётся для схемы OpenAPI.
+
+Если orjson не установлен, используется стандартный json.
+Сравнение скорости: utils/serialization_benchmark.py.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, List, Sequence, Type
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _json_default(value):
+    # Даты - в ISO формате, как у Pydantic
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Не сериализуемый тип: {type(value)}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Закодировать данные в JSON.
+
+    Args:
+        content: dict/list из простых типов, datetime и date
+
+    Returns:
+        JSON в UTF-8
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=_json_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON ответ с кодированием через orjson (без валидации содержимого)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def schema_fields(schema: Type[BaseModel]) -> tuple:
+    """Имена полей схемы ответа (порядок полей в JSON как у схемы)."""
+    return tuple(schema.model_fields)
+
+
+def rows_to_dicts(rows: Iterable[Any], fields: Sequence[str]) -> List[dict]:
+    """
+    Собрать словари из строк ORM без валидации.
+
+    Только для доверенных данных из БД: значения берутся из атрибутов
+    строки как есть, типы должны совпадать со схемой ответа.
+
+    Args:
+        rows: Модели или строки результата запроса
+        fields: Имена полей (schema_fields)
+
+    Returns:
+        Список словарей
+    """
+    return [{name: getattr(row, name) for name in fields} for row in rows]
@@ -6,16 +6,19 @@
 - Подписками (SubscriptionService)
 - Документами (DocumentService)
 - Лимитами (LimitsService)
+- Счётчиками использования (UsageService)
 """
 
 from .user_service import UserService
 from .subscription_service import SubscriptionService
 from .document_service import DocumentService
 from .limits_service import LimitsService
+from .usage_service import UsageService
 
 __all__ = [
     'UserService',
     'SubscriptionService',
     'DocumentService',
     'LimitsService',
+    'UsageService',
 ]
\ No newline at end of file
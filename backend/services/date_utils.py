@@ -0,0 +1,29 @@
+"""
+Вспомогательные функции для работы с датами в запросах.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+
+def get_today_range(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Получить границы текущих суток [начало дня, начало следующего дня).
+
+    Полуоткрытый диапазон позволяет фильтровать по колонке даты напрямую
+    (upload_date >= start AND upload_date < end) и использовать индекс,
+    в отличие от func.date(column) == func.date(func.now()).
+
+    Даты в БД пишутся через datetime.now(), поэтому границы считаются
+    в том же локальном времени приложения.
+
+    Args:
+        now: Текущий момент (по умолчанию datetime.now())
+
+    Returns:
+        Кортеж (today_start, tomorrow_start)
+    """
+    now = now or datetime.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return today_start, today_start + timedelta(days=1)
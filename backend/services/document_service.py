@@ -4,31 +4,133 @@
 Управление загрузкой, обработкой и удалением документов.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import joinedload
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import base64
 import logging
 
-from backend.models import UserDocument, User
+from backend.content_storage import encode_text
+from backend.models import UserDocument, UserDocumentContent, User
+from backend.services.date_utils import get_today_range
+from backend.services.usage_service import (
+    UsageService, counts_in_storage, discarded_upload_refunds, document_amount
+)
+from backend.services.stats_cache import stats_cache
 from shared.config import DocumentStatus
 
 logger = logging.getLogger(__name__)
 
+# Длина превью текста в списках документов
+PREVIEW_LENGTH = 200
+
+# Колонки списка документов (без текста из user_document_contents)
+LIST_COLUMNS = (
+    UserDocument.id,
+    UserDocument.filename,
+    UserDocument.file_type,
+    UserDocument.upload_date,
+    UserDocument.file_url,
+    UserDocument.duration_hours,
+    UserDocument.status,
+    UserDocument.preview,
+)
+
+
+def make_preview(text: Optional[str]) -> Optional[str]:
+    """
+    Превью текста для списков документов.
+
+    Args:
+        text: Извлеченный текст
+
+    Returns:
+        Первые PREVIEW_LENGTH символов или None
+    """
+    if not text:
+        return None
+    return text[:PREVIEW_LENGTH]
+
+
+def encode_cursor(upload_date: datetime, document_id: int) -> str:
+    """
+    Закодировать курсор страницы (последний документ страницы).
+
+    Args:
+        upload_date: Дата загрузки документа
+        document_id: ID документа
+
+    Returns:
+        Непрозрачная строка курсора
+    """
+    raw = f"{upload_date.isoformat()}|{document_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Раскодировать курсор страницы.
+
+    Args:
+        cursor: Строка курсора
+
+    Returns:
+        (upload_date, id) последнего документа предыдущей страницы
+
+    Raises:
+        ValueError: Если курсор некорректен
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        upload_date, document_id = raw.split("|")
+        return datetime.fromisoformat(upload_date), int(document_id)
+    except Exception:
+        raise ValueError("Некорректный курсор")
+
+
+def build_discard_uploads(*conditions):
+    """
+    Построить DELETE документов прямой загрузки, файл которых не получен.
+
+    У таких документов нет текста и действий пользователя, поэтому они
+    удаляются сразу, без мягкого удаления.
+
+    Args:
+        *conditions: Условия выбора документов
+
+    Returns:
+        DELETE ... RETURNING (id, user_id, file_type, upload_date, file_url)
+    """
+    return (
+        delete(UserDocument)
+        .where(*conditions)
+        .returning(
+            UserDocument.id,
+            UserDocument.user_id,
+            UserDocument.file_type,
+            UserDocument.upload_date,
+            UserDocument.file_url
+        )
+        .execution_options(synchronize_session=False)
+    )
+
 
 class DocumentService:
     """Сервис для управления документами."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Инициализация сервиса.
 
         Args:
-            db: Сессия базы данных
+            db: Асинхронная сессия базы данных
         """
         self.db = db
+        self.usage_service = UsageService(db)
 
-    def create_document(
+    async def create_document(
         self,
         user_id: int,
         filename: str,
@@ -54,36 +156,303 @@ class DocumentService:
             filename=filename,
             file_type=file_type,
             status=status,
+            preview=make_preview(kwargs.get("extracted_text")),
             **kwargs
         )
 
         self.db.add(new_doc)
-        self.db.commit()
-        self.db.refresh(new_doc)
+
+        # Счётчики использования обновляются в той же транзакции
+        amount = document_amount(file_type, kwargs.get("duration_hours"))
+        await self.usage_service.apply_delta(
+            user_id,
+            file_type,
+            storage=amount if counts_in_storage(file_type, status, False) else 0,
+            daily=amount
+        )
+
+        await self.db.commit()
+        await self.db.refresh(new_doc)
+
+        await stats_cache.invalidate_user(self.db, user_id)
 
         logger.info(f"Создан документ: id={new_doc.id}, type={file_type}, user={user_id}")
 
         return new_doc
 
-    def get_document_by_id(self, document_id: int) -> Optional[UserDocument]:
+    async def add_documents(
+        self,
+        user_id: int,
+        file_type: str,
+        filenames: List[str],
+        status: str = DocumentStatus.PENDING,
+        file_urls: Optional[List[str]] = None
+    ) -> List[int]:
+        """
+        Добавить несколько документов одним INSERT ... RETURNING.
+
+        Счётчики использования обновляются в той же транзакции;
+        коммит выполняет вызывающий код (см. commit_documents).
+
+        Args:
+            user_id: ID пользователя
+            file_type: Тип (photo, file)
+            filenames: Имена файлов
+            status: Статус обработки
+            file_urls: Ссылки на файлы в S3, если уже известны
+
+        Returns:
+            ID документов в порядке filenames
+        """
+        if not filenames:
+            return []
+
+        file_urls = file_urls or [None] * len(filenames)
+        now = datetime.now()
+        result = await self.db.execute(
+            insert(UserDocument).returning(UserDocument.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "filename": filename,
+                    "file_type": file_type,
+                    "status": status,
+                    "upload_date": now,
+                    "file_url": file_url,
+                    "is_deleted": False
+                }
+                for filename, file_url in zip(filenames, file_urls)
+            ]
+        )
+        document_ids = list(result.scalars().all())
+
+        amount = document_amount(file_type) * len(document_ids)
+        await self.usage_service.apply_delta(
+            user_id,
+            file_type,
+            storage=amount if counts_in_storage(file_type, status, False) else 0,
+            daily=amount
+        )
+
+        return document_ids
+
+    async def set_file_urls(self, file_urls: Dict[int, str]) -> None:
+        """
+        Записать ссылки на файлы одним UPDATE (без коммита).
+
+        Args:
+            file_urls: Ссылка на файл в S3 по ID документа
+        """
+        if not file_urls:
+            return
+
+        await self.db.execute(
+            update(UserDocument)
+            .where(UserDocument.id.in_(list(file_urls)))
+            .values(file_url=case(file_urls, value=UserDocument.id))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def commit_documents(self, user_id: int, document_ids: List[int]) -> None:
+        """
+        Зафиксировать документы, добавленные через add_documents.
+
+        Args:
+            user_id: ID пользователя
+            document_ids: ID добавленных документов
+        """
+        await self.db.commit()
+
+        await stats_cache.invalidate_user(self.db, user_id)
+
+        logger.info(f"Создано документов: {len(document_ids)}, user={user_id}")
+
+    async def claim_pending_uploads(self, user_id: int, file_type: str, document_ids: List[int]) -> List[Any]:
+        """
+        Перевести ожидающие загрузки документы в обработку.
+
+        Документы захватываются одним UPDATE ... WHERE status = 'uploading',
+        поэтому повторный вызов с теми же ID их уже не вернёт.
+
+        Args:
+            user_id: ID пользователя (владелец документов)
+            file_type: Тип документов (photo, file)
+            document_ids: ID документов
+
+        Returns:
+            Строки (id, filename, file_url) захваченных документов
+        """
+        if not document_ids:
+            return []
+
+        result = await self.db.execute(
+            update(UserDocument)
+            .where(
+                UserDocument.id.in_(document_ids),
+                UserDocument.user_id == user_id,
+                UserDocument.file_type == file_type,
+                UserDocument.status == DocumentStatus.UPLOADING,
+                UserDocument.is_deleted == False
+            )
+            .values(status=DocumentStatus.PROCESSING)
+            .returning(UserDocument.id, UserDocument.filename, UserDocument.file_url)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+
+        await self.db.commit()
+
+        return rows
+
+    async def discard_uploads(self, user_id: int, document_ids: List[int]) -> List[int]:
+        """
+        Удалить документы прямой загрузки, файл которых не получен.
+
+        Дневной лимит за загрузки текущего дня возвращается.
+
+        Args:
+            user_id: ID пользователя (владелец документов)
+            document_ids: ID документов
+
+        Returns:
+            ID удалённых документов
+        """
+        if not document_ids:
+            return []
+
+        result = await self.db.execute(build_discard_uploads(
+            UserDocument.id.in_(document_ids),
+            UserDocument.user_id == user_id
+        ))
+        rows = result.all()
+
+        today_start, tomorrow_start = get_today_range()
+        for (_, file_type), count in discarded_upload_refunds(rows, today_start, tomorrow_start).items():
+            await self.usage_service.apply_delta(user_id, file_type, daily=-count)
+
+        await self.db.commit()
+
+        await stats_cache.invalidate_user(self.db, user_id)
+
+        logger.info(f"Удалено незавершённых загрузок: {len(rows)}, user={user_id}")
+
+        return [row.id for row in rows]
+
+    async def get_documents_status(
+        self,
+        document_ids: List[int],
+        telegram_id: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Получить статусы нескольких неудалённых документов одним запросом.
+
+        Args:
+            document_ids: ID документов
+            telegram_id: Если указан - только документы этого пользователя
+
+        Returns:
+            Строки (id, filename, file_type, status)
+        """
+        if not document_ids:
+            return []
+
+        query = (
+            select(UserDocument.id, UserDocument.filename, UserDocument.file_type, UserDocument.status)
+            .where(UserDocument.id.in_(document_ids), UserDocument.is_deleted == False)
+        )
+
+        if telegram_id is not None:
+            query = query.join(User, User.id == UserDocument.user_id).where(User.telegram_id == telegram_id)
+
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def get_document_by_id(self, document_id: int, with_content: bool = False) -> Optional[UserDocument]:
         """
         Получить документ по ID.
 
         Args:
             document_id: ID документа
+            with_content: Загрузить извлечённый текст (нужно для чтения и записи extracted_text)
 
         Returns:
             Документ или None
         """
-        return self.db.query(UserDocument).filter(
-            UserDocument.id == document_id
-        ).first()
+        query = select(UserDocument).filter(UserDocument.id == document_id)
+
+        if with_content:
+            query = query.options(joinedload(UserDocument.content))
+
+        result = await self.db.execute(query)
+        return result.scalars().first()
 
-    def get_user_documents(
+    async def get_owned_document(self, document_id: int) -> Optional[Any]:
+        """
+        Получить неудалённый документ с владельцем (без полного текста).
+
+        Args:
+            document_id: ID документа
+
+        Returns:
+            Строка с колонками LIST_COLUMNS, user_id, text_length и owner_telegram_id или None
+        """
+        result = await self.db.execute(
+            select(
+                *LIST_COLUMNS,
+                UserDocument.user_id,
+                func.coalesce(UserDocumentContent.char_count, 0).label("text_length"),
+                User.telegram_id.label("owner_telegram_id")
+            )
+            .join(User, User.id == UserDocument.user_id)
+            .outerjoin(UserDocumentContent, UserDocumentContent.document_id == UserDocument.id)
+            .filter(UserDocument.id == document_id, UserDocument.is_deleted == False)
+        )
+        return result.first()
+
+    async def get_document_text(
+        self,
+        document_id: int,
+        offset: int = 0,
+        length: int = 4000
+    ) -> Optional[Any]:
+        """
+        Получить фрагмент извлечённого текста документа.
+
+        Несжатый текст вырезается в БД (substr), полный текст не передаётся.
+        Для сжатого текста text пустой - фрагмент читается потоково
+        через content_storage.read_text_range по колонкам storage, data, s3_key.
+
+        Args:
+            document_id: ID документа
+            offset: Смещение в символах
+            length: Длина фрагмента в символах
+
+        Returns:
+            Строка с колонками file_type, text, text_length, storage, data,
+            s3_key и owner_telegram_id или None
+        """
+        result = await self.db.execute(
+            select(
+                UserDocument.file_type,
+                func.coalesce(func.substr(UserDocumentContent.text, offset + 1, length), "").label("text"),
+                func.coalesce(UserDocumentContent.char_count, 0).label("text_length"),
+                UserDocumentContent.storage,
+                UserDocumentContent.data,
+                UserDocumentContent.s3_key,
+                User.telegram_id.label("owner_telegram_id")
+            )
+            .join(User, User.id == UserDocument.user_id)
+            .outerjoin(UserDocumentContent, UserDocumentContent.document_id == UserDocument.id)
+            .filter(UserDocument.id == document_id, UserDocument.is_deleted == False)
+        )
+        return result.first()
+
+    async def get_user_documents(
         self,
         user_id: int,
         file_type: Optional[str] = None,
-        include_deleted: bool = False
+        include_deleted: bool = False,
+        with_content: bool = False
     ) -> List[UserDocument]:
         """
         Получить документы пользователя.
@@ -92,28 +461,122 @@ class DocumentService:
             user_id: ID пользователя
             file_type: Фильтр по типу (опционально)
             include_deleted: Включить удаленные
+            with_content: Загрузить извлечённые тексты
 
         Returns:
             Список документов
         """
-        query = self.db.query(UserDocument).filter(
+        query = select(UserDocument).filter(
             UserDocument.user_id == user_id
         )
 
+        if with_content:
+            query = query.options(joinedload(UserDocument.content))
+
         if file_type:
             query = query.filter(UserDocument.file_type == file_type)
 
         if not include_deleted:
             query = query.filter(UserDocument.is_deleted == False)
 
-        return query.order_by(UserDocument.upload_date.desc()).all()
+        result = await self.db.execute(query.order_by(UserDocument.upload_date.desc()))
+        return list(result.scalars().all())
+
+    async def get_documents_page(
+        self,
+        user_id: int,
+        file_type: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Получить страницу неудалённых документов (новые первыми).
+
+        Пагинация по ключу (upload_date, id): следующая страница начинается
+        после последнего документа предыдущей, без OFFSET. Возвращаются
+        только колонки LIST_COLUMNS - без текстов документов.
+
+        Args:
+            user_id: ID пользователя
+            file_type: Фильтр по типу (опционально)
+            status: Фильтр по статусу (опционально)
+            limit: Размер страницы
+            cursor: Курсор из предыдущей страницы (None - первая страница)
+
+        Returns:
+            (документы страницы, курсор следующей страницы или None)
+
+        Raises:
+            ValueError: Если курсор некорректен
+        """
+        query = select(*LIST_COLUMNS).filter(
+            UserDocument.user_id == user_id,
+            UserDocument.is_deleted == False
+        )
+
+        if file_type:
+            query = query.filter(UserDocument.file_type == file_type)
+
+        if status:
+            query = query.filter(UserDocument.status == status)
+
+        if cursor:
+            upload_date, document_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(UserDocument.upload_date, UserDocument.id) < tuple_(upload_date, document_id)
+            )
+
+        # Лишняя строка показывает, есть ли следующая страница
+        result = await self.db.execute(
+            query.order_by(UserDocument.upload_date.desc(), UserDocument.id.desc()).limit(limit + 1)
+        )
+        rows = list(result.all())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].upload_date, rows[-1].id)
+
+        return rows, next_cursor
+
+    async def count_user_documents(
+        self,
+        user_id: int,
+        file_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> int:
+        """
+        Получить количество неудалённых документов для списка.
+
+        Args:
+            user_id: ID пользователя
+            file_type: Фильтр по типу (опционально)
+            status: Фильтр по статусу (опционально)
+
+        Returns:
+            Количество документов
+        """
+        query = select(func.count(UserDocument.id)).filter(
+            UserDocument.user_id == user_id,
+            UserDocument.is_deleted == False
+        )
+
+        if file_type:
+            query = query.filter(UserDocument.file_type == file_type)
+
+        if status:
+            query = query.filter(UserDocument.status == status)
+
+        return await self.db.scalar(query) or 0
 
-    def update_document_status(
+    async def update_document_status(
         self,
         document_id: int,
         status: str,
         error: Optional[str] = None,
-        transcription: Optional[str] = None
+        transcription: Optional[str] = None,
+        content: Optional[Dict] = None
     ) -> bool:
         """
         Обновить статус документа.
@@ -123,16 +586,20 @@ class DocumentService:
             status: Новый статус
             error: Сообщение об ошибке (опционально)
             transcription: Распознанный текст (опционально)
+            content: Колонки текста от encode_text (API сжимает текст в пуле потоков;
+                без них текст сжимается здесь)
 
         Returns:
             True если успешно
         """
-        doc = self.get_document_by_id(document_id)
+        doc = await self.get_document_by_id(document_id, with_content=bool(transcription))
 
         if not doc:
             logger.warning(f"Документ {document_id} не найден для обновления статуса")
             return False
 
+        was_counted = counts_in_storage(doc.file_type, doc.status, doc.is_deleted)
+
         # Если есть ошибка - ставим failed
         if error:
             doc.status = DocumentStatus.FAILED
@@ -140,41 +607,140 @@ class DocumentService:
             doc.status = status
 
         if transcription:
-            doc.extracted_text = transcription
-
-        self.db.commit()
+            if doc.content is None:
+                doc.content = UserDocumentContent()
+            doc.content.set_columns(content if content is not None else encode_text(transcription))
+            doc.preview = make_preview(transcription)
+
+        # Документ попал в хранилище (обработан) или выбыл из него
+        is_counted = counts_in_storage(doc.file_type, doc.status, doc.is_deleted)
+        if was_counted != is_counted:
+            amount = document_amount(doc.file_type, doc.duration_hours)
+            await self.usage_service.apply_delta(
+                doc.user_id,
+                doc.file_type,
+                storage=amount if is_counted else -amount
+            )
+
+        await self.db.commit()
+
+        # Статистика меняется, только если документ попал в хранилище или выбыл из него
+        if was_counted != is_counted:
+            await stats_cache.invalidate_user(self.db, doc.user_id)
 
         logger.info(f"Обновлен статус документа {document_id}: {doc.status}")
 
         return True
 
-    def soft_delete_document(self, document_id: int) -> bool:
+    async def soft_delete_document(self, document_id: int, user_id: Optional[int] = None) -> Optional[List[str]]:
         """
         Мягкое удаление документа.
 
+        Документ и его текст очищаются UPDATE без загрузки текста.
+        Вынесенный в S3 текст удаляет вызывающий код.
+
         Args:
             document_id: ID документа
+            user_id: Владелец документа (если уже известен, документ не читается)
 
         Returns:
-            True если успешно
+            Ключи S3 вынесенных текстов или None, если документ не найден или уже удалён
         """
-        doc = self.get_document_by_id(document_id)
+        if user_id is None:
+            user_id = await self.db.scalar(select(UserDocument.user_id).where(UserDocument.id == document_id))
 
-        if not doc:
+        if user_id is None:
             logger.warning(f"Документ {document_id} не найден для удаления")
-            return False
+            return None
+
+        rows, content_keys = await self.soft_delete_documents(user_id, document_ids=[document_id])
 
-        doc.is_deleted = True
-        doc.deleted_at = datetime.now()
-        doc.extracted_text = ""  # Очищаем текст
+        return content_keys if rows else None
 
-        self.db.commit()
+    async def soft_delete_documents(
+        self,
+        user_id: int,
+        document_ids: Optional[List[int]] = None,
+        file_type: Optional[str] = None
+    ) -> Tuple[List[Any], List[str]]:
+        """
+        Мягко удалить несколько документов пользователя одним UPDATE.
 
-        logger.info(f"Документ {document_id} помечен как удаленный")
+        Без document_ids и file_type удаляются все документы пользователя.
+        Объекты S3 не удаляются - это делает вызывающий код в фоне.
 
-        return True
+        Args:
+            user_id: ID пользователя (владелец документов)
+            document_ids: ID документов (опционально)
+            file_type: Тип документов (опционально)
+
+        Returns:
+            (строки id, file_type, file_url удалённых документов,
+            ключи S3 вынесенных туда текстов)
+        """
+        query = update(UserDocument).where(UserDocument.user_id == user_id, UserDocument.is_deleted == False)
+
+        if document_ids is not None:
+            query = query.where(UserDocument.id.in_(document_ids))
+
+        if file_type:
+            query = query.where(UserDocument.file_type == file_type)
+
+        result = await self.db.execute(
+            query
+            .values(is_deleted=True, deleted_at=datetime.now(), preview=None)
+            .returning(
+                UserDocument.id,
+                UserDocument.file_type,
+                UserDocument.file_url,
+                UserDocument.status,
+                UserDocument.duration_hours,
+                UserDocument.upload_date
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+
+        if not rows:
+            return [], []
+
+        deleted_ids = [row.id for row in rows]
+
+        # Тексты очищаются, как при удалении одного документа
+        content_keys = list(await self.db.scalars(
+            select(UserDocumentContent.s3_key)
+            .where(UserDocumentContent.document_id.in_(deleted_ids), UserDocumentContent.s3_key.is_not(None))
+        ))
+        await self.db.execute(
+            update(UserDocumentContent)
+            .where(UserDocumentContent.document_id.in_(deleted_ids))
+            .values(**encode_text(""))
+            .execution_options(synchronize_session=False)
+        )
+
+        # Счётчики по типам: хранилище и дневные тексты, загруженные сегодня
+        today_start, tomorrow_start = get_today_range()
+        deltas: Dict[str, List[float]] = {}
+        for row in rows:
+            amount = document_amount(row.file_type, row.duration_hours)
+            delta = deltas.setdefault(row.file_type, [0, 0])
+            if counts_in_storage(row.file_type, row.status, False):
+                delta[0] -= amount
+            if row.file_type == "text" and today_start <= row.upload_date < tomorrow_start:
+                delta[1] -= amount
+
+        for row_type, (storage, daily) in deltas.items():
+            await self.usage_service.apply_delta(user_id, row_type, storage=storage, daily=daily)
+
+        await self.db.commit()
+
+        await stats_cache.invalidate_user(self.db, user_id)
+
+        logger.info(f"Удалено документов: {len(rows)}, user={user_id}")
+
+        return rows, content_keys
 
-    def get_document_counts(
+    async def get_document_counts(
         self,
         user_id: int,
         file_type: str,
@@ -191,7 +757,7 @@ class DocumentService:
         Returns:
             Количество документов
         """
-        query = self.db.query(func.count(UserDocument.id)).filter(
+        query = select(func.count(UserDocument.id)).filter(
             UserDocument.user_id == user_id,
             UserDocument.file_type == file_type,
             UserDocument.is_deleted == False
@@ -201,12 +767,15 @@ class DocumentService:
             query = query.filter(UserDocument.status == DocumentStatus.COMPLETED)
 
         if include_today_only:
-            today = func.date(func.now())
-            query = query.filter(func.date(UserDocument.upload_date) == today)
+            today_start, tomorrow_start = get_today_range()
+            query = query.filter(
+                UserDocument.upload_date >= today_start,
+                UserDocument.upload_date < tomorrow_start
+            )
 
-        return query.scalar() or 0
+        return await self.db.scalar(query) or 0
 
-    def get_video_hours(
+    async def get_video_hours(
         self,
         user_id: int,
         include_today_only: bool = False
@@ -221,7 +790,7 @@ class DocumentService:
         Returns:
             Длительность в часах
         """
-        query = self.db.query(func.sum(UserDocument.duration_hours)).filter(
+        query = select(func.sum(UserDocument.duration_hours)).filter(
             UserDocument.user_id == user_id,
             UserDocument.file_type == "video",
             UserDocument.status == DocumentStatus.COMPLETED,
@@ -229,9 +798,12 @@ class DocumentService:
         )
 
         if include_today_only:
-            today = func.date(func.now())
-            query = query.filter(func.date(UserDocument.upload_date) == today)
+            today_start, tomorrow_start = get_today_range()
+            query = query.filter(
+                UserDocument.upload_date >= today_start,
+                UserDocument.upload_date < tomorrow_start
+            )
 
-        result = query.scalar()
+        result = await self.db.scalar(query)
 
         return result if result else 0.0
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Запись статуса обработки документов из Celery задач.
+
+Задачи пишут статус и распознанный текст напрямую в БД через пул
+синхронного движка, без HTTP запросов к API. Большие тексты выносятся
+в S3 (backend/content_storage.py) после коммита статуса: при откате
+объект S3 не остаётся без ссылки. Счётчики использования
+обновляются в той же транзакции, что и документ, как в DocumentService.
+"""
+
+import logging
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.content_storage import content_s3_key, offload_to_s3
+from backend.models import User, UserDocument, UserDocumentContent
+from backend.services.document_service import make_preview
+from backend.services.stats_cache import stats_cache
+from backend.services.usage_service import (
+    build_usage_delta,
+    counts_in_storage,
+    document_amount,
+    reconcile_usage_sync
+)
+from shared.config import settings, ContentStorage, DocumentStatus
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentStatusRepository:
+    """Синхронная запись статуса документов (для Celery worker)."""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Инициализация репозитория.
+
+        Args:
+            session_factory: Фабрика синхронных сессий (по умолчанию SessionLocal)
+        """
+        self._session_factory = session_factory
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            # Движок создаётся при первом обращении, а не при импорте задач
+            from backend.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def set_status(
+        self,
+        document_id: int,
+        status: str,
+        error: Optional[str] = None,
+        transcription: Optional[str] = None,
+        telegram_id: Optional[int] = None
+    ) -> bool:
+        """
+        Обновить статус документа.
+
+        Args:
+            document_id: ID документа
+            status: Новый статус
+            error: Сообщение об ошибке (статус становится failed)
+            transcription: Распознанный текст
+            telegram_id: ID владельца в Telegram для сброса кеша статистики
+
+        Returns:
+            True если документ обновлён
+        """
+        db = self._session()
+
+        try:
+            doc = db.get(UserDocument, document_id, with_for_update=True)
+
+            if not doc:
+                logger.warning(f"Документ {document_id} не найден для обновления статуса")
+                return False
+
+            was_counted = counts_in_storage(doc.file_type, doc.status, doc.is_deleted)
+
+            new_status = DocumentStatus.FAILED if error else status
+            doc.status = new_status
+
+            if transcription:
+                doc.extracted_text = transcription
+                doc.preview = make_preview(transcription)
+
+            # Большие расшифровки выносятся в S3 после коммита (content_storage)
+            offload = (
+                transcription is not None
+                and doc.content.storage == ContentStorage.ZSTD
+                and doc.content.stored_bytes >= settings.CONTENT_S3_MIN_BYTES
+            )
+
+            # Документ попал в хранилище (обработан) или выбыл из него
+            is_counted = counts_in_storage(doc.file_type, doc.status, doc.is_deleted)
+            if was_counted != is_counted:
+                amount = document_amount(doc.file_type, doc.duration_hours)
+                result = db.execute(build_usage_delta(
+                    doc.user_id,
+                    doc.file_type,
+                    storage=amount if is_counted else -amount
+                ))
+
+                if result.rowcount == 0:
+                    # Строки счётчиков нет - пересчёт с учётом текущей транзакции
+                    db.flush()
+                    reconcile_usage_sync(db, [doc.user_id])
+
+                if telegram_id is None:
+                    telegram_id = db.scalar(select(User.telegram_id).where(User.id == doc.user_id))
+
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Не удалось обновить статус документа {document_id}: {e}")
+            return False
+
+        finally:
+            db.close()
+
+        if was_counted != is_counted and telegram_id is not None:
+            stats_cache.invalidate_sync(telegram_id)
+
+        logger.info(f"Статус документа {document_id} обновлён: {new_status}")
+
+        if offload:
+            self._offload_text(document_id)
+
+        return True
+
+    def _offload_text(self, document_id: int) -> None:
+        # Вынос закоммиченного сжатого текста в S3 отдельной транзакцией.
+        # Если ссылку на объект сохранить не удалось, объект удаляется:
+        # текст остаётся в БД
+        db = self._session()
+        uploaded = False
+
+        try:
+            content = db.get(UserDocumentContent, document_id, with_for_update=True)
+            if content is None:
+                return
+
+            uploaded = offload_to_s3(content, document_id)
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Не удалось сохранить ссылку на текст документа {document_id} в S3: {e}")
+
+            if uploaded:
+                from backend.object_storage import delete_from_s3
+                delete_from_s3(content_s3_key(document_id))
+
+        finally:
+            db.close()
+
+    def get_owner(self, document_id: int) -> Optional[Tuple[int, str]]:
+        """
+        Получить владельца и имя файла документа.
+
+        Используется для задач, поставленных без telegram_id в аргументах.
+
+        Args:
+            document_id: ID документа
+
+        Returns:
+            (telegram_id, filename) или None
+        """
+        db = self._session()
+
+        try:
+            row = db.execute(
+                select(User.telegram_id, UserDocument.filename)
+                .join(User, User.id == UserDocument.user_id)
+                .where(UserDocument.id == document_id)
+            ).first()
+        finally:
+            db.close()
+
+        return tuple(row) if row else None
+
+
+# Репозиторий процесса worker
+document_status_repository = DocumentStatusRepository()
@@ -5,147 +5,148 @@
 для всех типов контента.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
 import logging
 
-from backend.models import UserDocument, SubscriptionTier
+from backend.services.tier_catalogue import TierInfo
+from backend.services.usage_service import UsageService, UsageSnapshot
 
 logger = logging.getLogger(__name__)
 
 # Константа для безлимитных тарифов
 UNLIMITED = 9999
 
+# Поля тарифа по типу документа: (лимит хранилища, дневной лимит)
+TIER_LIMIT_FIELDS = {
+    "text": ("texts_limit", "daily_texts"),
+    "photo": ("photos_limit", "daily_photos"),
+    "file": ("files_limit", "daily_files"),
+    "video": ("video_hours_limit", "daily_video_hours"),
+}
+
 
 class LimitsService:
     """Сервис для проверки лимитов пользователя."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Инициализация сервиса.
 
         Args:
-            db: Сессия базы данных
+            db: Асинхронная сессия базы данных
         """
         self.db = db
+        self.usage_service = UsageService(db)
 
-    def check_text_limits(self, user_id: int, tier: SubscriptionTier) -> Tuple[bool, str]:
+    async def _check_count_limits(
+        self,
+        file_type: str,
+        user_id: int,
+        tier: TierInfo,
+        usage: Optional[UsageSnapshot],
+        count: int = 1
+    ) -> Tuple[bool, str]:
         """
-        Проверяет лимиты для загрузки текста.
+        Проверяет лимиты по количеству документов (тексты, фото, файлы).
 
         Args:
+            file_type: Тип документа
             user_id: ID пользователя
             tier: Тариф пользователя
+            usage: Текущее использование (если уже загружено)
+            count: Количество загружаемых документов (весь пакет)
 
         Returns:
             Кортеж (can_upload, error_message)
         """
-        # Проверяем лимит хранилища
-        if tier.texts_limit != UNLIMITED:
-            total_texts = self.db.query(func.count(UserDocument.id)).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "text",
-                UserDocument.is_deleted == False
-            ).scalar()
+        storage_field, daily_field = TIER_LIMIT_FIELDS[file_type]
+        storage_limit = getattr(tier, storage_field)
+        daily_limit = getattr(tier, daily_field)
 
-            if total_texts >= tier.texts_limit:
-                return False, "Storage limit exceeded"
+        if storage_limit == UNLIMITED and daily_limit == UNLIMITED:
+            return True, ""
+
+        # Один запрос по первичному ключу user_usage
+        usage = usage or await self.usage_service.get_usage(user_id)
+
+        # Проверяем лимит хранилища (с учётом всего пакета)
+        if storage_limit != UNLIMITED and usage.storage(file_type) + count > storage_limit:
+            return False, "Storage limit exceeded"
 
         # Проверяем дневной лимит
-        if tier.daily_texts != UNLIMITED:
-            today = func.date(func.now())
-            daily_texts = self.db.query(func.count(UserDocument.id)).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "text",
-                func.date(UserDocument.upload_date) == today,
-                UserDocument.is_deleted == False
-            ).scalar()
-
-            if daily_texts >= tier.daily_texts:
-                return False, "Daily limit exceeded"
+        if daily_limit != UNLIMITED and usage.daily(file_type) + count > daily_limit:
+            return False, "Daily limit exceeded"
 
         return True, ""
 
-    def check_photo_limits(self, user_id: int, tier: SubscriptionTier) -> Tuple[bool, str]:
+    async def check_text_limits(
+        self,
+        user_id: int,
+        tier: TierInfo,
+        usage: Optional[UsageSnapshot] = None
+    ) -> Tuple[bool, str]:
         """
-        Проверяет лимиты для загрузки фото.
+        Проверяет лимиты для загрузки текста.
 
         Args:
             user_id: ID пользователя
             tier: Тариф пользователя
+            usage: Текущее использование (если уже загружено)
 
         Returns:
             Кортеж (can_upload, error_message)
         """
-        # Проверяем лимит хранилища
-        if tier.photos_limit != UNLIMITED:
-            total_photos = self.db.query(func.count(UserDocument.id)).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "photo",
-                UserDocument.status == "completed",
-                UserDocument.is_deleted == False
-            ).scalar()
+        return await self._check_count_limits("text", user_id, tier, usage)
 
-            if total_photos >= tier.photos_limit:
-                return False, "Storage limit exceeded"
-
-        # Проверяем дневной лимит
-        if tier.daily_photos != UNLIMITED:
-            today = func.date(func.now())
-            daily_photos = self.db.query(func.count(UserDocument.id)).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "photo",
-                func.date(UserDocument.upload_date) == today
-            ).scalar()
+    async def check_photo_limits(
+        self,
+        user_id: int,
+        tier: TierInfo,
+        usage: Optional[UsageSnapshot] = None,
+        count: int = 1
+    ) -> Tuple[bool, str]:
+        """
+        Проверяет лимиты для загрузки фото.
 
-            if daily_photos >= tier.daily_photos:
-                return False, "Daily limit exceeded"
+        Args:
+            user_id: ID пользователя
+            tier: Тариф пользователя
+            usage: Текущее использование (если уже загружено)
+            count: Количество фото в запросе
 
-        return True, ""
+        Returns:
+            Кортеж (can_upload, error_message)
+        """
+        return await self._check_count_limits("photo", user_id, tier, usage, count)
 
-    def check_file_limits(self, user_id: int, tier: SubscriptionTier) -> Tuple[bool, str]:
+    async def check_file_limits(
+        self,
+        user_id: int,
+        tier: TierInfo,
+        usage: Optional[UsageSnapshot] = None,
+        count: int = 1
+    ) -> Tuple[bool, str]:
         """
         Проверяет лимиты для загрузки файлов.
 
         Args:
             user_id: ID пользователя
             tier: Тариф пользователя
+            usage: Текущее использование (если уже загружено)
+            count: Количество файлов в запросе
 
         Returns:
             Кортеж (can_upload, error_message)
         """
-        # Проверяем лимит хранилища
-        if tier.files_limit != UNLIMITED:
-            total_files = self.db.query(func.count(UserDocument.id)).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "file",
-                UserDocument.status == "completed",
-                UserDocument.is_deleted == False
-            ).scalar()
-
-            if total_files >= tier.files_limit:
-                return False, "Storage limit exceeded"
-
-        # Проверяем дневной лимит
-        if tier.daily_files != UNLIMITED:
-            today = func.date(func.now())
-            daily_files = self.db.query(func.count(UserDocument.id)).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "file",
-                func.date(UserDocument.upload_date) == today
-            ).scalar()
-
-            if daily_files >= tier.daily_files:
-                return False, "Daily limit exceeded"
+        return await self._check_count_limits("file", user_id, tier, usage, count)
 
-        return True, ""
-
-    def check_video_limits(
+    async def check_video_limits(
         self,
         user_id: int,
-        tier: SubscriptionTier,
-        duration_hours: float
+        tier: TierInfo,
+        duration_hours: float,
+        usage: Optional[UsageSnapshot] = None
     ) -> Tuple[bool, str]:
         """
         Проверяет лимиты для загрузки видео.
@@ -154,36 +155,28 @@ class LimitsService:
             user_id: ID пользователя
             tier: Тариф пользователя
             duration_hours: Длительность видео в часах
+            usage: Текущее использование (если уже загружено)
 
         Returns:
             Кортеж (can_upload, error_message)
         """
+        if tier.video_hours_limit == UNLIMITED and tier.daily_video_hours == UNLIMITED:
+            return True, ""
+
+        usage = usage or await self.usage_service.get_usage(user_id)
+
         # Проверяем лимит хранилища
         if tier.video_hours_limit != UNLIMITED:
-            total_hours = self.db.query(
-                func.coalesce(func.sum(UserDocument.duration_hours), 0)
-            ).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "video",
-                UserDocument.status == "completed",
-                UserDocument.is_deleted == False
-            ).scalar()
+            total_hours = usage.video_hours
 
             if total_hours + duration_hours > tier.video_hours_limit:
                 return False, f"Storage limit exceeded (available: {tier.video_hours_limit - total_hours:.2f}h)"
 
         # Проверяем дневной лимит
         if tier.daily_video_hours != UNLIMITED:
-            today = func.date(func.now())
-            daily_hours = self.db.query(
-                func.coalesce(func.sum(UserDocument.duration_hours), 0)
-            ).filter(
-                UserDocument.user_id == user_id,
-                UserDocument.file_type == "video",
-                func.date(UserDocument.upload_date) == today
-            ).scalar()
+            daily_hours = usage.daily_video_hours
 
             if daily_hours + duration_hours > tier.daily_video_hours:
                 return False, f"Daily limit exceeded (available: {tier.daily_video_hours - daily_hours:.2f}h)"
 
-        return True, ""
\ No newline at end of file
+        return True, ""
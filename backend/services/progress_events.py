@@ -0,0 +1,178 @@
+"""
+События прогресса обработки документов через Redis pub/sub.
+
+Celery задачи публикуют этапы обработки (скачивание, перекодирование,
+распознавание, сохранение) и итоговый статус в канал документа.
+Последнее событие хранится в отдельном ключе, чтобы подписавшийся
+позже клиент сразу получил текущий этап.
+
+API читает события для long-poll и SSE эндпоинта. При недоступности
+Redis публикация пропускается, а клиенты получают статус из БД.
+"""
+
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from backend.services.redis_client import FailOpenRedis
+from shared.config import settings, DocumentStatus
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cogito:progress"
+
+# Время жизни последнего события документа
+LAST_EVENT_TTL_SEC = 3600
+
+# Итоговые статусы - после них событий больше не будет
+TERMINAL_STATUSES = {DocumentStatus.COMPLETED, DocumentStatus.FAILED}
+
+
+class ProgressStage:
+    """Этапы обработки документа."""
+
+    DOWNLOADING = "downloading"
+    TRANSCODING = "transcoding"
+    RECOGNIZING = "recognizing"
+    SAVING = "saving"
+
+
+class ProgressEvents(FailOpenRedis):
+    """Публикация и чтение событий прогресса документов."""
+
+    purpose = "событий прогресса"
+    # Подписка pub/sub ждёт сообщений дольше таймаута операции
+    async_socket_timeout = None
+
+    @staticmethod
+    def _keys(document_id: int):
+        channel = f"{KEY_PREFIX}:{document_id}"
+        return channel, f"{channel}:last"
+
+    def publish(
+        self,
+        document_id: int,
+        stage: Optional[str] = None,
+        status: str = DocumentStatus.PROCESSING,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        Опубликовать событие прогресса (синхронно, из Celery задачи).
+
+        Args:
+            document_id: ID документа
+            stage: Этап обработки (ProgressStage)
+            status: Статус документа
+            error: Сообщение об ошибке
+        """
+        if not self._available():
+            return
+
+        channel, last_key = self._keys(document_id)
+        payload = json.dumps({
+            "document_id": document_id,
+            "status": status,
+            "stage": stage,
+            "error": error,
+            "timestamp": time.time()
+        })
+
+        try:
+            with self.sync_client.pipeline(transaction=False) as pipe:
+                pipe.set(last_key, payload, ex=LAST_EVENT_TTL_SEC)
+                pipe.publish(channel, payload)
+                pipe.execute()
+        except Exception as e:
+            self._fail(e)
+
+    async def last_event(self, document_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Получить последнее событие документа.
+
+        Args:
+            document_id: ID документа
+
+        Returns:
+            Событие или None
+        """
+        if not self._available():
+            return None
+
+        _, last_key = self._keys(document_id)
+
+        try:
+            payload = await self.client.get(last_key)
+        except Exception as e:
+            self._fail(e)
+            return None
+
+        return json.loads(payload) if payload else None
+
+    async def listen(
+        self,
+        document_id: int,
+        timeout: float,
+        since: float = 0.0
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Получать события документа до итогового статуса или таймаута.
+
+        После подписки последнее событие перечитывается: событие,
+        опубликованное между чтением статуса и подпиской, не теряется.
+        Раз в секунду без событий выдаётся None - чтобы вызывающий код
+        мог отправить heartbeat и заметить отключение клиента.
+
+        Args:
+            document_id: ID документа
+            timeout: Максимальное время ожидания в секундах
+            since: Время уже полученного клиентом события (timestamp)
+
+        Yields:
+            Событие или None
+        """
+        if not self._available():
+            return
+
+        channel, _ = self._keys(document_id)
+        deadline = time.monotonic() + timeout
+
+        try:
+            pubsub = self.client.pubsub()
+            await pubsub.subscribe(channel)
+        except Exception as e:
+            self._fail(e)
+            return
+
+        try:
+            last = await self.last_event(document_id)
+            if last and last["timestamp"] > since:
+                yield last
+                if last["status"] in TERMINAL_STATUSES:
+                    return
+
+            while time.monotonic() < deadline:
+                wait = min(1.0, deadline - time.monotonic())
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=wait)
+
+                if message is None:
+                    yield None
+                    continue
+
+                event = json.loads(message["data"])
+                yield event
+
+                if event["status"] in TERMINAL_STATUSES:
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+# События прогресса процесса (API и worker)
+progress_events = ProgressEvents(settings.REDIS_URL)
@@ -0,0 +1,256 @@
+"""
+Распределённый rate limiting API по telegram_id с лимитами по тарифам.
+
+Все запросы приходят с одного хоста бота, поэтому ключ по IP объединял
+всех пользователей в один счётчик. Теперь:
+- ключ - telegram_id из пути, query или JSON тела запроса; запросы без
+  telegram_id ограничиваются по IP;
+- счётчики хранятся в Redis (settings.RATE_LIMIT_STORAGE_URI) и общие
+  для всех воркеров uvicorn и реплик API;
+- стратегия sliding-window-counter: проверка и увеличение счётчика
+  выполняются одним Lua скриптом в Redis (limits), то есть атомарно;
+- лимит маршрута умножается на коэффициент тарифа пользователя
+  (Limits.RATE_LIMIT_TIER_MULTIPLIERS), тариф берётся из каталога тарифов.
+
+Используется только публичный API пакета limits. telegram_id и тариф
+определяет зависимость resolve_rate_limit_identity и сохраняет их в
+request.state; проверку лимита выполняет зависимость маршрута
+(backend.main.rate_limited) в пуле потоков - хранилище limits синхронное.
+Тариф пользователя кешируется в памяти процесса на
+settings.RATE_LIMIT_TIER_CACHE_SEC - смена тарифа применяется с этой
+задержкой.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, Request
+from limits import RateLimitItem, parse
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import get_async_db
+from backend.models import User, UserSubscription
+from backend.services.tier_catalogue import tier_catalogue
+from shared.config import settings, Limits
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cogito:ratelimit"
+
+# Тариф пользователя без активной подписки или ещё не зарегистрированного
+DEFAULT_TIER = "free"
+
+# Максимум пользователей в кеше тарифов процесса
+TIER_CACHE_MAX_SIZE = 10000
+
+
+class RateLimitTiers:
+    """Кеш тарифов пользователей в памяти процесса (для rate limiting)."""
+
+    def __init__(self, ttl_sec: int, max_size: int = TIER_CACHE_MAX_SIZE):
+        """
+        Инициализация кеша.
+
+        Args:
+            ttl_sec: Время жизни записи в секундах
+            max_size: Максимум записей (при превышении кеш очищается)
+        """
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self._tiers: Dict[int, Tuple[str, float]] = {}
+
+    def invalidate(self, telegram_id: Optional[int] = None) -> None:
+        """Сбросить тариф пользователя (или весь кеш)."""
+        if telegram_id is None:
+            self._tiers.clear()
+        else:
+            self._tiers.pop(telegram_id, None)
+
+    async def get_tier_name(self, db: AsyncSession, telegram_id: int) -> str:
+        """
+        Получить название тарифа пользователя.
+
+        Args:
+            db: Асинхронная сессия базы данных
+            telegram_id: ID пользователя в Telegram
+
+        Returns:
+            Название тарифа (DEFAULT_TIER если подписки нет)
+        """
+        cached = self._tiers.get(telegram_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        tier_id = await db.scalar(
+            select(UserSubscription.tier_id)
+            .join(User, User.id == UserSubscription.user_id)
+            .where(User.telegram_id == telegram_id, UserSubscription.status == "active")
+            .limit(1)
+        )
+
+        tier = await tier_catalogue.get_by_id(db, tier_id) if tier_id is not None else None
+        tier_name = tier.tier_name if tier else DEFAULT_TIER
+
+        if len(self._tiers) >= self.max_size:
+            self._tiers.clear()
+        self._tiers[telegram_id] = (tier_name, time.monotonic() + self.ttl_sec)
+
+        return tier_name
+
+
+# Кеш тарифов процесса API
+rate_limit_tiers = RateLimitTiers(settings.RATE_LIMIT_TIER_CACHE_SEC)
+
+
+def _parse_telegram_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def extract_telegram_id(request: Request) -> Optional[int]:
+    """
+    Найти telegram_id в пути, query параметрах или JSON теле запроса.
+
+    Тело к этому моменту уже прочитано FastAPI, request.json() берёт
+    его из кеша запроса.
+
+    Args:
+        request: Запрос
+
+    Returns:
+        telegram_id или None
+    """
+    for params in (request.path_params, request.query_params):
+        if "telegram_id" in params:
+            return _parse_telegram_id(params["telegram_id"])
+
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except Exception:
+            return None
+
+        if isinstance(body, dict):
+            return _parse_telegram_id(body.get("telegram_id"))
+
+    return None
+
+
+async def resolve_rate_limit_identity(request: Request, db: AsyncSession = Depends(get_async_db)) -> None:
+    """
+    Зависимость маршрутов с лимитом: ключ rate limit для запроса.
+
+    Сохраняет в request.state.rate_limit_key ключ вида tg:<telegram_id>
+    и в request.state.rate_limit_tier тариф пользователя.
+    """
+    telegram_id = await extract_telegram_id(request)
+    if telegram_id is None:
+        return
+
+    try:
+        tier_name = await rate_limit_tiers.get_tier_name(db, telegram_id)
+    except Exception as e:
+        logger.warning(f"Не удалось определить тариф для rate limit (telegram_id={telegram_id}): {e}")
+        tier_name = DEFAULT_TIER
+
+    request.state.rate_limit_key = f"tg:{telegram_id}"
+    request.state.rate_limit_tier = tier_name
+
+
+def rate_limit_key(request: Request) -> Tuple[str, str]:
+    """Ключ счётчика и тариф: пользователь или IP, если telegram_id нет."""
+    key = getattr(request.state, "rate_limit_key", None)
+    if key is None:
+        host = request.client.host if request.client else "unknown"
+        return f"ip:{host}", DEFAULT_TIER
+    return key, request.state.rate_limit_tier
+
+
+def tier_limit(base_limit: str) -> Callable[[str], RateLimitItem]:
+    """
+    Лимит маршрута с учётом тарифа пользователя.
+
+    Args:
+        base_limit: Лимит бесплатного тарифа ("10/minute")
+
+    Returns:
+        Функция: по названию тарифа возвращает лимит
+    """
+    item = parse(base_limit)
+    items = {
+        tier_name: type(item)(item.amount * multiplier, item.multiples)
+        for tier_name, multiplier in Limits.RATE_LIMIT_TIER_MULTIPLIERS.items()
+    }
+
+    def provider(tier_name: str) -> RateLimitItem:
+        return items.get(tier_name, item)
+
+    return provider
+
+
+class RateLimiter:
+    """Счётчики rate limit в хранилище limits (sliding window counter)."""
+
+    def __init__(self, storage_uri: str, storage_options: Optional[Dict] = None):
+        """
+        Инициализация.
+
+        Args:
+            storage_uri: URI хранилища limits (redis://, memory://)
+            storage_options: Параметры хранилища
+        """
+        self._limiter = SlidingWindowCounterRateLimiter(storage_from_string(storage_uri, **(storage_options or {})))
+        # Счётчики в памяти процесса на время недоступности хранилища
+        self._fallback = SlidingWindowCounterRateLimiter(MemoryStorage())
+        self._storage_dead_until = 0.0
+
+    def hit(self, item: RateLimitItem, *identifiers: str) -> bool:
+        """
+        Учесть запрос в счётчике (блокирующий вызов - из API через run_blocking).
+
+        Args:
+            item: Лимит
+            *identifiers: Части ключа счётчика (маршрут, пользователь)
+
+        Returns:
+            False, если лимит исчерпан
+        """
+        if time.monotonic() >= self._storage_dead_until:
+            try:
+                return self._limiter.hit(item, KEY_PREFIX, *identifiers)
+            except Exception as e:
+                logger.warning(f"Хранилище rate limit недоступно, счётчики в памяти процесса: {e}")
+                self._storage_dead_until = time.monotonic() + settings.REDIS_RETRY_SEC
+
+        return self._fallback.hit(item, KEY_PREFIX, *identifiers)
+
+    def reset(self) -> None:
+        """Сбросить все счётчики (тесты)."""
+        self._limiter.storage.reset()
+        self._fallback.storage.reset()
+
+
+def create_limiter() -> RateLimiter:
+    """
+    Создать limiter API.
+
+    При недоступности Redis счётчики временно ведутся в памяти процесса,
+    хранилище проверяется снова через settings.REDIS_RETRY_SEC.
+
+    Returns:
+        RateLimiter
+    """
+    storage_uri = settings.RATE_LIMIT_STORAGE_URI or settings.REDIS_URL
+    storage_options = {}
+
+    if storage_uri.startswith(("redis://", "rediss://")):
+        # Проверка лимита синхронная - не ждём недоступный Redis долго
+        storage_options = {"socket_connect_timeout": 0.5, "socket_timeout": 0.5}
+
+    return RateLimiter(storage_uri, storage_options)
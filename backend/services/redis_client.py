@@ -0,0 +1,73 @@
+"""
+Клиенты Redis для вспомогательных сервисов (кеш статистики, события прогресса).
+
+Redis для них не обязателен: после ошибки сервис не обращается к Redis
+settings.REDIS_RETRY_SEC секунд и работает без него (fail-open), чтобы
+недоступный Redis не замедлял каждый запрос таймаутом подключения.
+"""
+
+import logging
+import time
+from typing import Optional
+
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Таймауты подключения и операций - недоступный Redis не должен ждать долго
+SOCKET_TIMEOUT_SEC = 0.5
+
+
+class FailOpenRedis:
+    """Базовый класс сервиса с необязательным Redis."""
+
+    # Назначение Redis в сервисе (для логов)
+    purpose = "сервиса"
+    # Таймаут операций асинхронного клиента (None - без таймаута, например для pub/sub)
+    async_socket_timeout: Optional[float] = SOCKET_TIMEOUT_SEC
+
+    def __init__(self, redis_url: str, client=None, sync_client=None):
+        """
+        Инициализация.
+
+        Args:
+            redis_url: URL Redis
+            client: Клиент redis.asyncio (по умолчанию создаётся по redis_url)
+            sync_client: Синхронный клиент redis (по умолчанию создаётся по redis_url)
+        """
+        self.redis_url = redis_url
+        self._client = client
+        self._sync_client = sync_client
+        # После ошибки Redis не используется до этого момента
+        self._disabled_until = 0.0
+
+    @property
+    def client(self):
+        """Клиент redis.asyncio (API, создаётся при первом обращении)."""
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(
+                self.redis_url,
+                socket_connect_timeout=SOCKET_TIMEOUT_SEC,
+                socket_timeout=self.async_socket_timeout
+            )
+        return self._client
+
+    @property
+    def sync_client(self):
+        """Синхронный клиент redis (Celery worker, создаётся при первом обращении)."""
+        if self._sync_client is None:
+            import redis
+            self._sync_client = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=SOCKET_TIMEOUT_SEC,
+                socket_timeout=SOCKET_TIMEOUT_SEC
+            )
+        return self._sync_client
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    def _fail(self, error: Exception) -> None:
+        logger.warning(f"Redis недоступен для {self.purpose}: {error}")
+        self._disabled_until = time.monotonic() + settings.REDIS_RETRY_SEC
@@ -0,0 +1,227 @@
+"""
+Кеш статистики пользователя (/users/{telegram_id}/stats) в Redis.
+
+Ключ - telegram_id. Кеш сбрасывается после коммита изменений, влияющих
+на статистику: создание, смена статуса и удаление документа, смена
+подписки, запрос к ИИ.
+
+Защита от гонок:
+- при промахе значение считает один запрос (блокировка SET NX),
+  остальные ждут результат;
+- при сбросе увеличивается номер поколения ключа, и значение,
+  посчитанное до сброса, в кеш не записывается.
+
+При недоступности Redis статистика считается напрямую из БД.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.metrics import STATS_CACHE_REQUESTS
+from backend.models import User
+from backend.services.date_utils import get_today_range
+from backend.services.redis_client import FailOpenRedis
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cogito:stats"
+
+# Блокировка пересчёта и ожидание чужого результата
+LOCK_TTL_MS = 5000
+WAIT_STEP_SEC = 0.05
+WAIT_STEPS = 40
+
+# Время жизни номера поколения
+GENERATION_TTL_SEC = 86400
+
+
+def _json_default(value):
+    # datetime (subscription_end) сериализуется в ISO формате
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Не сериализуемый тип: {type(value)}")
+
+
+class StatsCache(FailOpenRedis):
+    """Кеш статистики пользователей в Redis."""
+
+    purpose = "кеша статистики"
+
+    def __init__(self, redis_url: str, ttl_sec: int, client=None):
+        """
+        Инициализация кеша.
+
+        Args:
+            redis_url: URL Redis
+            ttl_sec: Максимальное время жизни значения
+            client: Клиент redis.asyncio (по умолчанию создаётся по redis_url)
+        """
+        super().__init__(redis_url, client)
+        self.ttl_sec = ttl_sec
+
+    @staticmethod
+    def _keys(telegram_id: int):
+        base = f"{KEY_PREFIX}:{telegram_id}"
+        return base, f"{base}:gen", f"{base}:lock"
+
+    def _fail(self, error: Exception) -> None:
+        STATS_CACHE_REQUESTS.labels("error").inc()
+        super()._fail(error)
+
+    def _value_ttl(self) -> int:
+        # Дневные счётчики обнуляются в полночь - значение не должно её пережить
+        _, tomorrow_start = get_today_range()
+        until_midnight = int((tomorrow_start - datetime.now()).total_seconds())
+        return max(1, min(self.ttl_sec, until_midnight))
+
+    async def get_or_compute(
+        self,
+        telegram_id: int,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Получить статистику из кеша или посчитать и сохранить.
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            compute: Корутина-функция подсчёта статистики
+
+        Returns:
+            Статистика пользователя
+        """
+        if not self._available():
+            STATS_CACHE_REQUESTS.labels("bypass").inc()
+            return await compute()
+
+        key, gen_key, lock_key = self._keys(telegram_id)
+
+        try:
+            cached, generation = await self.client.mget(key, gen_key)
+            if cached is not None:
+                STATS_CACHE_REQUESTS.labels("hit").inc()
+                return json.loads(cached)
+
+            STATS_CACHE_REQUESTS.labels("miss").inc()
+            token = uuid4().hex
+            locked = await self.client.set(lock_key, token, nx=True, px=LOCK_TTL_MS)
+        except Exception as e:
+            self._fail(e)
+            return await compute()
+
+        if not locked:
+            # Статистику уже считает другой запрос - ждём его результат
+            cached = await self._wait_for_value(key)
+            return json.loads(cached) if cached is not None else await compute()
+
+        try:
+            stats = await compute()
+            await self._store(key, gen_key, generation, stats)
+            return stats
+        finally:
+            await self._release(lock_key, token)
+
+    async def _wait_for_value(self, key: str) -> Optional[bytes]:
+        try:
+            for _ in range(WAIT_STEPS):
+                await asyncio.sleep(WAIT_STEP_SEC)
+                cached = await self.client.get(key)
+                if cached is not None:
+                    return cached
+        except Exception as e:
+            self._fail(e)
+        return None
+
+    async def _store(self, key: str, gen_key: str, generation: Optional[bytes], stats: Dict[str, Any]) -> None:
+        from redis.exceptions import WatchError
+
+        payload = json.dumps(stats, default=_json_default, ensure_ascii=False)
+
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                # Записываем, только если за время подсчёта не было сброса
+                await pipe.watch(gen_key)
+                if await pipe.get(gen_key) != generation:
+                    return
+                pipe.multi()
+                pipe.set(key, payload, ex=self._value_ttl())
+                await pipe.execute()
+        except WatchError:
+            pass
+        except Exception as e:
+            self._fail(e)
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            if await self.client.get(lock_key) == token.encode():
+                await self.client.delete(lock_key)
+        except Exception as e:
+            self._fail(e)
+
+    async def invalidate(self, telegram_id: int) -> None:
+        """
+        Сбросить статистику пользователя (вызывать после коммита).
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+        """
+        if not self._available():
+            return
+
+        key, gen_key, _ = self._keys(telegram_id)
+
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.incr(gen_key)
+                pipe.expire(gen_key, GENERATION_TTL_SEC)
+                pipe.delete(key)
+                await pipe.execute()
+        except Exception as e:
+            self._fail(e)
+
+    def invalidate_sync(self, telegram_id: int) -> None:
+        """
+        Сбросить статистику пользователя из синхронного кода (Celery worker).
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+        """
+        if not self._available():
+            return
+
+        key, gen_key, _ = self._keys(telegram_id)
+
+        try:
+            with self.sync_client.pipeline(transaction=True) as pipe:
+                pipe.incr(gen_key)
+                pipe.expire(gen_key, GENERATION_TTL_SEC)
+                pipe.delete(key)
+                pipe.execute()
+        except Exception as e:
+            self._fail(e)
+
+    async def invalidate_user(self, db: AsyncSession, user_id: int) -> None:
+        """
+        Сбросить статистику пользователя по ID в БД.
+
+        Args:
+            db: Асинхронная сессия базы данных
+            user_id: ID пользователя в БД
+        """
+        if not self._available():
+            return
+
+        telegram_id = await db.scalar(select(User.telegram_id).where(User.id == user_id))
+        if telegram_id is not None:
+            await self.invalidate(telegram_id)
+
+
+# Кеш процесса API
+stats_cache = StatsCache(settings.REDIS_URL, settings.STATS_CACHE_TTL_SEC)
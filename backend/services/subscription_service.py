@@ -4,12 +4,15 @@
 Управление тарифами и подписками пользователей.
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from datetime import datetime
 from typing import List, Optional, Tuple
 import logging
 
-from backend.models import SubscriptionTier, UserSubscription, User
+from backend.models import UserSubscription, User
+from backend.services.tier_catalogue import tier_catalogue, TierInfo
+from backend.services.stats_cache import stats_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +20,18 @@ logger = logging.getLogger(__name__)
 class SubscriptionService:
     """Сервис для управления подписками."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Инициализация сервиса.
 
         Args:
-            db: Сессия базы данных
+            db: Асинхронная сессия базы данных
         """
         self.db = db
 
-    def get_all_tiers(self, exclude_internal: bool = True) -> List[SubscriptionTier]:
+    async def get_all_tiers(self, exclude_internal: bool = True) -> List[TierInfo]:
         """
-        Получить список всех тарифных планов.
+        Получить список всех тарифных планов (из каталога в памяти).
 
         Args:
             exclude_internal: Исключить внутренние тарифы (free, admin)
@@ -36,44 +39,33 @@ class SubscriptionService:
         Returns:
             Список тарифов
         """
-        query = self.db.query(SubscriptionTier)
+        return await tier_catalogue.list_tiers(self.db, exclude_internal=exclude_internal)
 
-        if exclude_internal:
-            query = query.filter(
-                SubscriptionTier.tier_name.notin_(["free", "admin"])
-            )
-
-        return query.order_by(SubscriptionTier.price_rubles).all()
-
-    def get_tier_by_name(self, tier_name: str) -> Optional[SubscriptionTier]:
+    async def get_tier_by_name(self, tier_name: str) -> Optional[TierInfo]:
         """
-        Получить тариф по имени.
+        Получить тариф по имени (из каталога в памяти).
 
         Args:
             tier_name: Название тарифа (free, basic, premium, ultra, admin)
 
         Returns:
-            Объект тарифа или None
+            Тариф или None
         """
-        return self.db.query(SubscriptionTier).filter(
-            SubscriptionTier.tier_name == tier_name
-        ).first()
+        return await tier_catalogue.get_by_name(self.db, tier_name)
 
-    def get_tier_by_id(self, tier_id: int) -> Optional[SubscriptionTier]:
+    async def get_tier_by_id(self, tier_id: int) -> Optional[TierInfo]:
         """
-        Получить тариф по ID.
+        Получить тариф по ID (из каталога в памяти).
 
         Args:
             tier_id: ID тарифа
 
         Returns:
-            Объект тарифа или None
+            Тариф или None
         """
-        return self.db.query(SubscriptionTier).filter(
-            SubscriptionTier.id == tier_id
-        ).first()
+        return await tier_catalogue.get_by_id(self.db, tier_id)
 
-    def get_active_subscription(self, user_id: int) -> Optional[Tuple[UserSubscription, SubscriptionTier]]:
+    async def get_active_subscription(self, user_id: int) -> Optional[Tuple[UserSubscription, TierInfo]]:
         """
         Получить активную подписку пользователя с тарифом.
 
@@ -83,21 +75,20 @@ class SubscriptionService:
         Returns:
             Кортеж (подписка, тариф) или None
         """
-        from sqlalchemy.orm import joinedload
-
-        subscription = self.db.query(UserSubscription).options(
-            joinedload(UserSubscription.tier)
-        ).filter(
-            UserSubscription.user_id == user_id,
-            UserSubscription.status == "active"
-        ).first()
+        result = await self.db.execute(
+            select(UserSubscription).filter(
+                UserSubscription.user_id == user_id,
+                UserSubscription.status == "active"
+            )
+        )
+        subscription = result.scalars().first()
 
         if subscription:
-            return subscription, subscription.tier
+            return subscription, await self.get_tier_by_id(subscription.tier_id)
 
         return None
 
-    def assign_free_subscription(self, user_id: int) -> UserSubscription:
+    async def assign_free_subscription(self, user_id: int) -> UserSubscription:
         """
         Назначить бесплатную подписку пользователю.
 
@@ -107,7 +98,7 @@ class SubscriptionService:
         Returns:
             Созданная подписка
         """
-        free_tier = self.get_tier_by_name("free")
+        free_tier = await self.get_tier_by_name("free")
 
         if not free_tier:
             raise ValueError("Free tier not found in database")
@@ -124,14 +115,14 @@ class SubscriptionService:
         )
 
         self.db.add(new_subscription)
-        self.db.commit()
-        self.db.refresh(new_subscription)
+        await self.db.commit()
+        await self.db.refresh(new_subscription)
 
         logger.info(f"Назначена бесплатная подписка пользователю {user_id}")
 
         return new_subscription
 
-    def upgrade_subscription(
+    async def upgrade_subscription(
         self,
         user_id: int,
         new_tier_id: int,
@@ -149,7 +140,7 @@ class SubscriptionService:
             Новая подписка
         """
         # Завершаем текущую подписку
-        current = self.get_active_subscription(user_id)
+        current = await self.get_active_subscription(user_id)
 
         if current:
             current_sub, _ = current
@@ -167,8 +158,10 @@ class SubscriptionService:
         )
 
         self.db.add(new_subscription)
-        self.db.commit()
-        self.db.refresh(new_subscription)
+        await self.db.commit()
+        await self.db.refresh(new_subscription)
+
+        await stats_cache.invalidate_user(self.db, user_id)
 
         logger.info(f"Подписка пользователя {user_id} обновлена до tier_id={new_tier_id}")
 
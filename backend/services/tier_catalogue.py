@@ -0,0 +1,220 @@
+"""
+Каталог тарифов в памяти процесса.
+
+Тарифы меняются редко, поэтому API держит их копию в памяти и не ходит
+в БД за тарифом при регистрации, проверке лимитов и выдаче списка тарифов.
+
+Каталог перечитывается из БД:
+- при старте приложения;
+- по истечении TTL (settings.TIER_CATALOGUE_TTL_SEC);
+- после сообщения в Redis-канал TIERS_INVALIDATION_CHANNEL
+  (см. publish_tiers_invalidation - вызывать после изменения тарифов).
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import SubscriptionTier
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Канал Redis для сообщений об изменении тарифов
+TIERS_INVALIDATION_CHANNEL = "cogito:tiers:invalidate"
+
+# Внутренние тарифы, недоступные для покупки
+INTERNAL_TIERS = ("free", "admin")
+
+
+@dataclass(frozen=True)
+class TierInfo:
+    """Неизменяемая копия тарифа (не привязана к сессии БД)."""
+
+    id: int
+    tier_name: str
+    display_name: str
+    model_name: str
+    price_rubles: int
+    daily_messages: int
+    video_hours_limit: int
+    files_limit: int
+    photos_limit: int
+    texts_limit: int
+    daily_video_hours: int
+    daily_files: int
+    daily_photos: int
+    daily_texts: int
+
+    @classmethod
+    def from_model(cls, tier: SubscriptionTier) -> "TierInfo":
+        """Создать копию из модели SubscriptionTier."""
+        return cls(**{field.name: getattr(tier, field.name) for field in fields(cls)})
+
+
+class TierCatalogue:
+    """Версионированный каталог тарифов."""
+
+    def __init__(self, ttl_sec: int):
+        """
+        Инициализация каталога.
+
+        Args:
+            ttl_sec: Время жизни загруженной версии в секундах
+        """
+        self.ttl_sec = ttl_sec
+        # Номер версии увеличивается при каждой перезагрузке
+        self.version = 0
+        self._by_name: Dict[str, TierInfo] = {}
+        self._by_id: Dict[int, TierInfo] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        """Каталог не загружен, устарел по TTL или инвалидирован."""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_sec
+
+    def invalidate(self) -> None:
+        """Пометить каталог устаревшим (перечитается при следующем обращении)."""
+        self._loaded_at = None
+        logger.info(f"Каталог тарифов инвалидирован (версия {self.version})")
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Загрузить тарифы из БД и опубликовать новую версию каталога.
+
+        Args:
+            db: Асинхронная сессия базы данных
+        """
+        result = await db.execute(select(SubscriptionTier).order_by(SubscriptionTier.price_rubles))
+        tiers = [TierInfo.from_model(tier) for tier in result.scalars().all()]
+
+        # Словари заменяются целиком - читатели видят либо старую, либо новую версию
+        self._by_name = {tier.tier_name: tier for tier in tiers}
+        self._by_id = {tier.id: tier for tier in tiers}
+        self._loaded_at = time.monotonic()
+        self.version += 1
+
+        logger.info(f"Загружен каталог тарифов: {len(tiers)} шт., версия {self.version}")
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """
+        Перечитать каталог, если он устарел.
+
+        Args:
+            db: Асинхронная сессия базы данных
+        """
+        if not self.is_stale:
+            return
+
+        async with self._lock:
+            # Пока ждали блокировку, каталог мог перечитать другой запрос
+            if self.is_stale:
+                await self.load(db)
+
+    async def get_by_name(self, db: AsyncSession, tier_name: str) -> Optional[TierInfo]:
+        """
+        Получить тариф по имени.
+
+        Args:
+            db: Асинхронная сессия (используется только при перезагрузке)
+            tier_name: Название тарифа
+
+        Returns:
+            Тариф или None
+        """
+        await self.ensure_fresh(db)
+        return self._by_name.get(tier_name)
+
+    async def get_by_id(self, db: AsyncSession, tier_id: int) -> Optional[TierInfo]:
+        """
+        Получить тариф по ID.
+
+        Args:
+            db: Асинхронная сессия (используется только при перезагрузке)
+            tier_id: ID тарифа
+
+        Returns:
+            Тариф или None
+        """
+        await self.ensure_fresh(db)
+        return self._by_id.get(tier_id)
+
+    async def list_tiers(self, db: AsyncSession, exclude_internal: bool = True) -> List[TierInfo]:
+        """
+        Получить список тарифов, отсортированный по цене.
+
+        Args:
+            db: Асинхронная сессия (используется только при перезагрузке)
+            exclude_internal: Исключить внутренние тарифы (free, admin)
+
+        Returns:
+            Список тарифов
+        """
+        await self.ensure_fresh(db)
+        tiers = sorted(self._by_id.values(), key=lambda tier: tier.price_rubles)
+
+        if exclude_internal:
+            tiers = [tier for tier in tiers if tier.tier_name not in INTERNAL_TIERS]
+
+        return tiers
+
+
+# Каталог процесса API
+tier_catalogue = TierCatalogue(ttl_sec=settings.TIER_CATALOGUE_TTL_SEC)
+
+
+async def listen_for_tiers_invalidation(catalogue: TierCatalogue = tier_catalogue) -> None:
+    """
+    Слушать Redis-канал инвалидации и сбрасывать каталог.
+
+    Работает до отмены задачи; при недоступности Redis переподключается,
+    а каталог продолжает обновляться по TTL.
+
+    Args:
+        catalogue: Каталог тарифов
+    """
+    import redis.asyncio as aioredis
+
+    while True:
+        client = aioredis.from_url(settings.REDIS_URL)
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(TIERS_INVALIDATION_CHANNEL)
+                logger.info(f"Подписка на канал {TIERS_INVALIDATION_CHANNEL}")
+
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        catalogue.invalidate()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Канал инвалидации тарифов недоступен: {e}")
+            await asyncio.sleep(settings.TIER_CATALOGUE_RECONNECT_SEC)
+        finally:
+            await client.aclose()
+
+
+def publish_tiers_invalidation() -> int:
+    """
+    Сообщить всем процессам API, что тарифы изменились.
+
+    Вызывать после изменения subscription_tiers (скрипты, админка, миграции).
+
+    Returns:
+        Количество получивших сообщение подписчиков
+    """
+    import redis
+
+    client = redis.Redis.from_url(settings.REDIS_URL)
+    try:
+        return client.publish(TIERS_INVALIDATION_CHANNEL, "tiers")
+    finally:
+        client.close()
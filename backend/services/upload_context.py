@@ -0,0 +1,73 @@
+"""
+Контекст загрузки в базу знаний.
+
+Пользователь, активная подписка и текущее использование загружаются
+одним запросом, тариф берётся из каталога в памяти.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import User, UserSubscription, UserUsage
+from backend.services.date_utils import get_today_range
+from backend.services.usage_service import UsageService, UsageSnapshot
+from backend.services.tier_catalogue import tier_catalogue, TierInfo
+
+
+@dataclass
+class UploadContext:
+    """Данные пользователя, необходимые для загрузки документов."""
+
+    user: User
+    subscription: Optional[UserSubscription]
+    tier: Optional[TierInfo]
+    usage: UsageSnapshot
+
+    @classmethod
+    async def load(cls, db: AsyncSession, telegram_id: int) -> Optional["UploadContext"]:
+        """
+        Загрузить контекст одним запросом (users + подписка + user_usage).
+
+        Args:
+            db: Асинхронная сессия базы данных
+            telegram_id: ID пользователя в Telegram
+
+        Returns:
+            Контекст загрузки или None если пользователь не найден
+            (subscription и tier равны None, если нет активной подписки)
+        """
+        result = await db.execute(
+            select(User, UserSubscription, UserUsage)
+            .outerjoin(
+                UserSubscription,
+                and_(
+                    UserSubscription.user_id == User.id,
+                    UserSubscription.status == "active"
+                )
+            )
+            .outerjoin(UserUsage, UserUsage.user_id == User.id)
+            .where(User.telegram_id == telegram_id)
+            .limit(1)
+            .execution_options(populate_existing=True)
+        )
+        row = result.first()
+
+        if row is None:
+            return None
+
+        user, subscription, usage_row = row
+
+        tier = None
+        if subscription is not None:
+            tier = await tier_catalogue.get_by_id(db, subscription.tier_id)
+
+        if usage_row is not None:
+            usage = UsageSnapshot.from_row(usage_row, get_today_range()[0].date())
+        else:
+            # Строки счётчиков ещё нет - создаётся пересчётом по документам
+            usage = await UsageService(db).get_usage(user.id)
+
+        return cls(user=user, subscription=subscription, tier=tier, usage=usage)
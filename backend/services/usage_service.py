@@ -0,0 +1,405 @@
+"""
+Сервис счётчиков использования базы знаний.
+
+Счётчики хранятся в user_usage (одна строка на пользователя) и обновляются
+атомарными UPDATE в той же транзакции, что и документ. Проверки лимитов и
+статистика читают одну строку по первичному ключу вместо агрегатов
+по user_documents.
+
+Построители запросов не зависят от типа сессии и используются как
+асинхронным API, так и синхронными задачами Celery.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import logging
+
+from backend.models import UserDocument, UserUsage
+from backend.services.date_utils import get_today_range
+from shared.config import DocumentStatus
+
+logger = logging.getLogger(__name__)
+
+# Колонки счётчиков по типу документа: (хранилище, дневной)
+USAGE_COLUMNS = {
+    "text": ("texts_count", "daily_texts"),
+    "photo": ("photos_count", "daily_photos"),
+    "file": ("files_count", "daily_files"),
+    "video": ("video_hours", "daily_video_hours"),
+}
+
+DAILY_COLUMNS = tuple(daily for _, daily in USAGE_COLUMNS.values())
+
+
+@dataclass
+class UsageSnapshot:
+    """Текущее использование базы знаний (дневные значения - за сегодня)."""
+
+    texts_count: int = 0
+    photos_count: int = 0
+    files_count: int = 0
+    video_hours: float = 0.0
+    daily_texts: int = 0
+    daily_photos: int = 0
+    daily_files: int = 0
+    daily_video_hours: float = 0.0
+
+    @classmethod
+    def from_row(cls, usage: UserUsage, today: date) -> "UsageSnapshot":
+        """
+        Создать снимок из строки user_usage.
+
+        Если дневные счётчики относятся к другому дню, они считаются нулевыми.
+
+        Args:
+            usage: Строка user_usage
+            today: Текущая дата
+
+        Returns:
+            Снимок использования
+        """
+        snapshot = cls(
+            texts_count=usage.texts_count,
+            photos_count=usage.photos_count,
+            files_count=usage.files_count,
+            video_hours=usage.video_hours
+        )
+
+        if usage.usage_day == today:
+            snapshot.daily_texts = usage.daily_texts
+            snapshot.daily_photos = usage.daily_photos
+            snapshot.daily_files = usage.daily_files
+            snapshot.daily_video_hours = usage.daily_video_hours
+
+        return snapshot
+
+    def storage(self, file_type: str) -> float:
+        """Использование хранилища для типа документа."""
+        return getattr(self, USAGE_COLUMNS[file_type][0])
+
+    def daily(self, file_type: str) -> float:
+        """Дневное использование для типа документа."""
+        return getattr(self, USAGE_COLUMNS[file_type][1])
+
+
+# ============================================================================
+# ПРАВИЛА ПОДСЧЁТА
+# ============================================================================
+
+def document_amount(file_type: str, duration_hours: Optional[float] = None) -> float:
+    """
+    Вклад документа в счётчики: 1 шт или длительность видео в часах.
+
+    Args:
+        file_type: Тип документа
+        duration_hours: Длительность видео
+
+    Returns:
+        Величина для счётчиков
+    """
+    if file_type == "video":
+        return duration_hours or 0.0
+    return 1
+
+
+def counts_in_storage(file_type: str, status: str, is_deleted: bool) -> bool:
+    """
+    Учитывается ли документ в лимите хранилища.
+
+    Тексты учитываются сразу, фото, файлы и видео - после обработки.
+
+    Args:
+        file_type: Тип документа
+        status: Статус обработки
+        is_deleted: Флаг удаления
+
+    Returns:
+        True если документ занимает место в хранилище
+    """
+    if is_deleted:
+        return False
+    if file_type == "text":
+        return True
+    return status == DocumentStatus.COMPLETED
+
+
+def discarded_upload_refunds(rows: Iterable, today_start: datetime, tomorrow_start: datetime) -> Dict[tuple, int]:
+    """
+    Возврат дневного лимита за удалённые документы прямой загрузки.
+
+    Документы, файл которых так и не был получен, удаляются целиком и
+    в сверке счётчиков не участвуют. Возвращаются только загрузки
+    текущего дня - дневные счётчики прошлых дней уже сброшены.
+
+    Args:
+        rows: Строки (user_id, file_type, upload_date) удалённых документов
+        today_start: Начало текущего дня
+        tomorrow_start: Начало следующего дня
+
+    Returns:
+        Количество документов по (user_id, file_type)
+    """
+    refunds: Dict[tuple, int] = {}
+    for row in rows:
+        if today_start <= row.upload_date < tomorrow_start:
+            key = (row.user_id, row.file_type)
+            refunds[key] = refunds.get(key, 0) + 1
+    return refunds
+
+
+# ============================================================================
+# ПОСТРОИТЕЛИ ЗАПРОСОВ
+# ============================================================================
+
+def build_usage_delta(
+    user_id: int,
+    file_type: str,
+    storage: float = 0,
+    daily: float = 0,
+    today: Optional[date] = None
+):
+    """
+    Построить атомарный UPDATE счётчиков пользователя.
+
+    При смене дня дневные счётчики обнуляются в том же UPDATE.
+
+    Args:
+        user_id: ID пользователя
+        file_type: Тип документа
+        storage: Изменение счётчика хранилища
+        daily: Изменение дневного счётчика
+        today: Текущая дата (по умолчанию - сегодня)
+
+    Returns:
+        UPDATE запрос
+    """
+    storage_column, daily_column = USAGE_COLUMNS[file_type]
+    values = {"updated_at": datetime.now()}
+
+    if storage:
+        values[storage_column] = getattr(UserUsage, storage_column) + storage
+
+    if daily:
+        today = today or get_today_range()[0].date()
+        same_day = UserUsage.usage_day == today
+
+        for column in DAILY_COLUMNS:
+            current = case((same_day, getattr(UserUsage, column)), else_=0)
+            values[column] = current + daily if column == daily_column else current
+
+        values["usage_day"] = today
+
+    return (
+        update(UserUsage)
+        .where(UserUsage.user_id == user_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def build_usage_aggregate(user_ids: Iterable[int], today_start: datetime, tomorrow_start: datetime):
+    """
+    Построить агрегат счётчиков по user_documents (эталон для сверки).
+
+    Args:
+        user_ids: ID пользователей
+        today_start: Начало текущего дня
+        tomorrow_start: Начало следующего дня
+
+    Returns:
+        SELECT с колонками user_usage, сгруппированный по user_id
+    """
+    live = UserDocument.is_deleted == False
+    completed = and_(live, UserDocument.status == DocumentStatus.COMPLETED)
+    uploaded_today = and_(
+        UserDocument.upload_date >= today_start,
+        UserDocument.upload_date < tomorrow_start
+    )
+
+    def count_where(*conditions):
+        return func.count(case((and_(*conditions), UserDocument.id)))
+
+    def hours_where(*conditions):
+        return func.coalesce(
+            func.sum(case((and_(*conditions), UserDocument.duration_hours), else_=0)),
+            0
+        )
+
+    return select(
+        UserDocument.user_id,
+        count_where(UserDocument.file_type == "text", live).label("texts_count"),
+        count_where(UserDocument.file_type == "photo", completed).label("photos_count"),
+        count_where(UserDocument.file_type == "file", completed).label("files_count"),
+        hours_where(UserDocument.file_type == "video", completed).label("video_hours"),
+        count_where(UserDocument.file_type == "text", live, uploaded_today).label("daily_texts"),
+        count_where(UserDocument.file_type == "photo", uploaded_today).label("daily_photos"),
+        count_where(UserDocument.file_type == "file", uploaded_today).label("daily_files"),
+        hours_where(UserDocument.file_type == "video", uploaded_today).label("daily_video_hours"),
+    ).where(
+        UserDocument.user_id.in_(list(user_ids))
+    ).group_by(UserDocument.user_id)
+
+
+def build_usage_lock(user_ids: Iterable[int]):
+    """
+    Построить SELECT ... FOR UPDATE строк user_usage.
+
+    Блокировка до подсчёта агрегатов не даёт параллельной загрузке
+    потерять своё изменение при сверке.
+    """
+    return (
+        select(UserUsage)
+        .where(UserUsage.user_id.in_(list(user_ids)))
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+def apply_reconciled(
+    existing: Dict[int, UserUsage],
+    aggregates: Dict[int, object],
+    user_ids: Iterable[int],
+    today: date
+) -> List[UserUsage]:
+    """
+    Записать пересчитанные значения в строки user_usage.
+
+    Args:
+        existing: Существующие строки по user_id
+        aggregates: Результаты build_usage_aggregate по user_id
+        user_ids: ID пересчитываемых пользователей
+        today: Текущая дата
+
+    Returns:
+        Новые строки, которые нужно добавить в сессию
+    """
+    created = []
+
+    for user_id in user_ids:
+        usage = existing.get(user_id)
+        if usage is None:
+            usage = UserUsage(user_id=user_id)
+            created.append(usage)
+
+        row = aggregates.get(user_id)
+        for storage_column, daily_column in USAGE_COLUMNS.values():
+            setattr(usage, storage_column, getattr(row, storage_column) if row else 0)
+            setattr(usage, daily_column, getattr(row, daily_column) if row else 0)
+
+        usage.usage_day = today
+        usage.updated_at = datetime.now()
+
+    return created
+
+
+def reconcile_usage_sync(db: Session, user_ids: List[int]) -> int:
+    """
+    Пересчитать счётчики пользователей по user_documents (синхронно, для Celery).
+
+    Коммит выполняет вызывающий код.
+
+    Args:
+        db: Синхронная сессия БД
+        user_ids: ID пользователей
+
+    Returns:
+        Количество пересчитанных пользователей
+    """
+    today_start, tomorrow_start = get_today_range()
+
+    existing = {usage.user_id: usage for usage in db.scalars(build_usage_lock(user_ids))}
+    aggregates = {row.user_id: row for row in db.execute(build_usage_aggregate(user_ids, today_start, tomorrow_start))}
+
+    db.add_all(apply_reconciled(existing, aggregates, user_ids, today_start.date()))
+
+    return len(user_ids)
+
+
+class UsageService:
+    """Сервис счётчиков использования базы знаний."""
+
+    def __init__(self, db: AsyncSession):
+        """
+        Инициализация сервиса.
+
+        Args:
+            db: Асинхронная сессия базы данных
+        """
+        self.db = db
+
+    async def get_usage(self, user_id: int) -> UsageSnapshot:
+        """
+        Получить текущее использование пользователя (один запрос по PK).
+
+        Если строки ещё нет, она создаётся пересчётом по документам.
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            Снимок использования
+        """
+        usage = await self.db.get(UserUsage, user_id, populate_existing=True)
+
+        if usage is None:
+            await self.reconcile([user_id])
+            await self.db.commit()
+            usage = await self.db.get(UserUsage, user_id)
+
+        return UsageSnapshot.from_row(usage, get_today_range()[0].date())
+
+    async def apply_delta(
+        self,
+        user_id: int,
+        file_type: str,
+        storage: float = 0,
+        daily: float = 0
+    ) -> None:
+        """
+        Изменить счётчики в текущей транзакции (коммит - за вызывающим кодом).
+
+        Args:
+            user_id: ID пользователя
+            file_type: Тип документа
+            storage: Изменение счётчика хранилища
+            daily: Изменение дневного счётчика
+        """
+        if not storage and not daily:
+            return
+
+        result = await self.db.execute(build_usage_delta(user_id, file_type, storage, daily))
+
+        if result.rowcount == 0:
+            # Строки нет (пользователь создан до появления счётчиков) -
+            # пересчитываем с учётом изменений текущей транзакции
+            await self.db.flush()
+            await self.reconcile([user_id])
+
+    async def reconcile(self, user_ids: List[int]) -> int:
+        """
+        Пересчитать счётчики пользователей по user_documents.
+
+        Коммит выполняет вызывающий код.
+
+        Args:
+            user_ids: ID пользователей
+
+        Returns:
+            Количество пересчитанных пользователей
+        """
+        today_start, tomorrow_start = get_today_range()
+
+        existing = {usage.user_id: usage for usage in await self.db.scalars(build_usage_lock(user_ids))}
+        result = await self.db.execute(build_usage_aggregate(user_ids, today_start, tomorrow_start))
+        aggregates = {row.user_id: row for row in result}
+
+        self.db.add_all(apply_reconciled(existing, aggregates, user_ids, today_start.date()))
+
+        logger.info(f"Пересчитаны счётчики использования: {len(user_ids)} польз.")
+
+        return len(user_ids)
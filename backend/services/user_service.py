@@ -5,14 +5,17 @@
 и управления пользователями.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from datetime import datetime
 from typing import Optional, Tuple, Dict, Any
 import logging
 
-from backend.models import User, UserSubscription, SubscriptionTier
+from backend.models import User, UserUsage, UserDailyAction
 from backend import schemas
+from backend.services.date_utils import get_today_range
+from backend.services.usage_service import UsageService
+from backend.services.stats_cache import stats_cache
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +23,16 @@ logger = logging.getLogger(__name__)
 class UserService:
     """Сервис для управления пользователями."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Инициализация сервиса.
 
         Args:
-            db: Сессия базы данных
+            db: Асинхронная сессия базы данных
         """
         self.db = db
 
-    def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
+    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         """
         Получить пользователя по Telegram ID.
 
@@ -39,11 +42,12 @@ class UserService:
         Returns:
             Объект User или None если не найден
         """
-        return self.db.query(User).filter(
-            User.telegram_id == telegram_id
-        ).first()
+        result = await self.db.execute(
+            select(User).filter(User.telegram_id == telegram_id)
+        )
+        return result.scalars().first()
 
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
         """
         Получить пользователя по ID в базе.
 
@@ -53,9 +57,10 @@ class UserService:
         Returns:
             Объект User или None если не найден
         """
-        return self.db.query(User).filter(User.id == user_id).first()
+        result = await self.db.execute(select(User).filter(User.id == user_id))
+        return result.scalars().first()
 
-    def create_user(
+    async def create_user(
         self,
         telegram_id: int,
         username: Optional[str] = None,
@@ -76,18 +81,20 @@ class UserService:
             telegram_id=telegram_id,
             username=username,
             referral_code=f"REF{telegram_id}",
-            referred_by=referred_by
+            referred_by=referred_by,
+            # Пустые счётчики использования создаются вместе с пользователем
+            usage=UserUsage(usage_day=get_today_range()[0].date())
         )
 
         self.db.add(new_user)
-        self.db.commit()
-        self.db.refresh(new_user)
+        await self.db.commit()
+        await self.db.refresh(new_user)
 
         logger.info(f"Создан пользователь: id={new_user.id}, telegram_id={telegram_id}")
 
         return new_user
 
-    def register_or_get_user(
+    async def register_or_get_user(
         self,
         telegram_id: int,
         username: Optional[str] = None,
@@ -105,23 +112,55 @@ class UserService:
             Пользователь (существующий или новый)
         """
         # Проверяем существование
-        existing_user = self.get_user_by_telegram_id(telegram_id)
+        existing_user = await self.get_user_by_telegram_id(telegram_id)
 
         if existing_user:
             logger.info(f"Пользователь {telegram_id} уже существует")
             return existing_user
 
         # Создаем нового
-        new_user = self.create_user(telegram_id, username, referred_by)
+        new_user = await self.create_user(telegram_id, username, referred_by)
 
         # Выдаем бесплатную подписку
         from backend.services.subscription_service import SubscriptionService
         subscription_service = SubscriptionService(self.db)
-        subscription_service.assign_free_subscription(new_user.id)
+        await subscription_service.assign_free_subscription(new_user.id)
 
         return new_user
 
-    def get_user_stats(self, telegram_id: int) -> Dict[str, Any]:
+    async def log_ai_query(self, telegram_id: int, document_id: Optional[int] = None) -> int:
+        """
+        Записать запрос пользователя к ИИ (учитывается в дневном лимите сообщений).
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            document_id: ID документа, по которому задан вопрос (опционально)
+
+        Returns:
+            ID записи действия
+
+        Raises:
+            ValueError: Если пользователь не найден
+        """
+        user = await self.get_user_by_telegram_id(telegram_id)
+        if not user:
+            raise ValueError(f"User with telegram_id={telegram_id} not found")
+
+        action = UserDailyAction(
+            user_id=user.id,
+            document_id=document_id,
+            action_date=datetime.now(),
+            action_type="ai_query"
+        )
+
+        self.db.add(action)
+        await self.db.commit()
+
+        await stats_cache.invalidate(telegram_id)
+
+        return action.id
+
+    async def get_user_stats(self, telegram_id: int) -> Dict[str, Any]:
         """
         Получить статистику пользователя для главного меню.
 
@@ -134,74 +173,34 @@ class UserService:
         Raises:
             ValueError: Если пользователь не найден
         """
-        from backend.models import UserDocument, UserDailyAction
-        from sqlalchemy import case, and_
-
         # Получаем пользователя
-        user = self.get_user_by_telegram_id(telegram_id)
+        user = await self.get_user_by_telegram_id(telegram_id)
         if not user:
             raise ValueError(f"User with telegram_id={telegram_id} not found")
 
-        # Получаем активную подписку с тарифом
-        from sqlalchemy.orm import joinedload
+        # Получаем активную подписку (тариф - из каталога в памяти)
+        from backend.services.subscription_service import SubscriptionService
 
-        active_subscription = self.db.query(UserSubscription).options(
-            joinedload(UserSubscription.tier)
-        ).filter(
-            UserSubscription.user_id == user.id,
-            UserSubscription.status == "active"
-        ).first()
+        subscription_info = await SubscriptionService(self.db).get_active_subscription(user.id)
 
-        if not active_subscription:
+        if not subscription_info:
             raise ValueError(f"User {telegram_id} has no active subscription")
 
-        tier = active_subscription.tier
+        active_subscription, tier = subscription_info
 
         # Считаем сообщения сегодня
-        today = func.date(func.now())
-        messages_today = self.db.query(UserDailyAction).filter(
-            UserDailyAction.user_id == user.id,
-            UserDailyAction.action_type == "ai_query",
-            func.date(UserDailyAction.action_date) == today
-        ).count()
-
-        # ОПТИМИЗИРОВАННЫЙ запрос статистики по документам (один запрос)
-        stats = self.db.query(
-            # Общее хранилище
-            func.coalesce(
-                func.sum(case((UserDocument.file_type == "video", UserDocument.duration_hours), else_=0)),
-                0
-            ).label("video_hours"),
-            func.count(case((UserDocument.file_type == "file", UserDocument.id))).label("files_count"),
-            func.count(case((UserDocument.file_type == "photo", UserDocument.id))).label("photos_count"),
-            func.count(case((UserDocument.file_type == "text", UserDocument.id))).label("texts_count"),
-
-            # Дневное использование
-            func.coalesce(
-                func.sum(case(
-                    (and_(UserDocument.file_type == "video", func.date(UserDocument.upload_date) == today),
-                     UserDocument.duration_hours),
-                    else_=0
-                )),
-                0
-            ).label("daily_video_hours"),
-            func.count(case(
-                (and_(UserDocument.file_type == "file", func.date(UserDocument.upload_date) == today),
-                 UserDocument.id)
-            )).label("daily_files"),
-            func.count(case(
-                (and_(UserDocument.file_type == "photo", func.date(UserDocument.upload_date) == today),
-                 UserDocument.id)
-            )).label("daily_photos"),
-            func.count(case(
-                (and_(UserDocument.file_type == "text", func.date(UserDocument.upload_date) == today),
-                 UserDocument.id)
-            )).label("daily_texts"),
-        ).filter(
-            UserDocument.user_id == user.id,
-            UserDocument.status == "completed",
-            UserDocument.is_deleted == False
-        ).first()
+        today_start, tomorrow_start = get_today_range()
+        messages_today = await self.db.scalar(
+            select(func.count(UserDailyAction.id)).filter(
+                UserDailyAction.user_id == user.id,
+                UserDailyAction.action_type == "ai_query",
+                UserDailyAction.action_date >= today_start,
+                UserDailyAction.action_date < tomorrow_start
+            )
+        )
+
+        # Использование базы знаний - одна строка user_usage по первичному ключу
+        stats = await UsageService(self.db).get_usage(user.id)
 
         # Формируем ответ
         return {
@@ -0,0 +1,261 @@
+"""
+Профилировщик SQL запросов (включается settings.SQL_PROFILER_ENABLED).
+
+Связи User.documents, UserDocument.actions, SupportTicket.messages
+загружаются лениво, и лишние запросы видны только по росту задержки.
+Профилировщик на событиях SQLAlchemy before/after_cursor_execute:
+- группирует запросы по запросу API (SqlProfilerMiddleware) или задаче
+  Celery (profile_celery_tasks);
+- отмечает одинаковые запросы, повторённые не меньше
+  settings.SQL_N_PLUS_ONE_THRESHOLD раз (признак N+1);
+- пишет в лог медленные запросы (settings.SQL_SLOW_QUERY_MS) с
+  параметрами и планом EXPLAIN.
+
+Сводку по запросу API можно получить, отправив заголовок X-SQL-Profile:
+она вернётся в одноимённом заголовке ответа.
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Заголовок запроса (включает сводку) и ответа (содержит сводку)
+PROFILE_HEADER = "X-SQL-Profile"
+
+# Длина текста запроса и параметров в логе и сводке
+STATEMENT_PREVIEW_CHARS = 300
+PARAMETERS_PREVIEW_CHARS = 500
+
+# Повторяющихся запросов в сводке заголовка
+SUMMARY_REPEATED_LIMIT = 5
+
+# Префикс EXPLAIN по диалекту БД
+EXPLAIN_PREFIXES = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+
+def _preview(value, limit: int) -> str:
+    text = " ".join(str(value).split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class SqlProfile:
+    """SQL запросы одного запроса API или задачи Celery."""
+
+    def __init__(self, label: str):
+        """
+        Args:
+            label: Что профилируется ("GET /kb/documents/1", "task backend.s3_storage.process_file")
+        """
+        self.label = label
+        self.queries = 0
+        self.total_seconds = 0.0
+        self.slow = 0
+        self.statements: Counter = Counter()
+
+    def add(self, statement: str, seconds: float, slow: bool) -> None:
+        self.queries += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if slow:
+            self.slow += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[tuple]:
+        """
+        Запросы, повторённые не меньше threshold раз (признак N+1).
+
+        Returns:
+            Список пар (текст запроса, количество) по убыванию количества
+        """
+        threshold = threshold or settings.SQL_N_PLUS_ONE_THRESHOLD
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self) -> Dict:
+        """Сводка: количество и время запросов, медленные и повторяющиеся запросы."""
+        return {
+            "queries": self.queries,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "slow": self.slow,
+            "repeated": [
+                {"statement": _preview(statement, STATEMENT_PREVIEW_CHARS), "count": count}
+                for statement, count in self.repeated()[:SUMMARY_REPEATED_LIMIT]
+            ],
+        }
+
+    def report(self) -> None:
+        """Записать в лог признаки N+1 и итог профилирования."""
+        for statement, count in self.repeated():
+            logger.warning(
+                f"Возможный N+1 в {self.label}: {count} одинаковых запросов: "
+                f"{_preview(statement, STATEMENT_PREVIEW_CHARS)}"
+            )
+
+        logger.debug(f"SQL {self.label}: {self.queries} запросов, {self.total_seconds * 1000:.1f} мс")
+
+
+# Профиль текущего запроса API или задачи
+_current_profile: ContextVar[Optional[SqlProfile]] = ContextVar("sql_profile", default=None)
+
+
+def start_profile(label: str):
+    """
+    Начать профилирование (до stop_profile запросы относятся к нему).
+
+    Returns:
+        Токен для stop_profile
+    """
+    return _current_profile.set(SqlProfile(label))
+
+
+def stop_profile(token) -> Optional[SqlProfile]:
+    """
+    Закончить профилирование и записать итог в лог.
+
+    Returns:
+        Профиль с собранными запросами
+    """
+    profile = _current_profile.get()
+    _current_profile.reset(token)
+
+    if profile is not None:
+        profile.report()
+
+    return profile
+
+
+# ============================================================================
+# СОБЫТИЯ SQLALCHEMY
+# ============================================================================
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+
+    # Курсор DBAPI напрямую: без событий SQLAlchemy и без записи в профиль
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_profiler_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["sql_profiler_started"].pop()
+    slow = elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS
+
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add(statement, elapsed, slow)
+
+    if not slow:
+        return
+
+    label = profile.label if profile is not None else "вне запроса"
+    message = (
+        f"Медленный SQL ({elapsed * 1000:.0f} мс, {label}): {_preview(statement, STATEMENT_PREVIEW_CHARS)} "
+        f"| параметры: {_preview(parameters, PARAMETERS_PREVIEW_CHARS)}"
+    )
+
+    if settings.SQL_PROFILER_EXPLAIN and not executemany:
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            plan = f"не удалось получить: {e}"
+        if plan:
+            message += f"\n{plan}"
+
+    logger.warning(message)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    started = connection.info.get("sql_profiler_started") if connection is not None else None
+    if started:
+        started.pop()
+
+
+def install_sql_profiler(engine) -> None:
+    """
+    Подключить профилировщик к движку (повторный вызов ничего не делает).
+
+    Args:
+        engine: Синхронный движок (для асинхронного - async_engine.sync_engine)
+    """
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# ============================================================================
+# ЗАПРОСЫ API И ЗАДАЧИ CELERY
+# ============================================================================
+
+class SqlProfilerMiddleware:
+    """ASGI middleware: профиль SQL на каждый запрос API (если профилировщик включён)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        token = start_profile(f"{scope['method']} {scope['path']}")
+        profile = _current_profile.get()
+        with_header = PROFILE_HEADER.lower() in Headers(scope=scope)
+
+        async def send_wrapper(message):
+            # Сводка по запросам, выполненным до начала ответа
+            if with_header and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_HEADER] = json.dumps(profile.summary())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_profile(token)
+
+
+# Токены профилей выполняемых задач по ID задачи
+_task_tokens: Dict[str, object] = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    _task_tokens[task_id] = start_profile(f"task {task.name}")
+
+
+def _task_postrun(task_id=None, **kwargs):
+    token = _task_tokens.pop(task_id, None)
+    if token is not None:
+        stop_profile(token)
+
+
+def profile_celery_tasks() -> None:
+    """Профиль SQL на каждую задачу Celery (сигналы task_prerun/task_postrun)."""
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False)
+    task_postrun.connect(_task_postrun, weak=False)
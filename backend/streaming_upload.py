@@ -0,0 +1,166 @@
+"""
+Потоковый приём multipart/form-data с загрузкой файлов в S3.
+
+Тело запроса разбирается по мере поступления: данные каждого файла сразу
+уходят в S3 частями (S3StreamUpload), поэтому в памяти API держится не
+больше одной части на запрос, а превышение размера обнаруживается
+до получения файла целиком.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+from backend.object_storage import S3StreamUpload, delete_from_s3
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLarge(Exception):
+    """Файл или запрос превышает допустимый размер."""
+
+
+@dataclass
+class StreamedFile:
+    """Файл, загруженный в S3 из multipart запроса."""
+
+    filename: str
+    content_type: str
+    s3_key: str
+    size: int
+
+
+async def stream_files_to_s3(
+    request: Request,
+    field_name: str,
+    make_key: Callable[[str], str],
+    run_blocking: Callable[..., Awaitable],
+    max_file_size: int,
+    max_files: int,
+    content_type: Optional[str] = None
+) -> List[StreamedFile]:
+    """
+    Принять файлы из multipart запроса и загрузить их в S3.
+
+    Части с другим именем поля и без имени файла пропускаются.
+    При ошибке незавершённая загрузка отменяется, а уже загруженные
+    файлы этого запроса удаляются из S3.
+
+    Args:
+        request: Запрос FastAPI
+        field_name: Имя поля формы с файлами
+        make_key: Функция ключа S3 по имени файла
+        run_blocking: Запуск блокирующей функции в пуле потоков
+        max_file_size: Максимальный размер одного файла в байтах
+        max_files: Максимальное количество файлов
+        content_type: MIME тип объектов в S3 (по умолчанию - из заголовка части)
+
+    Returns:
+        Загруженные файлы в порядке следования в запросе
+
+    Raises:
+        UploadTooLarge: Превышен размер файла или запроса
+        ValueError: Некорректный запрос или слишком много файлов
+    """
+    media_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if media_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected multipart/form-data")
+
+    # Заведомо слишком большой запрос отклоняется до чтения тела
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > max_files * max_file_size + 64 * 1024:
+        raise UploadTooLarge("Request too large")
+
+    # Парсер вызывает колбэки синхронно - события обрабатываются после каждого блока
+    events = []
+    headers = {}
+    header = {"field": bytearray(), "value": bytearray()}
+
+    def on_header_end():
+        headers[bytes(header["field"]).lower()] = bytes(header["value"])
+        header["field"].clear()
+        header["value"].clear()
+
+    callbacks = {
+        "on_part_begin": headers.clear,
+        "on_header_field": lambda data, start, end: header["field"].extend(data[start:end]),
+        "on_header_value": lambda data, start, end: header["value"].extend(data[start:end]),
+        "on_header_end": on_header_end,
+        "on_headers_finished": lambda: events.append(("begin", dict(headers))),
+        "on_part_data": lambda data, start, end: events.append(("data", bytes(data[start:end]))),
+        "on_part_end": lambda: events.append(("end", None)),
+    }
+    parser = MultipartParser(params[b"boundary"], callbacks)
+
+    uploaded: List[StreamedFile] = []
+    state = {"upload": None, "file": None}
+
+    async def handle(kind, payload):
+        if kind == "begin":
+            _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+            name = disposition.get(b"name", b"").decode()
+            filename = disposition.get(b"filename", b"").decode()
+
+            if name != field_name or not filename:
+                state["upload"] = None
+                return
+
+            if len(uploaded) >= max_files:
+                raise ValueError(f"Too many files (max {max_files})")
+
+            part_type = payload.get(b"content-type", b"application/octet-stream").decode()
+            state["file"] = StreamedFile(filename=filename, content_type=part_type, s3_key=make_key(filename), size=0)
+            state["upload"] = S3StreamUpload(state["file"].s3_key, content_type=content_type or part_type)
+
+        elif kind == "data":
+            upload = state["upload"]
+            if upload is None:
+                return
+
+            part_ready = upload.feed(payload)
+
+            if upload.size > max_file_size:
+                raise UploadTooLarge(f"File too large: {state['file'].filename}")
+
+            if part_ready:
+                await run_blocking(upload.upload_part)
+
+        elif kind == "end" and state["upload"] is not None:
+            upload, streamed = state["upload"], state["file"]
+
+            await run_blocking(upload.complete)
+            state["upload"] = None
+            streamed.size = upload.size
+            uploaded.append(streamed)
+
+    async def cleanup():
+        if state["upload"] is not None:
+            await run_blocking(state["upload"].abort)
+        for streamed in uploaded:
+            await run_blocking(delete_from_s3, streamed.s3_key)
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, payload in events:
+                await handle(kind, payload)
+            events.clear()
+
+        parser.finalize()
+        for kind, payload in events:
+            await handle(kind, payload)
+
+    except MultipartParseError as e:
+        await cleanup()
+        raise ValueError(f"Invalid multipart body: {e}")
+    except Exception:
+        await cleanup()
+        raise
+
+    logger.info(f"Принято файлов из потока: {len(uploaded)} ({sum(f.size for f in uploaded)} байт)")
+
+    return uploaded
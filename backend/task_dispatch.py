@@ -0,0 +1,163 @@
+"""
+Пакетная постановка задач Celery.
+
+Задачи пакета публикуются одной группой (celery.group): все сообщения
+отправляются через один producer и одно соединение с брокером, а не
+отдельным apply_async на каждый документ. Группа сохраняется в result
+backend, поэтому её статус можно запросить целиком по group_id.
+
+Статусы произвольного набора задач читаются из result backend
+одним MGET.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from celery import group
+from celery.result import AsyncResult, GroupResult
+
+from backend.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Итоговые состояния задачи
+SUCCESS_STATES = {"success"}
+FAILURE_STATES = {"failure", "revoked"}
+
+
+@dataclass
+class DispatchedGroup:
+    """Поставленная в очередь группа задач."""
+
+    group_id: str
+    task_ids: List[str]
+
+
+def dispatch_group(task, args_list: Sequence[Sequence[Any]], priority: Optional[int] = None) -> DispatchedGroup:
+    """
+    Поставить задачи пакета в очередь одной группой.
+
+    Блокирующий вызов (брокер, result backend) - из API вызывать через run_blocking.
+
+    Args:
+        task: Задача Celery
+        args_list: Аргументы задачи для каждого элемента пакета
+        priority: Приоритет задач (0 - высший)
+
+    Returns:
+        ID группы и ID задач в порядке args_list
+    """
+    signatures = [task.signature(args=list(args), priority=priority) for args in args_list]
+
+    result = group(signatures).apply_async()
+    # Состав группы сохраняется в result backend для запроса статуса
+    result.save()
+
+    task_ids = [child.id for child in result.results]
+    logger.info(f"Группа задач {task.name} поставлена в очередь: group_id={result.id}, задач={len(task_ids)}")
+
+    return DispatchedGroup(group_id=result.id, task_ids=task_ids)
+
+
+def _status_item(task_id: str, state: str, info: Any) -> Dict[str, Any]:
+    return {
+        "task_id": task_id,
+        "status": state.lower(),
+        "progress": info.get('progress') if isinstance(info, dict) else None,
+        "error": str(info) if state.lower() in FAILURE_STATES else None
+    }
+
+
+def _task_status(result) -> Dict[str, Any]:
+    return _status_item(result.id, result.state, result.info)
+
+
+def get_tasks_status(task_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Получить статусы задач одним запросом к result backend.
+
+    Для Redis backend метаданные всех задач читаются одним MGET;
+    задачи без записи в backend считаются pending. Для остальных
+    backend - по одному запросу на задачу.
+
+    Блокирующий вызов (result backend) - из API вызывать через run_blocking.
+
+    Args:
+        task_ids: ID задач
+
+    Returns:
+        Статусы задач в порядке task_ids
+    """
+    if not task_ids:
+        return []
+
+    from celery.backends.redis import RedisBackend
+
+    backend = celery_app.backend
+
+    if not isinstance(backend, RedisBackend):
+        return [_task_status(AsyncResult(task_id, app=celery_app)) for task_id in task_ids]
+
+    values = backend.mget([backend.get_key_for_task(task_id) for task_id in task_ids])
+
+    statuses = []
+    for task_id, value in zip(task_ids, values):
+        meta = backend.decode_result(value) if value else {"status": "PENDING", "result": None}
+        statuses.append(_status_item(task_id, meta["status"], meta["result"]))
+
+    return statuses
+
+
+def get_group_status(group_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Получить статус группы задач: по каждой задаче и общий.
+
+    Общий статус:
+    - pending - ни одна задача не начата;
+    - processing - есть незавершённые задачи;
+    - completed - все задачи выполнены успешно;
+    - failed - все задачи завершились с ошибкой;
+    - partial - задачи завершены, часть с ошибкой.
+
+    Блокирующий вызов (result backend) - из API вызывать через run_blocking.
+
+    Args:
+        group_id: ID группы
+
+    Returns:
+        Статус группы или None если группа не найдена
+    """
+    result = GroupResult.restore(group_id, app=celery_app)
+    if result is None:
+        return None
+
+    tasks = [_task_status(child) for child in result.results]
+    states = [task["status"] for task in tasks]
+
+    total = len(states)
+    completed = sum(state in SUCCESS_STATES for state in states)
+    failed = sum(state in FAILURE_STATES for state in states)
+    pending = sum(state == "pending" for state in states)
+
+    if completed + failed == total:
+        if failed == 0:
+            status = "completed"
+        elif completed == 0:
+            status = "failed"
+        else:
+            status = "partial"
+    elif pending == total:
+        status = "pending"
+    else:
+        status = "processing"
+
+    return {
+        "group_id": group_id,
+        "status": status,
+        "total": total,
+        "completed": completed,
+        "failed": failed,
+        "pending": pending,
+        "tasks": tasks
+    }
@@ -0,0 +1,60 @@
+"""
+Лёгкие заглушки Celery задач для API.
+
+API только ставит задачи в очередь, поэтому ему не нужны реализации
+из backend/s3_storage.py с тяжёлыми зависимостями (yt_dlp, ffmpeg,
+pdf2image, docx). Заглушка знает имя задачи и создаёт подпись через
+celery_app - сообщение в брокере такое же, как от самой задачи.
+"""
+
+from typing import Optional, Sequence
+
+from celery.canvas import Signature
+
+from backend.celery_app import celery_app
+
+
+class TaskStub:
+    """Задача, известная API только по имени."""
+
+    def __init__(self, name: str):
+        """
+        Инициализация.
+
+        Args:
+            name: Имя зарегистрированной в worker задачи
+        """
+        self.name = name
+
+    def signature(self, args: Optional[Sequence] = None, **options) -> Signature:
+        """
+        Создать подпись задачи.
+
+        Args:
+            args: Позиционные аргументы задачи
+            **options: Опции отправки (priority, queue и т.д.)
+
+        Returns:
+            Подпись задачи для group/chain или apply_async
+        """
+        return celery_app.signature(self.name, args=args, **options)
+
+    def apply_async(self, args: Optional[Sequence] = None, **options):
+        """Поставить задачу в очередь."""
+        return celery_app.send_task(self.name, args=args, **options)
+
+    def delay(self, *args):
+        """Поставить задачу в очередь с позиционными аргументами."""
+        return self.apply_async(args=args)
+
+    def __repr__(self) -> str:
+        return f"<TaskStub {self.name}>"
+
+
+# Задачи обработки документов (реализации - backend/s3_storage.py)
+process_video = TaskStub('backend.s3_storage.process_video')
+process_photo_ocr = TaskStub('backend.s3_storage.process_photo_ocr')
+process_file = TaskStub('backend.s3_storage.process_file')
+
+# Фоновое удаление объектов из S3
+delete_s3_objects = TaskStub('backend.s3_storage.delete_s3_objects')
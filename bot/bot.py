@@ -17,7 +17,7 @@ import signal
 import sys
 import logging
 
-from shared.config import settings, CONTENT_CONFIG
+from shared.config import settings, CONTENT_CONFIG, configure_logging
 from utils.bot_utils import api_request, get_user_stats, logger
 
 # Импорт handlers из модулей
@@ -54,6 +54,7 @@ from bot.handlers import (
     my_videos,
     my_photos,
     my_files_docs,
+    documents_page,
     view_document,
     show_photo_original,
     delete_document,
@@ -310,6 +311,8 @@ async def shutdown(application):
 def main():
     """Запуск бота с регистрацией всех handlers."""
 
+    configure_logging('app.log')
+
     # Создание приложения
     app = ApplicationBuilder().token(settings.TELEGRAM_TOKEN).build()
 
@@ -393,6 +396,7 @@ def main():
     app.add_handler(CallbackQueryHandler(my_videos, pattern="^my_videos$"))
     app.add_handler(CallbackQueryHandler(my_photos, pattern="^my_photos$"))
     app.add_handler(CallbackQueryHandler(my_files_docs, pattern="^my_files_docs$"))
+    app.add_handler(CallbackQueryHandler(documents_page, pattern=r"^page_(text|video|photo|file)_\d+$"))
     app.add_handler(CallbackQueryHandler(view_document, pattern="^view_doc_"))
     app.add_handler(CallbackQueryHandler(show_photo_original, pattern="^show_photo_"))
     app.add_handler(CallbackQueryHandler(delete_document, pattern="^delete_doc_"))
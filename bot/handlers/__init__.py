@@ -47,6 +47,7 @@ from .document_handlers import (
     my_videos,
     my_photos,
     my_files_docs,
+    documents_page,
     view_document,
     show_photo_original,
     delete_document
@@ -85,6 +86,7 @@ __all__ = [
     'my_videos',
     'my_photos',
     'my_files_docs',
+    'documents_page',
     'view_document',
     'show_photo_original',
     'delete_document',
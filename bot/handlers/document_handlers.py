@@ -11,6 +11,7 @@ from utils.bot_utils import (
     api_request,
     get_user_stats,
     ButtonFactory,
+    fetch_documents_page,
     paginate_documents,
     logger
 )
@@ -105,8 +106,8 @@ async def my_texts(update: Update, context):
 
     user = query.from_user
 
-    # Получаем документы
-    success, data, error = await api_request("GET", f"/kb/documents/{user.id}")
+    # Получаем первую страницу (фильтрация и сортировка - на сервере)
+    success, data, error = await fetch_documents_page(user.id, "text")
 
     if not success:
         await query.edit_message_text(
@@ -115,11 +116,7 @@ async def my_texts(update: Update, context):
         )
         return
 
-    all_documents = data.get("documents", [])
-
-    # Фильтруем тексты
-    texts = [doc for doc in all_documents if doc["file_type"] == "text"]
-    texts.sort(key=lambda x: x["upload_date"])
+    texts = data.get("documents", [])
 
     # Если пусто
     if not texts:
@@ -133,7 +130,7 @@ async def my_texts(update: Update, context):
         return
 
     # Пагинация
-    await paginate_documents(texts, "text", context, query, user.id)
+    await paginate_documents(data, "text", context, query, user.id)
 
 
 async def my_videos(update: Update, context):
@@ -149,8 +146,8 @@ async def my_videos(update: Update, context):
 
     user = query.from_user
 
-    # Получаем документы
-    success, data, error = await api_request("GET", f"/kb/documents/{user.id}")
+    # Получаем первую страницу (фильтрация и сортировка - на сервере)
+    success, data, error = await fetch_documents_page(user.id, "video")
 
     if not success:
         await query.edit_message_text(
@@ -159,11 +156,7 @@ async def my_videos(update: Update, context):
         )
         return
 
-    all_documents = data.get("documents", [])
-
-    # Фильтруем видео
-    videos = [doc for doc in all_documents if doc["file_type"] == "video" and doc.get("status") == "completed"]
-    videos.sort(key=lambda x: x["upload_date"])
+    videos = data.get("documents", [])
 
     # Если пусто
     if not videos:
@@ -177,7 +170,7 @@ async def my_videos(update: Update, context):
         return
 
     # Пагинация
-    await paginate_documents(videos, "video", context, query, user.id)
+    await paginate_documents(data, "video", context, query, user.id)
 
 
 async def my_photos(update: Update, context):
@@ -193,8 +186,8 @@ async def my_photos(update: Update, context):
 
     user = query.from_user
 
-    # Получаем документы
-    success, data, error = await api_request("GET", f"/kb/documents/{user.id}")
+    # Получаем первую страницу (фильтрация и сортировка - на сервере)
+    success, data, error = await fetch_documents_page(user.id, "photo")
 
     if not success:
         if query.message.photo:
@@ -204,11 +197,7 @@ async def my_photos(update: Update, context):
             await query.edit_message_text(Messages.ERROR_DATA)
         return
 
-    all_documents = data.get("documents", [])
-
-    # Фильтруем фото
-    photos = [doc for doc in all_documents if doc["file_type"] == "photo" and doc["status"] == "completed"]
-    photos.sort(key=lambda x: x["upload_date"], reverse=True)
+    photos = data.get("documents", [])
 
     # Если пусто
     if not photos:
@@ -226,7 +215,7 @@ async def my_photos(update: Update, context):
         return
 
     # Пагинация
-    await paginate_documents(photos, "photo", context, query, user.id)
+    await paginate_documents(data, "photo", context, query, user.id)
 
 
 async def my_files_docs(update: Update, context):
@@ -242,8 +231,8 @@ async def my_files_docs(update: Update, context):
 
     user = query.from_user
 
-    # Получаем документы
-    success, data, error = await api_request("GET", f"/kb/documents/{user.id}")
+    # Получаем первую страницу (фильтрация и сортировка - на сервере)
+    success, data, error = await fetch_documents_page(user.id, "file")
 
     if not success:
         await query.edit_message_text(
@@ -252,11 +241,7 @@ async def my_files_docs(update: Update, context):
         )
         return
 
-    all_documents = data.get("documents", [])
-
-    # Фильтруем файлы
-    files = [doc for doc in all_documents if doc["file_type"] == "file" and doc["status"] == "completed"]
-    files.sort(key=lambda x: x["upload_date"], reverse=True)
+    files = data.get("documents", [])
 
     # Если пусто
     if not files:
@@ -270,14 +255,12 @@ async def my_files_docs(update: Update, context):
         return
 
     # Пагинация
-    await paginate_documents(files, "file", context, query, user.id)
+    await paginate_documents(data, "file", context, query, user.id)
 
 
-async def view_document(update: Update, context):
+async def documents_page(update: Update, context):
     """
-    Просмотр полного текста документа.
-
-    Разбивает длинный текст на части по 4000 символов.
+    Перейти на страницу списка документов (callback page_<тип>_<номер>).
 
     Args:
         update: Telegram Update
@@ -286,73 +269,98 @@ async def view_document(update: Update, context):
     query = update.callback_query
     await query.answer()
 
-    doc_id = int(query.data.split("_")[2])
     user = query.from_user
 
-    # Получаем документы
-    success, data, error = await api_request("GET", f"/kb/documents/{user.id}")
+    _, content_type, page = query.data.split("_")
+    page = int(page)
+
+    # Курсоры страниц сохраняются при показе списка; после перезапуска
+    # бота их нет - начинаем с первой страницы
+    state = context.user_data.get("doc_pages", {}).get(content_type)
+    if not state or page >= len(state["cursors"]):
+        page = 0
+    cursor = state["cursors"][page] if page else None
+
+    success, data, error = await fetch_documents_page(user.id, content_type, cursor)
 
     if not success:
-        await query.edit_message_text(Messages.ERROR_DATA)
+        if query.message.photo:
+            await query.message.delete()
+            await context.bot.send_message(user.id, Messages.ERROR_DATA)
+        else:
+            await query.edit_message_text(
+                Messages.ERROR_DATA,
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("◀️ Назад", callback_data="my_files")]])
+            )
         return
 
-    documents = data.get("documents", [])
-    document = next((d for d in documents if d["id"] == doc_id), None)
+    await paginate_documents(data, content_type, context, query, user.id, page)
 
-    if not document:
-        await query.edit_message_text("⚠️ Документ не найден.")
+
+async def view_document(update: Update, context):
+    """
+    Просмотр текста документа по частям.
+
+    Текст запрашивается фрагментами по Limits.MESSAGE_MAX_LENGTH символов;
+    части листаются кнопками (callback view_doc_<id>_<смещение>).
+
+    Args:
+        update: Telegram Update
+        context: Callback context
+    """
+    query = update.callback_query
+    await query.answer()
+
+    parts = query.data.split("_")
+    doc_id = int(parts[2])
+    offset = int(parts[3]) if len(parts) > 3 else 0
+    user = query.from_user
+
+    # Получаем только нужный фрагмент текста
+    success, data, error = await api_request(
+        "GET",
+        f"/kb/documents/{user.id}/{doc_id}/text",
+        params={"offset": offset, "length": Limits.MESSAGE_MAX_LENGTH}
+    )
+
+    if not success:
+        if error == "Document not found":
+            await query.edit_message_text("⚠️ Документ не найден.")
+        else:
+            await query.edit_message_text(Messages.ERROR_DATA)
         return
 
     # Определяем callback для кнопки "Назад"
-    file_type = document['file_type']
+    file_type = data['file_type']
     back_callback = CONTENT_CONFIG.get(file_type, {}).get("callbacks", {}).get("my_list", "my_files")
 
     # Формируем текст
     config = CONTENT_CONFIG.get(file_type, {})
     title = f"{config.get('icon', '📝')} Полный текст"
-    full_text = f"{title} {doc_id}\n\n{document['extracted_text']}"
-
-    # Разбиваем на части
-    text_parts = []
-    for i in range(0, len(full_text), Limits.MESSAGE_MAX_LENGTH):
-        text_parts.append(full_text[i:i + Limits.MESSAGE_MAX_LENGTH])
-
-    # Инициализируем хранилище для message_id
-    if 'doc_messages' not in context.user_data:
-        context.user_data['doc_messages'] = {}
-
-    message_ids = []
-    total_parts = len(text_parts)
-
-    # Отправляем части
-    for i, part in enumerate(text_parts):
-        is_last = (i == total_parts - 1)
-
-        if is_last:
-            keyboard = [
-                [InlineKeyboardButton("🗑 Удалить", callback_data=f"delete_doc_{doc_id}")],
-                [InlineKeyboardButton("◀️ Назад", callback_data=back_callback)]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            if i == 0:
-                edited_msg = await query.edit_message_text(part, reply_markup=reply_markup)
-                message_ids.append(edited_msg.message_id)
-            else:
-                sent_msg = await query.message.reply_text(part, reply_markup=reply_markup)
-                message_ids.append(sent_msg.message_id)
-        else:
-            if i == 0:
-                edited_msg = await query.edit_message_text(part)
-                message_ids.append(edited_msg.message_id)
-            else:
-                sent_msg = await query.message.reply_text(part)
-                message_ids.append(sent_msg.message_id)
 
-    # Сохраняем ID сообщений
-    context.user_data['doc_messages'][doc_id] = message_ids
+    total_parts = max(1, -(-data['total_length'] // Limits.MESSAGE_MAX_LENGTH))
+    if total_parts > 1:
+        title += f" (часть {offset // Limits.MESSAGE_MAX_LENGTH + 1}/{total_parts})"
+
+    text = f"{title} {doc_id}\n\n{data['text']}"
 
-    logger.debug(f"Отображён документ {doc_id} для пользователя {user.id}")
+    # Навигация по частям
+    nav_row = []
+    if offset > 0:
+        prev_offset = max(0, offset - Limits.MESSAGE_MAX_LENGTH)
+        nav_row.append(InlineKeyboardButton("◀️ Пред.", callback_data=f"view_doc_{doc_id}_{prev_offset}"))
+    if data.get('next_offset') is not None:
+        nav_row.append(InlineKeyboardButton("След. ▶️", callback_data=f"view_doc_{doc_id}_{data['next_offset']}"))
+
+    keyboard = []
+    if nav_row:
+        keyboard.append(nav_row)
+    keyboard.append([InlineKeyboardButton("🗑 Удалить", callback_data=f"delete_doc_{doc_id}")])
+    keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data=back_callback)])
+
+    await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+    logger.debug(f"Отображён документ {doc_id} (смещение {offset}) для пользователя {user.id}")
 
 
 async def show_photo_original(update: Update, context):
@@ -405,47 +413,16 @@ async def delete_document(update: Update, context):
     doc_id = int(query.data.split("_")[2])
     user = query.from_user
 
-    # Получаем информацию о документе
-    success, data, error = await api_request("GET", f"/kb/documents/{user.id}")
-
-    if not success:
-        if query.message.photo:
-            await query.message.delete()
-            await context.bot.send_message(user.id, Messages.ERROR_DATA)
-        else:
-            await query.edit_message_text(Messages.ERROR_DATA)
-        return
-
-    documents = data.get("documents", [])
-    document = next((d for d in documents if d["id"] == doc_id), None)
-
-    if not document:
-        if query.message.photo:
-            await query.message.delete()
-            await context.bot.send_message(user.id, "⚠️ Документ не найден.")
-        else:
-            await query.edit_message_text("⚠️ Документ не найден.")
-        return
-
-    file_type = document['file_type']
-
-    # Удаляем через API
-    success, delete_data, error = await api_request("DELETE", f"/kb/documents/{doc_id}")
+    # Удаляем через API (владелец документа проверяется на сервере)
+    success, delete_data, error = await api_request(
+        "DELETE",
+        f"/kb/documents/{doc_id}",
+        params={"telegram_id": user.id}
+    )
 
     if success:
-        # Удаляем предыдущие сообщения
-        if 'doc_messages' in context.user_data and doc_id in context.user_data['doc_messages']:
-            message_ids = context.user_data['doc_messages'][doc_id]
-
-            for msg_id in message_ids[:-1]:
-                try:
-                    await context.bot.delete_message(chat_id=user.id, message_id=msg_id)
-                except Exception as e:
-                    logger.warning(f"Не удалось удалить сообщение {msg_id}: {e}")
-
-            del context.user_data['doc_messages'][doc_id]
-
         # Определяем callback для возврата
+        file_type = delete_data.get('file_type')
         back_callback = CONTENT_CONFIG.get(file_type, {}).get("callbacks", {}).get("my_list", "my_files")
         keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data=back_callback)]]
 
@@ -465,8 +442,10 @@ async def delete_document(update: Update, context):
 
         logger.info(f"Документ {doc_id} удалён пользователем {user.id}")
     else:
+        message = "⚠️ Документ не найден." if error == "Document not found" else Messages.ERROR_DATA
+
         if query.message.photo:
             await query.message.delete()
-            await context.bot.send_message(user.id, Messages.ERROR_DATA)
+            await context.bot.send_message(user.id, message)
         else:
-            await query.edit_message_text(Messages.ERROR_DATA)
\ No newline at end of file
+            await query.edit_message_text(message)
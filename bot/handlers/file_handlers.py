@@ -6,7 +6,6 @@ Handlers для загрузки файлов (TXT, PDF, DOCX) в базу зн
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ConversationHandler
-import base64
 from datetime import datetime
 
 from shared.config import Limits
@@ -126,12 +125,11 @@ async def global_document_handler(update: Update, context):
         # Скачиваем файл
         file = await context.bot.get_file(doc.file_id)
         file_bytes = await file.download_as_bytearray()
-        file_base64 = base64.b64encode(bytes(file_bytes)).decode('utf-8')
 
-        # Добавляем в буфер
+        # Добавляем в буфер (байты отправляются multipart, без base64)
         await file_uploader.add_to_buffer(update, context, {
             "filename": doc.file_name,
-            "file_bytes": file_base64,
+            "content": bytes(file_bytes),
             "mime_type": mime_type
         })
 
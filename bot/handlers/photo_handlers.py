@@ -19,7 +19,7 @@ from utils.bot_utils import (
 )
 
 
-def convert_to_jpeg_for_ocr(photo_bytes: bytes) -> str:
+def convert_to_jpeg(photo_bytes: bytes) -> bytes:
     """
     Конвертировать изображение в JPEG для OCR.
 
@@ -29,7 +29,7 @@ def convert_to_jpeg_for_ocr(photo_bytes: bytes) -> str:
         photo_bytes: Байты изображения
 
     Returns:
-        Base64 строка JPEG изображения
+        Байты JPEG изображения
 
     Raises:
         ValueError: Если не удалось обработать изображение
@@ -50,21 +50,37 @@ def convert_to_jpeg_for_ocr(photo_bytes: bytes) -> str:
         # Сохраняем в JPEG
         output = io.BytesIO()
         image.save(output, format='JPEG', quality=100, optimize=True)
-        jpeg_bytes = output.getvalue()
-
-        # Кодируем в base64
-        try:
-            jpeg_base64 = base64.b64encode(jpeg_bytes).decode('utf-8')
-            return jpeg_base64
-        except Exception as e:
-            logger.error(f"Ошибка кодирования в base64: {e}")
-            raise ValueError(f"Failed to encode to base64: {e}")
+        return output.getvalue()
 
     except Exception as e:
         logger.error(f"Ошибка конвертации в JPEG: {e}")
         raise
 
 
+def convert_to_jpeg_for_ocr(photo_bytes: bytes) -> str:
+    """
+    Конвертировать изображение в JPEG и закодировать в base64.
+
+    Для JSON эндпоинта /kb/upload/photos.
+
+    Args:
+        photo_bytes: Байты изображения
+
+    Returns:
+        Base64 строка JPEG изображения
+
+    Raises:
+        ValueError: Если не удалось обработать изображение
+    """
+    jpeg_bytes = convert_to_jpeg(photo_bytes)
+
+    try:
+        return base64.b64encode(jpeg_bytes).decode('utf-8')
+    except Exception as e:
+        logger.error(f"Ошибка кодирования в base64: {e}")
+        raise ValueError(f"Failed to encode to base64: {e}")
+
+
 async def upload_photo(update: Update, context):
     """
     Начало загрузки фото.
@@ -143,13 +159,14 @@ async def global_photo_handler(update: Update, context):
         file = await context.bot.get_file(photo.file_id)
         photo_bytes = await file.download_as_bytearray()
 
-        jpeg_base64 = convert_to_jpeg_for_ocr(bytes(photo_bytes))
+        jpeg_bytes = convert_to_jpeg(bytes(photo_bytes))
         filename = f"photo_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
 
-        # Добавляем в буфер
+        # Добавляем в буфер (байты отправляются multipart, без base64)
         await photo_uploader.add_to_buffer(update, context, {
-            "base64": jpeg_base64,
-            "filename": filename
+            "content": jpeg_bytes,
+            "filename": filename,
+            "mime_type": "image/jpeg"
         })
 
         logger.debug(f"Фото добавлено в буфер: user={user.id}, filename={filename}")
@@ -10,6 +10,7 @@ import re
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Optional
 
 
 # Загрузка переменных окружения
@@ -53,6 +54,56 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+    # Хранилище счётчиков rate limit (по умолчанию REDIS_URL; memory:// - в памяти процесса)
+    RATE_LIMIT_STORAGE_URI: str = os.getenv("RATE_LIMIT_STORAGE_URI", "")
+    # Время жизни тарифа пользователя в кеше rate limit
+    RATE_LIMIT_TIER_CACHE_SEC: int = int(os.getenv("RATE_LIMIT_TIER_CACHE_SEC", "60"))
+
+    # Размер пула потоков API для блокирующих вызовов (S3, брокер Celery)
+    API_IO_WORKERS: int = int(os.getenv("API_IO_WORKERS", "32"))
+
+    # Каталог тарифов в памяти API: время жизни и пауза перед переподключением к Redis
+    TIER_CATALOGUE_TTL_SEC: int = int(os.getenv("TIER_CATALOGUE_TTL_SEC", "300"))
+    TIER_CATALOGUE_RECONNECT_SEC: int = int(os.getenv("TIER_CATALOGUE_RECONNECT_SEC", "5"))
+
+    # Кеш статистики пользователя в Redis: время жизни значения
+    STATS_CACHE_TTL_SEC: int = int(os.getenv("STATS_CACHE_TTL_SEC", "600"))
+    # Пауза после ошибки Redis для необязательных сервисов (кеш статистики, события прогресса)
+    REDIS_RETRY_SEC: int = int(os.getenv("REDIS_RETRY_SEC", "30"))
+
+    # Одновременных загрузок в S3 в рамках одного пакетного запроса
+    S3_UPLOAD_CONCURRENCY: int = int(os.getenv("S3_UPLOAD_CONCURRENCY", "5"))
+
+    # Размер части при потоковой загрузке в S3 (multipart upload, не меньше 5 МБ)
+    S3_MULTIPART_PART_SIZE_MB: int = int(os.getenv("S3_MULTIPART_PART_SIZE_MB", "8"))
+
+    # Тексты документов: до CONTENT_INLINE_MAX_BYTES хранятся как есть, больше - сжатыми zstd;
+    # сжатые от CONTENT_S3_MIN_BYTES выносятся в S3 (worker и utils/recompress_document_contents.py)
+    CONTENT_INLINE_MAX_BYTES: int = int(os.getenv("CONTENT_INLINE_MAX_BYTES", "8192"))
+    CONTENT_S3_MIN_BYTES: int = int(os.getenv("CONTENT_S3_MIN_BYTES", "262144"))
+    CONTENT_ZSTD_LEVEL: int = int(os.getenv("CONTENT_ZSTD_LEVEL", "9"))
+
+    # Через сколько дней после мягкого удаления документы удаляются окончательно
+    DOCUMENT_PURGE_AFTER_DAYS: int = int(os.getenv("DOCUMENT_PURGE_AFTER_DAYS", "30"))
+
+    # Роль процесса (api, worker, bot) - определяет профиль пула соединений с БД
+    PROCESS_ROLE: str = os.getenv("PROCESS_ROLE", "api")
+    # Префикс application_name в pg_stat_activity (к нему добавляется роль)
+    DB_APPLICATION_NAME: str = os.getenv("DB_APPLICATION_NAME", "cogito")
+    # Подключение через PgBouncer в режиме transaction pooling
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = os.getenv("DB_PGBOUNCER_TRANSACTION_MODE", "false").lower() == "true"
+    # Порт HTTP-сервера метрик Prometheus для Celery worker (0 - отключено)
+    WORKER_METRICS_PORT: int = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+    # Профилировщик SQL: запросы по запросам API и задачам Celery, N+1, медленные запросы
+    SQL_PROFILER_ENABLED: bool = os.getenv("SQL_PROFILER_ENABLED", "false").lower() == "true"
+    # Порог медленного запроса (в лог с параметрами и EXPLAIN)
+    SQL_SLOW_QUERY_MS: int = int(os.getenv("SQL_SLOW_QUERY_MS", "500"))
+    # Сколько одинаковых запросов за запрос API или задачу считать N+1
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    # Выполнять EXPLAIN для медленных SELECT
+    SQL_PROFILER_EXPLAIN: bool = os.getenv("SQL_PROFILER_EXPLAIN", "true").lower() == "true"
+
     model_config = SettingsConfigDict(env_file=str(env_path))
 
 
@@ -62,6 +113,79 @@ settings = Settings()
 S3_BASE_URL = f"https://storage.yandexcloud.net/{settings.YC_BUCKET_NAME}"
 
 
+# ============================================================================
+# ПУЛ СОЕДИНЕНИЙ С БД
+# ============================================================================
+
+# Профили пула по ролям процессов.
+# API обслуживает много коротких запросов, worker - мало длинных,
+# бот почти не ходит в БД напрямую.
+DB_POOL_PROFILES = {
+    "api": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 15000,
+    },
+    "worker": {
+        "pool_size": 2,
+        "max_overflow": 3,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 120000,
+    },
+    "bot": {
+        "pool_size": 2,
+        "max_overflow": 2,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 10000,
+    },
+}
+
+
+def get_db_pool_config(role: Optional[str] = None) -> dict:
+    """
+    Получить настройки пула соединений для роли процесса.
+
+    Любое значение профиля можно переопределить переменной окружения
+    вида DB_<РОЛЬ>_<ПАРАМЕТР>, например DB_WORKER_POOL_SIZE=4.
+
+    Args:
+        role: Роль процесса (по умолчанию settings.PROCESS_ROLE)
+
+    Returns:
+        Словарь настроек пула с application_name и pgbouncer
+
+    Raises:
+        ValueError: Если роль неизвестна
+    """
+    role = role or settings.PROCESS_ROLE
+
+    if role not in DB_POOL_PROFILES:
+        raise ValueError(f"Неизвестная роль процесса: {role}")
+
+    config = dict(DB_POOL_PROFILES[role])
+
+    for key, default in config.items():
+        value = os.getenv(f"DB_{role.upper()}_{key.upper()}")
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            config[key] = value.lower() == "true"
+        else:
+            config[key] = int(value)
+
+    config["application_name"] = f"{settings.DB_APPLICATION_NAME}-{role}"
+    config["pgbouncer"] = settings.DB_PGBOUNCER_TRANSACTION_MODE
+
+    return config
+
+
 # ============================================================================
 # ЛИМИТЫ
 # ============================================================================
@@ -71,6 +195,8 @@ class Limits:
 
     # Файлы
     MAX_FILE_SIZE_MB = 20
+    UPLOAD_URL_EXPIRATION_SEC = 900  # Срок действия presigned POST для прямой загрузки
+    UPLOAD_SESSION_GRACE_SEC = 900  # Запас на finalize после истечения presigned POST
 
     # Буферизация
     BUFFER_MAX_ITEMS = 10
@@ -82,6 +208,32 @@ class Limits:
     # Сообщения
     MESSAGE_MAX_LENGTH = 4000
 
+    # Документов на странице списка
+    DOCUMENTS_PAGE_SIZE = 5
+
+    # Максимальный фрагмент текста документа в одном запросе (символов)
+    DOCUMENT_TEXT_MAX_WINDOW = 16000
+
+    # Максимум ID документов и задач в одном запросе статусов
+    STATUS_BATCH_MAX_IDS = 500
+
+    # Максимум ID документов в одном запросе массового удаления
+    BULK_DELETE_MAX_IDS = 1000
+
+    # Прогресс обработки: ожидание long-poll, длительность SSE потока, heartbeat
+    PROGRESS_LONG_POLL_MAX_SEC = 30
+    PROGRESS_STREAM_TIMEOUT_SEC = 600
+    PROGRESS_HEARTBEAT_SEC = 15
+
+    # Множители лимитов запросов к API по тарифам (базовый лимит - у free)
+    RATE_LIMIT_TIER_MULTIPLIERS = {
+        "free": 1,
+        "basic": 2,
+        "premium": 3,
+        "ultra": 5,
+        "admin": 20,
+    }
+
     # Специальное значение для безлимитных тарифов
     UNLIMITED = 9999
 
@@ -94,11 +246,20 @@ class DocumentStatus:
     """Статусы обработки документов."""
 
     PENDING = "pending"
+    UPLOADING = "uploading"  # Ожидает прямой загрузки в S3 (/kb/upload/session)
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
 
 
+class ContentStorage:
+    """Способы хранения извлечённого текста документов."""
+
+    INLINE = "inline"  # Текст в user_document_contents.text
+    ZSTD = "zstd"      # Сжатый zstd текст в user_document_contents.data
+    S3 = "s3"          # Сжатый zstd текст в S3 (user_document_contents.s3_key)
+
+
 # ============================================================================
 # СООБЩЕНИЯ
 # ============================================================================
@@ -229,18 +390,7 @@ NOTIFICATION_TEMPLATES = {
 BASE_DIR = Path(__file__).parent.parent
 LOGS_DIR = BASE_DIR / 'logs'
 
-# Создание директории для логов
-LOGS_DIR.mkdir(exist_ok=True)
-
-# Базовая настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGS_DIR / 'app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 logger = logging.getLogger(__name__)
 
@@ -314,8 +464,39 @@ def apply_sensitive_filter_to_all_loggers():
             handler.addFilter(sensitive_filter)
 
 
-# Применяем фильтр при инициализации модуля
-apply_sensitive_filter_to_all_loggers()
+# Логирование процесса уже настроено
+_logging_configured = False
+
+
+def configure_logging(log_file: str = 'app.log') -> None:
+    """
+    Настроить логирование процесса.
+
+    Вызывается один раз точкой входа (API, бот, worker), а не при импорте
+    модулей: повторные вызовы ничего не меняют.
+
+    Args:
+        log_file: Имя файла лога в папке logs
+    """
+    global _logging_configured
+
+    if _logging_configured:
+        return
+
+    LOGS_DIR.mkdir(exist_ok=True)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(LOGS_DIR / log_file, encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+    apply_sensitive_filter_to_all_loggers()
+
+    _logging_configured = True
+
 
 
 # ============================================================================
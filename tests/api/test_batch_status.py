@@ -0,0 +1,55 @@
+# Тесты пакетного запроса статусов документов и задач
+
+import pytest
+from unittest.mock import patch
+
+from shared.config import Limits
+
+pytestmark = pytest.mark.api
+
+
+def upload_text(client, telegram_id, text):
+    return client.post("/kb/upload/text", json={"telegram_id": telegram_id, "text": text}).json()["document_id"]
+
+
+def test_batch_status_returns_documents_and_tasks(client, free_user_data, premium_user_data):
+    # Документы и задачи - одним запросом, ненайденные документы перечислены отдельно
+    client.post("/users/register", json=free_user_data)
+    client.post("/users/register", json=premium_user_data)
+
+    own_id = upload_text(client, free_user_data["telegram_id"], "Свой текст")
+    other_id = upload_text(client, premium_user_data["telegram_id"], "Чужой текст")
+
+    task_status = [{"task_id": "t1", "status": "success", "progress": None, "error": None}]
+    with patch('backend.main.get_tasks_status', return_value=task_status) as mock_tasks:
+        response = client.post("/kb/status:batch", json={
+            "document_ids": [own_id, other_id, 999999, own_id],
+            "task_ids": ["t1"],
+            "telegram_id": free_user_data["telegram_id"]
+        })
+
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [doc["document_id"] for doc in data["documents"]] == [own_id]
+    assert data["documents"][0]["status"] == "completed"
+    assert data["missing_document_ids"] == [other_id, 999999]
+    assert data["tasks"] == task_status
+    mock_tasks.assert_called_once_with(["t1"])
+
+
+def test_batch_status_limits_ids(client, free_user_data):
+    # Слишком много ID - 400
+    response = client.post("/kb/status:batch", json={
+        "document_ids": list(range(Limits.STATUS_BATCH_MAX_IDS + 1)),
+        "telegram_id": free_user_data["telegram_id"]
+    })
+
+    assert response.status_code == 400
+
+
+def test_batch_status_requires_telegram_id(client):
+    # Без telegram_id запрос отклоняется: у всех запросов бота общий IP
+    response = client.post("/kb/status:batch", json={"document_ids": [1]})
+
+    assert response.status_code == 422
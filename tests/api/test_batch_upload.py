@@ -0,0 +1,76 @@
+# Тесты пакетной загрузки фото: один INSERT, параллельные загрузки в S3, один коммит
+
+import time
+import pytest
+from unittest.mock import patch
+
+from backend.task_dispatch import DispatchedGroup
+from backend.models import UserDocument, UserUsage
+
+pytestmark = pytest.mark.api
+
+
+def photos_payload(telegram_id, count):
+    return {
+        "telegram_id": telegram_id,
+        "photos": [{"base64": f"photo-{i}", "filename": f"photo_{i}.jpg"} for i in range(count)]
+    }
+
+
+def test_upload_photos_batch_runs_uploads_concurrently(client, premium_user, db_session, captured_sql):
+    # Пакет из 5 фото загружается примерно за время самой медленной загрузки
+
+    def slow_upload(photo_base64, user_id, document_id):
+        time.sleep(0.2)
+        return f"photos/user_{user_id}/photo_{document_id}.jpg"
+
+    with patch('backend.main.upload_photo_to_s3', side_effect=slow_upload), \
+            patch('backend.main.dispatch_group') as mock_dispatch:
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"] * 5)
+
+        started = time.perf_counter()
+        response = client.post("/kb/upload/photos", json=photos_payload(premium_user.telegram_id, 5))
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert response.json()["uploaded_count"] == 5
+    assert elapsed < 0.8
+
+    documents = db_session.query(UserDocument).filter_by(user_id=premium_user.id, file_type="photo").all()
+    assert len(documents) == 5
+    assert all(doc.file_url.endswith(f"photo_{doc.id}.jpg") for doc in documents)
+
+    # Ссылки - одним UPDATE, документы не перечитываются по одному.
+    # INSERT ... RETURNING в PostgreSQL - один запрос; SQLite не гарантирует
+    # порядок RETURNING, и SQLAlchemy выполняет его построчно
+    statements = [statement for statement, _ in captured_sql]
+    assert sum(s.startswith("UPDATE user_documents") for s in statements) == 1
+    assert not any("FROM user_documents" in s and "user_documents.id = ?" in s for s in statements)
+
+    usage = db_session.get(UserUsage, premium_user.id)
+    db_session.refresh(usage)
+    assert usage.daily_photos == 5
+
+
+def test_upload_photos_batch_rolls_back_on_s3_error(client, premium_user, db_session):
+    # Ошибка одной загрузки откатывает пакет и удаляет уже загруженные объекты
+
+    def flaky_upload(photo_base64, user_id, document_id):
+        if photo_base64 == "photo-1":
+            raise RuntimeError("S3 unavailable")
+        return f"photos/user_{user_id}/photo_{document_id}.jpg"
+
+    with patch('backend.main.upload_photo_to_s3', side_effect=flaky_upload), \
+            patch('backend.main.delete_from_s3') as mock_delete, \
+            patch('backend.main.dispatch_group') as mock_dispatch:
+        response = client.post("/kb/upload/photos", json=photos_payload(premium_user.telegram_id, 3))
+
+    assert response.status_code == 500
+    assert mock_delete.call_count == 2
+    mock_dispatch.assert_not_called()
+
+    assert db_session.query(UserDocument).filter_by(user_id=premium_user.id).count() == 0
+
+    usage = db_session.get(UserUsage, premium_user.id)
+    db_session.refresh(usage)
+    assert usage.daily_photos == 0
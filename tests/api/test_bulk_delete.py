@@ -0,0 +1,101 @@
+# Тесты массового удаления документов (POST /kb/documents:bulk-delete)
+
+import pytest
+from unittest.mock import Mock, patch
+
+from backend.models import User, UserDocument, UserDocumentContent, UserUsage
+from shared.config import S3_BASE_URL
+
+pytestmark = pytest.mark.api
+
+
+@pytest.fixture
+def user_documents(client, free_user_data, db_session):
+    # Тексты и фото пользователя; фото с объектами в S3
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+
+    for i in range(3):
+        client.post("/kb/upload/text", json={"telegram_id": user.telegram_id, "text": f"Текст {i}"})
+
+    for i in range(2):
+        db_session.add(UserDocument(
+            user_id=user.id, filename=f"p{i}.jpg", file_type="photo", status="completed",
+            file_url=f"{S3_BASE_URL}/photos/user_{user.id}/photo_{i}.jpg", is_deleted=False
+        ))
+    db_session.commit()
+
+    return user
+
+
+def bulk_delete(client, **payload):
+    task = Mock(id="cleanup-task-id")
+    with patch('backend.main.delete_s3_objects') as mock_task:
+        mock_task.apply_async.return_value = task
+        response = client.post("/kb/documents:bulk-delete", json=payload)
+    return response, mock_task
+
+
+def active_documents(db_session, user):
+    db_session.expire_all()
+    return db_session.query(UserDocument).filter_by(user_id=user.id, is_deleted=False).all()
+
+
+def test_bulk_delete_by_type_enqueues_s3_cleanup(client, db_session, user_documents):
+    # Удаление по типу - одним запросом; объекты S3 удаляются в фоне одной задачей
+    response, mock_task = bulk_delete(client, telegram_id=user_documents.telegram_id, file_type="photo")
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["deleted_count"] == 2
+    assert data["cleanup_task_id"] == "cleanup-task-id"
+
+    mock_task.apply_async.assert_called_once()
+    keys = mock_task.apply_async.call_args.kwargs["args"][0]
+    assert sorted(keys) == [f"photos/user_{user_documents.id}/photo_{i}.jpg" for i in range(2)]
+
+    assert {doc.file_type for doc in active_documents(db_session, user_documents)} == {"text"}
+
+
+def test_bulk_delete_by_ids_updates_usage_and_texts(client, db_session, user_documents):
+    # Удаление по ID: очищаются тексты, счётчики использования уменьшаются
+    texts = [doc for doc in active_documents(db_session, user_documents) if doc.file_type == "text"]
+    ids = [texts[0].id, texts[1].id]
+
+    response, mock_task = bulk_delete(client, telegram_id=user_documents.telegram_id, document_ids=ids)
+
+    assert sorted(response.json()["deleted_ids"]) == sorted(ids)
+    assert response.json()["cleanup_task_id"] is None
+    mock_task.apply_async.assert_not_called()
+
+    db_session.expire_all()
+    usage = db_session.get(UserUsage, user_documents.id)
+    assert usage.texts_count == 1
+    assert usage.daily_texts == 1
+    assert {db_session.get(UserDocumentContent, doc_id).text for doc_id in ids} == {""}
+
+
+def test_bulk_delete_all_and_foreign_documents(client, db_session, user_documents, premium_user_data):
+    # Чужие документы не удаляются; all удаляет все документы пользователя
+    client.post("/users/register", json=premium_user_data)
+    own_ids = [doc.id for doc in active_documents(db_session, user_documents)]
+
+    response, _ = bulk_delete(client, telegram_id=premium_user_data["telegram_id"], document_ids=own_ids)
+    assert response.json()["deleted_count"] == 0
+
+    response, _ = bulk_delete(client, telegram_id=user_documents.telegram_id, all=True)
+    assert response.json()["deleted_count"] == 5
+    assert active_documents(db_session, user_documents) == []
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"all": True, "file_type": "photo"},
+    {"file_type": "audio"},
+    {"document_ids": list(range(1001))},
+])
+def test_bulk_delete_validates_selector(client, user_documents, payload):
+    # Нужен ровно один способ выбора документов
+    response, _ = bulk_delete(client, telegram_id=user_documents.telegram_id, **payload)
+
+    assert response.status_code == 400
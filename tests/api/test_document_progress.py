@@ -0,0 +1,130 @@
+# Тесты прогресса обработки документа: long-poll и SSE поверх Redis pub/sub
+
+import json
+import threading
+import pytest
+import fakeredis
+
+from backend.models import User, UserDocument
+from backend.services.progress_events import progress_events, ProgressStage
+
+pytestmark = pytest.mark.api
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    # Redis в памяти: worker публикует синхронным клиентом, API читает асинхронным
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(progress_events, "_client", fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(progress_events, "_sync_client", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(progress_events, "_disabled_until", 0.0)
+    return server
+
+
+@pytest.fixture
+def processing_doc(client, free_user_data, db_session):
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+
+    doc = UserDocument(user_id=user.id, filename="notes.txt", file_type="file", status="processing")
+    db_session.add(doc)
+    db_session.commit()
+    return doc
+
+
+def publish_later(delay, *args, **kwargs):
+    timer = threading.Timer(delay, progress_events.publish, args=args, kwargs=kwargs)
+    timer.start()
+    return timer
+
+
+def test_progress_falls_back_to_document_status(client, free_user_data, fake_redis):
+    # Без событий в Redis статус берётся из БД
+    telegram_id = free_user_data["telegram_id"]
+    client.post("/users/register", json=free_user_data)
+    document_id = client.post("/kb/upload/text", json={"telegram_id": telegram_id, "text": "Текст"}).json()["document_id"]
+
+    response = client.get(f"/kb/documents/{document_id}/progress", params={"telegram_id": telegram_id})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["timestamp"] is None
+
+
+def test_progress_returns_last_stage(client, free_user_data, processing_doc, fake_redis):
+    # Текущий этап - из последнего опубликованного события
+    progress_events.publish(processing_doc.id, stage=ProgressStage.RECOGNIZING)
+
+    response = client.get(
+        f"/kb/documents/{processing_doc.id}/progress",
+        params={"telegram_id": free_user_data["telegram_id"]}
+    )
+
+    data = response.json()
+    assert data["status"] == "processing"
+    assert data["stage"] == "recognizing"
+
+
+def test_progress_long_poll_waits_for_next_event(client, free_user_data, processing_doc, fake_redis):
+    # Long-poll отвечает, как только опубликовано новое событие
+    progress_events.publish(processing_doc.id, stage=ProgressStage.RECOGNIZING)
+    params = {"telegram_id": free_user_data["telegram_id"]}
+    since = client.get(f"/kb/documents/{processing_doc.id}/progress", params=params).json()["timestamp"]
+
+    timer = publish_later(0.3, processing_doc.id, stage=ProgressStage.SAVING)
+    response = client.get(
+        f"/kb/documents/{processing_doc.id}/progress",
+        params={**params, "wait": 5, "since": since}
+    )
+    timer.join()
+
+    data = response.json()
+    assert data["stage"] == "saving"
+    assert data["timestamp"] > since
+
+
+def test_progress_sse_streams_until_terminal_status(client, free_user_data, processing_doc, fake_redis):
+    # SSE поток передаёт события и закрывается после итогового статуса
+    timer = publish_later(0.3, processing_doc.id, status="completed")
+
+    response = client.get(
+        f"/kb/documents/{processing_doc.id}/progress",
+        params={"telegram_id": free_user_data["telegram_id"]},
+        headers={"Accept": "text/event-stream"}
+    )
+    timer.join()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert [event["status"] for event in events] == ["processing", "completed"]
+
+
+def test_progress_forbidden_for_other_user(client, premium_user_data, processing_doc, fake_redis):
+    # Прогресс чужого документа недоступен
+    client.post("/users/register", json=premium_user_data)
+
+    response = client.get(
+        f"/kb/documents/{processing_doc.id}/progress",
+        params={"telegram_id": premium_user_data["telegram_id"]}
+    )
+
+    assert response.status_code == 403
+
+
+def test_publish_disables_redis_after_error(monkeypatch):
+    # После ошибки Redis события не публикуются до истечения REDIS_RETRY_SEC
+    class BrokenRedis:
+        def __getattr__(self, name):
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(progress_events, "_sync_client", BrokenRedis())
+    monkeypatch.setattr(progress_events, "_disabled_until", 0.0)
+
+    progress_events.publish(1, ProgressStage.DOWNLOADING)
+
+    assert not progress_events._available()
@@ -92,7 +92,7 @@ def test_delete_document(client, free_user_data, db_session):
     doc_id = upload_response.json()["document_id"]
 
     # Удаляем
-    delete_response = client.delete(f"/kb/documents/{doc_id}")
+    delete_response = client.delete(f"/kb/documents/{doc_id}", params={"telegram_id": free_user_data["telegram_id"]})
 
     assert delete_response.status_code == 200
     assert delete_response.json()["success"] is True
@@ -103,9 +103,176 @@ def test_delete_document(client, free_user_data, db_session):
     assert doc.extracted_text == ""  # Текст очищен
 
 
-def test_delete_nonexistent_document(client):
+def test_delete_nonexistent_document(client, free_user_data):
     # Удаление несуществующего документа
 
-    response = client.delete("/kb/documents/999999")
+    response = client.delete("/kb/documents/999999", params={"telegram_id": free_user_data["telegram_id"]})
 
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_documents_page_filters_by_type(client, free_user_data, db_session):
+    # Страница документов фильтруется по типу и не содержит полного текста
+
+    client.post("/users/register", json=free_user_data)
+    client.post("/kb/upload/text", json={
+        "telegram_id": free_user_data["telegram_id"],
+        "text": "Длинный текст " * 50
+    })
+
+    response = client.get(
+        f"/kb/documents/{free_user_data['telegram_id']}/page",
+        params={"file_type": "text"}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total_count"] == 1
+    assert data["next_cursor"] is None
+
+    document = data["documents"][0]
+    assert document["file_type"] == "text"
+    assert "extracted_text" not in document
+    assert document["preview"] == ("Длинный текст " * 50)[:200]
+
+    empty = client.get(
+        f"/kb/documents/{free_user_data['telegram_id']}/page",
+        params={"file_type": "photo"}
+    ).json()
+    assert empty["documents"] == []
+    assert empty["total_count"] == 0
+
+
+def test_documents_page_keyset_pagination(client, free_user_data, db_session):
+    # Страницы по курсору идут без повторов и пропусков, новые первыми
+
+    from datetime import datetime, timedelta
+    from backend.models import User
+
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+
+    # Одинаковая дата у части документов - порядок определяет id
+    base = datetime(2026, 1, 1, 12, 0)
+    for i in range(7):
+        db_session.add(UserDocument(
+            user_id=user.id,
+            filename=f"photo_{i}.jpg",
+            file_type="photo",
+            status="completed",
+            upload_date=base + timedelta(minutes=i // 2),
+            is_deleted=False
+        ))
+    db_session.commit()
+
+    expected = [
+        doc.id for doc in db_session.query(UserDocument)
+        .filter_by(user_id=user.id, file_type="photo")
+        .order_by(UserDocument.upload_date.desc(), UserDocument.id.desc())
+    ]
+
+    seen = []
+    cursor = None
+    total_counts = []
+    while True:
+        params = {"file_type": "photo", "status": "completed", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get(f"/kb/documents/{free_user_data['telegram_id']}/page", params=params).json()
+
+        seen.extend(doc["id"] for doc in data["documents"])
+        total_counts.append(data["total_count"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert total_counts == [7, None, None]
+
+
+def test_documents_page_invalid_cursor(client, free_user_data):
+    # Некорректный курсор - 400
+
+    client.post("/users/register", json=free_user_data)
+
+    response = client.get(
+        f"/kb/documents/{free_user_data['telegram_id']}/page",
+        params={"cursor": "not-a-cursor"}
+    )
+
+    assert response.status_code == 400
+
+
+def test_get_user_document_checks_owner(client, free_user_data, premium_user_data):
+    # Документ доступен только владельцу и возвращается без полного текста
+
+    client.post("/users/register", json=free_user_data)
+    client.post("/users/register", json=premium_user_data)
+
+    doc_id = client.post("/kb/upload/text", json={
+        "telegram_id": free_user_data["telegram_id"],
+        "text": "Текст владельца"
+    }).json()["document_id"]
+
+    response = client.get(f"/kb/documents/{free_user_data['telegram_id']}/{doc_id}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == doc_id
+    assert data["text_length"] == len("Текст владельца")
+    assert "extracted_text" not in data
+
+    foreign = client.get(f"/kb/documents/{premium_user_data['telegram_id']}/{doc_id}")
+    assert foreign.status_code == 403
+
+    missing = client.get(f"/kb/documents/{free_user_data['telegram_id']}/999999")
+    assert missing.status_code == 404
+
+
+def test_get_user_document_text_windows(client, free_user_data):
+    # Текст читается фрагментами по смещению и длине
+
+    client.post("/users/register", json=free_user_data)
+
+    text = "".join(str(i % 10) for i in range(25))
+    doc_id = client.post("/kb/upload/text", json={
+        "telegram_id": free_user_data["telegram_id"],
+        "text": text
+    }).json()["document_id"]
+
+    chunks = []
+    offset = 0
+    while offset is not None:
+        data = client.get(
+            f"/kb/documents/{free_user_data['telegram_id']}/{doc_id}/text",
+            params={"offset": offset, "length": 10}
+        ).json()
+
+        assert data["total_length"] == 25
+        assert data["file_type"] == "text"
+        chunks.append(data["text"])
+        offset = data["next_offset"]
+
+    assert chunks == [text[:10], text[10:20], text[20:]]
+
+
+def test_delete_document_checks_owner(client, free_user_data, premium_user_data, db_session):
+    # Удалить можно только свой документ; без telegram_id запрос отклоняется
+
+    client.post("/users/register", json=free_user_data)
+    client.post("/users/register", json=premium_user_data)
+
+    doc_id = client.post("/kb/upload/text", json={
+        "telegram_id": free_user_data["telegram_id"],
+        "text": "Текст владельца"
+    }).json()["document_id"]
+
+    assert client.delete(f"/kb/documents/{doc_id}").status_code == 422
+
+    foreign = client.delete(f"/kb/documents/{doc_id}", params={"telegram_id": premium_user_data["telegram_id"]})
+    assert foreign.status_code == 403
+    assert db_session.query(UserDocument).filter_by(id=doc_id).first().is_deleted is False
+
+    response = client.delete(f"/kb/documents/{doc_id}", params={"telegram_id": free_user_data["telegram_id"]})
+    assert response.status_code == 200
+    assert response.json()["file_type"] == "text"
@@ -3,6 +3,7 @@
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from backend.models import UserDocument
+from backend.task_dispatch import DispatchedGroup
 
 pytestmark = pytest.mark.api
 
@@ -41,10 +42,8 @@ def test_upload_video_endpoint(client, free_user_data, db_session):
     db_session.commit()
 
     # Мокируем Celery task
-    with patch('backend.main.process_video') as mock_task:
-        mock_result = Mock()
-        mock_result.id = "fake-task-id"
-        mock_task.apply_async.return_value = mock_result
+    with patch('backend.main.dispatch_group') as mock_dispatch:
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"])
 
         video_data = {
             "telegram_id": free_user_data["telegram_id"],
@@ -64,6 +63,7 @@ def test_upload_video_endpoint(client, free_user_data, db_session):
 
     assert data["success"] is True
     assert "task_id" in data
+    assert data["group_id"] == "fake-group-id"
     assert "message" in data
 
 
@@ -98,10 +98,8 @@ def test_upload_video_creates_pending_document(client, premium_user_data, db_ses
     db_session.add(new_sub)
     db_session.commit()
 
-    with patch('backend.main.process_video') as mock_task:
-        mock_result = Mock()
-        mock_result.id = "fake-task-id"
-        mock_task.apply_async.return_value = mock_result
+    with patch('backend.main.dispatch_group') as mock_dispatch:
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"])
 
         video_data = {
             "telegram_id": premium_user_data["telegram_id"],
@@ -141,12 +139,10 @@ def test_upload_photos_endpoint(client, free_user_data):
     # (используем db_session из фикстуры через client)
 
     with patch('backend.main.upload_photo_to_s3') as mock_upload, \
-            patch('backend.main.process_photo_ocr') as mock_task:
+            patch('backend.main.dispatch_group') as mock_dispatch:
         mock_upload.return_value = "photos/user_1/photo_1.jpg"
 
-        mock_result = Mock()
-        mock_result.id = "fake-task-id"
-        mock_task.apply_async.return_value = mock_result
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"])
 
         # Тест с free тарифом должен вернуть ошибку лимита
         photo_data = {
@@ -172,12 +168,10 @@ def test_upload_files_endpoint(client, free_user_data):
     client.post("/users/register", json=free_user_data)
 
     with patch('backend.main.upload_file_to_s3') as mock_upload, \
-            patch('backend.main.process_file') as mock_task:
+            patch('backend.main.dispatch_group') as mock_dispatch:
         mock_upload.return_value = "files/user_1/document_1.txt"
 
-        mock_result = Mock()
-        mock_result.id = "fake-task-id"
-        mock_task.apply_async.return_value = mock_result
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"])
 
         file_data = {
             "telegram_id": free_user_data["telegram_id"],
@@ -241,6 +235,31 @@ def test_get_photo_presigned_url_nonexistent(client):
     assert response.status_code == 404
 
 
+def test_get_photo_presigned_url_for_owner(client, free_user_data, db_session):
+    # Владелец получает presigned URL; подпись вызывается с ключом S3 фото
+    from backend.models import User
+
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+
+    doc = UserDocument(
+        user_id=user.id,
+        filename="test.jpg",
+        file_type="photo",
+        status="completed",
+        file_url=f"https://storage.yandexcloud.net/cogito-ai-bot/photos/user_{user.id}/photo_1.jpg"
+    )
+    db_session.add(doc)
+    db_session.commit()
+
+    with patch('backend.main.get_photo_presigned_url', return_value="https://fake-presigned-url.com") as mock_presigned:
+        response = client.get(f"/kb/photo/{doc.id}/presigned", params={"telegram_id": user.telegram_id})
+
+    assert response.status_code == 200
+    assert response.json()["presigned_url"] == "https://fake-presigned-url.com"
+    mock_presigned.assert_called_once_with(f"photos/user_{user.id}/photo_1.jpg", expiration=3600)
+
+
 def test_get_document_info_endpoint(client, free_user_data, db_session):
     # Тест получения информации о документе
     from backend.models import User
@@ -273,7 +292,7 @@ def test_get_document_info_endpoint(client, free_user_data, db_session):
     assert data["status"] == "completed"
 
 
-def test_get_video_status_endpoint(client):
+def test_get_video_status_endpoint(client, free_user_data):
     # Тест получения статуса обработки видео
 
     with patch('backend.main.AsyncResult') as mock_result:
@@ -282,7 +301,7 @@ def test_get_video_status_endpoint(client):
         mock_task.info = {"progress": "100%"}
         mock_result.return_value = mock_task
 
-        response = client.get("/kb/video/status/fake-task-id")
+        response = client.get("/kb/video/status/fake-task-id", params={"telegram_id": free_user_data["telegram_id"]})
 
     assert response.status_code == 200
     data = response.json()
@@ -358,4 +377,34 @@ def test_update_document_status_with_error(client, free_user_data, db_session):
     assert response.status_code == 200
 
     db_session.refresh(doc)
-    assert doc.status == "failed"
\ No newline at end of file
+    assert doc.status == "failed"
+
+def test_get_task_group_status_endpoint(client, free_user_data):
+    # Статус группы задач пакетной загрузки
+
+    group_status = {
+        "group_id": "fake-group-id",
+        "status": "partial",
+        "total": 2,
+        "completed": 1,
+        "failed": 1,
+        "pending": 0,
+        "tasks": [
+            {"task_id": "t1", "status": "success", "progress": None, "error": None},
+            {"task_id": "t2", "status": "failure", "progress": None, "error": "bad file"}
+        ]
+    }
+
+    with patch('backend.main.get_group_status', return_value=group_status):
+        response = client.get("/kb/tasks/group/fake-group-id", params={"telegram_id": free_user_data["telegram_id"]})
+
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["status"] == "partial"
+    assert data["tasks"][1]["error"] == "bad file"
+
+    with patch('backend.main.get_group_status', return_value=None):
+        response = client.get("/kb/tasks/group/missing", params={"telegram_id": free_user_data["telegram_id"]})
+
+    assert response.status_code == 404
@@ -3,6 +3,8 @@
 import pytest
 from datetime import datetime
 
+from backend.models import UserDocument
+
 pytestmark = pytest.mark.api
 
 
@@ -104,4 +106,20 @@ def test_get_priority_returns_correct_values():
     assert get_priority("premium") == 2
     assert get_priority("free") == 3
     assert get_priority("basic") == 4
-    assert get_priority("unknown") == 4  # По умолчанию
\ No newline at end of file
+    assert get_priority("unknown") == 4  # По умолчанию
+
+
+def test_batch_upload_cannot_overshoot_limit(client, free_user_data, db_session):
+    # Пакет проверяется целиком: 2 файла при лимите free в 1 файл отклоняются
+
+    client.post("/users/register", json=free_user_data)
+    files = [
+        {"file_bytes": "dGVzdA==", "filename": f"doc_{i}.txt", "mime_type": "text/plain"}
+        for i in range(2)
+    ]
+
+    response = client.post("/kb/upload/files", json={"telegram_id": free_user_data["telegram_id"], "files": files})
+
+    assert response.status_code == 400
+    assert "limit exceeded" in response.json()["detail"].lower()
+    assert db_session.query(UserDocument).filter_by(file_type="file").count() == 0
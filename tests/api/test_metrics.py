@@ -0,0 +1,77 @@
+# Тесты метрик запросов API (/metrics)
+
+import pytest
+from prometheus_client import REGISTRY
+
+from backend.metrics import instrument_s3_client, record_dependency, RequestStats, _request_stats
+
+pytestmark = pytest.mark.api
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_metrics_by_route_template(client, free_user_data):
+    # Время, размер ответа и SQL запросы считаются по шаблону маршрута
+    route = "/kb/documents/{telegram_id}"
+    client.post("/users/register", json=free_user_data)
+
+    requests_before = sample("api_request_duration_seconds_count", method="GET", route=route, status="200")
+    queries_before = sample("api_request_db_queries_sum", route=route)
+
+    response = client.get(f"/kb/documents/{free_user_data['telegram_id']}")
+    assert response.status_code == 200
+
+    assert sample("api_request_duration_seconds_count", method="GET", route=route, status="200") == requests_before + 1
+    assert sample("api_response_size_bytes_sum", method="GET", route=route) >= len(response.content)
+    assert sample("api_request_db_queries_sum", route=route) > queries_before
+    assert sample("api_request_dependency_seconds_count", route=route, dependency="db") > 0
+    assert sample("api_requests_in_flight", method="GET", route=route) == 0
+
+
+def test_unknown_path_uses_single_label(client):
+    # Неизвестные пути не создают новых серий метрик
+    before = sample("api_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+
+    client.get("/no/such/path/123")
+    client.get("/no/such/path/456")
+
+    assert sample("api_request_duration_seconds_count", method="GET", route="unmatched", status="404") == before + 2
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client):
+    # /metrics отдаёт метрики в текстовом формате Prometheus
+    client.get("/subscriptions/tiers")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("api_request_duration_seconds_bucket", "api_requests_in_flight",
+                 "api_response_size_bytes_bucket", "db_query_duration_seconds_bucket"):
+        assert name in response.text
+
+
+def test_s3_calls_timed_in_request_stats():
+    # Вызовы boto3 замеряются и добавляются к статистике текущего запроса
+    import boto3
+    from botocore.stub import Stubber
+
+    s3 = boto3.client("s3", region_name="us-east-1", aws_access_key_id="key", aws_secret_access_key="secret")
+    instrument_s3_client(s3)
+
+    stubber = Stubber(s3)
+    stubber.add_response("head_object", {"ContentLength": 10}, {"Bucket": "bucket", "Key": "key"})
+
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        with stubber:
+            s3.head_object(Bucket="bucket", Key="key")
+        record_dependency("broker", 0.5)
+    finally:
+        _request_stats.reset(token)
+
+    assert sample("s3_request_duration_seconds_count", operation="HeadObject", result="ok") >= 1
+    assert stats.seconds["s3"] > 0
+    assert stats.seconds["broker"] == 0.5
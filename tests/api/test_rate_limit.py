@@ -0,0 +1,71 @@
+# Тесты rate limiting: ключ по telegram_id и лимиты по тарифам
+
+import pytest
+from unittest.mock import Mock, patch
+
+from backend.models import User, UserSubscription, SubscriptionTier
+from backend.services.rate_limit import RateLimiter, rate_limit_tiers, tier_limit
+
+pytestmark = pytest.mark.api
+
+
+def test_rate_limit_is_per_telegram_id(client, free_user_data, premium_user_data):
+    # Все запросы с одного IP, но у каждого пользователя свой счётчик
+    for _ in range(10):
+        assert client.post("/users/register", json=free_user_data).status_code == 200
+
+    assert client.post("/users/register", json=free_user_data).status_code == 429
+    assert client.post("/users/register", json=premium_user_data).status_code == 200
+
+
+def test_rate_limit_scales_with_tier(client, premium_user_data, db_session):
+    # Лимит платного тарифа больше базового
+    client.post("/users/register", json=premium_user_data)
+
+    user = db_session.query(User).filter_by(telegram_id=premium_user_data["telegram_id"]).first()
+    premium = db_session.query(SubscriptionTier).filter_by(tier_name="premium").first()
+    db_session.query(UserSubscription).filter_by(user_id=user.id).update({"tier_id": premium.id})
+    db_session.commit()
+    # Тариф в кеше устарел (истёк TTL)
+    rate_limit_tiers.invalidate(premium_user_data["telegram_id"])
+
+    # premium: 10/minute x 3
+    responses = [client.post("/users/register", json=premium_user_data) for _ in range(31)]
+
+    assert all(response.status_code == 200 for response in responses[:30])
+    assert responses[30].status_code == 429
+
+
+def test_routes_without_limit_skip_tier_lookup(client, free_user_data):
+    # Тариф для ключа rate limit определяется только на маршрутах с лимитом
+    with patch("backend.services.rate_limit.rate_limit_tiers.get_tier_name") as mock_tier:
+        response = client.get("/metrics", params={"telegram_id": free_user_data["telegram_id"]})
+
+    assert response.status_code == 200
+    mock_tier.assert_not_called()
+
+
+def test_tier_limit_provider():
+    # Лимит маршрута умножается на коэффициент тарифа
+    provider = tier_limit("10/minute")
+
+    assert str(provider("free")) == "10 per 1 minute"
+    assert str(provider("premium")) == "30 per 1 minute"
+    assert str(provider("unknown")) == "10 per 1 minute"
+
+
+def test_rate_limit_storage_failure_falls_back_to_memory(monkeypatch):
+    # Недоступное хранилище не отключает лимит: счётчики ведутся в памяти процесса
+    limiter = RateLimiter("memory://")
+    monkeypatch.setattr(limiter._limiter, "hit", Mock(side_effect=ConnectionError("redis is down")))
+    item = tier_limit("2/minute")("free")
+
+    assert [limiter.hit(item, "route", "tg:1") for _ in range(3)] == [True, True, False]
+    assert limiter._limiter.hit.call_count == 1
+
+
+def test_routes_without_telegram_id_in_path_require_it(client):
+    # Маршруты с лимитом без telegram_id в пути не делят один счётчик по IP
+    assert client.get("/kb/video/status/task-id").status_code == 422
+    assert client.get("/kb/tasks/group/group-id").status_code == 422
+    assert client.delete("/kb/documents/1").status_code == 422
@@ -0,0 +1,66 @@
+# Тесты быстрой сериализации списков документов
+
+import json
+import pytest
+from datetime import datetime, timedelta
+
+from backend.models import User, UserDocument
+from backend.schemas import DocumentsListResponse, DocumentsPageResponse
+from utils.serialization_benchmark import run_benchmark
+
+pytestmark = pytest.mark.api
+
+
+@pytest.fixture
+def user_documents(client, free_user_data, db_session):
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+
+    # Разные даты загрузки: порядок списка не зависит от id
+    uploaded = datetime.now()
+    for i, status in enumerate(["completed", "processing", "failed"]):
+        db_session.add(UserDocument(
+            user_id=user.id,
+            upload_date=uploaded + timedelta(seconds=i),
+            filename=f"документ_{i}.pdf",
+            file_type="file",
+            status=status,
+            extracted_text="Текст «с кавычками» и \"экранированием\"\n" * (i + 1),
+            preview="Текст",
+            duration_hours=0.25 if i else None,
+            is_deleted=False
+        ))
+    db_session.commit()
+
+    return db_session.query(UserDocument).filter_by(user_id=user.id).order_by(UserDocument.upload_date.desc()).all()
+
+
+def test_documents_list_matches_response_model(client, free_user_data, user_documents):
+    # Ответ без валидации совпадает с сериализацией через response_model
+    response = client.get(f"/kb/documents/{free_user_data['telegram_id']}")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    expected = DocumentsListResponse.model_validate(
+        {"documents": user_documents, "total_count": len(user_documents)},
+        from_attributes=True
+    )
+    assert response.json() == json.loads(expected.model_dump_json())
+
+
+def test_documents_page_matches_response_model(client, free_user_data, user_documents):
+    # Страница списка сериализуется так же, как через response_model
+    response = client.get(f"/kb/documents/{free_user_data['telegram_id']}/page", params={"limit": 2})
+
+    data = response.json()
+    assert DocumentsPageResponse.model_validate(data).model_dump(mode="json") == data
+    assert [doc["id"] for doc in data["documents"]] == [doc.id for doc in user_documents[:2]]
+    assert data["total_count"] == 3
+
+
+def test_serialization_benchmark_runs():
+    # Бенчмарк проверяет одинаковый JSON у всех способов сериализации
+    results = run_benchmark(count=20, text_kb=1, repeat=1)
+
+    assert set(results) == {"pydantic", "jsonable_encoder", "fast"}
@@ -0,0 +1,95 @@
+# Тесты профилировщика SQL (backend/sql_profiler.py)
+
+import json
+import logging
+import pytest
+from sqlalchemy import event, text
+
+from backend import sql_profiler
+from backend.models import User, UserDocument, UserDailyAction
+from backend.sql_profiler import PROFILE_HEADER, install_sql_profiler, start_profile, stop_profile
+from shared.config import settings
+
+pytestmark = pytest.mark.api
+
+LISTENERS = [
+    ("before_cursor_execute", sql_profiler._before_cursor_execute),
+    ("after_cursor_execute", sql_profiler._after_cursor_execute),
+    ("handle_error", sql_profiler._handle_error),
+]
+
+
+@pytest.fixture
+def profiled_engines(db_session, async_db_session, monkeypatch):
+    # Профилировщик на движках тестовой БД (sync - тесты, async - API)
+    monkeypatch.setattr(settings, "SQL_PROFILER_ENABLED", True)
+    engines = [db_session.get_bind(), async_db_session.bind.sync_engine]
+    for engine in engines:
+        install_sql_profiler(engine)
+
+    yield engines
+
+    for engine in engines:
+        for name, listener in LISTENERS:
+            event.remove(engine, name, listener)
+
+
+@pytest.fixture
+def user_with_documents(client, free_user_data, db_session):
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+
+    for i in range(6):
+        document = UserDocument(user_id=user.id, filename=f"doc_{i}.pdf", file_type="file", status="completed")
+        db_session.add(document)
+        db_session.flush()
+        db_session.add(UserDailyAction(
+            user_id=user.id, document_id=document.id, action_date=document.upload_date, action_type="file"
+        ))
+    db_session.commit()
+
+    return user
+
+
+def test_lazy_loads_flagged_as_n_plus_one(profiled_engines, user_with_documents, db_session, caplog):
+    # Ленивая загрузка связи в цикле - одинаковые запросы помечаются как N+1
+    db_session.expire_all()
+    caplog.set_level(logging.WARNING, logger="backend.sql_profiler")
+
+    token = start_profile("test")
+    documents = user_with_documents.documents
+    for document in documents:
+        assert len(document.actions) == 1
+    profile = stop_profile(token)
+
+    assert profile.queries >= 7
+    assert [count for _, count in profile.repeated()] == [6]
+    assert "Возможный N+1 в test: 6 одинаковых запросов" in caplog.text
+
+
+def test_slow_query_logged_with_parameters_and_plan(profiled_engines, db_session, monkeypatch, caplog):
+    # Медленный SELECT - в логе параметры и план EXPLAIN
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0)
+    caplog.set_level(logging.WARNING, logger="backend.sql_profiler")
+
+    db_session.execute(text("SELECT id FROM users WHERE telegram_id = :tg"), {"tg": 424242}).all()
+
+    record = next(r for r in caplog.records if "SELECT id FROM users" in r.getMessage())
+    assert "424242" in record.getMessage()
+    assert "users" in record.getMessage().split("\n", 1)[1]
+
+
+def test_profile_header_returns_request_summary(profiled_engines, client, free_user_data):
+    # Сводка по запросу API возвращается в заголовке только по запросу
+    client.post("/users/register", json=free_user_data)
+    url = f"/kb/documents/{free_user_data['telegram_id']}"
+
+    response = client.get(url, headers={PROFILE_HEADER: "1"})
+    summary = json.loads(response.headers[PROFILE_HEADER])
+
+    assert response.status_code == 200
+    assert summary["queries"] >= 1
+    assert summary["total_ms"] >= 0
+    assert summary["repeated"] == []
+
+    assert PROFILE_HEADER not in client.get(url).headers
@@ -0,0 +1,106 @@
+# Тесты кеша статистики пользователя
+
+import asyncio
+import pytest
+import fakeredis
+from unittest.mock import patch
+
+from backend.services.stats_cache import StatsCache, stats_cache
+from backend.services.user_service import UserService
+
+pytestmark = pytest.mark.api
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    # Redis в памяти вместо реального сервера
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(stats_cache, "_client", client)
+    monkeypatch.setattr(stats_cache, "_disabled_until", 0.0)
+    return client
+
+
+def test_stats_served_from_cache_until_upload(client, free_user_data, fake_redis):
+    # Повторный запрос статистики не считает её заново, загрузка текста сбрасывает кеш
+    telegram_id = free_user_data["telegram_id"]
+    client.post("/users/register", json=free_user_data)
+
+    with patch.object(UserService, "get_user_stats", autospec=True, side_effect=UserService.get_user_stats) as compute:
+        first = client.get(f"/users/{telegram_id}/stats").json()
+        second = client.get(f"/users/{telegram_id}/stats").json()
+
+        assert compute.call_count == 1
+        assert second == first
+
+        client.post("/kb/upload/text", json={"telegram_id": telegram_id, "text": "Новый текст"})
+        third = client.get(f"/users/{telegram_id}/stats").json()
+
+    assert compute.call_count == 2
+    assert third["kb_storage"]["texts"].startswith("1/")
+
+
+def test_ai_query_logging_invalidates_stats(client, free_user_data, fake_redis):
+    # Запрос к ИИ увеличивает messages_today и сбрасывает кеш
+    telegram_id = free_user_data["telegram_id"]
+    client.post("/users/register", json=free_user_data)
+
+    assert client.get(f"/users/{telegram_id}/stats").json()["messages_today"] == 0
+
+    response = client.post(f"/users/{telegram_id}/ai-queries", json={})
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+    assert client.get(f"/users/{telegram_id}/stats").json()["messages_today"] == 1
+
+
+def test_ai_query_logging_unknown_user(client):
+    # Запрос к ИИ от незарегистрированного пользователя - 404
+    response = client.post("/users/424242/ai-queries", json={})
+
+    assert response.status_code == 404
+
+
+def test_stats_without_redis(client, free_user_data, monkeypatch):
+    # Без Redis статистика считается напрямую
+    class BrokenRedis:
+        def __getattr__(self, name):
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(stats_cache, "_client", BrokenRedis())
+    monkeypatch.setattr(stats_cache, "_disabled_until", 0.0)
+
+    client.post("/users/register", json=free_user_data)
+    response = client.get(f"/users/{free_user_data['telegram_id']}/stats")
+
+    assert response.status_code == 200
+    assert response.json()["subscription_tier"] == "free"
+
+
+async def test_concurrent_misses_compute_once():
+    # Одновременные промахи: статистику считает один запрос, остальные ждут
+    cache = StatsCache("redis://unused", ttl_sec=60, client=fakeredis.FakeAsyncRedis())
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return {"messages_today": 3}
+
+    results = await asyncio.gather(*(cache.get_or_compute(1, compute) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result == {"messages_today": 3} for result in results)
+
+
+async def test_value_computed_before_invalidation_is_not_stored():
+    # Значение, посчитанное до сброса, не попадает в кеш
+    cache = StatsCache("redis://unused", ttl_sec=60, client=fakeredis.FakeAsyncRedis())
+
+    async def compute_with_concurrent_change():
+        await cache.invalidate(1)
+        return {"messages_today": 0}
+
+    await cache.get_or_compute(1, compute_with_concurrent_change)
+
+    assert await cache.client.get("cogito:stats:1") is None
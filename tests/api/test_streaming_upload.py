@@ -0,0 +1,105 @@
+# Тесты потоковой загрузки файлов (multipart/form-data)
+
+import pytest
+from unittest.mock import patch
+
+from backend.models import User, UserDocument
+from backend.task_signatures import process_file
+from backend.task_dispatch import DispatchedGroup
+
+pytestmark = pytest.mark.api
+
+
+@pytest.fixture
+def mock_s3():
+    with patch('backend.object_storage.s3_client') as mock_s3:
+        yield mock_s3
+
+
+@pytest.fixture
+def mock_dispatch():
+    with patch('backend.main.dispatch_group') as mock_dispatch:
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"])
+        yield mock_dispatch
+
+
+def test_upload_files_multipart_streams_to_s3(client, free_user_data, db_session, mock_s3, mock_dispatch):
+    # Файл из multipart запроса загружается в S3 и создаёт документ
+
+    client.post("/users/register", json=free_user_data)
+
+    response = client.post(
+        "/kb/upload/files/multipart",
+        params={"telegram_id": free_user_data["telegram_id"]},
+        files=[("files", ("notes.txt", b"hello world", "text/plain"))]
+    )
+
+    assert response.status_code == 200
+    assert response.json()["uploaded_count"] == 1
+
+    put_call = mock_s3.put_object.call_args.kwargs
+    assert put_call["Body"] == b"hello world"
+    assert put_call["ContentType"] == "text/plain"
+    assert put_call["Key"].startswith("files/user_")
+    assert put_call["Key"].endswith(".txt")
+
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+    doc = db_session.query(UserDocument).filter_by(user_id=user.id, file_type="file").one()
+    assert doc.filename == "notes.txt"
+    assert doc.file_url.endswith(put_call["Key"])
+
+    task, args_list, _ = mock_dispatch.call_args.args
+    assert task is process_file
+    assert args_list == [[doc.id, put_call["Key"], "text/plain", free_user_data["telegram_id"], "notes.txt"]]
+
+
+def test_upload_files_multipart_rejects_oversized_file(client, free_user_data, db_session, mock_s3, mock_dispatch):
+    # Слишком большой файл отклоняется во время приёма, документ не создаётся
+
+    client.post("/users/register", json=free_user_data)
+
+    with patch('backend.main.Limits.MAX_FILE_SIZE_MB', 1):
+        response = client.post(
+            "/kb/upload/files/multipart",
+            params={"telegram_id": free_user_data["telegram_id"]},
+            files=[("files", ("big.txt", b"x" * (1024 * 1024 + 1), "text/plain"))]
+        )
+
+    assert response.status_code == 413
+    mock_s3.put_object.assert_not_called()
+    mock_dispatch.assert_not_called()
+    assert db_session.query(UserDocument).filter_by(file_type="file").count() == 0
+
+
+def test_upload_files_multipart_checks_limit_for_whole_batch(client, free_user_data, db_session, mock_s3, mock_dispatch):
+    # Пакет сверх дневного лимита отклоняется после приёма, принятые объекты удаляются из S3
+
+    client.post("/users/register", json=free_user_data)
+
+    response = client.post(
+        "/kb/upload/files/multipart",
+        params={"telegram_id": free_user_data["telegram_id"]},
+        files=[("files", (f"doc_{i}.txt", b"hello", "text/plain")) for i in range(2)]
+    )
+
+    assert response.status_code == 400
+    put_keys = {call.kwargs["Key"] for call in mock_s3.put_object.call_args_list}
+    deleted_keys = {call.kwargs["Key"] for call in mock_s3.delete_object.call_args_list}
+    assert len(put_keys) == 2
+    assert deleted_keys == put_keys
+    mock_dispatch.assert_not_called()
+    assert db_session.query(UserDocument).filter_by(file_type="file").count() == 0
+
+
+def test_upload_files_multipart_requires_files(client, free_user_data, mock_s3):
+    # Запрос без файлов в поле files - 400
+
+    client.post("/users/register", json=free_user_data)
+
+    response = client.post(
+        "/kb/upload/files/multipart",
+        params={"telegram_id": free_user_data["telegram_id"]},
+        files=[("other", ("notes.txt", b"hello", "text/plain"))]
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,208 @@
+# Тесты прямой загрузки в S3: сессия с presigned POST и её завершение
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import User, UserDocument, UserUsage
+from backend.task_dispatch import DispatchedGroup
+from backend.task_signatures import process_file
+from shared.config import Limits
+
+pytestmark = pytest.mark.api
+
+
+@pytest.fixture
+def mock_dispatch():
+    with patch('backend.main.dispatch_group') as mock_dispatch:
+        mock_dispatch.return_value = DispatchedGroup("fake-group-id", ["fake-task-id"])
+        yield mock_dispatch
+
+
+def create_session(client, telegram_id, files):
+    return client.post("/kb/upload/session", json={
+        "telegram_id": telegram_id,
+        "file_type": "file",
+        "files": files
+    })
+
+
+def finalize(client, telegram_id, uploads):
+    return client.post("/kb/upload/session/finalize", json={
+        "telegram_id": telegram_id,
+        "file_type": "file",
+        "uploads": uploads
+    })
+
+
+def test_upload_session_returns_presigned_posts(client, free_user_data, db_session):
+    # Для каждого файла создаётся документ в статусе uploading и подписанная форма загрузки
+
+    client.post("/users/register", json=free_user_data)
+
+    response = create_session(client, free_user_data["telegram_id"], [
+        {"filename": "notes.txt", "mime_type": "text/plain", "size": 11}
+    ])
+
+    assert response.status_code == 200
+    upload = response.json()["uploads"][0]
+
+    doc = db_session.get(UserDocument, upload["document_id"])
+    assert doc.status == "uploading"
+    assert doc.file_url.endswith(upload["fields"]["key"])
+    assert upload["fields"]["key"] == f"files/user_{doc.user_id}/document_{doc.id}.txt"
+    assert upload["fields"]["Content-Type"] == "text/plain"
+    assert "policy" in upload["fields"]
+
+
+def test_upload_session_rejects_oversized_file(client, free_user_data, db_session):
+    # Слишком большой файл отклоняется до создания документов
+
+    client.post("/users/register", json=free_user_data)
+
+    response = create_session(client, free_user_data["telegram_id"], [
+        {"filename": "big.pdf", "mime_type": "application/pdf", "size": 10 ** 9}
+    ])
+
+    assert response.status_code == 413
+    assert db_session.query(UserDocument).filter_by(file_type="file").count() == 0
+
+
+def test_upload_session_checks_limit_for_whole_batch(client, free_user_data, db_session):
+    # Два файла при лимите free в один файл отклоняются до создания документов
+
+    client.post("/users/register", json=free_user_data)
+
+    response = create_session(client, free_user_data["telegram_id"], [
+        {"filename": f"doc_{i}.txt", "mime_type": "text/plain", "size": 4} for i in range(2)
+    ])
+
+    assert response.status_code == 400
+    assert db_session.query(UserDocument).filter_by(file_type="file").count() == 0
+
+
+def test_finalize_verifies_objects_and_dispatches(client, free_user_data, db_session, mock_dispatch):
+    # Завершение проверяет объект через head_object и ставит обработку в очередь
+
+    client.post("/users/register", json=free_user_data)
+    telegram_id = free_user_data["telegram_id"]
+
+    upload = create_session(client, telegram_id, [
+        {"filename": "notes.txt", "mime_type": "text/plain", "size": 11}
+    ]).json()["uploads"][0]
+    document_id, s3_key = upload["document_id"], upload["fields"]["key"]
+
+    head = {"size": 11, "etag": "abc", "content_type": "text/plain"}
+    with patch('backend.main.head_s3_object', return_value=head) as mock_head:
+        response = finalize(client, telegram_id, [{"document_id": document_id, "size": 11, "etag": '"abc"'}])
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["uploaded_count"] == 1
+    assert data["failed_document_ids"] == []
+    assert data["group_id"] == "fake-group-id"
+
+    mock_head.assert_called_once_with(s3_key)
+    task, args_list, _ = mock_dispatch.call_args.args
+    assert task is process_file
+    assert args_list == [[document_id, s3_key, "text/plain", telegram_id, "notes.txt"]]
+
+    doc = db_session.get(UserDocument, document_id)
+    db_session.refresh(doc)
+    assert doc.status == "processing"
+
+    # Повторное завершение документ уже не захватывает
+    with patch('backend.main.head_s3_object', return_value=head):
+        response = finalize(client, telegram_id, [{"document_id": document_id}])
+
+    assert response.status_code == 404
+    assert mock_dispatch.call_count == 1
+
+
+def test_finalize_discards_mismatched_upload(client, premium_user, db_session, mock_dispatch):
+    # Объект другого размера не обрабатывается и удаляется из S3, лимит за него возвращается
+
+    # Два файла в пакете - больше дневного лимита free
+    telegram_id = premium_user.telegram_id
+
+    uploads = create_session(client, telegram_id, [
+        {"filename": "a.txt", "mime_type": "text/plain", "size": 5},
+        {"filename": "b.txt", "mime_type": "text/plain", "size": 7}
+    ]).json()["uploads"]
+    ok_id, bad_id = uploads[0]["document_id"], uploads[1]["document_id"]
+
+    def fake_head(s3_key):
+        return {"size": 5 if s3_key == uploads[0]["fields"]["key"] else 999, "etag": "e", "content_type": "text/plain"}
+
+    with patch('backend.main.head_s3_object', side_effect=fake_head), \
+            patch('backend.main.delete_from_s3') as mock_delete:
+        response = finalize(client, telegram_id, [
+            {"document_id": ok_id, "size": 5},
+            {"document_id": bad_id, "size": 7}
+        ])
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["uploaded_count"] == 1
+    assert data["failed_document_ids"] == [bad_id]
+
+    mock_delete.assert_called_once_with(uploads[1]["fields"]["key"])
+    _, args_list, _ = mock_dispatch.call_args.args
+    assert [args[0] for args in args_list] == [ok_id]
+
+    db_session.expire_all()
+    assert db_session.get(UserDocument, bad_id) is None
+    assert db_session.get(UserUsage, premium_user.id).daily_files == 1
+
+
+def test_finalize_ignores_other_users_documents(client, free_user_data, premium_user_data, db_session, mock_dispatch):
+    # Чужие документы не захватываются
+
+    client.post("/users/register", json=free_user_data)
+    client.post("/users/register", json=premium_user_data)
+
+    upload = create_session(client, free_user_data["telegram_id"], [
+        {"filename": "notes.txt", "mime_type": "text/plain", "size": 11}
+    ]).json()["uploads"][0]
+
+    response = finalize(client, premium_user_data["telegram_id"], [{"document_id": upload["document_id"]}])
+
+    assert response.status_code == 404
+    mock_dispatch.assert_not_called()
+
+    owner = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+    doc = db_session.query(UserDocument).filter_by(user_id=owner.id).one()
+    assert doc.status == "uploading"
+
+
+def test_expired_upload_sessions_are_discarded(client, premium_user, db_session):
+    # Сессии, не завершённые после истечения presigned POST, удаляются вместе с объектами S3
+    from backend.maintenance_tasks import expire_upload_sessions
+
+    # Два файла в пакете - больше дневного лимита free
+    telegram_id = premium_user.telegram_id
+
+    uploads = create_session(client, telegram_id, [
+        {"filename": "old.txt", "mime_type": "text/plain", "size": 5},
+        {"filename": "new.txt", "mime_type": "text/plain", "size": 5}
+    ]).json()["uploads"]
+    stale_id, fresh_id = uploads[0]["document_id"], uploads[1]["document_id"]
+
+    # Сессии истекают сразу; вторая создана "позже" и ещё действует
+    db_session.query(UserDocument).filter_by(id=fresh_id).update({"upload_date": datetime.now() + timedelta(minutes=2)})
+    db_session.commit()
+
+    with patch("backend.maintenance_tasks.SessionLocal", sessionmaker(bind=db_session.get_bind())), \
+            patch.object(Limits, "UPLOAD_URL_EXPIRATION_SEC", 0), \
+            patch.object(Limits, "UPLOAD_SESSION_GRACE_SEC", 0), \
+            patch("backend.maintenance_tasks.delete_objects_from_s3", return_value=[]) as mock_delete:
+        report = expire_upload_sessions()
+
+    db_session.expire_all()
+
+    assert report == {"documents": 1, "s3_failed": 0}
+    mock_delete.assert_called_once_with([uploads[0]["fields"]["key"]])
+    assert db_session.get(UserDocument, stale_id) is None
+    assert db_session.get(UserDocument, fresh_id).status == "uploading"
+    assert db_session.get(UserUsage, premium_user.id).daily_files == 1
@@ -92,4 +92,13 @@ def test_user_stats_contains_correct_limits(client, free_user_data):
     assert "0/0" in kb_storage.get("video_hours", "")
     assert "0/1" in kb_storage.get("files", "")
     assert "0/0" in kb_storage.get("photos", "")
-    assert "0/5" in kb_storage.get("texts", "")
\ No newline at end of file
+    assert "0/5" in kb_storage.get("texts", "")
+
+
+def test_metrics_endpoint_exposes_pool_metrics(client):
+    # /metrics отдаёт метрики пула соединений с БД
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "db_pool_checkout_wait_seconds" in response.text
+    assert "db_pool_saturation" in response.text
@@ -171,64 +171,74 @@ async def test_safe_message_edit_photo_message():
 async def test_paginate_documents_single_page():
     # Пагинация с одной страницей
 
-    documents = [
-        {
-            "id": 1,
-            "filename": "test1.txt",
-            "file_type": "text",
-            "upload_date": "2025-01-01T12:00:00",
-            "extracted_text": "Content 1"
-        },
-        {
-            "id": 2,
-            "filename": "test2.txt",
-            "file_type": "text",
-            "upload_date": "2025-01-02T12:00:00",
-            "extracted_text": "Content 2"
-        }
-    ]
+    page_data = {
+        "documents": [
+            {
+                "id": 1,
+                "filename": "test1.txt",
+                "file_type": "text",
+                "upload_date": "2025-01-02T12:00:00",
+                "preview": "Content 1"
+            },
+            {
+                "id": 2,
+                "filename": "test2.txt",
+                "file_type": "text",
+                "upload_date": "2025-01-01T12:00:00",
+                "preview": "Content 2"
+            }
+        ],
+        "next_cursor": None,
+        "total_count": 2
+    }
 
     mock_query = Mock()
     mock_query.edit_message_text = AsyncMock()
+    mock_query.message.photo = None
 
     mock_context = Mock()
+    mock_context.user_data = {}
 
-    await paginate_documents(documents, "text", mock_context, mock_query, 12345)
+    await paginate_documents(page_data, "text", mock_context, mock_query, 12345)
 
-    # Должен вызваться edit_message_text один раз
+    # Должен вызваться edit_message_text один раз, без кнопки "Вперёд"
     mock_query.edit_message_text.assert_called_once()
+    keyboard = mock_query.edit_message_text.call_args.kwargs["reply_markup"].inline_keyboard
+    assert not any(button.callback_data == "page_text_1" for row in keyboard for button in row)
 
 
 @pytest.mark.asyncio
-async def test_paginate_documents_multiple_pages():
-    # Пагинация с несколькими страницами
-
-    # Создаём 20 документов (больше чем Limits.PAGINATION_ITEMS = 15)
-    documents = [
-        {
-            "id": i,
-            "filename": f"test{i}.txt",
-            "file_type": "text",
-            "upload_date": "2025-01-01T12:00:00",
-            "extracted_text": f"Content {i}"
-        }
-        for i in range(20)
-    ]
+async def test_paginate_documents_stores_next_cursor():
+    # Курсор следующей страницы сохраняется, в кнопке - только номер страницы
+
+    page_data = {
+        "documents": [
+            {
+                "id": i,
+                "filename": f"test{i}.txt",
+                "file_type": "text",
+                "upload_date": "2025-01-01T12:00:00",
+                "preview": f"Content {i}"
+            }
+            for i in range(Limits.DOCUMENTS_PAGE_SIZE)
+        ],
+        "next_cursor": "cursor-1",
+        "total_count": 20
+    }
 
     mock_query = Mock()
     mock_query.edit_message_text = AsyncMock()
     mock_query.message.photo = None
 
     mock_context = Mock()
-    mock_context.bot.send_message = AsyncMock()
+    mock_context.user_data = {}
 
-    await paginate_documents(documents, "text", mock_context, mock_query, 12345)
+    await paginate_documents(page_data, "text", mock_context, mock_query, 12345)
 
-    # Первая страница - edit_message_text
-    mock_query.edit_message_text.assert_called_once()
+    assert mock_context.user_data["doc_pages"]["text"] == {"cursors": [None, "cursor-1"], "total": 20}
 
-    # Вторая страница - send_message
-    mock_context.bot.send_message.assert_called()
+    keyboard = mock_query.edit_message_text.call_args.kwargs["reply_markup"].inline_keyboard
+    assert any(button.callback_data == "page_text_1" for row in keyboard for button in row)
 
 
 def test_limits_constants():
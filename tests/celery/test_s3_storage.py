@@ -10,12 +10,12 @@ pytestmark = pytest.mark.celery
 
 def test_upload_photo_to_s3_creates_correct_key():
     # upload_photo_to_s3 создаёт правильный путь в S3
-    from backend.s3_storage import upload_photo_to_s3
+    from backend.object_storage import upload_photo_to_s3
 
     # Создаём фейковый base64
     fake_image = base64.b64encode(b"fake_image_data").decode('utf-8')
 
-    with patch('backend.s3_storage.s3_client') as mock_s3:
+    with patch('backend.object_storage.s3_client') as mock_s3:
         mock_s3.put_object.return_value = {"ETag": "fake"}
 
         s3_key = upload_photo_to_s3(fake_image, user_id=123, document_id=456)
@@ -26,11 +26,11 @@ def test_upload_photo_to_s3_creates_correct_key():
 
 def test_upload_file_to_s3_creates_correct_key():
     # upload_file_to_s3 создаёт правильный путь с расширением
-    from backend.s3_storage import upload_file_to_s3
+    from backend.object_storage import upload_file_to_s3
 
     fake_file = base64.b64encode(b"fake_file_data").decode('utf-8')
 
-    with patch('backend.s3_storage.s3_client') as mock_s3:
+    with patch('backend.object_storage.s3_client') as mock_s3:
         mock_s3.put_object.return_value = {"ETag": "fake"}
 
         s3_key = upload_file_to_s3(fake_file, user_id=789, document_id=101, extension="pdf")
@@ -41,9 +41,9 @@ def test_upload_file_to_s3_creates_correct_key():
 
 def test_delete_from_s3_calls_delete_object():
     # delete_from_s3 вызывает s3_client.delete_object
-    from backend.s3_storage import delete_from_s3
+    from backend.object_storage import delete_from_s3
 
-    with patch('backend.s3_storage.s3_client') as mock_s3:
+    with patch('backend.object_storage.s3_client') as mock_s3:
         mock_s3.delete_object.return_value = {}
 
         result = delete_from_s3("test/path/file.jpg")
@@ -57,9 +57,9 @@ def test_delete_from_s3_calls_delete_object():
 
 def test_delete_from_s3_handles_errors():
     # delete_from_s3 обрабатывает ошибки
-    from backend.s3_storage import delete_from_s3
+    from backend.object_storage import delete_from_s3
 
-    with patch('backend.s3_storage.s3_client') as mock_s3:
+    with patch('backend.object_storage.s3_client') as mock_s3:
         mock_s3.delete_object.side_effect = Exception("S3 Error")
 
         result = delete_from_s3("test/path/file.jpg")
@@ -69,9 +69,9 @@ def test_delete_from_s3_handles_errors():
 
 def test_get_photo_presigned_url_generates_url():
     # get_photo_presigned_url генерирует presigned URL
-    from backend.s3_storage import get_photo_presigned_url
+    from backend.object_storage import get_photo_presigned_url
 
-    with patch('backend.s3_storage.s3_client') as mock_s3:
+    with patch('backend.object_storage.s3_client') as mock_s3:
         mock_s3.generate_presigned_url.return_value = "https://fake-url.com"
 
         url = get_photo_presigned_url("photos/user_1/photo_1.jpg")
@@ -151,17 +151,123 @@ def test_extract_text_from_txt_cp1251():
     assert result == "Привет мир"
 
 
-def test_update_document_status_calls_api():
-    # update_document_status отправляет PUT запрос
+def test_update_document_status_uses_repository():
+    # update_document_status пишет статус через репозиторий, без HTTP запросов к API
     from backend.s3_storage import update_document_status
 
-    with patch('backend.s3_storage.httpx.put') as mock_put:
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_put.return_value = mock_response
+    with patch('backend.s3_storage.document_status_repository') as mock_repository, \
+            patch('backend.s3_storage.progress_events') as mock_events:
+        update_document_status(123, "completed", transcription="Test text", telegram_id=42)
+
+    mock_repository.set_status.assert_called_once_with(
+        123,
+        "completed",
+        error=None,
+        transcription="Test text",
+        telegram_id=42
+    )
+    # Подписчики прогресса получают итоговый статус
+    mock_events.publish.assert_called_once_with(123, status="completed", error=None)
+
+
+def test_document_status_repository_writes_db(db_session):
+    # Статус, текст и счётчик хранилища обновляются одной транзакцией
+    from sqlalchemy.orm import sessionmaker
+    from backend.models import User, UserDocument, UserUsage
+    from backend.services.document_status_repository import DocumentStatusRepository
+
+    user = User(telegram_id=900001, username="worker", referral_code="REF900001")
+    db_session.add(user)
+    db_session.flush()
+    doc = UserDocument(user_id=user.id, filename="notes.txt", file_type="file", status="processing")
+    db_session.add(doc)
+    db_session.commit()
+
+    repository = DocumentStatusRepository(sessionmaker(bind=db_session.get_bind()))
+
+    with patch('backend.services.document_status_repository.stats_cache') as mock_cache:
+        assert repository.set_status(doc.id, "completed", transcription="Test text") is True
+
+    mock_cache.invalidate_sync.assert_called_once_with(900001)
+
+    db_session.refresh(doc)
+    assert doc.status == "completed"
+    assert doc.extracted_text == "Test text"
+    assert doc.preview == "Test text"
+    assert db_session.get(UserUsage, user.id).files_count == 1
+
+    assert repository.get_owner(doc.id) == (900001, "notes.txt")
+    assert repository.set_status(999999, "completed") is False
+
+
+def test_s3_stream_upload_small_object_uses_put_object():
+    # Объект меньше одной части загружается одним put_object
+    from backend.object_storage import S3StreamUpload
+
+    with patch('backend.object_storage.s3_client') as mock_s3:
+        upload = S3StreamUpload("files/user_1/document_x.txt", content_type="text/plain", part_size=10)
+
+        assert upload.feed(b"hello") is False
+        upload.complete()
+
+        mock_s3.put_object.assert_called_once()
+        assert mock_s3.put_object.call_args.kwargs["Body"] == b"hello"
+        mock_s3.create_multipart_upload.assert_not_called()
+
+
+def test_s3_stream_upload_sends_parts():
+    # Большой объект загружается частями через multipart upload
+    from backend.object_storage import S3StreamUpload
+
+    with patch('backend.object_storage.s3_client') as mock_s3:
+        mock_s3.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        mock_s3.upload_part.side_effect = [{"ETag": "e1"}, {"ETag": "e2"}]
+
+        upload = S3StreamUpload("files/user_1/document_x.pdf", part_size=4)
+
+        assert upload.feed(b"abcdef") is True
+        upload.upload_part()
+        upload.feed(b"gh")
+        upload.complete()
+
+        bodies = [call.kwargs["Body"] for call in mock_s3.upload_part.call_args_list]
+        assert bodies == [b"abcdef", b"gh"]
+        mock_s3.complete_multipart_upload.assert_called_once_with(
+            Bucket=mock_s3.complete_multipart_upload.call_args.kwargs["Bucket"],
+            Key="files/user_1/document_x.pdf",
+            UploadId="upload-1",
+            MultipartUpload={"Parts": [{"ETag": "e1", "PartNumber": 1}, {"ETag": "e2", "PartNumber": 2}]}
+        )
+        mock_s3.put_object.assert_not_called()
+
+
+def test_delete_objects_from_s3_in_chunks():
+    # delete_objects_from_s3 удаляет пачками по 1000 ключей и возвращает неудалённые
+    from backend.object_storage import delete_objects_from_s3
+
+    keys = [f"photos/user_1/photo_{i}.jpg" for i in range(2500)]
+
+    with patch('backend.object_storage.s3_client') as mock_s3:
+        mock_s3.delete_objects.side_effect = [
+            {},
+            {'Errors': [{'Key': keys[1500], 'Message': 'Access Denied'}]},
+            Exception("S3 Error"),
+        ]
+
+        failed = delete_objects_from_s3(keys)
+
+    assert [len(call.kwargs['Delete']['Objects']) for call in mock_s3.delete_objects.call_args_list] == [1000, 1000, 500]
+    assert failed == [keys[1500]] + keys[2000:]
+
+
+def test_delete_s3_objects_retries_failed_keys():
+    # Повтор задачи только для ключей, которые S3 не удалил
+    from backend.s3_storage import delete_s3_objects
 
-        update_document_status(123, "completed", transcription="Test text")
+    with patch('backend.s3_storage.delete_objects_from_s3', return_value=["b"]) as mock_delete, \
+            patch.object(delete_s3_objects, 'retry', side_effect=RuntimeError("retry")) as mock_retry:
+        with pytest.raises(RuntimeError):
+            delete_s3_objects.run(["a", "b"])
 
-        mock_put.assert_called_once()
-        call_args = mock_put.call_args
-        assert "123" in str(call_args)
\ No newline at end of file
+    mock_delete.assert_called_once_with(["a", "b"])
+    assert mock_retry.call_args.kwargs["args"] == [["b"]]
@@ -0,0 +1,104 @@
+# Тесты пакетной постановки задач группой и статуса группы
+
+import pytest
+from unittest.mock import Mock, patch
+
+from backend.task_dispatch import dispatch_group, get_group_status
+
+pytestmark = pytest.mark.celery
+
+
+def make_result(task_id, state, info=None):
+    return Mock(id=task_id, state=state, info=info)
+
+
+def test_dispatch_group_publishes_batch_once():
+    # Пакет публикуется одной группой и сохраняется в result backend
+    task = Mock()
+    task.name = "backend.s3_storage.process_file"
+    task.signature.side_effect = lambda args, priority: ("sig", tuple(args), priority)
+
+    group_result = Mock(id="group-1", results=[make_result("t1", "PENDING"), make_result("t2", "PENDING")])
+
+    with patch('backend.task_dispatch.group') as mock_group:
+        mock_group.return_value.apply_async.return_value = group_result
+
+        dispatched = dispatch_group(task, [[1, "key1"], [2, "key2"]], priority=3)
+
+    mock_group.assert_called_once_with([("sig", (1, "key1"), 3), ("sig", (2, "key2"), 3)])
+    mock_group.return_value.apply_async.assert_called_once_with()
+    group_result.save.assert_called_once()
+
+    assert dispatched.group_id == "group-1"
+    assert dispatched.task_ids == ["t1", "t2"]
+
+
+@pytest.mark.parametrize("states, expected", [
+    (["PENDING", "PENDING"], "pending"),
+    (["STARTED", "PENDING"], "processing"),
+    (["SUCCESS", "PENDING"], "processing"),
+    (["SUCCESS", "SUCCESS"], "completed"),
+    (["FAILURE", "REVOKED"], "failed"),
+    (["SUCCESS", "FAILURE"], "partial"),
+])
+def test_get_group_status_aggregates_states(states, expected):
+    # Общий статус группы считается по состояниям задач
+    results = [make_result(f"t{i}", state) for i, state in enumerate(states)]
+
+    with patch('backend.task_dispatch.GroupResult') as mock_group_result:
+        mock_group_result.restore.return_value = Mock(results=results)
+
+        status = get_group_status("group-1")
+
+    assert status["status"] == expected
+    assert status["total"] == len(states)
+    assert [task["status"] for task in status["tasks"]] == [state.lower() for state in states]
+
+
+def test_get_group_status_reports_item_errors():
+    # Ошибка и прогресс возвращаются по каждой задаче
+    results = [
+        make_result("t1", "FAILURE", ValueError("bad file")),
+        make_result("t2", "STARTED", {"progress": "50%"}),
+    ]
+
+    with patch('backend.task_dispatch.GroupResult') as mock_group_result:
+        mock_group_result.restore.return_value = Mock(results=results)
+
+        status = get_group_status("group-1")
+
+    assert status["failed"] == 1
+    assert status["tasks"][0]["error"] == "bad file"
+    assert status["tasks"][1]["progress"] == "50%"
+    assert status["tasks"][1]["error"] is None
+
+
+def test_get_group_status_unknown_group():
+    # Несуществующая группа - None
+    with patch('backend.task_dispatch.GroupResult') as mock_group_result:
+        mock_group_result.restore.return_value = None
+
+        assert get_group_status("missing") is None
+
+
+def test_get_tasks_status_reads_backend_with_one_mget():
+    # Статусы задач читаются из Redis backend одним MGET
+    import fakeredis
+    from celery.backends.redis import RedisBackend
+    from backend.celery_app import celery_app
+    from backend.task_dispatch import get_tasks_status
+
+    backend = RedisBackend(app=celery_app, url="redis://localhost:6379/0")
+    backend.client = fakeredis.FakeRedis()
+    backend.store_result("t1", {"document_id": 1}, "SUCCESS")
+    backend.store_result("t2", ValueError("bad file"), "FAILURE")
+
+    with patch('backend.task_dispatch.celery_app') as mock_app, \
+            patch.object(backend, 'mget', wraps=backend.mget) as mock_mget:
+        mock_app.backend = backend
+
+        statuses = get_tasks_status(["t1", "t2", "t3"])
+
+    mock_mget.assert_called_once()
+    assert [status["status"] for status in statuses] == ["success", "failure", "pending"]
+    assert statuses[1]["error"] == "bad file"
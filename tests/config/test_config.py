@@ -3,7 +3,8 @@
 import pytest
 from shared.config import (
     settings, Messages, Limits, DocumentStatus,
-    CONTENT_CONFIG, NOTIFICATION_TEMPLATES
+    CONTENT_CONFIG, NOTIFICATION_TEMPLATES,
+    DB_POOL_PROFILES, get_db_pool_config
 )
 
 pytestmark = pytest.mark.api
@@ -115,4 +116,32 @@ def test_limits_are_positive():
     assert Limits.BUFFER_MAX_ITEMS > 0
     assert Limits.BUFFER_TIMEOUT_SEC > 0
     assert Limits.MAX_FILE_SIZE_MB > 0
-    assert Limits.MESSAGE_MAX_LENGTH > 0
\ No newline at end of file
+    assert Limits.MESSAGE_MAX_LENGTH > 0
+
+
+def test_db_pool_profiles_cover_all_roles():
+    # Профили пула есть для всех ролей процессов
+
+    assert set(DB_POOL_PROFILES) == {"api", "worker", "bot"}
+
+
+def test_db_pool_config_role_override(monkeypatch):
+    # Параметры пула переопределяются переменными окружения конкретной роли
+
+    monkeypatch.setenv("DB_WORKER_POOL_SIZE", "7")
+    monkeypatch.setenv("DB_WORKER_POOL_PRE_PING", "false")
+
+    worker = get_db_pool_config("worker")
+    api = get_db_pool_config("api")
+
+    assert worker["pool_size"] == 7
+    assert worker["pool_pre_ping"] is False
+    assert worker["application_name"].endswith("-worker")
+    assert api["pool_size"] == DB_POOL_PROFILES["api"]["pool_size"]
+
+
+def test_db_pool_config_unknown_role():
+    # Неизвестная роль процесса - ошибка
+
+    with pytest.raises(ValueError):
+        get_db_pool_config("scheduler")
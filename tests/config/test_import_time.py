@@ -0,0 +1,49 @@
+# Тесты времени импорта точек входа (utils/import_benchmark.py)
+
+import os
+
+import pytest
+
+from utils.import_benchmark import ENTRY_POINTS, check_entry_point, measure_import, parse_importtime
+
+# Замеры времени зависят от машины - только по явному запросу:
+# IMPORT_BENCHMARK=1 pytest -m slow tests/config/test_import_time.py
+IMPORT_BENCHMARK = os.getenv('IMPORT_BENCHMARK') == '1'
+
+
+SAMPLE_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+import time:        50 |         50 |     json.decoder
+import time:        70 |        120 |   json
+import time:        30 |         30 |   shared.helpers
+import time:       200 |        350 | backend.sample
+"""
+
+
+def test_parse_importtime_breakdown():
+    # Разбивка: накопленное время и модули первого уровня
+    report = parse_importtime(SAMPLE_OUTPUT, "backend.sample")
+
+    assert report.total_ms == 0.35
+    assert report.top_level == ["json", "shared.helpers"]
+    assert report.top(1) == [("json", 0.12)]
+    assert "json.decoder" in report.cumulative_us
+
+
+@pytest.mark.parametrize("entry", ENTRY_POINTS, ids=lambda entry: entry.module)
+def test_entry_point_does_not_import_heavy_modules(entry):
+    # Точка входа не тянет тяжёлые модули
+    report = measure_import(entry.module)
+
+    assert check_entry_point(entry, report, check_budget=False) == []
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not IMPORT_BENCHMARK, reason="IMPORT_BENCHMARK=1 не задан")
+@pytest.mark.parametrize("entry", ENTRY_POINTS, ids=lambda entry: entry.module)
+def test_entry_point_import_within_budget(entry):
+    # Точка входа укладывается в бюджет времени импорта
+    report = measure_import(entry.module)
+    scale = float(os.getenv('IMPORT_BUDGET_SCALE', '1'))
+
+    assert check_entry_point(entry, report, scale) == []
@@ -1,26 +1,65 @@
 # Фикстуры для pytest
 
+import os
+import tempfile
 import pytest
+from datetime import datetime
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
-from backend.main import app
-from backend.database import Base, get_db
-from backend.models import SubscriptionTier
+# Счётчики rate limit в памяти процесса (без Redis)
+os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
 
-# Используем in-memory SQLite для тестов
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
+from backend.main import app, limiter
+from backend.database import Base, get_db, get_async_db
+from backend.models import SubscriptionTier, User, UserSubscription
+from backend.services.tier_catalogue import tier_catalogue
+from backend.services.rate_limit import rate_limit_tiers
+from backend.metrics import instrument_engine
+
+# Используем SQLite во временном файле: синхронная сессия тестов и
+# асинхронная сессия API (aiosqlite) должны видеть одни и те же данные
+_test_db_fd, TEST_DB_PATH = tempfile.mkstemp(suffix=".db", prefix="cogito_test_")
+os.close(_test_db_fd)
+
+SQLALCHEMY_TEST_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
+SQLALCHEMY_TEST_ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
 
 test_engine = create_engine(
     SQLALCHEMY_TEST_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    poolclass=NullPool,
+)
+
+# NullPool: TestClient создаёт новый event loop для каждого теста,
+# соединения aiosqlite нельзя переиспользовать между loop'ами
+test_async_engine = create_async_engine(
+    SQLALCHEMY_TEST_ASYNC_DATABASE_URL,
+    poolclass=NullPool,
 )
 
+# Метрики SQL запросов, как у движков API
+instrument_engine(test_engine, "sync")
+instrument_engine(test_async_engine.sync_engine, "async")
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=test_async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Удаляем временный файл БД после прогона
+    if os.path.exists(TEST_DB_PATH):
+        os.remove(TEST_DB_PATH)
+
 
 @pytest.fixture(scope="function")
 def db_session():
@@ -29,8 +68,9 @@ def db_session():
 
     db = TestingSessionLocal()
 
-    # Заполняем тарифы
+    # Заполняем тарифы; каталог в памяти перечитает их при первом обращении
     seed_tiers(db)
+    tier_catalogue.invalidate()
 
     try:
         yield db
@@ -136,7 +176,16 @@ def client(db_session):
         finally:
             pass
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    # Счётчики rate limit и тарифы пользователей не переносятся между тестами
+    limiter.reset()
+    rate_limit_tiers.invalidate()
 
     with TestClient(app) as test_client:
         yield test_client
@@ -144,6 +193,29 @@ def client(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+async def async_db_session(db_session):
+    # Асинхронная сессия к той же тестовой БД (для тестов сервисов)
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def captured_sql(db_session):
+    # Перехватывает SQL асинхронного движка (сервисы и эндпоинты API).
+    # Фикстура синхронная и не зависит от async_db_session - подходит
+    # и синхронным тестам через TestClient
+    captured = []
+    sync_engine = test_async_engine.sync_engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield captured
+    event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture
 def free_user_data():
     # Данные бесплатного пользователя
@@ -162,6 +234,27 @@ def premium_user_data():
     }
 
 
+@pytest.fixture
+def premium_user(client, premium_user_data, db_session):
+    # Зарегистрированный пользователь с тарифом premium (у free фото недоступны, файлов - один)
+    client.post("/users/register", json=premium_user_data)
+
+    user = db_session.query(User).filter_by(telegram_id=premium_user_data["telegram_id"]).first()
+    tier = db_session.query(SubscriptionTier).filter_by(tier_name="premium").first()
+
+    db_session.query(UserSubscription).filter_by(user_id=user.id).update({"status": "expired"})
+    db_session.add(UserSubscription(
+        user_id=user.id,
+        tier_id=tier.id,
+        status="active",
+        source="test",
+        start_date=datetime.now()
+    ))
+    db_session.commit()
+
+    return user
+
+
 @pytest.fixture
 def admin_user_data():
     # Данные админа
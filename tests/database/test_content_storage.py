@@ -0,0 +1,215 @@
+# Тесты хранения текстов документов: сжатие zstd и вынос в S3
+
+import io
+import re
+import pytest
+from unittest.mock import Mock
+from sqlalchemy.orm import sessionmaker
+
+from backend import content_storage
+from backend.content_storage import encode_text, offload_to_s3, read_text, read_text_range
+from backend.models import User, UserDocument, UserDocumentContent
+from shared.config import settings, ContentStorage
+from utils.recompress_document_contents import recompress
+
+pytestmark = pytest.mark.database
+
+# Многобайтовые символы на границах блоков распаковки
+LONG_TEXT = "Расшифровка видео, часть {}. Ёлка 🎄\n"
+LONG_TEXT = "".join(LONG_TEXT.format(i) for i in range(2000))
+
+
+class FakeS3Client:
+    # S3 в памяти: put_object и get_object с потоковым Body
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = bytes(Body)
+        return {"ETag": "etag"}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    client = FakeS3Client()
+    monkeypatch.setattr("backend.object_storage.s3_client", client)
+    return client
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(telegram_id=777001, referral_code="REF777001")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def test_small_text_stored_inline():
+    # Короткий текст хранится как есть
+    columns = encode_text("Короткий текст")
+
+    assert columns["storage"] == ContentStorage.INLINE
+    assert columns["text"] == "Короткий текст"
+    assert columns["data"] is None
+
+
+def test_large_text_compressed_and_read_by_range(monkeypatch):
+    # Большой текст сжимается; фрагмент читается потоково, в том числе
+    # через границы блоков распаковки
+    monkeypatch.setattr(content_storage, "READ_CHUNK_SIZE", 1000)
+    content = UserDocumentContent()
+    content.set_text(LONG_TEXT)
+
+    assert content.storage == ContentStorage.ZSTD
+    assert content.text is None
+    assert content.stored_bytes < content.size_bytes == len(LONG_TEXT.encode("utf-8"))
+    assert content.char_count == len(LONG_TEXT)
+
+    assert read_text(content) == LONG_TEXT
+    for offset, length in ((0, 10), (995, 20), (len(LONG_TEXT) - 5, 100), (len(LONG_TEXT) + 1, 10)):
+        assert read_text_range(content, offset, length) == LONG_TEXT[offset:offset + length]
+
+
+def test_large_text_offloaded_to_s3(db_session, user, fake_s3, monkeypatch):
+    # Сжатый текст от порога выносится в S3 и читается оттуда прозрачно
+    monkeypatch.setattr(settings, "CONTENT_S3_MIN_BYTES", 0)
+    doc = UserDocument(user_id=user.id, filename="video.mp4", file_type="video", extracted_text=LONG_TEXT)
+    db_session.add(doc)
+    db_session.commit()
+
+    assert offload_to_s3(doc.content, doc.id)
+    db_session.commit()
+    db_session.expire_all()
+
+    content = db_session.get(UserDocumentContent, doc.id)
+    assert content.storage == ContentStorage.S3
+    assert content.data is None
+    assert content.s3_key in fake_s3.objects
+    assert read_text(content) == LONG_TEXT
+    # Сетевой вызов не скрывается за атрибутом модели
+    with pytest.raises(RuntimeError):
+        doc.extracted_text
+
+
+def test_status_repository_offloads_text_after_commit(db_session, user, fake_s3, monkeypatch):
+    # Текст выносится в S3 только после коммита статуса: при откате объект без ссылки не остаётся
+    from backend.services.document_status_repository import DocumentStatusRepository
+
+    monkeypatch.setattr(settings, "CONTENT_S3_MIN_BYTES", 0)
+    doc = UserDocument(user_id=user.id, filename="video.mp4", file_type="video", status="processing")
+    db_session.add(doc)
+    db_session.commit()
+
+    committed_states = []
+    put_object = fake_s3.put_object
+
+    def checked_put(**kwargs):
+        db_session.expire_all()
+        committed_states.append((
+            db_session.get(UserDocument, doc.id).status,
+            db_session.get(UserDocumentContent, doc.id).storage
+        ))
+        return put_object(**kwargs)
+
+    monkeypatch.setattr(fake_s3, "put_object", checked_put)
+    repository = DocumentStatusRepository(sessionmaker(bind=db_session.get_bind()))
+
+    monkeypatch.setattr("backend.services.document_status_repository.stats_cache", Mock())
+
+    assert repository.set_status(doc.id, "completed", transcription=LONG_TEXT)
+
+    assert committed_states == [("completed", ContentStorage.ZSTD)]
+    db_session.expire_all()
+    content = db_session.get(UserDocumentContent, doc.id)
+    assert content.storage == ContentStorage.S3
+    assert content.s3_key in fake_s3.objects
+    assert read_text(content) == LONG_TEXT
+
+
+def test_text_endpoint_reads_compressed_fragment(client, db_session, free_user_data):
+    # Эндпоинт текста отдаёт фрагмент сжатого текста
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+    doc = UserDocument(user_id=user.id, filename="a.txt", file_type="text", status="completed", extracted_text=LONG_TEXT)
+    db_session.add(doc)
+    db_session.commit()
+    assert doc.content.storage == ContentStorage.ZSTD
+
+    response = client.get(
+        f"/kb/documents/{free_user_data['telegram_id']}/{doc.id}/text",
+        params={"offset": 100, "length": 50}
+    )
+
+    data = response.json()
+    assert data["text"] == LONG_TEXT[100:150]
+    assert data["total_length"] == len(LONG_TEXT)
+    assert data["next_offset"] == 150
+
+
+def test_documents_list_reads_offloaded_texts(client, db_session, free_user_data, fake_s3, monkeypatch):
+    # Список документов отдаёт тексты из S3 (читаются в пуле потоков)
+    monkeypatch.setattr(settings, "CONTENT_S3_MIN_BYTES", 0)
+    client.post("/users/register", json=free_user_data)
+    user = db_session.query(User).filter_by(telegram_id=free_user_data["telegram_id"]).first()
+    docs = [
+        UserDocument(user_id=user.id, filename=f"{i}.txt", file_type="text", status="completed", extracted_text=LONG_TEXT)
+        for i in range(2)
+    ]
+    db_session.add_all(docs)
+    db_session.commit()
+    for doc in docs:
+        assert offload_to_s3(doc.content, doc.id)
+    db_session.commit()
+
+    response = client.get(f"/kb/documents/{free_user_data['telegram_id']}")
+
+    assert response.status_code == 200
+    assert [document["extracted_text"] for document in response.json()["documents"]] == [LONG_TEXT] * 2
+
+
+async def test_soft_delete_does_not_load_text(db_session, async_db_session, user, captured_sql):
+    # Текст удаляемого документа очищается UPDATE без чтения
+    from backend.services.document_service import DocumentService
+
+    doc = UserDocument(user_id=user.id, filename="a.txt", file_type="text", status="completed", extracted_text=LONG_TEXT)
+    db_session.add(doc)
+    db_session.commit()
+
+    assert await DocumentService(async_db_session).soft_delete_document(doc.id) == []
+
+    selects = [statement for statement, _ in captured_sql if statement.lstrip().startswith("SELECT")]
+    assert not [statement for statement in selects if re.search(r"user_document_contents(_\d+)?\.data", statement)]
+
+    db_session.expire_all()
+    assert db_session.get(UserDocument, doc.id).is_deleted
+    assert db_session.get(UserDocumentContent, doc.id).char_count == 0
+
+
+def test_recompress_existing_texts(db_session, user, fake_s3, monkeypatch):
+    # Старые несжатые тексты сжимаются пачками, большие - выносятся в S3
+    monkeypatch.setattr(settings, "CONTENT_INLINE_MAX_BYTES", 10 ** 9)
+    for i in range(3):
+        db_session.add(UserDocument(user_id=user.id, filename=f"{i}.txt", file_type="text", extracted_text=LONG_TEXT))
+    db_session.add(UserDocument(user_id=user.id, filename="small.txt", file_type="text", extracted_text="мало"))
+    db_session.commit()
+
+    monkeypatch.setattr(settings, "CONTENT_INLINE_MAX_BYTES", 1000)
+    monkeypatch.setattr(settings, "CONTENT_S3_MIN_BYTES", 10 ** 9)
+    session_factory = sessionmaker(bind=db_session.get_bind())
+
+    stats = recompress(session_factory, batch_size=2)
+
+    assert stats["documents"] == 3
+    assert stats["bytes_after"] < stats["bytes_before"] == 3 * len(LONG_TEXT.encode("utf-8"))
+
+    db_session.expire_all()
+    storages = sorted(content.storage for content in db_session.query(UserDocumentContent))
+    assert storages == [ContentStorage.INLINE] + [ContentStorage.ZSTD] * 3
+
+    # Распаковка перед откатом миграции
+    assert recompress(session_factory, decompress=True)["documents"] == 3
+    db_session.expire_all()
+    assert {content.text for content in db_session.query(UserDocumentContent)} == {LONG_TEXT, "мало"}
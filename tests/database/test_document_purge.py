@@ -0,0 +1,87 @@
+# Тесты окончательного удаления мягко удалённых документов
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy.orm import sessionmaker
+
+from backend.maintenance_tasks import purge_deleted_documents
+from backend.models import User, UserDocument, UserDocumentContent, UserDailyAction
+from shared.config import S3_BASE_URL
+
+pytestmark = pytest.mark.database
+
+
+@pytest.fixture
+def documents(db_session):
+    # Старые удалённые, недавно удалённые и активные документы
+    user = User(telegram_id=888001, referral_code="REF888001")
+    db_session.add(user)
+    db_session.commit()
+
+    old = datetime.now() - timedelta(days=40)
+    docs = {
+        "old_photo": UserDocument(
+            user_id=user.id, filename="p.jpg", file_type="photo", status="completed",
+            file_url=f"{S3_BASE_URL}/photos/user_{user.id}/photo_1.jpg",
+            is_deleted=True, deleted_at=old, extracted_text="распознанный текст"
+        ),
+        "old_text": UserDocument(
+            user_id=user.id, filename="t.txt", file_type="text", status="completed",
+            is_deleted=True, deleted_at=old, extracted_text=""
+        ),
+        "recent": UserDocument(
+            user_id=user.id, filename="r.txt", file_type="text", status="completed",
+            is_deleted=True, deleted_at=datetime.now() - timedelta(days=1)
+        ),
+        "active": UserDocument(user_id=user.id, filename="a.txt", file_type="text", status="completed"),
+    }
+    db_session.add_all(docs.values())
+    db_session.flush()
+    db_session.add(UserDailyAction(
+        user_id=user.id, document_id=docs["old_photo"].id, action_date=old, action_type="photo"
+    ))
+    db_session.commit()
+
+    return docs
+
+
+def test_purge_deletes_old_documents_in_batches(db_session, documents):
+    # Удаляются только документы, удалённые раньше срока хранения; S3 - одним запросом на пачку
+    photo_id = documents["old_photo"].id
+    s3_calls = []
+
+    with patch("backend.maintenance_tasks.SessionLocal", sessionmaker(bind=db_session.get_bind())), \
+            patch("backend.maintenance_tasks.delete_objects_from_s3", side_effect=lambda keys: s3_calls.append(keys) or []):
+        report = purge_deleted_documents(retention_days=30, batch_size=1)
+
+    assert report == {
+        "documents": 2,
+        "actions": 1,
+        "db_bytes": len("распознанный текст".encode("utf-8")),
+        "s3_objects": 2,
+        "s3_failed": 0,
+    }
+    assert len(s3_calls) == 2
+    assert f"photos/user_{documents['old_photo'].user_id}/photo_1.jpg" in s3_calls[0]
+    assert f"contents/document_{photo_id}.txt.zst" in s3_calls[0]
+
+    db_session.expire_all()
+    remaining = {doc.filename for doc in db_session.query(UserDocument)}
+    assert remaining == {"r.txt", "a.txt"}
+    assert db_session.get(UserDocumentContent, photo_id) is None
+
+    # Действие пользователя остаётся без ссылки на документ
+    action = db_session.query(UserDailyAction).one()
+    assert action.document_id is None
+
+
+def test_purge_reports_failed_s3_objects(db_session, documents):
+    # Неудалённые объекты S3 попадают в отчёт, строки БД всё равно удаляются
+    with patch("backend.maintenance_tasks.SessionLocal", sessionmaker(bind=db_session.get_bind())), \
+            patch("backend.maintenance_tasks.delete_objects_from_s3", side_effect=lambda keys: keys[:1]):
+        report = purge_deleted_documents(retention_days=30)
+
+    assert report["documents"] == 2
+    assert report["s3_objects"] == 1
+    assert report["s3_failed"] == 1
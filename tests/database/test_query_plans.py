@@ -0,0 +1,158 @@
+# Тесты планов запросов: проверки лимитов используют индексы
+
+import pytest
+from datetime import datetime, timedelta
+
+from backend.models import User, UserDocument, UserSubscription, SubscriptionTier
+from backend.services import LimitsService, DocumentService, UserService, UsageService
+from backend.services.date_utils import get_today_range
+
+pytestmark = pytest.mark.database
+
+
+@pytest.fixture
+def user_with_documents(db_session):
+    # Пользователь с документами всех типов за сегодня и вчера
+    user = User(telegram_id=555001, username="plan_user", referral_code="REF555001")
+    db_session.add(user)
+    db_session.commit()
+
+    now = datetime.now()
+    for file_type in ("text", "photo", "file", "video"):
+        for upload_date in (now, now - timedelta(days=1)):
+            db_session.add(UserDocument(
+                user_id=user.id,
+                filename=f"{file_type}.bin",
+                file_type=file_type,
+                status="completed",
+                upload_date=upload_date,
+                duration_hours=0.5 if file_type == "video" else None,
+                is_deleted=False
+            ))
+    db_session.commit()
+
+    return user
+
+
+def query_plan(db_session, statement, parameters):
+    # EXPLAIN QUERY PLAN для запроса с параметрами
+    rows = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def assert_documents_queries_use_index(db_session, captured):
+    # Все запросы к user_documents идут через индекс, без полного сканирования
+    document_queries = [
+        (statement, parameters) for statement, parameters in captured
+        if "FROM user_documents" in statement
+    ]
+    assert document_queries
+
+    for statement, parameters in document_queries:
+        plan = query_plan(db_session, statement, parameters)
+        assert "USING" in plan and "INDEX ix_user_documents_" in plan, plan
+        assert "SCAN user_documents" not in plan, plan
+
+        # Дневные фильтры - диапазон по самой колонке, входящий в индекс
+        assert "date(user_documents.upload_date)" not in statement
+        if "upload_date >=" in statement and "CASE" not in statement:
+            assert "upload_date>?" in plan and "upload_date<?" in plan, plan
+
+
+def test_today_range_is_half_open():
+    # Границы дня: [00:00 сегодня, 00:00 завтра)
+    start, end = get_today_range(datetime(2026, 3, 15, 17, 42, 5))
+
+    assert start == datetime(2026, 3, 15)
+    assert end == datetime(2026, 3, 16)
+
+
+@pytest.mark.parametrize("check", ["text", "photo", "file", "video"])
+async def test_limit_checks_read_usage_by_primary_key(db_session, async_db_session, captured_sql, user_with_documents, check):
+    # Проверка лимитов - один запрос к user_usage по первичному ключу
+    tier = db_session.query(SubscriptionTier).filter_by(tier_name="basic").first()
+    service = LimitsService(async_db_session)
+
+    # Первая проверка создаёт строку счётчиков пересчётом по документам
+    await service.check_text_limits(user_with_documents.id, tier)
+    captured_sql.clear()
+
+    if check == "video":
+        await service.check_video_limits(user_with_documents.id, tier, 0.1)
+    else:
+        await getattr(service, f"check_{check}_limits")(user_with_documents.id, tier)
+
+    assert len(captured_sql) == 1
+    statement, parameters = captured_sql[0]
+    assert "FROM user_usage" in statement
+    assert "user_documents" not in statement
+
+    plan = query_plan(db_session, statement, parameters)
+    assert "SEARCH user_usage USING INTEGER PRIMARY KEY" in plan, plan
+
+
+async def test_usage_reconcile_uses_index(db_session, async_db_session, captured_sql, user_with_documents):
+    # Пересчёт счётчиков по документам идёт через индекс user_documents
+    await UsageService(async_db_session).reconcile([user_with_documents.id])
+
+    assert_documents_queries_use_index(db_session, captured_sql)
+
+
+async def test_document_counts_today_use_index(db_session, async_db_session, captured_sql, user_with_documents):
+    # Подсчёт документов за сегодня не оборачивает upload_date в функцию
+    service = DocumentService(async_db_session)
+
+    texts_today = await service.get_document_counts(user_with_documents.id, "text", include_today_only=True)
+    hours_today = await service.get_video_hours(user_with_documents.id, include_today_only=True)
+
+    assert texts_today == 1
+    assert hours_today == 0.5
+    assert_documents_queries_use_index(db_session, captured_sql)
+
+
+async def test_stats_queries_use_indexes(db_session, async_db_session, captured_sql, user_with_documents):
+    # Статистика: сообщения за сегодня через индекс, документы не агрегируются
+    tier = db_session.query(SubscriptionTier).filter_by(tier_name="basic").first()
+    db_session.add(UserSubscription(
+        user_id=user_with_documents.id,
+        tier_id=tier.id,
+        source="registration",
+        status="active",
+        start_date=datetime.now()
+    ))
+    db_session.commit()
+
+    stats = await UserService(async_db_session).get_user_stats(user_with_documents.telegram_id)
+
+    assert stats["kb_daily"]["texts"].startswith("1/")
+
+    actions_queries = [
+        (statement, parameters) for statement, parameters in captured_sql
+        if "FROM user_actions" in statement
+    ]
+    assert actions_queries
+    for statement, parameters in actions_queries:
+        plan = query_plan(db_session, statement, parameters)
+        assert "ix_user_actions_user_type_date" in plan, plan
+
+    # Строки счётчиков ещё не было - единственный запрос к документам это пересчёт
+    documents_queries = [statement for statement, _ in captured_sql if "FROM user_documents" in statement]
+    assert len(documents_queries) == 1
+
+
+async def test_documents_page_uses_index(db_session, async_db_session, captured_sql, user_with_documents):
+    # Страница документов читается из индекса без отдельной сортировки
+    service = DocumentService(async_db_session)
+
+    documents, next_cursor = await service.get_documents_page(user_with_documents.id, file_type="photo", limit=1)
+    await service.get_documents_page(user_with_documents.id, file_type="photo", limit=1, cursor=next_cursor)
+
+    assert len(documents) == 1 and next_cursor is not None
+    assert all("extracted_text" not in statement for statement, _ in captured_sql)
+    # Тексты документов не читаются
+    assert all("user_document_contents" not in statement for statement, _ in captured_sql)
+
+    for statement, parameters in captured_sql:
+        plan = query_plan(db_session, statement, parameters)
+        assert "INDEX ix_user_documents_" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
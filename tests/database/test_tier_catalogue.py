@@ -0,0 +1,64 @@
+# Тесты каталога тарифов в памяти
+
+import pytest
+
+from backend.models import SubscriptionTier
+from backend.services import UserService
+from backend.services.tier_catalogue import TierCatalogue, tier_catalogue
+
+pytestmark = pytest.mark.database
+
+
+async def test_catalogue_serves_tiers_from_memory(async_db_session, captured_sql):
+    # После загрузки тарифы отдаются без запросов к БД
+    catalogue = TierCatalogue(ttl_sec=300)
+    await catalogue.load(async_db_session)
+    captured_sql.clear()
+
+    free = await catalogue.get_by_name(async_db_session, "free")
+    same = await catalogue.get_by_id(async_db_session, free.id)
+    public = await catalogue.list_tiers(async_db_session)
+
+    assert captured_sql == []
+    assert same == free
+    assert [tier.tier_name for tier in public] == ["basic", "premium", "ultra"]
+
+
+async def test_catalogue_reloads_after_invalidation(db_session, async_db_session):
+    # Инвалидация - новая версия с изменёнными тарифами
+    catalogue = TierCatalogue(ttl_sec=300)
+    await catalogue.ensure_fresh(async_db_session)
+    version = catalogue.version
+
+    basic = db_session.query(SubscriptionTier).filter_by(tier_name="basic").first()
+    basic.daily_texts = 77
+    db_session.commit()
+
+    # До инвалидации - прежняя версия
+    assert (await catalogue.get_by_name(async_db_session, "basic")).daily_texts == 25
+
+    catalogue.invalidate()
+
+    assert (await catalogue.get_by_name(async_db_session, "basic")).daily_texts == 77
+    assert catalogue.version == version + 1
+
+
+async def test_catalogue_reloads_after_ttl(async_db_session, captured_sql):
+    # Истёкший TTL - каталог перечитывается
+    catalogue = TierCatalogue(ttl_sec=0)
+    await catalogue.load(async_db_session)
+    captured_sql.clear()
+
+    await catalogue.get_by_name(async_db_session, "free")
+
+    assert any("FROM subscription_tiers" in statement for statement, _ in captured_sql)
+
+
+async def test_registration_uses_catalogue(async_db_session, captured_sql):
+    # Регистрация не запрашивает тариф free из БД
+    await tier_catalogue.ensure_fresh(async_db_session)
+    captured_sql.clear()
+
+    await UserService(async_db_session).register_or_get_user(telegram_id=720001, username="tiers")
+
+    assert not any("FROM subscription_tiers" in statement for statement, _ in captured_sql)
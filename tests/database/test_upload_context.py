@@ -0,0 +1,45 @@
+# Тесты загрузки контекста для эндпоинтов загрузки
+
+import pytest
+from datetime import datetime
+
+from backend.models import UserSubscription
+from backend.services import UserService
+from backend.services.upload_context import UploadContext
+
+pytestmark = pytest.mark.database
+
+
+async def test_upload_context_single_query(db_session, async_db_session, captured_sql):
+    # Пользователь, подписка, тариф и использование загружаются одним запросом
+    await UserService(async_db_session).register_or_get_user(telegram_id=710001, username="ctx")
+    captured_sql.clear()
+
+    context = await UploadContext.load(async_db_session, 710001)
+
+    assert len(captured_sql) == 1
+    assert context.user.telegram_id == 710001
+    assert context.subscription.status == "active"
+    assert context.tier.tier_name == "free"
+    assert context.usage.texts_count == 0
+
+
+async def test_upload_context_unknown_user(async_db_session):
+    # Неизвестный пользователь - None
+    assert await UploadContext.load(async_db_session, 710404) is None
+
+
+async def test_upload_context_without_active_subscription(db_session, async_db_session):
+    # Без активной подписки тариф не заполняется
+    user = await UserService(async_db_session).register_or_get_user(telegram_id=710002, username="ctx")
+
+    subscription = db_session.query(UserSubscription).filter_by(user_id=user.id).first()
+    subscription.status = "expired"
+    subscription.end_date_fact = datetime.now()
+    db_session.commit()
+
+    context = await UploadContext.load(async_db_session, 710002)
+
+    assert context.user.id == user.id
+    assert context.subscription is None
+    assert context.tier is None
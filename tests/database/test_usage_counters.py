@@ -0,0 +1,135 @@
+# Тесты счётчиков использования user_usage
+
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import User, UserUsage
+from backend.services import DocumentService, UsageService, UserService
+from backend.services.date_utils import get_today_range
+from backend.services.usage_service import USAGE_COLUMNS, build_usage_aggregate
+
+pytestmark = pytest.mark.database
+
+
+def reconciled_values(db_session, user_id):
+    # Эталонные значения счётчиков, посчитанные по user_documents
+    today_start, tomorrow_start = get_today_range()
+    row = db_session.execute(build_usage_aggregate([user_id], today_start, tomorrow_start)).first()
+
+    return {
+        column: (getattr(row, column) if row else 0)
+        for pair in USAGE_COLUMNS.values() for column in pair
+    }
+
+
+def snapshot_values(snapshot):
+    return {column: getattr(snapshot, column) for pair in USAGE_COLUMNS.values() for column in pair}
+
+
+async def test_registration_creates_empty_usage(db_session, async_db_session):
+    # При регистрации создаётся пустая строка счётчиков
+    user = await UserService(async_db_session).create_user(telegram_id=700001, username="usage")
+
+    usage = db_session.get(UserUsage, user.id)
+
+    assert usage is not None
+    assert usage.texts_count == 0
+    assert usage.usage_day == get_today_range()[0].date()
+
+
+async def test_counters_follow_document_lifecycle(db_session, async_db_session):
+    # Создание, обработка и удаление документов поддерживают счётчики в актуальном состоянии
+    user = await UserService(async_db_session).create_user(telegram_id=700002, username="usage")
+    documents = DocumentService(async_db_session)
+    usage_service = UsageService(async_db_session)
+
+    text_1 = await documents.create_document(user.id, "a.txt", "text", status="completed", extracted_text="a")
+    await documents.create_document(user.id, "b.txt", "text", status="completed", extracted_text="b")
+    photo = await documents.create_document(user.id, "p.jpg", "photo", status="pending")
+    video = await documents.create_document(user.id, "v", "video", status="pending", duration_hours=0.5)
+    failed_file = await documents.create_document(user.id, "f.pdf", "file", status="pending")
+
+    await documents.update_document_status(photo.id, "completed")
+    await documents.update_document_status(video.id, "completed")
+    await documents.update_document_status(failed_file.id, "processing", error="broken")
+    await documents.soft_delete_document(text_1.id)
+    await documents.soft_delete_document(photo.id)
+    # Повторное удаление не меняет счётчики
+    await documents.soft_delete_document(photo.id)
+
+    usage = await usage_service.get_usage(user.id)
+
+    assert usage.texts_count == 1
+    assert usage.daily_texts == 1
+    assert usage.photos_count == 0
+    assert usage.daily_photos == 1
+    assert usage.files_count == 0
+    assert usage.daily_files == 1
+    assert usage.video_hours == 0.5
+    assert usage.daily_video_hours == 0.5
+    assert snapshot_values(usage) == reconciled_values(db_session, user.id)
+
+
+async def test_daily_counters_reset_on_new_day(db_session, async_db_session):
+    # Дневные счётчики за прошлый день не учитываются и обнуляются при следующей загрузке
+    user = await UserService(async_db_session).create_user(telegram_id=700003, username="usage")
+    documents = DocumentService(async_db_session)
+
+    await documents.create_document(user.id, "a.txt", "text", status="completed", extracted_text="a")
+    await documents.create_document(user.id, "p.jpg", "photo", status="pending")
+
+    usage_row = db_session.get(UserUsage, user.id)
+    usage_row.usage_day = usage_row.usage_day - timedelta(days=1)
+    db_session.commit()
+
+    usage = await UsageService(async_db_session).get_usage(user.id)
+    assert usage.texts_count == 1
+    assert usage.daily_texts == 0
+    assert usage.daily_photos == 0
+
+    await documents.create_document(user.id, "b.txt", "text", status="completed", extracted_text="b")
+
+    usage = await UsageService(async_db_session).get_usage(user.id)
+    assert usage.texts_count == 2
+    assert usage.daily_texts == 1
+    assert usage.daily_photos == 0
+
+
+async def test_missing_usage_row_is_rebuilt(db_session, async_db_session):
+    # Для пользователя без строки счётчиков она создаётся пересчётом
+    user = User(telegram_id=700004, username="legacy", referral_code="REF700004")
+    db_session.add(user)
+    db_session.commit()
+
+    await DocumentService(async_db_session).create_document(
+        user.id, "a.txt", "text", status="completed", extracted_text="a"
+    )
+
+    usage = await UsageService(async_db_session).get_usage(user.id)
+
+    assert usage.texts_count == 1
+    assert usage.daily_texts == 1
+
+
+async def test_reconcile_task_repairs_drift(db_session, async_db_session):
+    # Задача сверки восстанавливает счётчики по user_documents
+    from backend.maintenance_tasks import reconcile_user_usage
+
+    user = await UserService(async_db_session).create_user(telegram_id=700005, username="usage")
+    await DocumentService(async_db_session).create_document(
+        user.id, "a.txt", "text", status="completed", extracted_text="a"
+    )
+
+    usage_row = db_session.get(UserUsage, user.id)
+    usage_row.texts_count = 42
+    db_session.commit()
+
+    with patch("backend.maintenance_tasks.SessionLocal", sessionmaker(bind=db_session.get_bind())):
+        result = reconcile_user_usage(batch_size=1)
+
+    assert result["users"] == 1
+
+    db_session.refresh(usage_row)
+    assert usage_row.texts_count == 1
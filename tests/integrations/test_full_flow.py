@@ -55,7 +55,7 @@ def test_full_text_upload_flow(client, free_user_data, db_session):
     assert len(docs) == 1
 
     # Удаляем
-    delete_response = client.delete(f"/kb/documents/{doc_id}")
+    delete_response = client.delete(f"/kb/documents/{doc_id}", params={"telegram_id": free_user_data["telegram_id"]})
     assert delete_response.json()["success"] is True
 
     # Проверяем мягкое удаление
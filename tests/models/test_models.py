@@ -4,7 +4,7 @@ import pytest
 from datetime import datetime
 from backend.models import (
     User, UserSubscription, SubscriptionTier,
-    UserDocument, UserDailyAction
+    UserDocument, UserDocumentContent, UserDailyAction
 )
 
 pytestmark = pytest.mark.database
@@ -111,6 +111,27 @@ def test_soft_delete_document(db_session):
     assert doc.extracted_text == ""
 
 
+def test_document_text_stored_separately(db_session):
+    # Текст документа хранится в user_document_contents вместе с размерами
+    user = User(telegram_id=12345, referral_code="REF12345")
+    db_session.add(user)
+    db_session.commit()
+
+    doc = UserDocument(user_id=user.id, filename="test.txt", file_type="text", extracted_text="Привет")
+    empty = UserDocument(user_id=user.id, filename="empty.txt", file_type="text")
+    db_session.add_all([doc, empty])
+    db_session.commit()
+
+    content = db_session.get(UserDocumentContent, doc.id)
+    assert content.text == "Привет"
+    assert content.char_count == 6
+    assert content.size_bytes == 12
+
+    # Документ без текста - без строки содержимого
+    assert empty.extracted_text is None
+    assert db_session.get(UserDocumentContent, empty.id) is None
+
+
 def test_user_daily_action(db_session):
     # Создание записи действия пользователя
     user = User(telegram_id=12345, referral_code="REF12345")
@@ -0,0 +1,68 @@
+# Перенос текстов документов из user_documents.extracted_text в user_document_contents
+#
+# python utils/backfill_document_contents.py
+# python utils/backfill_document_contents.py --batch-size 500
+#
+# Миграция d5a9f3b2c6e1 переносит тексты при обновлении схемы. Запуск после
+# выкладки переносит тексты, которые успели записать старые экземпляры API
+# и worker. Уже перенесённые тексты не меняются, запуск можно повторять.
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from backend.database import engine
+
+BACKFILL_SQL = text("""
+    INSERT INTO user_document_contents (document_id, text, char_count, size_bytes)
+    SELECT id, extracted_text, char_length(extracted_text), octet_length(extracted_text)
+    FROM user_documents
+    WHERE id > :start_id AND id <= :end_id AND extracted_text IS NOT NULL
+    ON CONFLICT (document_id) DO NOTHING
+""")
+
+
+def backfill(batch_size: int = 1000, pause_sec: float = 0.0) -> int:
+    """
+    Перенести недостающие тексты документов.
+
+    Args:
+        batch_size: Документов за одну транзакцию (диапазон id)
+        pause_sec: Пауза между транзакциями (снижает нагрузку на БД)
+
+    Returns:
+        Количество перенесённых текстов
+    """
+    with engine.connect() as conn:
+        max_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM user_documents")).scalar()
+
+    copied = 0
+    for start_id in range(0, max_id, batch_size):
+        with engine.begin() as conn:
+            result = conn.execute(BACKFILL_SQL, {"start_id": start_id, "end_id": start_id + batch_size})
+            copied += result.rowcount
+        if pause_sec:
+            time.sleep(pause_sec)
+
+    return copied
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Перенос текстов документов в user_document_contents")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Документов за транзакцию")
+    parser.add_argument('--pause', type=float, default=0.0, help="Пауза между транзакциями в секундах")
+    args = parser.parse_args()
+
+    copied = backfill(args.batch_size, args.pause)
+    print(f"Перенесено текстов: {copied}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
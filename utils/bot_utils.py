@@ -13,7 +13,7 @@ import logging
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
-from shared.config import settings, Limits, Messages, CONTENT_CONFIG
+from shared.config import settings, Limits, Messages, CONTENT_CONFIG, DocumentStatus
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -27,7 +27,8 @@ async def api_request(
         method: str,
         endpoint: str,
         json: Optional[Dict[str, Any]] = None,
-        params: Optional[Dict[str, Any]] = None
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[aiohttp.FormData] = None
 ) -> Tuple[bool, Optional[Dict], Optional[str]]:
     """
     Выполнить HTTP запрос к API.
@@ -37,6 +38,7 @@ async def api_request(
         endpoint: Путь эндпоинта (например, /users/register)
         json: JSON данные для POST/PUT
         params: Query параметры для GET
+        data: Данные формы (multipart/form-data)
 
     Returns:
         Кортеж (success, data, error_message)
@@ -50,6 +52,7 @@ async def api_request(
                     url,
                     json=json,
                     params=params,
+                    data=data,
                     timeout=aiohttp.ClientTimeout(total=30)
             ) as response:
 
@@ -70,6 +73,78 @@ async def api_request(
         return False, None, str(e)
 
 
+async def api_upload_direct(
+        endpoint: str,
+        telegram_id: int,
+        file_type: str,
+        files: List[Dict[str, Any]]
+) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """
+    Загрузить файлы напрямую в S3 по presigned POST, минуя API.
+
+    API создаёт сессию (документы и подписанные формы загрузки),
+    файлы отправляются в S3 параллельно, затем сессия завершается
+    и API проверяет объекты и запускает обработку.
+
+    Args:
+        endpoint: Путь эндпоинта сессии (например, /kb/upload/session)
+        telegram_id: ID пользователя в Telegram
+        file_type: Тип документов (photo, file)
+        files: Файлы [{"filename": ..., "content": bytes, "mime_type": ...}, ...]
+
+    Returns:
+        Кортеж (success, data, error_message) ответа на завершение сессии
+    """
+    success, session_data, error = await api_request("POST", endpoint, json={
+        "telegram_id": telegram_id,
+        "file_type": file_type,
+        "files": [
+            {"filename": item["filename"], "mime_type": item.get("mime_type"), "size": len(item["content"])}
+            for item in files
+        ]
+    })
+
+    if not success:
+        return False, None, error
+
+    async def upload(http, presigned, item):
+        form = aiohttp.FormData()
+        for name, value in presigned["fields"].items():
+            form.add_field(name, value)
+        # Поле file должно быть последним в форме
+        form.add_field("file", item["content"], filename=item["filename"])
+
+        try:
+            async with http.post(presigned["url"], data=form) as response:
+                if response.status not in (200, 201, 204):
+                    logger.error(f"S3 upload error: document_id={presigned['document_id']} -> {response.status}")
+                    return None
+                return {
+                    "document_id": presigned["document_id"],
+                    "size": len(item["content"]),
+                    "etag": response.headers.get("ETag")
+                }
+        except Exception as e:
+            logger.error(f"S3 upload exception: document_id={presigned['document_id']} -> {e}")
+            return None
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as http:
+        results = await asyncio.gather(*(
+            upload(http, presigned, item)
+            for presigned, item in zip(session_data["uploads"], files)
+        ))
+
+    # Незагруженные документы API пометит как failed
+    return await api_request("POST", f"{endpoint}/finalize", json={
+        "telegram_id": telegram_id,
+        "file_type": file_type,
+        "uploads": [
+            result or {"document_id": presigned["document_id"]}
+            for result, presigned in zip(results, session_data["uploads"])
+        ]
+    })
+
+
 async def get_user_stats(telegram_id: int) -> Tuple[bool, Optional[Dict], Optional[str]]:
     """
     Получить статистику пользователя.
@@ -349,20 +424,13 @@ class BufferedUploader:
             f"⏳ Отправляю {len(buffer)} {self.upload_type}(s) на обработку..."
         )
 
-        # Формируем payload
-        if self.upload_type == "photo":
-            payload = {
-                "telegram_id": user_id,
-                "photos": buffer
-            }
-        else:  # file
-            payload = {
-                "telegram_id": user_id,
-                "files": buffer
-            }
-
-        # Отправляем в API
-        success, data, error = await api_request("POST", self.api_endpoint, json=payload)
+        # Файлы загружаются прямо в S3, API получает только метаданные
+        success, data, error = await api_upload_direct(
+            self.api_endpoint,
+            user_id,
+            self.upload_type,
+            buffer
+        )
 
         if success:
             logger.info(f"{len(buffer)} {self.upload_type}(s) отправлено на обработку для пользователя {user_id}")
@@ -406,14 +474,14 @@ class BufferedUploader:
 # Создаём глобальные инстансы
 photo_uploader = BufferedUploader(
     upload_type="photo",
-    api_endpoint="/kb/upload/photos",
+    api_endpoint="/kb/upload/session",
     max_items=Limits.BUFFER_MAX_ITEMS,
     wait_time=Limits.BUFFER_WAIT_TIME_SEC
 )
 
 file_uploader = BufferedUploader(
     upload_type="file",
-    api_endpoint="/kb/upload/files",
+    api_endpoint="/kb/upload/session",
     max_items=Limits.BUFFER_MAX_ITEMS,
     wait_time=Limits.BUFFER_WAIT_TIME_SEC
 )
@@ -423,33 +491,70 @@ file_uploader = BufferedUploader(
 # ПАГИНАЦИЯ ДОКУМЕНТОВ
 # ============================================================================
 
+async def fetch_documents_page(
+        telegram_id: int,
+        content_type: str,
+        cursor: Optional[str] = None
+) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """
+    Получить страницу документов одного типа.
+
+    Args:
+        telegram_id: ID пользователя в Telegram
+        content_type: Тип контента
+        cursor: Курсор страницы (None - первая страница)
+
+    Returns:
+        Кортеж (success, page_data, error)
+    """
+    params = {"file_type": content_type, "limit": Limits.DOCUMENTS_PAGE_SIZE}
+
+    # Тексты доступны сразу, остальное - после обработки
+    if content_type != "text":
+        params["status"] = DocumentStatus.COMPLETED
+
+    if cursor:
+        params["cursor"] = cursor
+
+    return await api_request("GET", f"/kb/documents/{telegram_id}/page", params=params)
+
+
 async def paginate_documents(
-        documents: List[Dict],
+        page_data: Dict,
         content_type: str,
         context: ContextTypes.DEFAULT_TYPE,
         query,
         user_id: int,
-        page: int = 0,
-        items_per_page: int = 5
+        page: int = 0
 ):
     """
-    Пагинация списка документов.
+    Показать страницу списка документов.
+
+    Курсоры просмотренных страниц хранятся в context.user_data["doc_pages"],
+    чтобы кнопки навигации оставались короткими (page_<тип>_<номер>).
 
     Args:
-        documents: Список документов
+        page_data: Ответ API (documents, next_cursor, total_count)
         content_type: Тип контента
         context: Callback context
         query: Callback query
         user_id: ID пользователя
         page: Номер страницы
-        items_per_page: Элементов на странице
     """
-    total = len(documents)
-    total_pages = (total + items_per_page - 1) // items_per_page
+    page_documents = page_data.get("documents", [])
+    next_cursor = page_data.get("next_cursor")
+
+    # Состояние списка: курсор для каждой открытой страницы и общее количество
+    pages = context.user_data.setdefault("doc_pages", {})
+    if page == 0 or content_type not in pages:
+        pages[content_type] = {"cursors": [None], "total": page_data.get("total_count")}
 
-    start_idx = page * items_per_page
-    end_idx = start_idx + items_per_page
-    page_documents = documents[start_idx:end_idx]
+    state = pages[content_type]
+    del state["cursors"][page + 1:]
+    if next_cursor:
+        state["cursors"].append(next_cursor)
+
+    total = state["total"] if state["total"] is not None else len(page_documents)
 
     config = CONTENT_CONFIG.get(content_type, {})
 
@@ -458,10 +563,12 @@ async def paginate_documents(
     keyboard = []
 
     for doc in page_documents:
-        filename = doc['filename']
         upload_date = doc['upload_date'][:10]
 
-        button_text = f"📄 {filename[:25]}... ({upload_date})"
+        # У текстов имя файла служебное - показываем начало текста
+        label = doc.get('preview') if content_type == "text" and doc.get('preview') else doc['filename']
+
+        button_text = f"📄 {label[:25]}... ({upload_date})"
 
         if content_type == "photo":
             keyboard.append([InlineKeyboardButton(button_text, callback_data=f"view_doc_{doc['id']}")])
@@ -473,7 +580,7 @@ async def paginate_documents(
     nav_row = []
     if page > 0:
         nav_row.append(InlineKeyboardButton("◀️ Назад", callback_data=f"page_{content_type}_{page - 1}"))
-    if page < total_pages - 1:
+    if next_cursor:
         nav_row.append(InlineKeyboardButton("Вперёд ▶️", callback_data=f"page_{content_type}_{page + 1}"))
 
     if nav_row:
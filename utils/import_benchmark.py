@@ -0,0 +1,184 @@
+# Бенчмарк времени импорта точек входа (python -X importtime)
+#
+# python utils/import_benchmark.py            - проверка всех точек входа
+# python utils/import_benchmark.py backend.main --top 30
+#
+# Каждая точка входа импортируется в отдельном процессе. Проверка не
+# проходит, если общее время импорта превышает бюджет или загружен
+# модуль из списка запрещённых (тяжёлые зависимости, которые должны
+# импортироваться лениво). Бюджеты с запасом ~2x от текущих замеров;
+# на медленной машине их можно масштабировать через IMPORT_BUDGET_SCALE.
+# В обычном прогоне тестов проверяются только запрещённые модули,
+# бюджеты времени - при IMPORT_BENCHMARK=1.
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+BASE_DIR = Path(__file__).parent.parent
+
+
+@dataclass
+class EntryPoint:
+    """Точка входа и её ограничения."""
+
+    module: str
+    budget_ms: int
+    forbidden: Sequence[str] = ()
+
+
+# Тяжёлые зависимости обработки документов - только для Celery worker
+WORKER_ONLY_MODULES = ('yt_dlp', 'ffmpeg', 'pdf2image', 'docx', 'requests', 'backend.s3_storage')
+
+ENTRY_POINTS = [
+    # API: задачи ставятся через заглушки, boto3 загружается при первом обращении к S3
+    EntryPoint('backend.main', 2000, WORKER_ONLY_MODULES + ('boto3', 'botocore', 'uvicorn')),
+    # Приложение Celery без модулей задач (импортируется API)
+    EntryPoint('backend.celery_app', 600, WORKER_ONLY_MODULES + ('boto3', 'sqlalchemy')),
+    # Worker: реализации задач
+    EntryPoint('backend.s3_storage', 2500),
+    # Telegram бот
+    EntryPoint('bot.bot', 1800, ('boto3', 'pdf2image', 'docx', 'sqlalchemy', 'fastapi')),
+]
+
+
+@dataclass
+class ImportReport:
+    """Результат замера импорта одной точки входа."""
+
+    module: str
+    total_ms: float
+    # Накопленное время импорта каждого модуля, мкс
+    cumulative_us: Dict[str, int] = field(default_factory=dict)
+    # Модули, импортированные напрямую точкой входа (первый уровень)
+    top_level: List[str] = field(default_factory=list)
+
+    def top(self, limit: int = 15) -> List[tuple]:
+        """Самые медленные модули первого уровня: (модуль, мс)."""
+        items = [(name, self.cumulative_us[name] / 1000) for name in self.top_level]
+        return sorted(items, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def parse_importtime(output: str, module: str) -> ImportReport:
+    """
+    Разобрать вывод python -X importtime.
+
+    Args:
+        output: stderr процесса
+        module: Импортируемая точка входа
+
+    Returns:
+        Отчёт с накопленным временем модулей
+    """
+    cumulative = {}
+    levels = []
+    base_indent = None
+
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        indent = len(name) - len(name.lstrip())
+        name = name.strip()
+        cumulative[name] = int(cumulative_us)
+        levels.append((indent, name))
+
+        if name == module:
+            base_indent = indent
+
+    if base_indent is None:
+        raise RuntimeError(f"Модуль {module} не найден в выводе importtime")
+
+    # Вложенные импорты выводятся до родителя с отступом на 2 больше
+    direct = [name for indent, name in levels if indent == base_indent + 2]
+    return ImportReport(module, cumulative[module] / 1000, cumulative, direct)
+
+
+def measure_import(module: str, python: str = sys.executable) -> ImportReport:
+    """
+    Импортировать модуль в отдельном процессе и замерить время.
+
+    Args:
+        module: Имя модуля
+        python: Интерпретатор
+
+    Returns:
+        Отчёт об импорте
+
+    Raises:
+        RuntimeError: Импорт завершился ошибкой
+    """
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''
+        raise RuntimeError(f"Импорт {module} завершился ошибкой: {error}")
+
+    return parse_importtime(result.stderr, module)
+
+
+def check_entry_point(entry: EntryPoint, report: ImportReport, scale: float = 1.0,
+                      check_budget: bool = True) -> List[str]:
+    """
+    Проверить отчёт против ограничений точки входа.
+
+    Args:
+        entry: Точка входа
+        report: Отчёт об импорте
+        scale: Множитель бюджета
+        check_budget: Проверять время импорта (False - только запрещённые модули)
+
+    Returns:
+        Список нарушений (пустой, если всё в порядке)
+    """
+    problems = []
+
+    budget_ms = entry.budget_ms * scale
+    if check_budget and report.total_ms > budget_ms:
+        problems.append(f"{entry.module}: импорт {report.total_ms:.0f} мс превышает бюджет {budget_ms:.0f} мс")
+
+    loaded = [name for name in entry.forbidden if name in report.cumulative_us]
+    if loaded:
+        problems.append(f"{entry.module}: загружены тяжёлые модули {', '.join(loaded)}")
+
+    return problems
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк времени импорта точек входа")
+    parser.add_argument('modules', nargs='*', help="Точки входа (по умолчанию все)")
+    parser.add_argument('--top', type=int, default=10, help="Сколько модулей показать в разбивке")
+    parser.add_argument('--scale', type=float, default=float(os.getenv('IMPORT_BUDGET_SCALE', '1')),
+                        help="Множитель бюджетов")
+    args = parser.parse_args(argv)
+
+    entries = [entry for entry in ENTRY_POINTS if not args.modules or entry.module in args.modules]
+    problems = []
+
+    for entry in entries:
+        report = measure_import(entry.module)
+        print(f"{entry.module}: {report.total_ms:.0f} мс (бюджет {entry.budget_ms * args.scale:.0f} мс)")
+        for name, ms in report.top(args.top):
+            print(f"    {ms:8.1f} мс  {name}")
+
+        problems.extend(check_entry_point(entry, report, args.scale))
+
+    for problem in problems:
+        print(f"❌ {problem}")
+
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# Сжатие существующих текстов документов по политике backend/content_storage.py
+#
+# python utils/recompress_document_contents.py
+# python utils/recompress_document_contents.py --batch-size 200 --pause 0.5
+# python utils/recompress_document_contents.py --decompress   # перед откатом миграции e8c1a4d7b3f5
+#
+# Тексты обрабатываются пачками по document_id, каждая пачка - отдельная
+# транзакция; строки, заблокированные worker, пропускаются (SKIP LOCKED)
+# и обрабатываются повторным запуском. Большие сжатые тексты выносятся в S3.
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from backend.content_storage import offload_to_s3, read_text
+from backend.models import UserDocumentContent
+from shared.config import settings, ContentStorage
+
+
+def _pending_filter(decompress: bool):
+    if decompress:
+        return UserDocumentContent.storage != ContentStorage.INLINE
+
+    return or_(
+        # Несжатые тексты больше порога
+        (UserDocumentContent.storage == ContentStorage.INLINE)
+        & (UserDocumentContent.size_bytes > settings.CONTENT_INLINE_MAX_BYTES),
+        # Сжатые тексты, которые нужно вынести в S3
+        (UserDocumentContent.storage == ContentStorage.ZSTD)
+        & (UserDocumentContent.stored_bytes >= settings.CONTENT_S3_MIN_BYTES),
+    )
+
+
+def _db_bytes(content) -> int:
+    # Вынесенные в S3 тексты места в БД не занимают
+    return 0 if content.storage == ContentStorage.S3 else content.stored_bytes
+
+
+def recompress(
+    session_factory: Callable[[], Session],
+    batch_size: int = 100,
+    pause_sec: float = 0.0,
+    decompress: bool = False
+) -> Dict[str, int]:
+    """
+    Сжать (или распаковать) тексты документов пачками.
+
+    Args:
+        session_factory: Фабрика синхронных сессий
+        batch_size: Текстов за одну транзакцию
+        pause_sec: Пауза между транзакциями (снижает нагрузку на БД)
+        decompress: Вернуть все тексты в несжатый вид
+
+    Returns:
+        Количество текстов, размер в БД до и после в байтах
+    """
+    stats = {"documents": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+
+    while True:
+        with session_factory() as db:
+            contents = db.scalars(
+                select(UserDocumentContent)
+                .where(UserDocumentContent.document_id > last_id, _pending_filter(decompress))
+                .order_by(UserDocumentContent.document_id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+
+            if not contents:
+                break
+
+            for content in contents:
+                stats["bytes_before"] += _db_bytes(content)
+                text = read_text(content)
+
+                if decompress:
+                    content.storage = ContentStorage.INLINE
+                    content.text, content.data, content.s3_key = text, None, None
+                    content.stored_bytes = content.size_bytes
+                else:
+                    if content.storage == ContentStorage.INLINE:
+                        content.set_text(text)
+                    offload_to_s3(content, content.document_id)
+
+                stats["bytes_after"] += _db_bytes(content)
+                stats["documents"] += 1
+
+            last_id = contents[-1].document_id
+            db.commit()
+
+        if pause_sec:
+            time.sleep(pause_sec)
+
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сжатие текстов документов в user_document_contents")
+    parser.add_argument('--batch-size', type=int, default=100, help="Текстов за транзакцию")
+    parser.add_argument('--pause', type=float, default=0.0, help="Пауза между транзакциями в секундах")
+    parser.add_argument('--decompress', action='store_true', help="Распаковать все тексты")
+    args = parser.parse_args()
+
+    from backend.database import SessionLocal
+
+    stats = recompress(SessionLocal, args.batch_size, args.pause, args.decompress)
+    saved = stats["bytes_before"] - stats["bytes_after"]
+
+    print(f"Обработано текстов: {stats['documents']}")
+    print(f"Размер в БД: {stats['bytes_before']} -> {stats['bytes_after']} байт (сэкономлено {saved})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
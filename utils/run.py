@@ -1,5 +1,6 @@
 # Единый файл для запуска приложения
 
+import os
 import redis
 import subprocess
 import sys
@@ -39,6 +40,11 @@ def check_redis():
         return False
 
 
+def with_role(role):
+    """Окружение процесса с ролью (определяет профиль пула соединений с БД)"""
+    return {**os.environ, 'PROCESS_ROLE': role}
+
+
 def main():
     logger.info("=== ЗАПУСК COGITO AI BOT ===")
 
@@ -51,19 +57,22 @@ def main():
     try:
         logger.info("▶ Запуск API сервера...")
         api = subprocess.Popen(
-            ['uvicorn', 'backend.main:app', '--reload']
+            ['uvicorn', 'backend.main:app', '--reload'],
+            env=with_role('api')
         )
         processes.append(('API', api))
 
         logger.info("▶ Запуск Celery Worker...")
         celery = subprocess.Popen(
-            ['celery', '-A', 'backend.celery_app', 'worker', '--loglevel=info', '--pool=solo']
+            ['celery', '-A', 'backend.celery_app', 'worker', '--loglevel=info', '--pool=solo'],
+            env=with_role('worker')
         )
         processes.append(('Celery', celery))
 
         logger.info("▶ Запуск Telegram бота...")
         bot = subprocess.Popen(
-            ['python', '-m', 'bot.bot']
+            ['python', '-m', 'bot.bot'],
+            env=with_role('bot')
         )
         processes.append(('Bot', bot))
 
@@ -0,0 +1,125 @@
+# Бенчмарк сериализации списка документов (/kb/documents/{telegram_id})
+#
+# python utils/serialization_benchmark.py
+# python utils/serialization_benchmark.py --documents 1000 --text-kb 64 --repeat 5
+#
+# Сравнивает способы собрать JSON ответ из строк ORM:
+# - pydantic: валидация response_model (from_attributes) и dump_json -
+#   текущий путь FastAPI для эндпоинтов с response_model;
+# - jsonable_encoder: валидация, jsonable_encoder и json.dumps -
+#   путь FastAPI до перехода на dump_json;
+# - fast: словари из атрибутов строк и orjson (backend/serialization.py).
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.schemas import DocumentsListResponse, DocumentResponse
+from backend.serialization import dumps, rows_to_dicts, schema_fields
+
+DOCUMENT_FIELDS = schema_fields(DocumentResponse)
+
+
+def make_documents(count: int, text_kb: int) -> List[SimpleNamespace]:
+    """Строки документов с атрибутами как у UserDocument."""
+    text = ("Извлечённый текст документа. " * (text_kb * 1024 // 30 + 1))[:text_kb * 1024]
+    start = datetime(2026, 1, 1, 12, 0, 0, 123456)
+
+    return [
+        SimpleNamespace(
+            id=i,
+            filename=f"document_{i}.pdf",
+            file_type="file",
+            upload_date=start + timedelta(minutes=i),
+            extracted_text=text,
+            file_url=f"https://storage.yandexcloud.net/bucket/files/user_1/document_{i}.pdf",
+            duration_hours=None,
+            status="completed",
+            is_deleted=False
+        )
+        for i in range(count)
+    ]
+
+
+def serialize_pydantic(documents) -> bytes:
+    payload = {"documents": documents, "total_count": len(documents)}
+    return DocumentsListResponse.model_validate(payload, from_attributes=True).model_dump_json().encode()
+
+
+def serialize_jsonable_encoder(documents) -> bytes:
+    payload = {"documents": documents, "total_count": len(documents)}
+    model = DocumentsListResponse.model_validate(payload, from_attributes=True)
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_fast(documents) -> bytes:
+    return dumps({"documents": rows_to_dicts(documents, DOCUMENT_FIELDS), "total_count": len(documents)})
+
+
+SERIALIZERS: Dict[str, Callable] = {
+    "pydantic": serialize_pydantic,
+    "jsonable_encoder": serialize_jsonable_encoder,
+    "fast": serialize_fast,
+}
+
+
+def run_benchmark(count: int = 1000, text_kb: int = 16, repeat: int = 5) -> Dict[str, float]:
+    """
+    Замерить сериализацию списка документов.
+
+    Args:
+        count: Документов в списке
+        text_kb: Размер extracted_text каждого документа в КБ
+        repeat: Повторов (берётся лучшее время)
+
+    Returns:
+        Лучшее время каждого способа в мс
+    """
+    documents = make_documents(count, text_kb)
+
+    # Все способы дают одинаковый JSON
+    reference = json.loads(serialize_pydantic(documents))
+    for name, serializer in SERIALIZERS.items():
+        if json.loads(serializer(documents)) != reference:
+            raise AssertionError(f"Сериализация {name} отличается от pydantic")
+
+    results = {}
+    for name, serializer in SERIALIZERS.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serializer(documents)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = min(timings)
+
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации списка документов")
+    parser.add_argument('--documents', type=int, default=1000, help="Документов в списке")
+    parser.add_argument('--text-kb', type=int, default=16, help="Размер текста документа в КБ")
+    parser.add_argument('--repeat', type=int, default=5, help="Повторов")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.documents, args.text_kb, args.repeat)
+    baseline = results["pydantic"]
+
+    print(f"{args.documents} документов по {args.text_kb} КБ текста:")
+    for name, ms in results.items():
+        print(f"    {name:<18} {ms:9.1f} мс  x{baseline / ms:.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())